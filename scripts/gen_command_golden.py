@@ -0,0 +1,322 @@
+"""生成 src/python/rc_command_golden.json（RC-main 命令预处理的 golden 语料）
+
+用法:
+    python scripts/gen_command_golden.py
+
+从 src/main 的 C 源码中原样提取 apply_value_placeholder、normalize_powershell_command、
+dup_and_escape_quotes_for_cmdline 与 PowerShell 参数模板，以及 RC_ActionRunProgramUtf8 判断
+扩展名所用的 strip_wrapping_quotes_alloc / RC_NormalizePathSlashes / file_ext_lower，
+编译成小程序（需要 gcc/clang，Windows 下可用 MinGW），对内置用例逐条求值后写出 JSON。rc_command.py 的自检会按该文件核对
+Python 实现；修改 C 侧行为后重新运行本脚本并检查差异。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+ROUTER_C = ROOT / "src" / "main" / "rc_router.c"
+ACTIONS_C = ROOT / "src" / "main" / "rc_actions.c"
+UTF_C = ROOT / "src" / "main" / "rc_utf.c"
+OUT_PATH = ROOT / "src" / "python" / "rc_command_golden.json"
+
+# (名称, 命令, value)；value 为 None 表示 payload 不带 #数值
+CASES = [
+    ("empty", "", None),
+    ("plain", "Get-Date", None),
+    ("curl-space", 'curl "http://127.0.0.1/api"', None),
+    ("curl-tab", "curl\thttp://x", None),
+    ("curl-upper", "CURL -s http://x", None),
+    ("curl-only", "curl", None),
+    ("curl-leading-space", "  curl http://x", None),
+    ("curl-exe", "curl.exe http://x", None),
+    ("curl-after-semicolon", "Get-Date; curl http://x", None),
+    ("curlx", "curlx http://x", None),
+    ("value-basic", "Set-Volume {value}", 30),
+    ("value-negative", "Set-Volume {value}", -5),
+    ("value-multi", "echo {value} {value}{value}", 7),
+    ("value-missing", "Set-Volume {value}", None),
+    ("value-case", "Set-Volume {Value}", 30),
+    ("value-spaced", "Set-Volume { value }", 30),
+    ("value-curl", 'curl "http://x/?v={value}"', 100),
+    ("quotes", 'Write-Host "a \\"b\\" c"', None),
+    ("single-quotes", "Write-Host 'it''s'", None),
+    ("backtick", 'Write-Host "a`"b"', None),
+    ("unicode", "Write-Host '你好，世界'", None),
+    ("newline", "Get-Date\nGet-Location", None),
+    ("here-string", '$s = @"\nline "q"\n"@\n$s', None),
+    ("braces", "& { Get-Date }", None),
+    ("near-limit", "x" * 8100, None),
+    ("over-limit", "x" * 8200, None),
+]
+
+# (名称, 路径, 环境变量)；“程序或脚本”的启动方式。环境变量展开依赖 Windows API，对照程序不执行展开，
+# 只记录主程序判断扩展名所用的字符串（展开之前），核对时由 Python 侧按 env 展开
+PROGRAM_CASES = [
+    ("ps1", "C:\\tools\\run.ps1", {}),
+    ("ps1-upper-slashes", " C:/tools/Run.PS1 ", {}),
+    ("bat-quoted", '"C:\\a b\\x.bat"', {}),
+    ("cmd-single-quoted", "'C:/x.cmd'", {}),
+    ("exe", "C:\\Windows\\notepad.exe", {}),
+    ("dot-in-dir", "C:\\v1.2\\app", {}),
+    ("no-ext", "C:\\tools\\run", {}),
+    ("env-whole-ps1", "%X%", {"X": "C:\\tools\\run.ps1"}),
+    ("env-dir-ps1", "%D%\\run.ps1", {"D": "C:\\tools"}),
+    ("env-dir-bat", "%D%/run.bat", {"D": "C:\\tools"}),
+    ("env-dollar", "$X", {"X": "/tools/run.ps1"}),
+    ("empty", "   ", {}),
+    ("empty-quotes", '""', {}),
+]
+
+# 只匹配定义（参数表后紧跟函数体），跳过前置声明
+_FUNC_RE = r"^static [^\n;]*\b{name}\([^;{{]*\)\s*\{{"
+
+
+def _extract_function(src: str, name: str) -> str:
+    m = re.search(_FUNC_RE.format(name=re.escape(name)), src, re.MULTILINE)
+    if not m:
+        raise SystemExit(f"未找到函数 {name}")
+    start = m.start()
+    depth = 0
+    i = m.end() - 1
+    while True:
+        if src[i] == "{":
+            depth += 1
+        elif src[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return src[start : i + 1]
+        i += 1
+
+
+def _extract_ps_templates(src: str) -> list[str]:
+    """RC_ActionRunPowershellCommandUtf8Ex 中的参数模板，按 keep / hide / show 顺序。"""
+    body = _extract_function(src.replace("bool RC_ActionRunPowershellCommandUtf8Ex(", "static bool RC_ActionRunPowershellCommandUtf8Ex("), "RC_ActionRunPowershellCommandUtf8Ex")
+    templates = re.findall(r'L"(-NoProfile -ExecutionPolicy Bypass(?:[^"\\]|\\.)*)"', body)
+    if len(templates) != 3:
+        raise SystemExit(f"参数模板数量不符：{templates}")
+    return templates
+
+
+_HARNESS = r"""
+#include <locale.h>
+#include <stdarg.h>
+#include <stdbool.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <strings.h>
+#include <wchar.h>
+#define _snprintf snprintf
+#define _strnicmp strncasecmp
+#define _vsnwprintf vswprintf
+
+%(functions)s
+
+static char *hex_decode(const char *h)
+{
+    size_t n = strlen(h) / 2;
+    char *out = malloc(n + 1);
+    for (size_t i = 0; i < n; i++)
+        sscanf(h + i * 2, "%%2hhx", (unsigned char *)&out[i]);
+    out[n] = 0;
+    return out;
+}
+
+static void hex_print(const char *s)
+{
+    for (const unsigned char *p = (const unsigned char *)s; *p; p++)
+        printf("%%02x", *p);
+    printf(" ");
+}
+
+static void print_args(const wchar_t *fmt, const wchar_t *escaped)
+{
+    wchar_t args[8192];
+    if (!rc_snwprintf_safe(args, sizeof(args) / sizeof(args[0]), fmt, escaped))
+    {
+        printf("- ");
+        return;
+    }
+    size_t cap = wcslen(args) * 4 + 1;
+    char *utf8 = malloc(cap);
+    wcstombs(utf8, args, cap);
+    hex_print(utf8);
+    free(utf8);
+}
+
+int main(void)
+{
+    setlocale(LC_ALL, "C.UTF-8");
+    char line[200000];
+    while (fgets(line, sizeof(line), stdin))
+    {
+        int hasValue = 0, value = 0;
+        char hex[190000] = "";
+        sscanf(line, "%%d %%d %%s", &hasValue, &value, hex);
+        char *cmd = hex_decode(hex);
+        char *applied = apply_value_placeholder(cmd, hasValue != 0, value);
+        char *norm = normalize_powershell_command(applied);
+        hex_print(applied);
+        hex_print(norm);
+        size_t wcap = strlen(norm) + 1;
+        wchar_t *w = malloc(wcap * sizeof(wchar_t));
+        mbstowcs(w, norm, wcap);
+        wchar_t *escaped = dup_and_escape_quotes_for_cmdline(w);
+        print_args(L"%(keep)s", escaped);
+        print_args(L"%(hide)s", escaped);
+        print_args(L"%(show)s", escaped);
+        printf("\n");
+        free(escaped);
+        free(w);
+        free(norm);
+        free(applied);
+        free(cmd);
+    }
+    return 0;
+}
+"""
+
+
+_PROGRAM_HARNESS = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#define _strdup strdup
+
+%(functions)s
+
+static char *hex_decode(const char *h)
+{
+    size_t n = strlen(h) / 2;
+    char *out = malloc(n + 1);
+    for (size_t i = 0; i < n; i++)
+        sscanf(h + i * 2, "%%2hhx", (unsigned char *)&out[i]);
+    out[n] = 0;
+    return out;
+}
+
+static void hex_print(const char *s)
+{
+    for (const unsigned char *p = (const unsigned char *)s; *p; p++)
+        printf("%%02x", *p);
+    printf(" ");
+}
+
+int main(void)
+{
+    char line[20000];
+    while (fgets(line, sizeof(line), stdin))
+    {
+        char hex[19000] = "";
+        sscanf(line, "%%s", hex);
+        char *raw = hex_decode(hex);
+        /* 与 RC_ActionRunProgramUtf8 相同的步骤：去引号 -> 归一化分隔符 -> 取扩展名 */
+        char *owned = strip_wrapping_quotes_alloc(raw);
+        const char *path2 = owned ? owned : skip_spaces(raw);
+        if (!path2 || !*path2)
+        {
+            printf("- -\n");
+        }
+        else
+        {
+            char *tmp = _strdup(path2);
+            RC_NormalizePathSlashes(tmp);
+            hex_print(tmp);
+            hex_print(file_ext_lower(tmp));
+            printf("\n");
+            free(tmp);
+        }
+        free(owned);
+        free(raw);
+    }
+    return 0;
+}
+"""
+
+
+def _run_harness(cc: str, source: str, stdin: str) -> str:
+    with tempfile.TemporaryDirectory() as tmp:
+        c_path = os.path.join(tmp, "golden.c")
+        exe_path = os.path.join(tmp, "golden.exe")
+        Path(c_path).write_text(source, encoding="utf-8")
+        subprocess.run([cc, "-O0", "-o", exe_path, c_path], check=True)
+        out = subprocess.run([exe_path], input=stdin.encode("utf-8"), capture_output=True, check=True).stdout
+    return out.decode("ascii")
+
+
+def _program_cases(cc: str, actions: str) -> list[dict]:
+    utf = UTF_C.read_text(encoding="utf-8").replace("void RC_NormalizePathSlashes(", "static void RC_NormalizePathSlashes(")
+    functions = "\n\n".join(
+        [
+            _extract_function(actions, "skip_spaces"),
+            _extract_function(actions, "strip_wrapping_quotes_alloc"),
+            _extract_function(utf, "RC_NormalizePathSlashes"),
+            _extract_function(actions, "file_ext_lower"),
+        ]
+    )
+    stdin = "".join(f"{path.encode('utf-8').hex() or '-'}\n" for _, path, _env in PROGRAM_CASES)
+    out = _run_harness(cc, _PROGRAM_HARNESS % {"functions": functions}, stdin)
+    cases = []
+    for (name, path, env), line in zip(PROGRAM_CASES, out.splitlines()):
+        normalized, ext = (None if p == "-" else bytes.fromhex(p).decode("utf-8") for p in line.split(" ")[:2])
+        # normalized 为 None 表示主程序拒绝执行（路径为空）
+        cases.append({"name": name, "path": path, "env": env, "normalized": normalized, "ext": ext})
+    return cases
+
+
+def main() -> None:
+    cc = shutil.which("gcc") or shutil.which("clang") or shutil.which("cc")
+    if not cc:
+        raise SystemExit("需要 gcc / clang 编译对照程序")
+    router = ROUTER_C.read_text(encoding="utf-8")
+    actions = ACTIONS_C.read_text(encoding="utf-8")
+    functions = "\n\n".join(
+        [
+            _extract_function(router, "dupstr0"),
+            _extract_function(router, "apply_value_placeholder"),
+            _extract_function(router, "normalize_powershell_command"),
+            _extract_function(actions, "rc_vsnwprintf_safe"),
+            _extract_function(actions, "rc_snwprintf_safe"),
+            _extract_function(actions, "dup_and_escape_quotes_for_cmdline"),
+        ]
+    )
+    keep, hide, show = _extract_ps_templates(actions)
+    source = _HARNESS % {"functions": functions, "keep": keep, "hide": hide, "show": show}
+
+    stdin = "".join(f"{0 if v is None else 1} {v or 0} {cmd.encode('utf-8').hex()}\n" for _, cmd, v in CASES)
+    out = _run_harness(cc, source, stdin)
+
+    def _text(h: str):
+        return None if h == "-" else bytes.fromhex(h).decode("utf-8")
+
+    cases = []
+    for (name, cmd, value), line in zip(CASES, out.splitlines()):
+        parts = line.split(" ")[:5]
+        # 空字符串输出为空字段，"-" 表示参数超出缓冲区（主程序不会执行）
+        applied, normalized, keep_args, hide_args, show_args = (_text(p) if p != "" else "" for p in parts)
+        cases.append(
+            {
+                "name": name,
+                "cmd": cmd,
+                "value": value,
+                "applied": applied,
+                "normalized": normalized,
+                "args": {"hide": hide_args, "show": show_args, "keep": keep_args},
+            }
+        )
+    programs = _program_cases(cc, actions)
+    data = {"source": ["src/main/rc_router.c", "src/main/rc_actions.c", "src/main/rc_utf.c"], "cases": cases, "programs": programs}
+    OUT_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8", newline="\n")
+    print(f"已写入 {OUT_PATH}（{len(cases)} + {len(programs)} 条）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,545 @@
+"""本机 MQTT 替身 broker + 压测发布器：测量“发布 → RC-main 收到 → 执行动作”的端到端延迟
+
+用法:
+    python scripts/mqtt_bench.py --config config.toml --log logs/main.log --rate 50 --count 500
+    python scripts/mqtt_bench.py --config config.toml --log logs/main.log --shape burst --burst-size 20 --burst-interval 2
+    python scripts/mqtt_bench.py --config config.toml --log logs/main.log --stream recorded.tsv --rate 200
+    python scripts/mqtt_bench.py --self-check
+
+流程：
+1. 在本机启动一个最小的 MQTT 3.1.1 broker（asyncio，只支持 QoS 0/1 发布、+/# 通配订阅，不保存 retained 消息）；
+2. 把 RC-main 的 broker 地址改为 127.0.0.1 与 --port 后启动 RC-main，脚本等待其订阅
+   config.toml 中的全部 topic（与 RC_RouterGetTopics 相同，见 src/python/rc_router.py）；
+3. 按 --rate 与 --shape（constant / poisson / burst）发布合成消息或 --stream 中录制的消息，并记录发布时间；
+4. 同时用 rc_log.LogReader 跟踪 main.log（主程序超过 200KB 会清空日志，跟踪时会检测并从头继续读），
+   把每条发布与日志中的“收到 MQTT 消息”行及其后第一条提到该 topic 的动作日志对应起来；
+5. 输出“发布 → 收到”“发布 → 动作”两组延迟的直方图与百分位（日志时间精度为 1 ms）。
+
+说明：主程序日志使用本地时间，只能在同一台机器上对比。dispatch 仅依赖 topic/payload，
+不需要真实硬件，但动作本身（运行程序、调节音量等）会真实执行，请使用测试用的配置。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src" / "python"))
+
+import rc_log  # noqa: E402
+import rc_router  # noqa: E402
+
+# MQTT 控制报文类型
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+# 与 rc_mqtt.c 的 RC_MQTT_LOG_PREVIEW_BYTES 一致（含结尾 NUL）
+LOG_PREVIEW_BYTES = 128
+# 直方图分桶上界（毫秒）
+HIST_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+# ---- MQTT 编解码 ----
+
+
+def _encode_length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _encode_str(s: bytes) -> bytes:
+    return struct.pack("!H", len(s)) + s
+
+
+def _packet(ptype: int, flags: int, body: bytes = b"") -> bytes:
+    return bytes([(ptype << 4) | flags]) + _encode_length(len(body)) + body
+
+
+def _decode_str(body: bytes, pos: int) -> Tuple[bytes, int]:
+    (n,) = struct.unpack_from("!H", body, pos)
+    return body[pos + 2 : pos + 2 + n], pos + 2 + n
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    first = (await reader.readexactly(1))[0]
+    length = 0
+    for shift in range(0, 28, 7):
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+    else:
+        raise ValueError("malformed remaining length")
+    body = await reader.readexactly(length) if length else b""
+    return first >> 4, first & 0x0F, body
+
+
+def publish_packet(topic: str, payload: bytes, qos: int = 0, packet_id: int = 0) -> bytes:
+    body = _encode_str(topic.encode("utf-8"))
+    if qos:
+        body += struct.pack("!H", packet_id)
+    return _packet(PUBLISH, qos << 1, body + payload)
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """MQTT 主题过滤：+ 匹配单层，# 匹配剩余各层（含父层本身）。"""
+    if pattern == topic:
+        return True
+    pp = pattern.split("/")
+    tp = topic.split("/")
+    for i, part in enumerate(pp):
+        if part == "#":
+            return True
+        if i >= len(tp) or (part != "+" and part != tp[i]):
+            return False
+    return len(pp) == len(tp)
+
+
+# ---- broker ----
+
+
+class _Session:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.client_id = ""
+        self.filters: List[str] = []
+
+
+class Broker:
+    """
+    English: Minimal asyncio MQTT 3.1.1 broker for local benchmarking (QoS 0 delivery, no retained/persistent sessions)
+    中文: 本机压测用的最小 broker：接受任意 CONNECT，订阅按 QoS 0 投递，不保存会话与 retained 消息
+    """
+
+    def __init__(self):
+        self.sessions: List[_Session] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sub_event = asyncio.Event()
+        self._handlers: set = set()
+        self.received = 0  # 来自外部客户端的 PUBLISH 数
+
+    async def start(self, host: str = "127.0.0.1", port: int = 1883) -> int:
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for s in list(self.sessions):
+            s.writer.close()
+        # 等连接处理协程自行退出，避免事件循环关闭时被取消
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def subscribed(self, topics: Iterable[str]) -> bool:
+        """是否有一个客户端已订阅（可经通配符覆盖）全部 topic。"""
+        topics = list(topics)
+        return any(all(any(topic_matches(f, t) for f in s.filters) for t in topics) for s in self.sessions)
+
+    async def wait_subscribed(self, topics: List[str], timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self.subscribed(topics):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._sub_event.clear()
+            try:
+                await asyncio.wait_for(self._sub_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def publish(self, topic: str, payload: bytes) -> int:
+        """向匹配的订阅者投递（QoS 0），返回投递数。写入传输层缓冲区即返回。"""
+        data = None
+        n = 0
+        for s in self.sessions:
+            if any(topic_matches(f, topic) for f in s.filters):
+                data = data or publish_packet(topic, payload)
+                s.writer.write(data)
+                n += 1
+        return n
+
+    async def drain(self) -> None:
+        for s in list(self.sessions):
+            try:
+                await s.writer.drain()
+            except Exception:
+                pass
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = _Session(writer)
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            ptype, _flags, body = await read_packet(reader)
+            if ptype != CONNECT:
+                return
+            _proto, pos = _decode_str(body, 0)
+            level = body[pos]
+            pos += 4  # level、连接标志、keepalive
+            client_id, pos = _decode_str(body, pos)
+            session.client_id = client_id.decode("utf-8", "replace")
+            if level != 4:
+                writer.write(_packet(CONNACK, 0, b"\x00\x01"))  # 不支持的协议版本
+                return
+            writer.write(_packet(CONNACK, 0, b"\x00\x00"))
+            self.sessions.append(session)
+            while True:
+                ptype, flags, body = await read_packet(reader)
+                if ptype == PUBLISH:
+                    topic, pos = _decode_str(body, 0)
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        (pid,) = struct.unpack_from("!H", body, pos)
+                        pos += 2
+                        if qos == 1:
+                            writer.write(_packet(PUBACK, 0, struct.pack("!H", pid)))
+                    self.received += 1
+                    self.publish(topic.decode("utf-8", "replace"), body[pos:])
+                elif ptype == SUBSCRIBE:
+                    (pid,) = struct.unpack_from("!H", body, 0)
+                    pos, granted = 2, bytearray()
+                    while pos < len(body):
+                        f, pos = _decode_str(body, pos)
+                        pos += 1
+                        session.filters.append(f.decode("utf-8", "replace"))
+                        granted.append(0)
+                    writer.write(_packet(SUBACK, 0, struct.pack("!H", pid) + bytes(granted)))
+                    self._sub_event.set()
+                elif ptype == UNSUBSCRIBE:
+                    (pid,) = struct.unpack_from("!H", body, 0)
+                    pos = 2
+                    while pos < len(body):
+                        f, pos = _decode_str(body, pos)
+                        name = f.decode("utf-8", "replace")
+                        if name in session.filters:
+                            session.filters.remove(name)
+                    writer.write(_packet(UNSUBACK, 0, struct.pack("!H", pid)))
+                elif ptype == PINGREQ:
+                    writer.write(_packet(PINGRESP, 0))
+                elif ptype == DISCONNECT:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, IndexError, struct.error):
+            pass
+        finally:
+            if session in self.sessions:
+                self.sessions.remove(session)
+            self._handlers.discard(task)
+            writer.close()
+
+
+# ---- 消息流与发布节奏 ----
+
+
+def synthetic_stream(topics: List[str], payloads: List[str], count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    rnd = random.Random(seed)
+    return [(rnd.choice(topics), rnd.choice(payloads)) for _ in range(count)]
+
+
+def recorded_stream(path: str) -> List[Tuple[str, str]]:
+    """录制的消息（与 rc_router 回放相同的格式：topic<TAB>payload 或 JSON 行）。"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return [m for m in map(rc_router.parse_message_line, f) if m is not None]
+
+
+def schedule(count: int, rate: float, shape: str = "constant", burst_size: int = 10, burst_interval: float = 1.0, seed: int = 0) -> List[float]:
+    """
+    返回每条消息相对开始时间的发布时刻（秒）：
+    - constant：间隔 1/rate；
+    - poisson：指数分布间隔，平均速率 rate；
+    - burst：每 burst_interval 秒一次性发出 burst_size 条（rate 不参与）。
+    """
+    if shape == "burst":
+        return [(i // max(1, burst_size)) * burst_interval for i in range(count)]
+    if rate <= 0:
+        return [0.0] * count
+    if shape == "poisson":
+        rnd = random.Random(seed)
+        t, out = 0.0, []
+        for _ in range(count):
+            out.append(t)
+            t += rnd.expovariate(rate)
+        return out
+    return [i / rate for i in range(count)]
+
+
+async def run_load(broker: Broker, messages: List[Tuple[str, str]], offsets: List[float]) -> List[Tuple[float, str, str]]:
+    """按 offsets 发布消息，返回 [(发布时间 time.time(), topic, payload)]。落后于计划时不再 sleep，直接追赶。"""
+    sent: List[Tuple[float, str, str]] = []
+    start = time.perf_counter()
+    for (topic, payload), offset in zip(messages, offsets):
+        delay = start + offset - time.perf_counter()
+        if delay > 0.002:
+            await asyncio.sleep(delay)
+        broker.publish(topic, payload.encode("utf-8"))
+        sent.append((time.time(), topic, payload))
+        if len(sent) % 256 == 0:
+            await broker.drain()
+    await broker.drain()
+    return sent
+
+
+# ---- main.log ----
+
+
+def payload_preview(payload: str) -> str:
+    """与 rc_mqtt.c mqtt_sanitize_preview 一致：\\r\\n\\t 变空格、其它控制字符变 ?，按字节截断。"""
+    out = bytearray()
+    for c in payload.encode("utf-8")[: LOG_PREVIEW_BYTES - 1]:
+        out.append(0x20 if c in (0x0D, 0x0A, 0x09) else (0x3F if c < 0x20 else c))
+    return out.decode("utf-8", "replace")
+
+
+# ---- 关联与统计 ----
+
+
+def correlate(sent: List[Tuple[float, str, str]], records: List[rc_log.Record], max_latency: float = 30.0) -> Dict[str, List[float]]:
+    """
+    按 (topic, payload) 先进先出地把发布与“收到 MQTT 消息”日志对应（同一 TCP 连接按序投递）；
+    超过 max_latency 仍未对应的发布视为丢失。收到之后、同一 topic 下一次收到之前第一条提到该 topic
+    的日志视为动作日志。返回毫秒延迟：{"receive": [...], "action": [...], "lost": [数量]}。
+    """
+    pending: Dict[Tuple[str, str], deque] = {}
+    for ts, topic, payload in sent:
+        pending.setdefault((topic, payload_preview(payload.strip(" \r\n\t"))), deque()).append(ts)
+    receive: List[float] = []
+    action: List[float] = []
+    waiting: Dict[str, float] = {}  # topic -> 等待动作日志的发布时间
+    for rec in records:
+        if rec.time is None or rec.continued:
+            continue
+        ts, msg = rec.time, rec.message
+        received = rc_log.parse_receive(msg)
+        if received:
+            q = pending.get(received)
+            while q and ts - q[0] > max_latency:
+                q.popleft()
+            if q:
+                t0 = q.popleft()
+                receive.append(max(0.0, (ts - t0) * 1000.0))
+                waiting[received[0]] = t0
+            continue
+        for topic in [t for t in waiting if t and t in msg]:
+            action.append(max(0.0, (ts - waiting.pop(topic)) * 1000.0))
+    lost = sum(len(q) for q in pending.values())
+    return {"receive": receive, "action": action, "lost": [lost]}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    data = sorted(samples)
+    k = (len(data) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def histogram(samples: List[float], bounds: Tuple[int, ...] = HIST_BOUNDS_MS) -> List[Tuple[str, int]]:
+    counts = [0] * (len(bounds) + 1)
+    for v in samples:
+        for i, b in enumerate(bounds):
+            if v <= b:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<= {b} ms" for b in bounds] + [f"> {bounds[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+def format_histogram(title: str, samples: List[float], width: int = 40) -> List[str]:
+    lines = [f"{title}: n={len(samples)}"]
+    if not samples:
+        return lines
+    lines.append(
+        "  p50 {:.1f} ms  p90 {:.1f} ms  p99 {:.1f} ms  max {:.1f} ms".format(
+            percentile(samples, 50), percentile(samples, 90), percentile(samples, 99), max(samples)
+        )
+    )
+    hist = histogram(samples)
+    peak = max(c for _, c in hist) or 1
+    for label, c in hist:
+        if c:
+            lines.append(f"  {label:>11} {c:>7} {'#' * max(1, round(c * width / peak))}")
+    return lines
+
+
+# ---- 命令行 ----
+
+
+async def bench(args: argparse.Namespace) -> int:
+    router = rc_router.Router.from_file(args.config)
+    topics = [t for t in router.topics if t]
+    if not topics:
+        print("config.toml 中没有已启用的主题")
+        return 1
+    if args.stream:
+        messages = recorded_stream(args.stream)[: args.count or None]
+    else:
+        payloads = [p.strip() for p in args.payloads.split(",") if p.strip()]
+        messages = synthetic_stream(topics, payloads, args.count, args.seed)
+    offsets = schedule(len(messages), args.rate, args.shape, args.burst_size, args.burst_interval, args.seed)
+
+    broker = Broker()
+    port = await broker.start(args.host, args.port)
+    print(f"broker 已在 {args.host}:{port} 监听；请将 RC-main 的 broker/port 指向这里并启动（等待 {args.wait:.0f} 秒）")
+    if not await broker.wait_subscribed(topics, args.wait):
+        print("等待订阅超时：RC-main 未连接或订阅的主题与 config.toml 不一致")
+        await broker.stop()
+        return 1
+    print(f"已订阅 {len(topics)} 个主题，开始发布 {len(messages)} 条消息（{args.shape}）")
+
+    tail = rc_log.LogReader.at_end(args.log)
+    log_lines: List[rc_log.Record] = []
+    stop = asyncio.Event()
+
+    async def _follow() -> None:
+        while not stop.is_set():
+            log_lines.extend(tail.poll())
+            await asyncio.sleep(0.05)
+        log_lines.extend(tail.poll())
+
+    follower = asyncio.create_task(_follow())
+    sent = await run_load(broker, messages, offsets)
+    await asyncio.sleep(args.settle)
+    stop.set()
+    await follower
+    await broker.stop()
+
+    result = correlate(sent, log_lines, args.max_latency)
+    out = format_histogram("发布 → 收到", result["receive"]) + format_histogram("发布 → 动作日志", result["action"])
+    out.append(f"丢失/未对应: {result['lost'][0]}  日志被清空次数: {tail.truncations}")
+    print("\n".join(out))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sent": len(sent), "truncations": tail.truncations, **result}, f, ensure_ascii=False)
+    return 0
+
+
+async def _fake_rc_main(port: int, router: rc_router.Router, log_path: str, truncate_at: int) -> None:
+    """自检用的 RC-main 替身：订阅主题，收到消息后按主程序格式写“收到”与动作日志。"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = _encode_str(b"MQTT") + bytes([4, 0x02]) + struct.pack("!H", 60) + _encode_str(b"fake-rc-main")
+    writer.write(_packet(CONNECT, 0, body))
+    await read_packet(reader)
+    for i, topic in enumerate(t for t in router.topics if t):
+        writer.write(_packet(SUBSCRIBE, 2, struct.pack("!H", i + 1) + _encode_str(topic.encode("utf-8")) + b"\x00"))
+        await read_packet(reader)
+    written = 0
+
+    def _log(msg: str, level: str = "INFO") -> None:
+        nonlocal written
+        t = time.time()
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) + f".{int(t * 1000) % 1000:03d}"
+        mode = "ab"
+        if written >= truncate_at:  # 模拟 200KB 上限时的清空
+            mode, written = "wb", 0
+        line = f"{stamp} [{level}] {msg}\n".encode("utf-8")
+        with open(log_path, mode) as f:
+            f.write(line)
+        written += len(line)
+
+    try:
+        while True:
+            ptype, _flags, body = await read_packet(reader)
+            if ptype != PUBLISH:
+                continue
+            topic_b, pos = _decode_str(body, 0)
+            topic, payload = topic_b.decode("utf-8"), body[pos:].decode("utf-8").strip(" \r\n\t")
+            _log(f"收到 MQTT 消息 topic='{topic}' payload='{payload_preview(payload)}' (len={len(payload.encode())})")
+            await asyncio.sleep(0.003)
+            action = router.handle(topic, payload)
+            if action.message:
+                _log(action.message, action.level.upper())
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+
+
+async def _self_check() -> None:
+    import tempfile
+
+    assert topic_matches("a/+/c", "a/b/c") and topic_matches("a/#", "a") and not topic_matches("a/+", "a/b/c")
+    assert schedule(5, 0, "burst", 2, 1.0) == [0, 0, 1.0, 1.0, 2.0] and schedule(3, 10)[2] == 0.2
+    router = rc_router.Router(rc_router.flatten_config({
+        "command1": "bench/cmd", "command1_checked": 1, "command1_on_value": "Set-Volume {value}",
+        "serve1": "bench/svc", "serve1_checked": 1, "serve1_value": "Spooler",
+    }))
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "main.log")
+        open(log_path, "wb").close()
+        broker = Broker()
+        port = await broker.start("127.0.0.1", 0)
+        fake = asyncio.create_task(_fake_rc_main(port, router, log_path, truncate_at=6000))
+        assert await broker.wait_subscribed(["bench/cmd", "bench/svc"], 5)
+        messages = synthetic_stream(["bench/cmd", "bench/svc"], ["on", "off", "on#30"], 120, seed=1)
+        tail = rc_log.LogReader.at_end(log_path)
+        lines: List[rc_log.Record] = []
+        done = asyncio.Event()
+
+        async def _follow() -> None:  # 与发布并行跟踪日志（中途会被清空，未及读取的行视为丢失）
+            while not done.is_set():
+                lines.extend(tail.poll())
+                await asyncio.sleep(0.005)
+
+        follower = asyncio.create_task(_follow())
+        sent = await run_load(broker, messages, schedule(120, 100))
+        await asyncio.sleep(0.2)
+        done.set()
+        await follower
+        lines.extend(tail.poll())
+        await broker.stop()
+        fake.cancel()
+    result = correlate(sent, lines)
+    assert tail.truncations >= 1, tail.truncations
+    assert len(result["receive"]) + result["lost"][0] == 120 and len(result["receive"]) >= 100, result["lost"]
+    assert len(result["action"]) >= 100 and min(result["action"]) >= min(result["receive"])
+    print("\n".join(format_histogram("发布 → 收到", result["receive"]) + format_histogram("发布 → 动作日志", result["action"])))
+    print("mqtt_bench self-check OK")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="本机 MQTT broker + 压测发布器，测量 RC-main 的端到端延迟")
+    ap.add_argument("--config", default=str(ROOT / "config.toml"), help="RC-main 使用的 config.toml（读取订阅主题）")
+    ap.add_argument("--log", default=str(ROOT / "logs" / "main.log"), help="RC-main 的 main.log")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1883)
+    ap.add_argument("--stream", help="录制的消息文件（topic<TAB>payload 或 JSON 行）；不指定则随机合成")
+    ap.add_argument("--payloads", default="on,off,on#50", help="合成消息的 payload 列表（逗号分隔）")
+    ap.add_argument("--count", type=int, default=500)
+    ap.add_argument("--rate", type=float, default=50.0, help="每秒消息数（constant / poisson）")
+    ap.add_argument("--shape", choices=("constant", "poisson", "burst"), default="constant")
+    ap.add_argument("--burst-size", type=int, default=20)
+    ap.add_argument("--burst-interval", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--wait", type=float, default=120.0, help="等待 RC-main 订阅的秒数")
+    ap.add_argument("--settle", type=float, default=3.0, help="发布结束后继续跟踪日志的秒数")
+    ap.add_argument("--max-latency", type=float, default=30.0, help="超过该秒数仍未出现在日志中的消息视为丢失")
+    ap.add_argument("--json", help="把原始延迟数据写入 JSON 文件")
+    ap.add_argument("--self-check", action="store_true")
+    args = ap.parse_args(argv)
+    if args.self_check:
+        asyncio.run(_self_check())
+        return 0
+    return asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,8 @@ pyinstaller -F -n RC-GUI --noconsole --icon=res\\icon_GUI.ico --add-data "res\\i
 程序名：RC-GUI.exe
 """
 import os
+import json
+import platform
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog
 import tkinter.ttk as ttk
@@ -19,13 +21,32 @@ import tomli_w
 import ctypes
 import sys
 import time
-import psutil
+import threading
+import traceback
 import subprocess
-import win32com.client
+import queue
+import psutil
 import re
 import shutil
+import secrets
+import itertools
+from collections import deque
 import locale
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, List, Union
+
+from rc_pspool import PowerShellPool, PSResult
+import rc_bench
+import rc_capabilities
+import rc_appindex
+import rc_analytics
+import rc_check
+import rc_command
+import rc_decode
+import rc_log
+import rc_observers
+import rc_router
+import rc_services
+import rc_tasks
 
 def resource_path(relative_path: str) -> str:
     """返回资源文件的实际路径（兼容 PyInstaller）。"""
@@ -156,13 +177,26 @@ def t(s: str) -> str:
     return _CURRENT_LANG_DICT.get(s, s)
 
 
-_LANG_OBSERVERS: list[callable] = []
+# 语言切换观察者；带 owner 登记的回调随窗口销毁自动注销（见 rc_observers 自检）
+_LANG_REGISTRY = rc_observers.ObserverRegistry()
+
+
+def register_lang_observer(cb, owner: tk.Misc | None = None) -> None:
+    """Register a callback to run on language changes.
+
+    传入 owner（通常是回调所属的 Toplevel）时，owner 销毁即自动注销，
+    避免已关闭窗口的闭包（及其整棵控件树）常驻内存。
+    """
+    try:
+        _LANG_REGISTRY.register(cb, owner)
+    except Exception:
+        pass
 
 
-def register_lang_observer(cb) -> None:
-    """Register a callback to run on language changes."""
+def unregister_lang_observer(cb) -> None:
+    """Remove a previously registered language observer (no-op if absent)."""
     try:
-        _LANG_OBSERVERS.append(cb)
+        _LANG_REGISTRY.unregister(cb)
     except Exception:
         pass
 
@@ -259,75 +293,143 @@ def apply_language_to_widgets(widget: tk.Misc) -> None:
         return
 
 
+# ----------------------------
+# 合并的自适应布局
+# ----------------------------
+
+# 待重新布局的窗口（路径 -> 窗口）；同一轮事件中的多次请求只在空闲时执行一次
+_RELAYOUT_PENDING: dict[str, tk.Misc] = {}
+_RELAYOUT_SCHEDULED = False
+# 最近若干次布局的耗时：(窗口数, 毫秒)。RC_LAYOUT_TIMING=1 时同时写入 logs/gui.log
+_RELAYOUT_TIMINGS: deque = deque(maxlen=50)
+
+
+def schedule_relayout(win: tk.Misc) -> None:
+    """请求窗口按内容自适应大小；实际的 geometry("") 在空闲时与其它请求合并执行。"""
+    global _RELAYOUT_SCHEDULED
+    _RELAYOUT_PENDING[str(win)] = win
+    if _RELAYOUT_SCHEDULED:
+        return
+    try:
+        win.after_idle(_flush_relayouts)
+        _RELAYOUT_SCHEDULED = True
+    except Exception:
+        _RELAYOUT_PENDING.pop(str(win), None)
+
+
+def _flush_relayouts() -> None:
+    global _RELAYOUT_SCHEDULED
+    _RELAYOUT_SCHEDULED = False
+    pending = list(_RELAYOUT_PENDING.values())
+    _RELAYOUT_PENDING.clear()
+    start = time.perf_counter()
+    count = 0
+    for w in pending:
+        try:
+            # 已关闭或隐藏（withdraw 复用）的窗口跳过，避免丢失其记住的尺寸
+            if not w.winfo_exists() or w.winfo_toplevel().state() == "withdrawn":
+                continue
+            w.geometry("")
+            count += 1
+        except Exception:
+            pass
+    if not count:
+        return
+    # 所有窗口共用一次布局计算
+    try:
+        pending[0].update_idletasks()
+    except Exception:
+        pass
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    _RELAYOUT_TIMINGS.append((count, elapsed_ms))
+    if os.environ.get("RC_LAYOUT_TIMING") == "1":
+        # 打包版没有控制台，写入 logs/gui.log（模块加载期间 gui_log 可能尚未定义）
+        try:
+            gui_log("INFO", f"layout: {count} window(s) in {elapsed_ms:.1f} ms")
+        except Exception:
+            pass
+
+
 def _apply_language_everywhere() -> None:
     # root/title
     _set_root_title()
-    # 主窗口控件文案
+    # 控件文案：winfo_children 已包含各级 Toplevel，一次递归即可覆盖所有已打开窗口
     try:
         apply_language_to_widgets(root)
     except Exception:
         pass
-    # 已打开的 Toplevel
-    def _apply_to_toplevels(parent):
-        try:
-            for w in parent.winfo_children():
-                if isinstance(w, tk.Toplevel) and w.winfo_exists():
-                    apply_language_to_widgets(w)
-                    _apply_to_toplevels(w)
-        except Exception:
-            pass
-    _apply_to_toplevels(root)
 
     # 动态元素（combobox values / window titles 等）
     try:
-        alive: list[callable] = []
-        for cb in list(_LANG_OBSERVERS):
-            try:
-                cb()
-                alive.append(cb)
-            except Exception:
-                pass
-        _LANG_OBSERVERS[:] = alive
+        _LANG_REGISTRY.notify()
     except Exception:
         pass
 
-    # 最后统一触发一次自适应宽度更新
-    try:
-        # 主窗口自适应
-        root.update_idletasks()
-        root.geometry("")
+    # 最后统一请求一次自适应宽度更新（空闲时合并执行）
+    def _resize_toplevels(parent):
+        for w in parent.winfo_children():
+            if isinstance(w, tk.Toplevel):
+                schedule_relayout(w)
+                # 递归处理嵌套的 Toplevel
+                _resize_toplevels(w)
 
-        def _resize_toplevels(parent):
-            for w in parent.winfo_children():
-                if isinstance(w, tk.Toplevel) and w.winfo_exists():
-                    try:
-                        w.update_idletasks()
-                        # 只有当窗口不是固定大小时才尝试自动调整
-                        # 或者对于我们的设置窗口，强制自适应一次
-                        w.geometry("")
-                        w.update_idletasks()
-                        # 递归处理嵌套的 Toplevel
-                        _resize_toplevels(w)
-                    except Exception:
-                        pass
+    try:
+        schedule_relayout(root)
         _resize_toplevels(root)
     except Exception:
         pass
 
-def _normalize_command_for_powershell(cmd: str) -> str:
-    """规范化命令避免 PowerShell 将 curl 映射为 Invoke-WebRequest。
-    处理：行首/分隔符后的 curl -> curl.exe，末尾独立 curl -> curl.exe，独立 -s -> --silent。
-    出错则返回原串。"""
-    try:
-        import re as _re
-        txt = cmd or ""
-        txt = _re.sub(r"^(\s*)curl(\s+)", r"\1curl.exe\2", txt, flags=_re.IGNORECASE)
-        txt = _re.sub(r"([;&|]\s*)curl(\s+)", r"\1curl.exe\2", txt, flags=_re.IGNORECASE)
-        txt = _re.sub(r"(\s+)curl(\s*)$", r"\1curl.exe\2", txt, flags=_re.IGNORECASE)
-        txt = _re.sub(r"(?<![A-Za-z0-9_-])-s(?![A-Za-z0-9_-])(?=\s|$)", "--silent", txt)
-        return txt
-    except Exception:
-        return cmd
+# 常驻 PowerShell 进程池：测试按钮复用已启动的 powershell.exe（首次使用时才启动）
+_PS_POOL: PowerShellPool | None = None
+# 测试结果弹窗中最多显示的输出字符数
+_PS_RESULT_MAX_CHARS = 2000
+
+
+def _ps_pool() -> PowerShellPool:
+    global _PS_POOL
+    if _PS_POOL is None:
+        _PS_POOL = PowerShellPool(size=2)
+    return _PS_POOL
+
+
+def _run_in_background(widget: tk.Misc, func: Callable[[], Any], on_done: Callable[[Any, BaseException | None], None]) -> None:
+    """
+    在后台线程执行 func，完成后在 Tk 主线程回调 on_done(结果, 异常)。
+    结果通过 after() 轮询取回，不在后台线程中调用任何 Tk 接口。
+    """
+    box: dict[str, Any] = {}
+
+    def _worker() -> None:
+        try:
+            box["result"] = func()
+        except BaseException as e:
+            box["error"] = e
+        box["done"] = True
+
+    def _poll() -> None:
+        if not box.get("done"):
+            try:
+                widget.after(30, _poll)
+            except Exception:
+                pass
+            return
+        on_done(box.get("result"), box.get("error"))
+
+    threading.Thread(target=_worker, daemon=True).start()
+    widget.after(30, _poll)
+
+
+def _command_issue_text(issue: rc_command.LintIssue) -> str:
+    prefix = t("错误") if issue.level == "error" else t("警告")
+    return f"{prefix}: {t(issue.message)}"
+
+
+def _format_ps_result(res: PSResult) -> str:
+    text = res.output if res.ok else (res.error or res.output)
+    text = (text or "").strip() or t("（无输出）")
+    if len(text) > _PS_RESULT_MAX_CHARS:
+        text = text[:_PS_RESULT_MAX_CHARS] + "\n..."
+    return f"{text}\n\n{t('耗时')}: {res.elapsed_ms:.0f} ms"
 
 # 统一版本来源
 try:
@@ -437,46 +539,85 @@ def run_py_in_venv_as_admin_hidden(python_exe_path, script_path, script_args=Non
     # 兼容旧调用，默认隐藏窗口
     return run_py_in_venv_as_admin(python_exe_path, script_path, script_args, show_window=False)
 
+# 提权重启握手：旧实例创建一次性命名事件（名称含随机 nonce），通过命令行参数传给新实例；
+# 新实例进入事件循环后置位该事件，旧实例等到信号（最多 5 秒）再退出，无需扫描进程表
+RESTART_READY_ARG = "--rc-ready-event="
+RESTART_READY_TIMEOUT_MS = 5000
+
+_EVENT_MODIFY_STATE = 0x0002
+_WAIT_OBJECT_0 = 0
+
+
+def _create_restart_ready_event() -> tuple[int | None, str]:
+    """创建握手事件，返回 (句柄, 名称)；失败时返回 (None, "")。"""
+    try:
+        kernel32 = ctypes.windll.kernel32
+        kernel32.CreateEventW.restype = ctypes.c_void_p
+        name = f"Local\\RC-GUI-ready-{secrets.token_hex(8)}"
+        # 手动复位、初始未置位
+        handle = kernel32.CreateEventW(None, True, False, name)
+        return (handle, name) if handle else (None, "")
+    except Exception:
+        return None, ""
+
+
+def _wait_restart_ready_event(handle: int, timeout_ms: int) -> bool:
+    """等待新实例置位握手事件，并关闭句柄。"""
+    kernel32 = ctypes.windll.kernel32
+    try:
+        return kernel32.WaitForSingleObject(ctypes.c_void_p(handle), timeout_ms) == _WAIT_OBJECT_0
+    except Exception:
+        return False
+    finally:
+        try:
+            kernel32.CloseHandle(ctypes.c_void_p(handle))
+        except Exception:
+            pass
+
+
+def signal_restart_ready() -> None:
+    """新实例：若由提权重启拉起，则通知旧实例自己已就绪。"""
+    for arg in sys.argv[1:]:
+        if not arg.startswith(RESTART_READY_ARG):
+            continue
+        try:
+            kernel32 = ctypes.windll.kernel32
+            kernel32.OpenEventW.restype = ctypes.c_void_p
+            handle = kernel32.OpenEventW(_EVENT_MODIFY_STATE, False, arg[len(RESTART_READY_ARG):])
+            if handle:
+                kernel32.SetEvent(ctypes.c_void_p(handle))
+                kernel32.CloseHandle(ctypes.c_void_p(handle))
+        except Exception:
+            pass
+        return
+
+
 def restart_self_as_admin():
     """以管理员权限重新启动当前程序"""
+    ready_handle = None
     try:
-        # 获取当前程序的完整路径和参数
-        if getattr(sys, "frozen", False):
-            # 如果是打包后的exe
-            current_exe = sys.executable
-        else:
-            # 如果是Python脚本
-            current_script = os.path.abspath(__file__)
-            current_exe = sys.executable
-        
+        # 新实例就绪后置位该事件；创建失败时退化为直接退出
+        ready_handle, ready_name = _create_restart_ready_event()
+        extra_args = [f"{RESTART_READY_ARG}{ready_name}"] if ready_handle else []
+
+        current_exe = sys.executable
         # 构建重启命令
         if getattr(sys, "frozen", False):
-            result = run_as_admin(current_exe)
+            # 如果是打包后的exe
+            result = run_as_admin(current_exe, " ".join(extra_args))
         else:
             # 脚本模式优先 pythonw.exe
             base_dir = os.path.dirname(current_exe)
             pythonw = os.path.join(base_dir, 'pythonw.exe')
             interpreter = pythonw if os.path.exists(pythonw) else current_exe
             script_path = os.path.abspath(__file__)
-            result = run_py_in_venv_as_admin(interpreter, script_path, show_window=False)
+            result = run_py_in_venv_as_admin(interpreter, script_path, extra_args, show_window=False)
 
         if result > 32:
-            # 等待新进程出现再退出（最多5s）
-            if not getattr(sys, 'frozen', False):
-                target = os.path.abspath(__file__)
-                for _ in range(50):
-                    new_found = False
-                    try:
-                        for proc in psutil.process_iter(['name','cmdline','pid']):
-                            cl = proc.info.get('cmdline') or []
-                            if proc.pid != os.getpid() and cl and target in ' '.join(cl) and 'python' in (proc.info.get('name') or '').lower():
-                                new_found = True
-                                break
-                    except Exception:
-                        pass
-                    if new_found:
-                        break
-                    time.sleep(0.1)
+            # 等待新实例就绪再退出（最多5s）
+            if ready_handle:
+                handle, ready_handle = ready_handle, None
+                _wait_restart_ready_event(handle, RESTART_READY_TIMEOUT_MS)
             os._exit(0)
         else:
             # UAC 被拒绝或失败，返回 False 让程序继续以普通权限运行
@@ -485,6 +626,12 @@ def restart_self_as_admin():
     except Exception as e:
         messagebox.showerror(t("UAC提权"), t(f"重启程序时出错: {e}"))
         return False
+    finally:
+        if ready_handle:
+            try:
+                ctypes.windll.kernel32.CloseHandle(ctypes.c_void_p(ready_handle))
+            except Exception:
+                pass
 
 def check_and_request_uac():
     """检查并在需要时请求提权"""
@@ -526,6 +673,104 @@ def _enable_dpi_awareness() -> None:
             except Exception:
                 pass
 
+# ----------------------------
+# 显示度量缓存（缩放值 / 字体族）
+# ----------------------------
+
+# 缩放值与派生尺寸只向 Tcl 查询一次；_pad/_scaled_width 等结果按参数记忆
+_DISPLAY_METRICS: dict[str, Any] = {"scaling": None, "pads": {}, "widths": {}}
+_FONT_FAMILIES_CACHE: set[str] | None = None
+
+# GUI 侧持久化缓存文件（与 config.toml 同目录，写入失败时静默忽略）
+GUI_CACHE_FILE_NAME = "RC-GUI.cache.json"
+
+
+def _gui_cache_path() -> str:
+    return os.path.join(os.path.abspath(os.path.dirname(sys.argv[0])), GUI_CACHE_FILE_NAME)
+
+
+def _load_gui_cache() -> dict:
+    """读取 GUI 持久化缓存，文件缺失或损坏时返回空字典。"""
+    try:
+        with open(_gui_cache_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _update_gui_cache(section: str, value: Any) -> None:
+    """更新缓存中的一个分区并原子写回（先写临时文件再替换）。"""
+    path = _gui_cache_path()
+    data = _load_gui_cache()
+    data[section] = value
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except Exception:
+            pass
+
+
+def _set_cached_scaling(scale: float | None) -> None:
+    try:
+        scale = float(scale or 0)
+    except Exception:
+        scale = 0.0
+    _DISPLAY_METRICS["scaling"] = scale if scale > 0 else None
+    _DISPLAY_METRICS["pads"].clear()
+    _DISPLAY_METRICS["widths"].clear()
+
+
+def _installed_font_families(root: tk.Misc) -> set[str]:
+    """系统字体列表只枚举一次。"""
+    global _FONT_FAMILIES_CACHE
+    if _FONT_FAMILIES_CACHE is None:
+        try:
+            _FONT_FAMILIES_CACHE = set(tkfont.families(root))
+        except Exception:
+            _FONT_FAMILIES_CACHE = set()
+    return _FONT_FAMILIES_CACHE
+
+
+def _font_cache_key() -> str:
+    """字体缓存键：系统版本 + DPI，任一变化即重新选择。"""
+    try:
+        build = platform.version()
+    except Exception:
+        build = ""
+    dpi = int(round(_get_scaling() * 72))
+    return f"{build}|{dpi}"
+
+
+def _resolve_font_families(root: tk.Misc, choices: Dict[str, tuple]) -> Dict[str, str]:
+    """
+    为每个用途（ui/fixed）选出第一个系统可用的字体族。
+    命中持久化缓存时直接返回；否则枚举一次系统字体并写回缓存。空串表示均不可用。
+    """
+    key = _font_cache_key()
+    try:
+        cached = (_load_gui_cache().get("fonts") or {}).get(key)
+        if isinstance(cached, dict) and all(isinstance(cached.get(k), str) for k in choices):
+            return {k: cached[k] for k in choices}
+    except Exception:
+        pass
+
+    installed = _installed_font_families(root)
+    resolved = {
+        k: next((fam for fam in fams if fam in installed), "")
+        for k, fams in choices.items()
+    }
+    # 仅在成功枚举到字体时持久化，避免把失败结果固化
+    if installed:
+        _update_gui_cache("fonts", {key: resolved})
+    return resolved
+
+
 def _apply_font_readability_and_scaling(root: tk.Tk) -> None:
     """
     统一设置更易读的字体族，并根据系统缩放设置 Tk scaling。
@@ -576,6 +821,8 @@ def _apply_font_readability_and_scaling(root: tk.Tk) -> None:
                 root.tk.call("tk", "scaling", scaling_to_apply)
         except Exception:
             scaling_to_apply = None
+    # 缩放值只解析这一次，之后由 _get_scaling() 直接返回缓存
+    _set_cached_scaling(scaling_to_apply)
 
     if scaling_to_apply and scaling_to_apply >= 1.5:
         body_min_size = 10
@@ -585,11 +832,14 @@ def _apply_font_readability_and_scaling(root: tk.Tk) -> None:
     preferred_ui = ("Microsoft YaHei UI", "Segoe UI", "Microsoft YaHei")
     preferred_fixed = ("Consolas", "Cascadia Mono", "Courier New")
 
-    def _set_font(name: str, family_choices, min_size=9):
+    # 字体族选择结果按 系统版本+DPI 持久化，命中缓存时无需枚举系统字体
+    families = _resolve_font_families(root, {"ui": preferred_ui, "fixed": preferred_fixed})
+    ui_family = families.get("ui", "")
+    fixed_family = families.get("fixed", "")
+
+    def _set_font(name: str, family: str, min_size=9):
         try:
             f = tkfont.nametofont(name)
-            # 选择第一个系统可用字体
-            family = next((fam for fam in family_choices if tkfont.families() and fam in tkfont.families()), None)
             if family:
                 f.configure(family=family)
             # 合理的最小字号
@@ -599,15 +849,15 @@ def _apply_font_readability_and_scaling(root: tk.Tk) -> None:
         except Exception:
             pass
 
-    _set_font("TkDefaultFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkTextFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkMenuFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkHeadingFont", preferred_ui, min_size=heading_min_size)
-    _set_font("TkCaptionFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkSmallCaptionFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkIconFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkTooltipFont", preferred_ui, min_size=body_min_size)
-    _set_font("TkFixedFont", preferred_fixed, min_size=body_min_size)
+    _set_font("TkDefaultFont", ui_family, min_size=body_min_size)
+    _set_font("TkTextFont", ui_family, min_size=body_min_size)
+    _set_font("TkMenuFont", ui_family, min_size=body_min_size)
+    _set_font("TkHeadingFont", ui_family, min_size=heading_min_size)
+    _set_font("TkCaptionFont", ui_family, min_size=body_min_size)
+    _set_font("TkSmallCaptionFont", ui_family, min_size=body_min_size)
+    _set_font("TkIconFont", ui_family, min_size=body_min_size)
+    _set_font("TkTooltipFont", ui_family, min_size=body_min_size)
+    _set_font("TkFixedFont", fixed_family, min_size=body_min_size)
 
 def _apply_ttk_ui_fonts(root: tk.Tk) -> None:
     """
@@ -656,13 +906,7 @@ def _apply_ttk_ui_fonts(root: tk.Tk) -> None:
         # 行高根据字体行距微调，避免文字被裁剪
         try:
             linespace = default_font.metrics("linespace")
-            extra = 10
-            try:
-                _scaling = float(root.tk.call("tk", "scaling"))
-                if _scaling >= 1.5:
-                    extra = 14
-            except Exception:
-                pass
+            extra = 14 if _get_scaling() >= 1.5 else 10
             row_h = max(22, int(linespace + extra))
             style.configure("Treeview", rowheight=row_h)
         except Exception:
@@ -699,49 +943,62 @@ def center_window(window: Union[tk.Tk, tk.Toplevel], parent: Union[tk.Tk, tk.Top
 
 def _scaled_size(widget: tk.Misc, width: int, height: int) -> tuple[int, int]:
     """按照 Tk 当前 scaling 进行尺寸缩放（兼容高 DPI）。"""
-    try:
-        scale = float(widget.tk.call("tk", "scaling"))
-        if scale <= 0:
-            scale = 1.0
-    except Exception:
-        scale = 1.0
+    scale = _get_scaling()
     try:
         return max(100, int(width * scale)), max(80, int(height * scale))
     except Exception:
         return width, height
 
 def _get_scaling() -> float:
-    """获取当前 Tk scaling 值，默认 1.0。"""
+    """获取当前 Tk scaling 值（首次查询后缓存），默认 1.0。"""
+    s = _DISPLAY_METRICS.get("scaling")
+    if s:
+        return s
     try:
         s = float(tk._default_root.tk.call("tk", "scaling"))
-        return s if s > 0 else 1.0
     except Exception:
+        # 根窗口尚未创建：不缓存，下次再查
         return 1.0
-
-def _pad(padx: int = 10, pady: int = 6) -> tuple[int, int]:
-    """根据系统缩放调整 padx/pady。"""
-    scale = _get_scaling()
-    return max(2, int(padx * scale)), max(2, int(pady * scale))
+    _set_cached_scaling(s)
+    return s if s > 0 else 1.0
+
+def _pad(padx: int = 10, pady: int = 6, min_x: int = 2, min_y: int = 2) -> tuple[int, int]:
+    """根据系统缩放调整 padx/pady（结果按参数缓存）。"""
+    key = (padx, pady, min_x, min_y)
+    cached = _DISPLAY_METRICS["pads"].get(key)
+    if cached is None:
+        scale = _get_scaling()
+        cached = (max(min_x, int(padx * scale)), max(min_y, int(pady * scale)))
+        _DISPLAY_METRICS["pads"][key] = cached
+    return cached
 
 def _scaled_width(chars: int) -> int:
     """根据系统缩放调整 Entry/Combobox 等控件的 width（字符数）。"""
-    scale = _get_scaling()
-    return max(1, int(chars * scale))
+    cached = _DISPLAY_METRICS["widths"].get(chars)
+    if cached is None:
+        cached = max(1, int(chars * _get_scaling()))
+        _DISPLAY_METRICS["widths"][chars] = cached
+    return cached
+
+
+# 计划任务管理器：整个 GUI 进程共用一个任务计划会话（首次使用时连接）
+_TASK_MANAGER: rc_tasks.TaskManager | None = None
+
+
+def _task_manager() -> rc_tasks.TaskManager:
+    global _TASK_MANAGER
+    if _TASK_MANAGER is None:
+        _TASK_MANAGER = rc_tasks.TaskManager()
+    return _TASK_MANAGER
 
 
 # 检查任务计划是否存在
 def check_task_exists(task_name: str) -> bool:
     """
     English: Checks if a scheduled task with the given name exists
-    中文: 根据任务名称判断是否存在相应的计划任务
+    中文: 根据任务名称判断是否存在相应的计划任务（结果由任务管理器缓存）
     """
-    scheduler = win32com.client.Dispatch("Schedule.Service")
-    scheduler.Connect()
-    root_folder = scheduler.GetFolder("\\")
-    for task in root_folder.GetTasks(0):
-        if task.Name == task_name:
-            return True
-    return False
+    return _task_manager().exists(task_name)
 
 def open_keyboard_recorder(parent: Union[tk.Tk, tk.Toplevel], target_var: tk.StringVar) -> None:
     """
@@ -887,7 +1144,7 @@ def open_keyboard_recorder(parent: Union[tk.Tk, tk.Toplevel], target_var: tk.Str
         except Exception:
             pass
 
-    register_lang_observer(_apply_lang_to_rec)
+    register_lang_observer(_apply_lang_to_rec, owner=rec)
     _apply_lang_to_rec()
 
 
@@ -897,10 +1154,8 @@ def set_auto_start() -> None:
     English: Creates a scheduled task to auto-start the program upon logon or system start
     中文: 设置开机自启动，程序自动运行，提供两种方案选择
     """
-    exe_path = os.path.join(
-        os.path.dirname(os.path.abspath(sys.argv[0])), "RC-main.exe"
-        # and "main.py"
-    )
+    base_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+    exe_path = os.path.join(base_dir, "RC-main.exe")
 
     # 检查文件是否存在
     if not os.path.exists(exe_path):
@@ -927,132 +1182,52 @@ def set_auto_start() -> None:
         messagebox.showinfo(t("已取消"), t("已取消设置开机自启动"))
         return
 
-    def _run_schtasks(args: list[str]) -> int:
-        try:
-            cp = subprocess.run(["schtasks", *args], shell=False)
-            return int(getattr(cp, "returncode", 1) or 0)
-        except FileNotFoundError:
-            return 1
-
-    exe_cmd = exe_path
-    
     if choice == True:  # 选择"是"，对应方案一
-        # 方案一：使用Administrators用户组创建任务计划，任何用户登录时运行
-        result = _run_schtasks(
-            [
-                "/Create",
-                "/SC",
-                "ONLOGON",
-                "/TN",
-                TASK_NAME_MAIN,
-                "/TR",
-                exe_cmd,
-                "/RU",
-                r"BUILTIN\Administrators",
-                "/RL",
-                "HIGHEST",
-                "/F",
-            ]
-        )
+        # 方案一：Administrators 用户组，任何用户登录时以最高权限运行
+        main_spec = rc_tasks.TaskSpec(TASK_NAME_MAIN, exe_path, "logon", "group", rc_tasks.TASK_INSTANCES_STOP_EXISTING)
     else:  # 选择"否"，对应方案二
         # 方案二：使用SYSTEM用户在系统启动时运行
-        result = _run_schtasks(
-            [
-                "/Create",
-                "/SC",
-                "ONSTART",
-                "/TN",
-                TASK_NAME_MAIN,
-                "/TR",
-                exe_cmd,
-                "/RU",
-                "SYSTEM",
-                "/RL",
-                "HIGHEST",
-                "/F",
-            ]
-        )
+        main_spec = rc_tasks.TaskSpec(TASK_NAME_MAIN, exe_path, "boot", "system", rc_tasks.TASK_INSTANCES_STOP_EXISTING)
+
+    tray_exe_path = os.path.join(base_dir, "RC-tray.exe")
+    tray_spec = None
+    if os.path.exists(tray_exe_path):
+        # 托盘程序使用当前登录用户（最高权限）运行，登录后触发
+        tray_spec = rc_tasks.TaskSpec(TASK_NAME_TRAY, tray_exe_path, "logon", "user", rc_tasks.TASK_INSTANCES_PARALLEL)
+
+    manager = _task_manager()
+    # 任务可能在程序外被修改过，操作前丢弃查询缓存（会话保持）
+    manager.invalidate()
+    result = ""
+    tray_result = ""
+    try:
+        manager.register(main_spec)
+    except Exception as e:
+        result = str(e)
+    if tray_spec is not None and not result:
+        try:
+            manager.register(tray_spec)
+        except Exception as e:
+            tray_result = str(e)
     # 清理可能存在的旧版中文任务名，忽略失败
     try:
-        _run_schtasks(["/Delete", "/TN", "A远程控制", "/F"])
-        _run_schtasks(["/Delete", "/TN", "A远程托盘", "/F"])
+        manager.delete_many(rc_tasks.LEGACY_TASK_NAMES)
     except Exception:
         pass
+    if tray_spec is None:
+        messagebox.showwarning(t("警告"), t("未找到 RC-tray.exe 文件，跳过托盘启动设置"))
 
-    scheduler = win32com.client.Dispatch("Schedule.Service")
-    scheduler.Connect()
-    root_folder_main = scheduler.GetFolder("\\")
-    task_definition = root_folder_main.GetTask(TASK_NAME_MAIN).Definition
-    principal = task_definition.Principal
-    # 根据选择的方案设置不同的登录类型和权限
-    if choice == True:  # 选择"是"，对应方案一
-        # 方案一：设置为用户组登录类型
-        principal.LogonType = 3  # 3表示TASK_LOGON_GROUP，用户组登录
-    else:  # 选择"否"，对应方案二
-        # 方案二：设置为服务账户登录类型
-        principal.LogonType = 5  # 5表示TASK_LOGON_SERVICE_ACCOUNT，服务账户登录
-    
-    principal.RunLevel = 1  # 最高权限
-    settings = task_definition.Settings
-    settings.MultipleInstances = 3  # 并行运行:0，排队：1，不运行：2，停止运行的：3
-    settings.Hidden = False  # 确保不是隐藏运行
-    settings.DisallowStartIfOnBatteries = False  # 不允许在电池供电时启动
-    settings.StopIfGoingOnBatteries = False  # 允许在电池供电时启动
-    settings.ExecutionTimeLimit = "PT0S"  # 无限时间限制
-    # task_definition.Settings.Compatibility = 4    # 设置兼容性为 Windows 10
-    root_folder_main.RegisterTaskDefinition(TASK_NAME_MAIN, task_definition, 6, "", "", 2)
-    tray_exe_path = os.path.join(
-            os.path.dirname(os.path.abspath(sys.argv[0])), "RC-tray.exe"
-            # and "tray.py"
-        )
-
-    tray_result = 0
-    if os.path.exists(tray_exe_path):
-        tray_cmd = tray_exe_path  # 托盘程序使用当前登录用户（最高权限）运行，登录后触发
-        tray_result = _run_schtasks(
-            [
-                "/Create",
-                "/SC",
-                "ONLOGON",
-                "/TN",
-                TASK_NAME_TRAY,
-                "/TR",
-                tray_cmd,
-                "/RL",
-                "HIGHEST",
-                "/F",
-            ]
-        )
-        # 同步设置权限和运行级别
-        scheduler = win32com.client.Dispatch("Schedule.Service")
-        scheduler.Connect()
-        root_folder_tray = scheduler.GetFolder("\\")
-        task_def = root_folder_tray.GetTask(TASK_NAME_TRAY).Definition
-        settings_tray = task_def.Settings
-        settings_tray.MultipleInstances = 0  # 并行运行:0，排队：1，不运行：2，停止运行的：3
-        settings_tray.Hidden = False  # 确保不是隐藏运行
-        settings_tray.DisallowStartIfOnBatteries = False  # 不允许在电池供电时启动
-        settings_tray.StopIfGoingOnBatteries = False      # 允许在电池供电时启动
-        settings_tray.ExecutionTimeLimit = "PT0S"         # 无限时间限制
-        # task_def.Settings.Compatibility = 4
-
-        root_folder_tray.RegisterTaskDefinition(
-            TASK_NAME_TRAY, task_def, 6, "", "", 0  # 0表示只在用户登录时运行，2表示不管用户是否登录都运行
-        )
-        # if tray_result == 0:
-        #     messagebox.showinfo("提示", "创建托盘任务成功(使用当前登录用户，最高权限运行)")
-        # else:
-        #     messagebox.showerror("错误", "创建托盘自启动失败")
-    else:
-        messagebox.showwarning(t("警告"), t("未找到 RC-tray.exe 文件，跳过托盘启动设置"))    # 检查创建任务的结果
-
-    # 检查创建任务的结果
-    if check_task_exists(TASK_NAME_MAIN):
+    # 检查创建任务的结果：注册失败时即使同名旧任务仍在也不算成功
+    try:
+        created = not result and check_task_exists(TASK_NAME_MAIN)
+    except Exception:
+        created = False
+    if created:
         if choice == True:
             messagebox.showinfo(t("提示"), t("创建任务成功\n已配置为任何用户登录时以管理员组权限运行"))
         else:
             messagebox.showinfo(t("提示"), t("创建任务成功\n已配置为系统启动时以SYSTEM用户权限运行"))
-            if tray_result != 0:
+            if tray_result:
                 messagebox.showwarning(
                     t("警告"),
                     t("创建托盘自启动失败\n{code}").format(code=tray_result),
@@ -1074,18 +1249,17 @@ def remove_auto_start() -> None:
     中文: 移除开机自启动的计划任务
     """
     if messagebox.askyesno(t("确定？"), t("你确定要删除开机自启动任务吗？")):
-        delete_result = subprocess.run(
-            ["schtasks", "/Delete", "/TN", TASK_NAME_MAIN, "/F"], shell=False
-        ).returncode
-        tray_delete = subprocess.run(
-            ["schtasks", "/Delete", "/TN", TASK_NAME_TRAY, "/F"], shell=False
-        ).returncode
-        # 兼容清理旧中文任务名（若存在）
+        manager = _task_manager()
+        manager.invalidate()
         try:
-            subprocess.run(["schtasks", "/Delete", "/TN", "A远程控制", "/F"], shell=False)
-            subprocess.run(["schtasks", "/Delete", "/TN", "A远程托盘", "/F"], shell=False)
-        except Exception:
-            pass
+            # 同一会话中删除两个任务，并兼容清理旧中文任务名（若存在）
+            deleted = manager.uninstall([TASK_NAME_MAIN, TASK_NAME_TRAY])
+        except Exception as e:
+            messagebox.showerror(t("错误"), t("关闭开机自启动失败") + f"\n{e}")
+            check_task()
+            return
+        delete_result = 0 if deleted.get(TASK_NAME_MAIN) else 1
+        tray_delete = 0 if deleted.get(TASK_NAME_TRAY) else 1
         if delete_result == 0 and tray_delete == 0:
             messagebox.showinfo(t("提示"), t("关闭所有自启动任务成功"))
         elif delete_result == 0:
@@ -1103,8 +1277,12 @@ def check_task() -> None:
     English: Updates the button text based on whether the auto-start task exists
     中文: 检查是否存在开机自启任务，并更新按钮文字
     """
-    src_text = "关闭开机自启" if check_task_exists(TASK_NAME_MAIN) else "设置开机自启"
-    if check_task_exists(TASK_NAME_MAIN):
+    try:
+        exists = check_task_exists(TASK_NAME_MAIN)
+    except Exception:
+        exists = False
+    src_text = "关闭开机自启" if exists else "设置开机自启"
+    if exists:
         auto_start_button.config(text=t(src_text), command=remove_auto_start)
     else:
         auto_start_button.config(text=t(src_text), command=set_auto_start)
@@ -1152,11 +1330,6 @@ def load_custom_themes() -> None:
                 "off_preset": off_preset,
             }
             custom_themes.append(theme)
-            status = t("开") if theme["checked"] else t("关")
-            display_name = theme["nickname"] or theme["name"]
-            item_text = f"[{status}] {display_name}"
-            tree_iid = str(len(custom_themes) - 1)
-            custom_theme_tree.insert("", "end", iid=tree_iid, values=(item_text,))
             app_index += 1
         else:
             break
@@ -1178,11 +1351,6 @@ def load_custom_themes() -> None:
                 "off_preset": off_preset,
             }
             custom_themes.append(theme)
-            status = t("开") if theme["checked"] else t("关")
-            display_name = theme["nickname"] or theme["name"]
-            item_text = f"[{status}] {display_name}"
-            tree_iid = str(len(custom_themes) - 1)
-            custom_theme_tree.insert("", "end", iid=tree_iid, values=(item_text,))
             serve_index += 1
         else:
             break
@@ -1222,11 +1390,6 @@ def load_custom_themes() -> None:
                 "value_max": _vmax,
             }
             custom_themes.append(theme)
-            status = t("开") if theme["checked"] else t("关")
-            display_name = theme["nickname"] or theme["name"]
-            item_text = f"[{status}] {display_name}"
-            tree_iid = str(len(custom_themes) - 1)
-            custom_theme_tree.insert("", "end", iid=tree_iid, values=(item_text,))
             command_index += 1
         else:
             break
@@ -1249,22 +1412,53 @@ def load_custom_themes() -> None:
                 "char_delay_ms": int(config.get(f"{hk_key}_char_delay_ms", 0) or 0),
             }
             custom_themes.append(theme)
-            status = t("开") if theme["checked"] else t("关")
-            display_name = theme["nickname"] or theme["name"]
-            item_text = f"[{status}] {display_name}"
-            tree_iid = str(len(custom_themes) - 1)
-            custom_theme_tree.insert("", "end", iid=tree_iid, values=(item_text,))
             hotkey_index += 1
         else:
             break
 
+    rebuild_custom_theme_tree()
+
 
 _DETAIL_LAST_GEOM: str | None = None
 
+# 详情窗口：首次打开时构建，关闭时 withdraw() 隐藏，再次打开直接复用
+_DETAIL_WINDOW: tk.Toplevel | None = None
+
+
+def _detail_segments(content: str) -> list[tuple[str, tuple]]:
+    """把帮助文本解析为 (行文本, 样式标签) 列表，供 Text.insert 一次性插入。"""
+    segments: list[tuple[str, tuple]] = []
+    for line in content.strip().splitlines():
+        striped = line.strip()
+        if not striped:
+            segments.append(("\n", ()))
+        elif striped.startswith("【") and striped.endswith("】"):
+            segments.append((striped + "\n", ("section",)))
+        elif (striped.endswith("：") or striped.endswith(":")) and len(striped) < 40:
+            segments.append((striped + "\n", ("sub",)))
+        else:
+            segments.append((striped + "\n", ()))
+    return segments
+
+
 def show_detail_window():
         """显示详细信息窗口（改进版：分栏、滚动、加大行距、段落留白）。"""
-        global _DETAIL_LAST_GEOM
+        global _DETAIL_WINDOW
+        win = _DETAIL_WINDOW
+        if win is not None:
+                try:
+                        if win.winfo_exists():
+                                if _DETAIL_LAST_GEOM:
+                                        win.geometry(_DETAIL_LAST_GEOM)
+                                win.deiconify()
+                                win.lift()
+                                win.focus_force()
+                                return
+                except Exception:
+                        pass
+
         win = tk.Toplevel(root)
+        _DETAIL_WINDOW = win
         win.title(t("详情信息"))
         win.minsize(680, 520)
         # 恢复上次窗口尺寸
@@ -1278,7 +1472,6 @@ def show_detail_window():
                 win.geometry(f"{w}x{h}")
 
         def _on_close():
-                nonlocal win
                 try:
                         geom = win.winfo_geometry()
                         # 只记录 宽x高+X+Y 结构
@@ -1288,72 +1481,79 @@ def show_detail_window():
                                 globals()["_DETAIL_LAST_GEOM"] = parts[0]
                 except Exception:
                         pass
-                win.destroy()
+                win.withdraw()
 
         win.protocol("WM_DELETE_WINDOW", _on_close)
 
         notebook = ttk.Notebook(win)
         notebook.pack(fill="both", expand=True, padx=6, pady=6)
 
-        def _fill_text(txt: tk.Text, content: str) -> None:
+        # 字体：在系统默认字体基础上放大 + 行距（所有标签页共用）
+        base_font = tkfont.nametofont("TkDefaultFont").copy()
+        size = max(10, base_font.cget("size"))
+        try:
+            base_font.configure(size=size + 1)
+        except Exception:
+            pass
+
+        def _current_lang_key() -> str:
+            return "zh" if LANG == "zh-CN" else "en"
+
+        def _render_entry(ent: dict) -> None:
+            """在标签页首次被选中时创建 Text，并按当前语言填充（已是当前语言则跳过）。"""
+            lang_key = _current_lang_key()
+            if ent["rendered_lang"] == lang_key:
+                return
+            txt = ent["txt"]
+            if txt is None:
+                frame = ent["frame"]
+                # 使用 Text + Scrollbar 而非 scrolledtext（避免某些打包环境主题差异）
+                txt = tk.Text(frame, wrap="word", undo=False, relief="flat", padx=8, pady=8)
+                vsb = ttk.Scrollbar(frame, orient="vertical", command=txt.yview)
+                txt.configure(yscrollcommand=lambda *a: vsb.set(*a))
+                vsb.pack(side="right", fill="y")
+                txt.pack(side="left", fill="both", expand=True)
+                txt.configure(font=base_font, spacing1=4, spacing2=2, spacing3=6)
+                # 标题/小节样式加粗
+                txt.tag_config(
+                    "section",
+                    font=(base_font.cget("family"), base_font.cget("size") + 1, "bold"),
+                    spacing3=10,
+                )
+                txt.tag_config("sub", font=(base_font.cget("family"), base_font.cget("size"), "bold"))
+                ent["txt"] = txt
+
+            # 每种语言只解析一次，之后直接复用
+            segments = ent["segments"].get(lang_key)
+            if segments is None:
+                segments = _detail_segments(ent["content_zh"] if lang_key == "zh" else ent["content_en"])
+                ent["segments"][lang_key] = segments
             try:
                 txt.configure(state=tk.NORMAL)
-            except Exception:
-                pass
-            try:
                 txt.delete("1.0", tk.END)
+                # 单次 insert 传入 文本/标签 交替参数，避免逐行往返 Tcl
+                args: list = []
+                for text, tags in segments:
+                    args.extend((text, tags))
+                if args:
+                    txt.insert("end", *args)
+                txt.configure(state=tk.DISABLED)
             except Exception:
                 return
-            lines = content.strip().splitlines()
-            for line in lines:
-                striped = line.strip()
-                if not striped:
-                    txt.insert("end", "\n")
-                    continue
-                if striped.startswith("【") and striped.endswith("】"):
-                    txt.insert("end", striped + "\n", ("section",))
-                elif (striped.endswith("：") or striped.endswith(":")) and len(striped) < 40:
-                    txt.insert("end", striped + "\n", ("sub",))
-                else:
-                    txt.insert("end", striped + "\n")
-            txt.configure(state=tk.DISABLED)
+            ent["rendered_lang"] = lang_key
 
         def make_text_tab(title_zh: str, content_zh: str, content_en: str) -> dict:
             frame = ttk.Frame(notebook)
-            notebook.add(frame, text=title_zh)
-            # 使用 Text + Scrollbar 而非 scrolledtext（避免某些打包环境主题差异）
-            txt = tk.Text(frame, wrap="word", undo=False, relief="flat", padx=8, pady=8)
-            vsb = ttk.Scrollbar(frame, orient="vertical", command=txt.yview)
-            txt.configure(yscrollcommand=lambda *a: vsb.set(*a))
-            vsb.pack(side="right", fill="y")
-            txt.pack(side="left", fill="both", expand=True)
-
-            # 字体：在系统默认字体基础上放大 + 行距
-            base_font = tkfont.nametofont("TkDefaultFont").copy()
-            size = max(10, base_font.cget("size"))
-            try:
-                base_font.configure(size=size + 1)
-            except Exception:
-                pass
-            txt.configure(font=base_font, spacing1=4, spacing2=2, spacing3=6)
-
-            # 插入内容并对标题/小节样式加粗
-            txt.tag_config(
-                "section",
-                font=(base_font.cget("family"), base_font.cget("size") + 1, "bold"),
-                spacing3=10,
-            )
-            txt.tag_config("sub", font=(base_font.cget("family"), base_font.cget("size"), "bold"))
-
-            entry = {
+            notebook.add(frame, text=t(title_zh))
+            return {
                 "frame": frame,
-                "txt": txt,
+                "txt": None,
+                "rendered_lang": None,
+                "segments": {},
                 "title_zh": title_zh,
                 "content_zh": content_zh,
                 "content_en": content_en,
             }
-            _fill_text(txt, content_en if LANG != "zh-CN" else content_zh)
-            return entry
 
         quickstart_content_zh = """
 【快速入门】
@@ -1693,17 +1893,31 @@ Cannot find config/logs:
         _detail_entries.append(make_text_tab("自定义主题", custom_content_zh, custom_content_en))
         _detail_entries.append(make_text_tab("MQTT与连接", mqtt_content_zh, mqtt_content_en))
         _detail_entries.append(make_text_tab("提示与FAQ", tips_content_zh, tips_content_en))
+
+        def _render_selected(_event=None) -> None:
+            try:
+                selected = notebook.select()
+            except Exception:
+                return
+            for ent in _detail_entries:
+                if str(ent["frame"]) == selected:
+                    _render_entry(ent)
+                    break
+
+        notebook.bind("<<NotebookTabChanged>>", _render_selected, add="+")
+        _render_selected()
         center_window(win)
 
         def _apply_lang_to_detail() -> None:
             if not win.winfo_exists():
                 return
             try:
+                # 只更新标题；正文在标签页被选中时按新语言重新填充
                 for ent in _detail_entries:
                     notebook.tab(ent["frame"], text=t(ent["title_zh"]))
-                    _fill_text(ent["txt"], ent["content_en"] if LANG != "zh-CN" else ent["content_zh"])
             except Exception:
                 pass
+            _render_selected()
             try:
                 win.title(t("详情信息"))
             except Exception:
@@ -1713,830 +1927,1015 @@ Cannot find config/logs:
             except Exception:
                 pass
 
-        register_lang_observer(_apply_lang_to_detail)
+        def _on_detail_destroy(event) -> None:
+            global _DETAIL_WINDOW
+            if event.widget is win and _DETAIL_WINDOW is win:
+                _DETAIL_WINDOW = None
+
+        win.bind("<Destroy>", _on_detail_destroy, add="+")
+        register_lang_observer(_apply_lang_to_detail, owner=win)
         _apply_lang_to_detail()
 
 
-def rebuild_custom_theme_tree() -> None:
-    """
-    重新构建自定义主题树视图，确保索引正确
-    """
-    # 清空树视图中的所有项目
-    for item in custom_theme_tree.get_children():
-        custom_theme_tree.delete(item)
-    
-    # 重新插入所有主题，使用正确的索引
-    for index, theme in enumerate(custom_themes):
-        status = t("开") if theme["checked"] else t("关")
-        display_name = theme["nickname"] or theme["name"]
-        item_text = f"[{status}] {display_name}"
-        custom_theme_tree.insert("", "end", iid=str(index), values=(item_text,))
+# 自定义主题的稳定行 ID：与列表位置无关，增删主题不会让其它行的 ID 失效
+_THEME_ROW_IDS = itertools.count(1)
 
+# 虚拟列表在可见行之外额外生成的行数（避免滚动时露出空白）
+_THEME_LIST_OVERSCAN = 4
 
-# 修改自定义主题的函数
-def modify_custom_theme() -> None:
-    """
-    English: Opens a new window to modify selected custom theme
-    中文: 打开新窗口修改已选定的自定义主题
-    """
-    selected = custom_theme_tree.selection()
-    if not selected:
-        messagebox.showwarning(t("警告"), t("请先选择一个自定义主题"))
-        return
 
-    index = int(selected[0])
-    theme = custom_themes[index]
+def _theme_row_id(theme: Dict[str, Any]) -> str:
+    """返回主题的稳定行 ID（首次访问时分配，保存在主题字典的 "_rid" 中，不写入配置）。"""
+    rid = theme.get("_rid")
+    if not rid:
+        rid = f"theme{next(_THEME_ROW_IDS)}"
+        theme["_rid"] = rid
+    return rid
 
-    theme_window = tk.Toplevel(root)
-    theme_window.title(t("修改自定义主题"))
-    # 设置自适应
-    theme_window.geometry("")
-    theme_window.resizable(True, True)
-    
-    # 根据系统缩放计算内边距
-    
-    try:
-    
-        s = float(theme_window.tk.call('tk', 'scaling'))
-    
-        if s <= 0: s = 1.0
-    
-    except Exception: s = 1.0
-    
-    _PADX = max(4, int(10 * s))
-    
-    _PADY = max(3, int(6 * s))
-    # 允许窗口大小调整，并设置网格权重使输入控件随窗口拉伸
-    theme_window.resizable(True, True)
-    try:
-        theme_window.columnconfigure(0, weight=0)
-        theme_window.columnconfigure(1, weight=1)
-        theme_window.columnconfigure(2, weight=0)
-        theme_window.columnconfigure(3, weight=0)
-    except Exception:
-        pass
 
-    ttk.Label(theme_window, text=t("类型：")).grid(row=0, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    _type_keys = ["程序或脚本", "服务(需管理员权限)", "命令", "按键(Hotkey)"]
-    _initial_type_key = theme.get("type") or "程序或脚本"
-    if _initial_type_key not in _type_keys:
-        _initial_type_key = "程序或脚本"
-    theme_type_key_var = tk.StringVar(value=_initial_type_key)  # 内部值（保持中文 key）
-    theme_type_var = tk.StringVar(value=t(_initial_type_key))  # 显示值（随语言变化）
+def _theme_match_key(theme: Dict[str, Any]) -> tuple:
+    """重新加载配置后用于认回旧行 ID 的业务键（类型 + 主题名）。"""
+    return (theme.get("type", ""), theme.get("name", ""))
 
-    def _type_labels() -> list[str]:
-        return [t(k) for k in _type_keys]
 
-    def _type_key_by_label(label: str) -> str:
-        m = {t(k): k for k in _type_keys}
-        return m.get(label, "程序或脚本")
+# 搜索框匹配的主题字段（另加主题类型及其当前语言译名）
+_THEME_SEARCH_FIELDS = ("nickname", "name", "on_value", "off_value", "value")
 
-    def _type_label_by_key(key: str) -> str:
-        if key not in _type_keys:
-            key = "程序或脚本"
-            theme_type_key_var.set(key)
-        return t(key)
 
-    theme_type_combobox = ttk.Combobox(
-        theme_window,
-        textvariable=theme_type_var,
-        values=_type_labels(),
-        state="readonly",
-    )
-    theme_type_combobox.grid(row=0, column=1, sticky="we", padx=(0, _PADX), pady=_PADY)
-    try:
-        theme_type_combobox.current(_type_keys.index(_initial_type_key))
-    except Exception:
-        theme_type_combobox.current(0)
-        theme_type_key_var.set("程序或脚本")
-        theme_type_var.set(t("程序或脚本"))
+def _theme_search_sig(theme: Dict[str, Any]) -> tuple:
+    """检索签名：签名不变时检索文本可直接复用。"""
+    ttype = str(theme.get("type", "") or "")
+    return (LANG, ttype) + tuple(str(theme.get(f, "") or "") for f in _THEME_SEARCH_FIELDS)
 
-    ttk.Label(theme_window, text=t("服务时主程序")).grid(row=0, column=2, sticky="w", padx=_PADX, pady=_PADY)
-    ttk.Label(theme_window, text=t("需管理员权限")).grid(row=1, column=2, sticky="w", padx=_PADX, pady=_PADY)
 
-    ttk.Label(theme_window, text=t("状态：")).grid(row=1, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    theme_checked_var = tk.IntVar(value=theme["checked"])
-    ttk.Checkbutton(theme_window, variable=theme_checked_var).grid(
-        row=1, column=1, sticky="w", padx=(0, _PADX), pady=_PADY
-    )
+def _theme_search_text(sig: tuple) -> str:
+    """由签名生成小写检索文本；各字段以换行分隔，避免查询词跨字段误匹配。"""
+    return "\n".join((sig[1], t(sig[1])) + sig[2:]).lower()
 
-    ttk.Label(theme_window, text=t("昵称：")).grid(row=2, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    theme_nickname_entry = ttk.Entry(theme_window)
-    theme_nickname_entry.insert(0, theme["nickname"])
-    theme_nickname_entry.grid(row=2, column=1, sticky="we", padx=(0, _PADX), pady=_PADY)
 
-    ttk.Label(theme_window, text=t("主题：")).grid(row=3, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    theme_name_entry = ttk.Entry(theme_window)
-    theme_name_entry.insert(0, theme["name"])
-    theme_name_entry.grid(row=3, column=1, sticky="we", padx=(0, _PADX), pady=_PADY)
+# “全部检查”的结果：行 ID -> (检查时的主题签名, 状态)；主题修改后签名不同，图标自动消失
+_THEME_CHECKS: dict[str, tuple[tuple, str]] = {}
+_THEME_CHECK_ICONS = {rc_check.STATUS_OK: "✔", rc_check.STATUS_WARNING: "⚠", rc_check.STATUS_ERROR: "✖"}
+_THEME_CHECK_FIELDS = ("type", "name", "checked", "on_value", "off_value", "value", "on_type", "off_type")
 
-    # 新: 程序/命令类型拆分 ON/OFF 与关闭预设；Hotkey 保持原样
-    on_label_mod = ttk.Label(theme_window, text=t("打开(on)："))
-    on_label_mod.grid(row=4, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    on_frame_mod = ttk.Frame(theme_window)
-    on_frame_mod.grid(row=4, column=1, sticky="nsew", padx=(0, _PADX), pady=_PADY)
-    try:
-        theme_window.rowconfigure(4, weight=2)
-    except Exception:
-        pass
-    on_value_text = tk.Text(on_frame_mod, height=3, wrap="word")
-    on_value_text.insert("1.0", theme.get("on_value", theme.get("value", "")))
-    on_value_text.grid(row=0, column=0, sticky="nsew")
-    on_scroll_y = ttk.Scrollbar(on_frame_mod, orient="vertical", command=on_value_text.yview)
-    on_scroll_y.grid(row=0, column=1, sticky="ns")
-    on_value_text.configure(yscrollcommand=on_scroll_y.set)
-    try:
-        on_frame_mod.columnconfigure(0, weight=1)
-        on_frame_mod.rowconfigure(0, weight=1)
-    except Exception:
-        pass
 
-    off_label_mod = ttk.Label(theme_window, text=t("关闭(off)："))
-    off_label_mod.grid(row=5, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    off_frame_mod = ttk.Frame(theme_window)
-    off_frame_mod.grid(row=5, column=1, sticky="nsew", padx=(0, _PADX), pady=_PADY)
-    off_value_text = tk.Text(off_frame_mod, height=3, wrap="word")
-    off_value_text.insert("1.0", theme.get("off_value", ""))
-    off_value_text.grid(row=0, column=0, sticky="nsew")
-    off_scroll_y = ttk.Scrollbar(off_frame_mod, orient="vertical", command=off_value_text.yview)
-    off_scroll_y.grid(row=0, column=1, sticky="ns")
-    off_value_text.configure(yscrollcommand=off_scroll_y.set)
-    try:
-        off_frame_mod.columnconfigure(0, weight=1)
-        off_frame_mod.rowconfigure(0, weight=1)
-    except Exception:
-        pass
+def _theme_check_sig(theme: Dict[str, Any]) -> tuple:
+    return tuple(str(theme.get(f, "") or "") for f in _THEME_CHECK_FIELDS)
 
-    off_preset_label_mod = ttk.Label(theme_window, text=t("关闭预设："))
-    off_preset_label_mod.grid(row=6, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    # 关闭预设：内部 code + 显示 label 分离
-    _preset_label_zh_by_code = {
-        "none": "忽略",
-        "kill": "强制结束",
-        "interrupt": "中断",
-        "stop": "停止服务",
-        "custom": "自定义",
+
+def _theme_row_text(theme: Dict[str, Any]) -> str:
+    status = t("开") if theme["checked"] else t("关")
+    display_name = theme["nickname"] or theme["name"]
+    check = _THEME_CHECKS.get(theme.get("_rid", ""))
+    if check and check[0] == _theme_check_sig(theme):
+        return f"{_THEME_CHECK_ICONS[check[1]]} [{status}] {display_name}"
+    return f"[{status}] {display_name}"
+
+
+def _make_virtual_theme_list(tree: ttk.Treeview, vsb: ttk.Scrollbar) -> dict:
+    """
+    English: Virtualized view over the custom theme model; the Treeview only holds visible rows plus a small overscan
+    中文: 自定义主题的虚拟列表：Treeview 中只存在可见行及少量预留行，滚动时按模型重新生成这一段
+    """
+    state: dict[str, Any] = {
+        "top": 0,          # 第一个可见行在 rows 中的位置
+        "rows": [],        # 按显示顺序排列、通过筛选的行 ID
+        "all_rows": [],    # 全部行 ID（模型顺序）
+        "by_id": {},       # 行 ID -> 主题字典
+        "index": {},       # 行 ID -> (签名, 小写检索文本)，主题变化时才重算
+        "query": "",       # 当前筛选词（小写、去首尾空白）
+        "shown": [],       # 当前已插入 Treeview 的行 ID（按显示顺序）
+        "texts": {},       # 已插入行 ID -> 当前显示文本
+        "selected": None,  # 选中行 ID（可能不在可见范围内）
+        "row_h": 0,
     }
 
-    def _default_preset_code_for_type(t_type: str) -> str:
-        if t_type == "命令":
-            return "interrupt"
-        if t_type == "程序或脚本":
-            return "kill"
-        if t_type == "服务(需管理员权限)":
-            return "stop"
-        return "none"
+    def _row_height() -> int:
+        if not state["row_h"]:
+            try:
+                state["row_h"] = int(ttk.Style().lookup("Treeview", "rowheight") or 0)
+            except Exception:
+                state["row_h"] = 0
+            if state["row_h"] <= 0:
+                state["row_h"] = 20
+        return state["row_h"]
 
-    def _preset_codes_for_type(t_type: str) -> tuple[str, ...]:
-        if t_type == "命令":
-            return ("none", "interrupt", "kill", "custom")
-        if t_type == "程序或脚本":
-            return ("none", "kill", "custom")
-        if t_type == "服务(需管理员权限)":
-            return ("none", "stop", "custom")
-        return ("none",)
+    def _visible_count() -> int:
+        try:
+            h = tree.winfo_height()
+        except Exception:
+            h = 0
+        if h <= 1:
+            # 尚未布局：使用 Treeview 的默认行数
+            try:
+                return max(1, int(tree.cget("height")))
+            except Exception:
+                return 10
+        # 减去表头所占的一行
+        return max(1, h // _row_height() - 1)
+
+    def render() -> None:
+        rows = state["rows"]
+        total = len(rows)
+        vis = _visible_count()
+        top = max(0, min(state["top"], total - vis))
+        state["top"] = top
+        want = rows[top: top + vis + _THEME_LIST_OVERSCAN]
+        by_id = state["by_id"]
+        texts = state["texts"]
+        try:
+            # 按行 ID 与已插入的行对账：只删除离开窗口的行、插入新进入的行、更新文本变化的行
+            want_set = set(want)
+            stale = [rid for rid in state["shown"] if rid not in want_set]
+            if stale:
+                tree.delete(*stale)
+                for rid in stale:
+                    texts.pop(rid, None)
+            cur = [rid for rid in state["shown"] if rid in want_set]
+            for i, rid in enumerate(want):
+                text = _theme_row_text(by_id[rid])
+                if i < len(cur) and cur[i] == rid:
+                    if texts.get(rid) != text:
+                        tree.item(rid, values=(text,))
+                elif rid in texts:
+                    tree.move(rid, "", i)
+                    cur.remove(rid)
+                    cur.insert(i, rid)
+                    if texts[rid] != text:
+                        tree.item(rid, values=(text,))
+                else:
+                    tree.insert("", i, iid=rid, values=(text,))
+                    cur.insert(i, rid)
+                texts[rid] = text
+            state["shown"] = want
+            tree.yview_moveto(0)
+            sel = state["selected"]
+            if sel in want_set and tuple(tree.selection()) != (sel,):
+                tree.selection_set(sel)
+        except Exception:
+            pass
+        try:
+            if total:
+                vsb.set(top / total, min(1.0, (top + vis) / total))
+            else:
+                vsb.set(0.0, 1.0)
+        except Exception:
+            pass
 
-    def _preset_labels_for_type(t_type: str) -> list[str]:
-        return [t(_preset_label_zh_by_code[c]) for c in _preset_codes_for_type(t_type)]
+    def set_rows(themes: List[Dict[str, Any]]) -> None:
+        # 重新加载得到的是新字典：按业务键认回旧行 ID，保证对账、选择与滚动位置不丢失
+        old_ids: dict[tuple, list[str]] = {}
+        for rid in state["rows"]:
+            old_ids.setdefault(_theme_match_key(state["by_id"][rid]), []).append(rid)
+        taken = {th.get("_rid") for th in themes if th.get("_rid")}
+        for th in themes:
+            if th.get("_rid"):
+                continue
+            for rid in old_ids.get(_theme_match_key(th), ()):
+                if rid not in taken:
+                    th["_rid"] = rid
+                    taken.add(rid)
+                    break
+        state["all_rows"] = [_theme_row_id(th) for th in themes]
+        state["by_id"] = {_theme_row_id(th): th for th in themes}
+
+        # 增量维护检索索引：只重算签名变化的主题，并丢弃已删除的行
+        old_index = state["index"]
+        index: dict[str, tuple[tuple, str]] = {}
+        for rid, th in state["by_id"].items():
+            entry = old_index.get(rid)
+            sig = _theme_search_sig(th)
+            if entry is None or entry[0] != sig:
+                entry = (sig, _theme_search_text(sig))
+            index[rid] = entry
+        state["index"] = index
+
+        state["rows"] = _filter_rows(state["all_rows"], state["query"])
+        _drop_hidden_selection()
+        render()
+
+    def _filter_rows(base: list[str], query: str) -> list[str]:
+        terms = query.split()
+        if not terms:
+            return list(base)
+        index = state["index"]
+        return [rid for rid in base if all(term in index[rid][1] for term in terms)]
+
+    def _drop_hidden_selection() -> None:
+        sel = state["selected"]
+        if sel is not None and (sel not in state["by_id"] or sel not in set(state["rows"])):
+            state["selected"] = None
+
+    def set_filter(query: str) -> None:
+        """按昵称/主题名/类型/命令文本筛选（空格分隔的多个词需同时命中）。"""
+        q = " ".join(str(query or "").lower().split())
+        prev = state["query"]
+        if q == prev:
+            return
+        # 查询只是在上一次基础上追加字符时，结果必为上次结果的子集，只需在其中继续筛选
+        base = state["rows"] if prev and q.startswith(prev) else state["all_rows"]
+        state["query"] = q
+        state["rows"] = _filter_rows(base, q)
+        state["top"] = 0
+        _drop_hidden_selection()
+        render()
+
+    def scroll_to(top: int) -> None:
+        top = max(0, min(int(top), len(state["rows"]) - _visible_count()))
+        if top != state["top"]:
+            state["top"] = top
+            render()
+
+    def _yview(*args) -> None:
+        # 滚动条回调：moveto <fraction> / scroll <n> units|pages
+        try:
+            if args[0] == "moveto":
+                scroll_to(round(float(args[1]) * len(state["rows"])))
+            elif args[0] == "scroll":
+                step = _visible_count() if str(args[2]).startswith("page") else 1
+                scroll_to(state["top"] + int(args[1]) * step)
+        except Exception:
+            pass
 
-    def _preset_code_by_label(label: str) -> str:
-        m = {t(v): k for k, v in _preset_label_zh_by_code.items()}
-        return m.get(label, "none")
+    def _on_wheel(event) -> str:
+        try:
+            scroll_to(state["top"] - int(event.delta / 120) * 3)
+        except Exception:
+            pass
+        return "break"
 
-    def _preset_label_by_code(code: str) -> str:
-        return t(_preset_label_zh_by_code.get(code, "忽略"))
+    def select(rid: str | None) -> None:
+        """选中指定行并确保其可见。"""
+        if rid not in state["by_id"]:
+            return
+        state["selected"] = rid
+        idx = state["rows"].index(rid)
+        vis = _visible_count()
+        if idx < state["top"]:
+            state["top"] = idx
+        elif idx >= state["top"] + vis:
+            state["top"] = idx - vis + 1
+        render()
+        try:
+            tree.focus(rid)
+        except Exception:
+            pass
 
-    _t0 = theme_type_key_var.get()
-    preset_internal_default = theme.get("off_preset", _default_preset_code_for_type(_t0))
-    if preset_internal_default not in _preset_label_zh_by_code:
-        preset_internal_default = _default_preset_code_for_type(_t0)
-    off_preset_key_var_mod = tk.StringVar(value=preset_internal_default)
-    off_preset_var_mod = tk.StringVar(value=_preset_label_by_code(preset_internal_default))
+    def _on_key(delta: int | None, absolute: int | None = None):
+        def _handler(_event=None) -> str:
+            rows = state["rows"]
+            if not rows:
+                return "break"
+            if absolute is not None:
+                idx = absolute if absolute >= 0 else len(rows) - 1
+            else:
+                cur = state["selected"]
+                idx = rows.index(cur) if cur in state["by_id"] else state["top"] - 1
+                step = _visible_count() if abs(delta) > 1 else 1
+                idx += step if delta > 0 else -step
+            select(rows[max(0, min(idx, len(rows) - 1))])
+            return "break"
+        return _handler
+
+    def _on_select(_event=None) -> None:
+        # 行被滚出可见范围时 Treeview 选择会变空，此时保留模型中的选择
+        try:
+            sel = tree.selection()
+        except Exception:
+            sel = ()
+        if sel:
+            state["selected"] = sel[0]
+
+    def _on_configure(_event=None) -> None:
+        want = min(len(state["rows"]) - state["top"], _visible_count() + _THEME_LIST_OVERSCAN)
+        if want != len(state["shown"]):
+            render()
+
+    def selected_theme() -> Dict[str, Any] | None:
+        return state["by_id"].get(state["selected"])
+
+    vsb.configure(command=_yview)
+    tree.bind("<<TreeviewSelect>>", _on_select, add="+")
+    tree.bind("<MouseWheel>", _on_wheel)
+    tree.bind("<Configure>", _on_configure, add="+")
+    tree.bind("<Up>", _on_key(-1))
+    tree.bind("<Down>", _on_key(1))
+    tree.bind("<Prior>", _on_key(-2))
+    tree.bind("<Next>", _on_key(2))
+    tree.bind("<Home>", _on_key(None, 0))
+    tree.bind("<End>", _on_key(None, -1))
+
+    return {
+        "set_rows": set_rows,
+        "set_filter": set_filter,
+        "render": render,
+        "select": select,
+        "selected_theme": selected_theme,
+    }
 
-    off_preset_combo_mod = ttk.Combobox(
-        theme_window,
-        textvariable=off_preset_var_mod,
-        state="readonly",
-        values=_preset_labels_for_type(_t0),
-    )
-    off_preset_combo_mod.grid(row=6, column=1, sticky="w", padx=(0, _PADX), pady=_PADY)
 
-    # 记录自定义内容以便在预设与自定义切换时还原
-    previous_custom_off_value_mod = theme.get("off_value", "")
-    def _preview_text_for_mod(code: str, t_type: str, service_name: str = "") -> str:
-        if LANG != "zh-CN":
-            if t_type == "命令":
-                if code == "interrupt":
-                    return "Preset: Interrupt — Sends CTRL+BREAK to the last recorded command process and tries to exit gracefully."
-                if code == "kill":
-                    return "Preset: Force kill — Kills all recorded command processes (kill/taskkill)."
-                return "Preset: Ignore — No off action will be performed."
-            if t_type == "程序或脚本":
-                if code == "kill":
-                    return "Preset: Force kill — Tries to terminate the process/script derived from the On target (cmd/bat enhanced, ps1 dedicated, otherwise taskkill /IM)."
-                return "Preset: Ignore — No off action will be performed."
-            if t_type == "服务(需管理员权限)":
-                if code == "stop":
-                    svc = service_name or "the specified service"
-                    return f"Preset: Stop service — Runs: sc stop {svc}."
-                return "Preset: Ignore — No off action will be performed."
-            return "Preset: Ignore — No off action will be performed."
+def rebuild_custom_theme_tree() -> None:
+    """
+    用当前 custom_themes 模型刷新自定义主题列表（只生成可见行）
+    """
+    custom_theme_view["set_rows"](custom_themes)
 
-        # zh
-        if t_type == "命令":
-            if code == "interrupt":
-                return t("预设：中断 — 向最新记录的命令进程发送 CTRL+BREAK，并尝试优雅结束。")
-            if code == "kill":
-                return t("预设：强制结束 — 结束所有记录的命令进程（kill/taskkill）。")
-            return t("预设：忽略 — 不执行任何关闭动作。")
-        if t_type == "程序或脚本":
-            if code == "kill":
-                return t("预设：强制结束 — 将尝试结束由“打开(on)”目标派生的脚本/进程（cmd/bat 优先增强终止，ps1 专用终止，其它 taskkill /IM）。")
-            return t("预设：忽略 — 不执行任何关闭动作。")
-        if t_type == "服务(需管理员权限)":
-            if code == "stop":
-                svc = service_name or t("指定服务")
-                return t("预设：停止服务 — 使用 sc stop {svc} 停止服务。").format(svc=svc)
-            return t("预设：忽略 — 不执行任何关闭动作。")
-        return t("预设：忽略 — 不执行任何关闭动作。")
 
-    def _update_off_editability_mod(*_):
-        nonlocal previous_custom_off_value_mod
-        code = off_preset_key_var_mod.get() or "none"
-        t_type = theme_type_key_var.get()
+# 检查结果窗口：复用同一个窗口，再次检查时清空重填
+_CHECK_WINDOW: dict | None = None
+
+
+def _check_items() -> list[rc_check.CheckItem]:
+    """在主线程读取界面状态，生成供后台检查的主题快照。"""
+    items = []
+    for theme in builtin_themes:
+        key = theme["key"]
+        available = None
+        reason = ""
+        if key == "sleep" and sleep_disabled:
+            available, reason = False, sleep_status_message
+        elif key == "screen" and brightness_disabled:
+            available, reason = False, brightness_status_message
+        items.append(rc_check.CheckItem(f"builtin:{key}", "builtin", {
+            "nickname": t(theme["nickname"]),
+            "name": theme["name_var"].get(),
+            "checked": theme["checked"].get(),
+            "available": available,
+            "reason": reason,
+        }))
+    for theme in custom_themes:
+        items.append(rc_check.CheckItem(_theme_row_id(theme), "custom", dict(theme)))
+    return items
+
+
+def _get_check_window() -> dict:
+    global _CHECK_WINDOW
+    try:
+        if _CHECK_WINDOW is not None and _CHECK_WINDOW["window"].winfo_exists():
+            return _CHECK_WINDOW
+    except Exception:
+        pass
+    win = tk.Toplevel(root)
+    win.title(t("检查结果"))
+    win.geometry("")
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(1, weight=1)
+    status_var = tk.StringVar(value="")
+    ttk.Label(win, textvariable=status_var).grid(row=0, column=0, columnspan=2, sticky="w", padx=_PADX, pady=_PADY)
+    tree = ttk.Treeview(win, columns=("status", "theme", "type", "detail"), show="headings", height=14)
+    for col, title, width in (("status", "", 40), ("theme", "主题", 160), ("type", "类型", 120), ("detail", "说明", 420)):
+        tree.heading(col, text=t(title) if title else "")
+        tree.column(col, width=_scaled_width(width), stretch=(col == "detail"), anchor="w")
+    tree.tag_configure("error", foreground="#c0392b")
+    tree.tag_configure("warning", foreground="#d35400")
+    vsb = ttk.Scrollbar(win, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=vsb.set)
+    tree.grid(row=1, column=0, sticky="nsew", padx=(_PADX, 0), pady=(0, _PADY))
+    vsb.grid(row=1, column=1, sticky="ns", padx=(0, _PADX), pady=(0, _PADY))
+
+    def _on_double(_event=None) -> None:
+        # 自定义主题：跳到列表中的对应行并打开编辑窗口
+        rid = tree.focus()
+        if rid.startswith("builtin:") or not rid:
+            return
+        custom_theme_view["set_filter"]("")
+        custom_theme_search_var.set("")
+        custom_theme_view["select"](rid)
+        modify_custom_theme()
+
+    tree.bind("<Double-Button-1>", _on_double)
+    win.protocol("WM_DELETE_WINDOW", win.withdraw)
+    register_lang_observer(lambda: apply_language_to_widgets(win), owner=win)
+    _CHECK_WINDOW = {"window": win, "tree": tree, "status": status_var, "running": False}
+    return _CHECK_WINDOW
+
+
+def check_all_themes() -> None:
+    """
+    English: Dry-runs every built-in and custom theme concurrently; results stream in as each check completes
+    中文: 并发检查全部内置/自定义主题（不执行任何动作），每完成一个就显示到结果窗口并在列表中标注图标
+    """
+    cw = _get_check_window()
+    if cw["running"]:
+        cw["window"].deiconify()
+        cw["window"].lift()
+        return
+    items = _check_items()
+    by_key = {item.key: item for item in items}
+    tree: ttk.Treeview = cw["tree"]
+    tree.delete(*tree.get_children())
+    win = cw["window"]
+    win.deiconify()
+    center_window(win)
+    win.lift()
+    results: "queue.Queue[rc_check.CheckResult]" = queue.Queue()
+    counts = {"done": 0, rc_check.STATUS_ERROR: 0, rc_check.STATUS_WARNING: 0}
+    cw["running"] = True
+
+    def _add_row(res: rc_check.CheckResult) -> None:
+        item = by_key[res.key]
+        th = item.theme
+        name = th.get("nickname") or th.get("name") or ""
+        ttype = t("内置") if item.kind == "builtin" else t(th.get("type", ""))
+        icon = _THEME_CHECK_ICONS[res.status]
+        lines = [
+            t(i.message) + (f" ({i.detail})" if i.detail else "") for i in res.issues
+        ] or [t("正常")]
+        tree.insert("", "end", iid=res.key, values=(icon, name, ttype, "; ".join(lines)), tags=(res.status,))
+        if item.kind == "custom":
+            _THEME_CHECKS[res.key] = (_theme_check_sig(th), res.status)
+
+    def _drain() -> None:
+        changed = False
         try:
-            if code == "custom":
-                # 从预览切回自定义，恢复用户之前的输入
-                off_value_text.configure(state=tk.NORMAL)
-                try:
-                    off_value_text.delete("1.0", tk.END)
-                    off_value_text.insert("1.0", previous_custom_off_value_mod)
-                except Exception:
-                    pass
-            else:
-                # 切换到预设，先缓存自定义内容
-                try:
-                    if str(off_value_text.cget("state")) == str(tk.NORMAL):
-                        _cur = off_value_text.get("1.0", "end-1c")
-                        if _cur.strip():
-                            previous_custom_off_value_mod = _cur
-                except Exception:
-                    pass
-                # 写入预览说明并禁用
-                try:
-                    off_value_text.configure(state=tk.NORMAL)
-                    off_value_text.delete("1.0", tk.END)
-                    service_name = on_value_text.get("1.0", "end-1c").strip()
-                    off_value_text.insert("1.0", _preview_text_for_mod(code, t_type, service_name))
-                except Exception:
-                    pass
-                off_value_text.configure(state=tk.DISABLED)
+            while True:
+                res = results.get_nowait()
+                counts["done"] += 1
+                if res.status in counts:
+                    counts[res.status] += 1
+                _add_row(res)
+                changed = True
+        except queue.Empty:
+            pass
         except Exception:
             pass
+        if changed:
+            custom_theme_view["render"]()
         try:
-            if t_type == "程序或脚本" and code == "custom":
-                off_action_btn_mod.state(["!disabled"])
-            elif t_type == "命令" and code == "custom":
-                off_action_btn_mod.state(["!disabled"])
-            else:
-                off_action_btn_mod.state(["disabled"])
+            cw["status"].set(
+                t("已检查 {done}/{total}，错误 {errors}，警告 {warnings}").format(
+                    done=counts["done"], total=len(items),
+                    errors=counts[rc_check.STATUS_ERROR], warnings=counts[rc_check.STATUS_WARNING],
+                )
+            )
         except Exception:
             pass
 
-    def _on_off_preset_selected_mod(_event=None):
-        off_preset_key_var_mod.set(_preset_code_by_label(off_preset_var_mod.get()))
-        _update_off_editability_mod()
+    def _tick() -> None:
+        _drain()
+        if cw["running"]:
+            win.after(50, _tick)
 
-    off_preset_combo_mod.bind("<<ComboboxSelected>>", _on_off_preset_selected_mod)
+    def _on_done(_res, err) -> None:
+        cw["running"] = False
+        _drain()
+        if err is not None:
+            messagebox.showerror(t("错误"), str(err), parent=win)
 
-    def select_file():
-        file_path = filedialog.askopenfilename()
-        if file_path:
-            # 根据类型写入到 on_value 文本框
-            try:
-                on_value_text.delete("1.0", tk.END)
-                on_value_text.insert("1.0", file_path)
-            except Exception:
-                pass
+    _tick()
+    catalog = _service_catalog()
+    # 服务目录已读取时直接查目录，否则逐个通过 psutil 查询
+    checker = rc_check.ThemeChecker(service_lookup=catalog.lookup if catalog.loaded else None)
+    _run_in_background(win, lambda: rc_check.check_all(items, checker, on_result=results.put), _on_done)
 
-    def open_services():
-        try:
-            os.startfile("services.msc")
-        except Exception:
-            try:
-                subprocess.Popen(["services.msc"])  # 备用方式
-            except Exception as e:
-                messagebox.showerror(t("错误"), t("无法打开服务管理器: {err}").format(err=e))
 
-    # 命令类型：{value} 参数范围（默认 0-100，可配置）
-    cmd_value_min_var_add = tk.StringVar(value="0")
-    cmd_value_max_var_add = tk.StringVar(value="100")
+# 命令测试面板：最多保留的输出行数、每次轮询最多取出的行数与轮询间隔
+_RUNNER_MAX_LINES = 2000
+_RUNNER_BATCH_LINES = 500
+_RUNNER_POLL_MS = 50
+
+
+def _format_bytes(n: int) -> str:
+    if n >= 1024 * 1024:
+        return f"{n / (1024 * 1024):.1f} MB"
+    return f"{n / 1024:.0f} KB"
 
-    def _get_cmd_value_range_add() -> tuple[int, int]:
+
+def _make_command_runner(parent: tk.Misc) -> dict:
+    """
+    English: Embedded test runner that streams a PowerShell command's stdout/stderr into a bounded Text
+    中文: 内嵌命令测试面板：异步启动命令，读线程把输出送入队列，主线程定时取出写入文本框；
+          显示运行耗时、退出码与 powershell 进程的峰值内存，长时间运行也不会阻塞编辑窗口
+    """
+    frame = ttk.LabelFrame(parent, text=t("测试输出"))
+    header = ttk.Frame(frame)
+    header.pack(side="top", fill="x", padx=4, pady=(2, 4))
+    status_var = tk.StringVar(value="")
+    ttk.Label(header, textvariable=status_var).pack(side="left")
+
+    body = ttk.Frame(frame)
+    body.pack(side="top", fill="both", expand=True, padx=4, pady=(0, 4))
+    txt = tk.Text(body, height=10, wrap="char", font="TkFixedFont", state=tk.DISABLED)
+    vsb = ttk.Scrollbar(body, orient="vertical", command=txt.yview)
+    txt.configure(yscrollcommand=vsb.set)
+    vsb.pack(side="right", fill="y")
+    txt.pack(side="left", fill="both", expand=True)
+    txt.tag_config("stderr", foreground="#c0392b")
+    txt.tag_config("meta", foreground="#808080")
+    txt.tag_config("lint", foreground="#d35400")
+
+    state: dict[str, Any] = {"proc": None, "run_id": 0}
+
+    def _append(pairs: list[tuple[str, str]]) -> None:
+        if not pairs:
+            return
+        args: list = []
+        for text, tag in pairs[-_RUNNER_MAX_LINES:]:
+            args.extend((text, (tag,) if tag else ()))
         try:
-            lo = int((cmd_value_min_var_add.get() or "0").strip())
-            hi = int((cmd_value_max_var_add.get() or "100").strip())
+            at_bottom = txt.yview()[1] >= 0.999
+            txt.configure(state=tk.NORMAL)
+            txt.insert("end", *args)
+            # 超出上限时丢弃最早的行
+            lines = int(txt.index("end-1c").split(".")[0])
+            if lines > _RUNNER_MAX_LINES:
+                txt.delete("1.0", f"{lines - _RUNNER_MAX_LINES + 1}.0")
+            txt.configure(state=tk.DISABLED)
+            if at_bottom:
+                txt.see("end")
         except Exception:
-            messagebox.showwarning(t("提示"), t("请输入整数"))
-            return 0, 100
-        if lo > hi:
-            lo, hi = hi, lo
-        return lo, hi
+            pass
 
-    def _ask_value_for_placeholder_add(parent_win: tk.Misc) -> str | None:
-        lo, hi = _get_cmd_value_range_add()
-        ex = 50
-        if ex < lo or ex > hi:
-            ex = lo
-        s = simpledialog.askstring(
-            t("输入参数"),
-            t("请输入 {value} 的值（范围 {lo}-{hi}），例如 {ex}：").format(value="{value}", lo=lo, hi=hi, ex=ex),
-            initialvalue=str(ex),
-            parent=parent_win,
-        )
-        if s is None:
-            return None
-        s = str(s).strip()
+    def _clear() -> None:
         try:
-            v = int(s)
+            txt.configure(state=tk.NORMAL)
+            txt.delete("1.0", "end")
+            txt.configure(state=tk.DISABLED)
         except Exception:
-            messagebox.showwarning(t("提示"), t("请输入整数"))
-            return None
-        if v < lo or v > hi:
-            messagebox.showwarning(t("提示"), t("参数超出范围：{lo}-{hi}").format(lo=lo, hi=hi))
-            return None
-        return str(v)
+            pass
 
-    # 命令类型：{value} 参数范围（默认 0-100，可配置）
-    cmd_value_min_var = tk.StringVar(value=str(int(theme.get("value_min", 0) or 0)))
-    cmd_value_max_var = tk.StringVar(value=str(int(theme.get("value_max", 100) or 100)))
+    def _status(run: dict) -> str:
+        end = run.get("end")
+        elapsed = (end if end is not None else time.perf_counter()) - run["start"]
+        parts = [f"{t('耗时')}: {elapsed:.2f}s"]
+        if run.get("peak"):
+            parts.append(f"{t('峰值内存')}: {_format_bytes(run['peak'])}")
+        if run.get("code") is not None:
+            parts.insert(0, f"{t('退出码')}: {run['code']}")
+        elif run.get("stopped"):
+            parts.insert(0, t("已停止"))
+        else:
+            parts.insert(0, t("运行中") + "...")
+        return "  ·  ".join(parts)
 
-    def _get_cmd_value_range_mod() -> tuple[int, int]:
+    def _sample_peak(run: dict) -> None:
+        ps = run.get("ps")
+        if ps is None:
+            return
         try:
-            lo = int((cmd_value_min_var.get() or "0").strip())
-            hi = int((cmd_value_max_var.get() or "100").strip())
+            mi = ps.memory_info()
+            run["peak"] = max(run.get("peak", 0), int(getattr(mi, "peak_wset", 0) or mi.rss))
         except Exception:
-            messagebox.showwarning(t("提示"), t("请输入整数"))
-            return 0, 100
-        if lo > hi:
-            lo, hi = hi, lo
-        return lo, hi
+            run["ps"] = None
 
-    def _ask_value_for_placeholder_mod(parent_win: tk.Misc) -> str | None:
-        lo, hi = _get_cmd_value_range_mod()
-        ex = 50
-        if ex < lo or ex > hi:
-            ex = lo
-        s = simpledialog.askstring(
-            t("输入参数"),
-            t("请输入 {value} 的值（范围 {lo}-{hi}），例如 {ex}：").format(value="{value}", lo=lo, hi=hi, ex=ex),
-            initialvalue=str(ex),
-            parent=parent_win,
-        )
-        if s is None:
-            return None
-        s = str(s).strip()
+    def _poll(run: dict) -> None:
+        if run["id"] != state["run_id"]:
+            return
+        q: queue.Queue = run["queue"]
+        pairs: list[tuple[str, str]] = []
         try:
-            v = int(s)
+            while len(pairs) < _RUNNER_BATCH_LINES:
+                kind, text = q.get_nowait()
+                if text is None:
+                    run["open"] -= 1
+                else:
+                    pairs.append((text, "stderr" if kind == "err" else ""))
+        except queue.Empty:
+            pass
+        _append(pairs)
+        if run.get("code") is None:
+            _sample_peak(run)
+        finished = run.get("code") is not None and run["open"] == 0 and q.empty()
+        try:
+            status_var.set(_status(run))
         except Exception:
-            messagebox.showwarning(t("提示"), t("请输入整数"))
-            return None
-        if v < lo or v > hi:
-            messagebox.showwarning(t("提示"), t("参数超出范围：{lo}-{hi}").format(lo=lo, hi=hi))
-            return None
-        return str(v)
-
-    def test_command_in_powershell():
-        cmd = on_value_text.get("1.0", "end-1c").strip()
-        if not cmd:
-            messagebox.showwarning(t("提示"), t("请先在“值”中输入要测试的命令"))
             return
-        if "{value}" in cmd:
-            val = _ask_value_for_placeholder_mod(theme_window)
-            if val is None:
-                return
-            cmd = cmd.replace("{value}", val)
-        cmd = _normalize_command_for_powershell(cmd)
-        # 在 PowerShell 中显示命令，等待用户按回车后再执行
-        if LANG != "zh-CN":
-            ps_script = (
-                "Write-Host 'Ready to test command:' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host 'Press Enter to run';"
-                "\nWrite-Host 'Running...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('Error: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
-        else:
-            ps_script = (
-                "Write-Host '已准备好要测试的命令：' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host '按回车后执行';"
-                "\nWrite-Host '正在执行...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('发生错误: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
-        try:
-            subprocess.Popen(
-                ["powershell.exe", "-NoExit", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script],
-                creationflags=subprocess.CREATE_NEW_CONSOLE,
-            )
-        except Exception as e:
-            messagebox.showerror(t("错误"), t("无法启动 PowerShell: {err}").format(err=e))
-
-    select_file_btn_mod = ttk.Button(theme_window, text=t("选择文件"), command=select_file)
-    select_file_btn_mod.grid(row=4, column=2, sticky="w", padx=_PADX, pady=_PADY)
-    def select_off_file():
-        nonlocal previous_custom_off_value_mod
-        file_path = filedialog.askopenfilename()
-        if file_path:
+        if finished:
+            state["proc"] = None
             try:
-                if (off_preset_key_var_mod.get() or "none") != "custom":
-                    off_preset_key_var_mod.set("custom")
-                    off_preset_var_mod.set(_preset_label_by_code("custom"))
-                previous_custom_off_value_mod = file_path
-                off_value_text.configure(state=tk.NORMAL)
-                off_value_text.delete("1.0", tk.END)
-                off_value_text.insert("1.0", file_path)
+                stop_btn.configure(state="disabled")
             except Exception:
                 pass
-            _update_off_editability_mod()
-
-    def test_off_command_in_powershell():
-        if (off_preset_key_var_mod.get() or "none") != "custom":
-            messagebox.showwarning(t("提示"), t("请先将关闭预设切换为“自定义”并填写命令"))
             return
         try:
-            off_value_text.configure(state=tk.NORMAL)
+            frame.after(_RUNNER_POLL_MS, _poll, run)
         except Exception:
             pass
-        cmd = off_value_text.get("1.0", "end-1c").strip()
-        if not cmd:
-            messagebox.showwarning(t("提示"), t("请先在“关闭(off)”中输入要测试的命令"))
-            return
-        if "{value}" in cmd:
-            val = _ask_value_for_placeholder_mod(theme_window)
-            if val is None:
+
+    def _put(run: dict, item: tuple) -> bool:
+        # 队列满时等待面板取走；本次运行已被新的测试取代时放弃，避免读线程永久阻塞
+        while True:
+            try:
+                run["queue"].put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                if run["id"] != state["run_id"]:
+                    return False
+
+    def _reader(stream, kind: str, run: dict) -> None:
+        # 每个输出流一个增量解码器：编码只在第一段非 ASCII 输出时确定一次
+        decoder = rc_decode.StreamDecoder("powershell")
+        try:
+            for raw in iter(stream.readline, b""):
+                if not _put(run, (kind, decoder.feed(raw).rstrip("\r\n") + "\n")):
+                    return
+            rest = decoder.flush()
+            if rest and not _put(run, (kind, rest)):
                 return
-            cmd = cmd.replace("{value}", val)
-        cmd = _normalize_command_for_powershell(cmd)
-        if LANG != "zh-CN":
-            ps_script = (
-                "Write-Host 'Ready to test command:' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host 'Press Enter to run';"
-                "\nWrite-Host 'Running...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('Error: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
-        else:
-            ps_script = (
-                "Write-Host '已准备好要测试的命令：' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host '按回车后执行';"
-                "\nWrite-Host '正在执行...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('发生错误: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
+        except Exception:
+            pass
+        _put(run, (kind, None))
+
+    def _waiter(proc: subprocess.Popen, run: dict) -> None:
+        code = proc.wait()
+        run["end"] = time.perf_counter()
+        run["code"] = code
+
+    def run(cmd: str, notes: list[str] | None = None) -> None:
+        stop()
+        _clear()
+        state["run_id"] += 1
+        # 读线程阻塞在有界队列上形成背压，输出再多也不会无限占用内存
+        q: queue.Queue = queue.Queue(maxsize=_RUNNER_MAX_LINES * 2)
+        run_state: dict[str, Any] = {"id": state["run_id"], "queue": q, "open": 2, "start": time.perf_counter()}
+        _append([(f"> {cmd}\n", "meta")] + [(f"{line}\n", "lint") for line in notes or []])
         try:
-            subprocess.Popen(
-                ["powershell.exe", "-NoExit", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script],
-                creationflags=subprocess.CREATE_NEW_CONSOLE,
+            proc = subprocess.Popen(
+                ["powershell.exe", "-NoProfile", "-ExecutionPolicy", "Bypass", "-NonInteractive", "-Command", cmd],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
             )
         except Exception as e:
-            messagebox.showerror(t("错误"), t("无法启动 PowerShell: {err}").format(err=e))
+            _append([(t("无法启动 PowerShell: {err}").format(err=e) + "\n", "stderr")])
+            status_var.set("")
+            return
+        run_state["start"] = time.perf_counter()
+        try:
+            run_state["ps"] = psutil.Process(proc.pid)
+        except Exception:
+            run_state["ps"] = None
+        state["proc"] = proc
+        threading.Thread(target=_reader, args=(proc.stdout, "out", run_state), daemon=True).start()
+        threading.Thread(target=_reader, args=(proc.stderr, "err", run_state), daemon=True).start()
+        threading.Thread(target=_waiter, args=(proc, run_state), daemon=True).start()
+        stop_btn.configure(state="normal")
+        state["run"] = run_state
+        _poll(run_state)
+
+    def stop() -> None:
+        proc = state.get("proc")
+        if proc is None or proc.poll() is not None:
+            return
+        run_state = state.get("run")
+        if run_state is not None:
+            run_state["stopped"] = True
+        pid = proc.pid
 
-    off_action_btn_mod = ttk.Button(theme_window, text=t("选择文件"), command=select_off_file)
-    off_action_btn_mod.grid(row=5, column=2, sticky="w", padx=_PADX, pady=_PADY)
-    _update_off_editability_mod()
+        # 结束整棵进程树（命令可能又启动了子进程）；在后台执行以免阻塞界面
+        def _kill_tree() -> None:
+            try:
+                subprocess.run(
+                    ["taskkill", "/PID", str(pid), "/T", "/F"],
+                    capture_output=True,
+                    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+                )
+            except Exception:
+                pass
+            try:
+                proc.kill()
+            except Exception:
+                pass
 
-    # 垂直方向自适应：占位扩展区，推开底部按钮
-    try:
-        theme_window.rowconfigure(7, weight=1)
-        _spacer_mod = ttk.Frame(theme_window)
-        _spacer_mod.grid(row=7, column=0, columnspan=4, sticky="nsew")
-    except Exception:
-        pass
+        threading.Thread(target=_kill_tree, daemon=True).start()
 
-    # 命令类型：命令窗口显示/隐藏 -> 改为复选框，放在“状态”后面
-    cmd_window_var = tk.IntVar(value=0 if theme.get("window", "show") == "hide" else 1)
-    cmd_window_check = ttk.Checkbutton(theme_window, text=t("显示窗口"), variable=cmd_window_var)
+    def report(lines: list[str], status: str = "") -> None:
+        """停止当前运行并显示一段文本结果（如基准测试报告）。"""
+        stop()
+        _clear()
+        state["run_id"] += 1
+        _append([(line + "\n", "meta" if line.startswith("> ") else "") for line in lines])
+        status_var.set(status)
 
-    cmd_range_frame_mod = ttk.Frame(theme_window)
-    ttk.Label(cmd_range_frame_mod, text=t("value 参数范围：")).grid(row=0, column=0, sticky="w")
-    ttk.Label(cmd_range_frame_mod, text=t("最小：")).grid(row=0, column=1, sticky="e", padx=(8, 2))
-    cmd_min_entry_mod = ttk.Entry(cmd_range_frame_mod, textvariable=cmd_value_min_var, width=8)
-    cmd_min_entry_mod.grid(row=0, column=2, sticky="w")
-    ttk.Label(cmd_range_frame_mod, text=t("最大：")).grid(row=0, column=3, sticky="e", padx=(10, 2))
-    cmd_max_entry_mod = ttk.Entry(cmd_range_frame_mod, textvariable=cmd_value_max_var, width=8)
-    cmd_max_entry_mod.grid(row=0, column=4, sticky="w")
-
-    # Hotkey 专用设置（修改窗口）
-    hotkey_frame_mod = ttk.Labelframe(theme_window, text=t("按键(Hotkey) 设置"))
-    hk_type_items = [
-        ("none", "不执行"),
-        ("keyboard", "键盘组合"),
-    ]
+    stop_btn = ttk.Button(header, text=t("停止"), command=stop, state="disabled")
+    stop_btn.pack(side="right")
+    ttk.Button(header, text=t("清空"), command=_clear).pack(side="right", padx=(0, 4))
 
-    def _hk_type_labels_mod() -> list[str]:
-        return [t(zh) for _, zh in hk_type_items]
+    return {"frame": frame, "run": run, "stop": stop, "report": report, "status": status_var.set}
 
-    def _hk_type_key_by_label_mod(label: str) -> str:
-        m = {t(zh): k for k, zh in hk_type_items}
-        return m.get(label, "none")
 
-    def _hk_type_label_by_key_mod(key: str) -> str:
-        zh = next((zh for k, zh in hk_type_items if k == key), "不执行")
-        return t(zh)
+# 应用索引：与 config.toml 同目录保存，记录每个目录的 mtime，后续只重扫变化的目录
+APP_INDEX_FILE_NAME = "RC-GUI.appindex.json"
+_APP_INDEX: rc_appindex.AppIndex | None = None
+# refreshing：后台扫描进行中；waiters：扫描完成后要通知的回调；pending_full：扫描中收到的重建请求
+_APP_INDEX_STATE: dict[str, Any] = {"refreshing": False, "waiters": [], "pending_full": False}
 
-    hk_on_type_key_var_mod = tk.StringVar(value=theme.get("on_type", "keyboard") or "keyboard")
-    hk_on_type_var_mod = tk.StringVar(value=_hk_type_label_by_key_mod(hk_on_type_key_var_mod.get()))
-    hk_on_val_var_mod = tk.StringVar(value=theme.get("on_value", ""))
-
-    hk_off_type_key_var_mod = tk.StringVar(value=theme.get("off_type", "none") or "none")
-    hk_off_type_var_mod = tk.StringVar(value=_hk_type_label_by_key_mod(hk_off_type_key_var_mod.get()))
-    hk_off_val_var_mod = tk.StringVar(value=theme.get("off_value", ""))
-    hk_char_delay_var_mod = tk.StringVar(value=str(theme.get("char_delay_ms", 0)))
-
-    ttk.Label(hotkey_frame_mod, text=t("打开(on)：")).grid(row=0, column=0, sticky="e", padx=8, pady=4)
-    hk_on_type_combo_mod = ttk.Combobox(hotkey_frame_mod, values=_hk_type_labels_mod(), textvariable=hk_on_type_var_mod, state="readonly", width=12)
-    hk_on_type_combo_mod.grid(row=0, column=1, sticky="w")
-    hk_on_entry_mod = ttk.Entry(hotkey_frame_mod, textvariable=hk_on_val_var_mod, width=24)
-    hk_on_entry_mod.grid(row=0, column=2, sticky="w")
-    ttk.Button(hotkey_frame_mod, text=t("录制"), command=lambda: open_keyboard_recorder(theme_window, hk_on_val_var_mod)).grid(row=0, column=3, sticky="w")
-
-    ttk.Label(hotkey_frame_mod, text=t("关闭(off)：")).grid(row=1, column=0, sticky="e", padx=8, pady=4)
-    hk_off_type_combo_mod = ttk.Combobox(hotkey_frame_mod, values=_hk_type_labels_mod(), textvariable=hk_off_type_var_mod, state="readonly", width=12)
-    hk_off_type_combo_mod.grid(row=1, column=1, sticky="w")
-    hk_off_entry_mod = ttk.Entry(hotkey_frame_mod, textvariable=hk_off_val_var_mod, width=24)
-    hk_off_entry_mod.grid(row=1, column=2, sticky="w")
-    ttk.Button(hotkey_frame_mod, text=t("录制"), command=lambda: open_keyboard_recorder(theme_window, hk_off_val_var_mod)).grid(row=1, column=3, sticky="w")
-
-    ttk.Label(hotkey_frame_mod, text=t("字母段间隔(ms)：")).grid(row=2, column=0, sticky="e", padx=8, pady=4)
-    hk_char_delay_entry_mod = ttk.Entry(hotkey_frame_mod, textvariable=hk_char_delay_var_mod, width=12)
-    hk_char_delay_entry_mod.grid(row=2, column=1, sticky="w")
-    ttk.Label(hotkey_frame_mod, text=t("(未测试，不保证生效)")).grid(row=2, column=2, columnspan=2, sticky="w")
-
-    def _on_hk_on_type_selected_mod(_event=None):
-        hk_on_type_key_var_mod.set(_hk_type_key_by_label_mod(hk_on_type_var_mod.get()))
-        hk_on_type_var_mod.set(_hk_type_label_by_key_mod(hk_on_type_key_var_mod.get()))
-
-    def _on_hk_off_type_selected_mod(_event=None):
-        hk_off_type_key_var_mod.set(_hk_type_key_by_label_mod(hk_off_type_var_mod.get()))
-        hk_off_type_var_mod.set(_hk_type_label_by_key_mod(hk_off_type_key_var_mod.get()))
-
-    hk_on_type_combo_mod.bind("<<ComboboxSelected>>", _on_hk_on_type_selected_mod)
-    hk_off_type_combo_mod.bind("<<ComboboxSelected>>", _on_hk_off_type_selected_mod)
-
-    def _update_type_specific_mod(*_):
-        type_key = theme_type_key_var.get()
-        if type_key == "命令":
-            cmd_window_check.grid(row=1, column=1, sticky="n")
-            # 放到“关闭预设”同一行右侧
-            cmd_range_frame_mod.grid(row=6, column=1, columnspan=2, sticky="n", padx=(0, _PADX), pady=_PADY)
-        else:
-            cmd_window_check.grid_remove()
-            cmd_range_frame_mod.grid_remove()
-        if type_key == "按键(Hotkey)":
-            on_label_mod.grid_remove()
-            off_label_mod.grid_remove()
-            on_frame_mod.grid_remove()
-            off_frame_mod.grid_remove()
-            off_preset_combo_mod.grid_remove()
-            try:
-                off_preset_label_mod.grid_remove()
-            except Exception:
-                pass
-            hotkey_frame_mod.grid(row=4, column=1, columnspan=2, sticky="we")
-            select_file_btn_mod.grid_remove()
-            off_action_btn_mod.state(["disabled"])
-            off_action_btn_mod.grid_remove()
-        else:
-            hotkey_frame_mod.grid_remove()
-            on_label_mod.grid(row=4, column=0, sticky="e")
-            on_frame_mod.grid(row=4, column=1, sticky="nsew")
-            off_label_mod.grid(row=5, column=0, sticky="e")
-            off_frame_mod.grid(row=5, column=1, sticky="nsew")
-            off_preset_label_mod.grid(row=6, column=0, sticky="e")
-            # 根据类型刷新可选值（保持内部 code 不变）
-            values_now = _preset_labels_for_type(type_key)
-            off_preset_combo_mod.configure(values=values_now)
-            allowed_codes = _preset_codes_for_type(type_key)
-            cur_code = off_preset_key_var_mod.get() or "none"
-            if cur_code not in allowed_codes:
-                cur_code = _default_preset_code_for_type(type_key)
-                if cur_code not in allowed_codes:
-                    cur_code = allowed_codes[0]
-                off_preset_key_var_mod.set(cur_code)
-            off_preset_var_mod.set(_preset_label_by_code(off_preset_key_var_mod.get() or "none"))
-            off_preset_combo_mod.grid(row=6, column=1, sticky="w")
-            # 根据类型设置按钮文本与功能
-            if type_key == "程序或脚本":
-                select_file_btn_mod.configure(text=t("选择文件"), command=select_file)
-                select_file_btn_mod.grid(row=4, column=2, sticky="w", padx=15)
-                off_action_btn_mod.configure(text=t("选择文件"), command=select_off_file)
-                off_action_btn_mod.grid(row=5, column=2, sticky="w", padx=15)
-            elif type_key == "服务(需管理员权限)":
-                select_file_btn_mod.configure(text=t("打开服务"), command=open_services)
-                select_file_btn_mod.grid(row=4, column=2, sticky="w", padx=15)
-                off_action_btn_mod.state(["disabled"])
-                off_action_btn_mod.grid_remove()
-            elif type_key == "命令":
-                select_file_btn_mod.configure(text=t("PowerShell测试"), command=test_command_in_powershell)
-                select_file_btn_mod.grid(row=4, column=2, sticky="w", padx=15)
-                off_action_btn_mod.configure(text=t("PowerShell测试(关闭)"), command=test_off_command_in_powershell)
-                off_action_btn_mod.grid(row=5, column=2, sticky="w", padx=15)
-            else:
-                select_file_btn_mod.grid_remove()
-                off_action_btn_mod.state(["disabled"])
-                off_action_btn_mod.grid_remove()
-            _update_off_editability_mod()
 
-    theme_type_combobox.bind("<<ComboboxSelected>>", _update_type_specific_mod)
-    _update_type_specific_mod()
+def _app_index_user_roots() -> list[str]:
+    roots = _load_gui_cache().get("app_index_roots")
+    return [r for r in roots if isinstance(r, str)] if isinstance(roots, list) else []
 
-    def _on_theme_type_selected_mod(_event=None):
-        theme_type_key_var.set(_type_key_by_label(theme_type_var.get()))
-        theme_type_var.set(_type_label_by_key(theme_type_key_var.get()))
-        _update_type_specific_mod()
 
-    # 覆盖绑定：先同步内部 key，再刷新 UI
-    theme_type_combobox.bind("<<ComboboxSelected>>", _on_theme_type_selected_mod)
+def _app_index() -> rc_appindex.AppIndex:
+    global _APP_INDEX
+    if _APP_INDEX is None:
+        _APP_INDEX = rc_appindex.AppIndex(
+            rc_appindex.default_roots() + _app_index_user_roots(),
+            os.path.join(os.path.abspath(os.path.dirname(sys.argv[0])), APP_INDEX_FILE_NAME),
+            rc_appindex.shell_link_resolver(),
+        )
+    return _APP_INDEX
 
-    def _refresh_type_and_preset_i18n_mod() -> None:
-        try:
-            theme_type_combobox.configure(values=_type_labels())
-            # 维持当前选择
-            cur_type_key = theme_type_key_var.get() or "程序或脚本"
-            if cur_type_key not in _type_keys:
-                cur_type_key = "程序或脚本"
-                theme_type_key_var.set(cur_type_key)
-            theme_type_var.set(_type_label_by_key(cur_type_key))
+
+def _refresh_app_index(on_done: Callable[[], None] | None = None, full: bool = False) -> None:
+    """在后台刷新应用索引；已在刷新时只登记回调，不重复扫描（由主窗口轮询，选择窗口关闭也不影响）。"""
+    if on_done is not None:
+        _APP_INDEX_STATE["waiters"].append(on_done)
+    if _APP_INDEX_STATE["refreshing"]:
+        # 扫描中又请求重建：本轮结束后再完整扫描一次
+        _APP_INDEX_STATE["pending_full"] = _APP_INDEX_STATE.get("pending_full") or full
+        return
+    _APP_INDEX_STATE["refreshing"] = True
+    index = _app_index()
+    # 在主线程取副本交给后台扫描；添加文件夹只替换 index.roots，不修改扫描中的列表，
+    # 扫描结束时根目录已变化则再增量扫描一次
+    roots = list(index.roots)
+
+    def _done(_res, _err) -> None:
+        _APP_INDEX_STATE["refreshing"] = False
+        pending_full = _APP_INDEX_STATE.pop("pending_full", False)
+        if pending_full or index.roots != roots:
+            _refresh_app_index(full=pending_full)
+            return
+        waiters, _APP_INDEX_STATE["waiters"] = _APP_INDEX_STATE["waiters"], []
+        for cb in waiters:
             try:
-                theme_type_combobox.current(_type_keys.index(cur_type_key))
+                cb()
             except Exception:
                 pass
-        except Exception:
-            pass
-        try:
-            t_key = theme_type_key_var.get() or "程序或脚本"
-            off_preset_combo_mod.configure(values=_preset_labels_for_type(t_key))
-            off_preset_var_mod.set(_preset_label_by_code(off_preset_key_var_mod.get() or "none"))
-        except Exception:
-            pass
 
-        # Hotkey 下拉选项刷新
-        try:
-            hk_on_type_combo_mod.configure(values=_hk_type_labels_mod())
-            hk_off_type_combo_mod.configure(values=_hk_type_labels_mod())
-            hk_on_type_var_mod.set(_hk_type_label_by_key_mod(hk_on_type_key_var_mod.get()))
-            hk_off_type_var_mod.set(_hk_type_label_by_key_mod(hk_off_type_key_var_mod.get()))
-        except Exception:
-            pass
+    _run_in_background(root, lambda: index.refresh(full=full, roots=roots), _done)
 
-        # 如果当前是预设（非 custom），则更新预设说明文本语言
+
+def _open_search_picker(
+    parent: tk.Toplevel,
+    title: str,
+    columns: list[tuple[str, str, int]],
+    search: Callable[[str], list[tuple[tuple, str]]],
+    status: Callable[[], str],
+    on_pick: Callable[[str], None],
+    buttons: list[tuple[str, Callable[[dict], None]]],
+) -> dict:
+    """
+    可输入筛选的列表选择窗口（程序、服务选择共用）。
+    search(查询) -> [(各列显示值, 选中后返回的值)]；buttons 为附加按钮 (文本, 回调(picker))。
+    返回 {"window", "refill", "pick"}，数据源在后台更新后调用 refill() 刷新列表。
+    """
+    win = tk.Toplevel(parent)
+    win.title(t(title))
+    win.transient(parent)
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(1, weight=1)
+
+    top = ttk.Frame(win)
+    top.grid(row=0, column=0, columnspan=2, sticky="ew", padx=_PADX, pady=_PADY)
+    ttk.Label(top, text=t("搜索：")).pack(side="left")
+    query_var = tk.StringVar()
+    entry = ttk.Entry(top, textvariable=query_var)
+    entry.pack(side="left", fill="x", expand=True)
+    status_var = tk.StringVar(value="")
+    ttk.Label(top, textvariable=status_var).pack(side="left", padx=(8, 0))
+
+    tree = ttk.Treeview(win, columns=[c[0] for c in columns], show="headings", selectmode="browse", height=16)
+    for i, (key, heading, width) in enumerate(columns):
+        tree.heading(key, text=t(heading))
+        tree.column(key, width=_scaled_width(width), stretch=(i == len(columns) - 1))
+    vsb = ttk.Scrollbar(win, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=vsb.set)
+    tree.grid(row=1, column=0, sticky="nsew", padx=(_PADX, 0))
+    vsb.grid(row=1, column=1, sticky="ns", padx=(0, _PADX))
+    shown: dict[str, str] = {}
+
+    def refill(*_) -> None:
         try:
-            t_type = theme_type_key_var.get()
-            code = off_preset_key_var_mod.get() or "none"
-            if code != "custom":
-                service_name = on_value_text.get("1.0", "end-1c").strip()
-                off_value_text.configure(state=tk.NORMAL)
-                off_value_text.delete("1.0", tk.END)
-                off_value_text.insert("1.0", _preview_text_for_mod(code, t_type, service_name))
-                off_value_text.configure(state=tk.DISABLED)
+            if not win.winfo_exists():
+                return
         except Exception:
-            pass
+            return
+        tree.delete(*tree.get_children())
+        shown.clear()
+        for i, (values, value) in enumerate(search(query_var.get())):
+            iid = str(i)
+            shown[iid] = value
+            tree.insert("", "end", iid=iid, values=values)
+        children = tree.get_children()
+        if children:
+            tree.selection_set(children[0])
+            tree.focus(children[0])
+        status_var.set(status())
+
+    def pick(value: str) -> None:
+        win.destroy()
+        on_pick(value)
+
+    def _choose(_event=None) -> str:
+        sel = tree.selection()
+        if sel and sel[0] in shown:
+            pick(shown[sel[0]])
+        return "break"
+
+    def _move(delta: int):
+        def _handler(_event=None) -> str:
+            children = tree.get_children()
+            if not children:
+                return "break"
+            sel = tree.selection()
+            idx = children.index(sel[0]) if sel else -1
+            idx = max(0, min(len(children) - 1, idx + delta))
+            tree.selection_set(children[idx])
+            tree.see(children[idx])
+            return "break"
+        return _handler
+
+    picker = {"window": win, "refill": refill, "pick": pick}
+    btns = ttk.Frame(win)
+    btns.grid(row=2, column=0, columnspan=2, sticky="ew", padx=_PADX, pady=_PADY)
+    ttk.Button(btns, text=t("选择"), command=_choose).pack(side="left", padx=(0, 4))
+    for text, cb in buttons:
+        ttk.Button(btns, text=t(text), command=lambda cb=cb: cb(picker)).pack(side="left", padx=4)
+    ttk.Button(btns, text=t("取消"), command=win.destroy).pack(side="right")
+
+    query_var.trace_add("write", refill)
+    entry.bind("<Return>", _choose)
+    entry.bind("<Down>", _move(1))
+    entry.bind("<Up>", _move(-1))
+    entry.bind("<Escape>", lambda _e: win.destroy())
+    tree.bind("<Double-Button-1>", _choose)
+    tree.bind("<Return>", _choose)
+
+    refill()
+    center_window(win, parent)
+    entry.focus_set()
+    win.grab_set()
+    return picker
+
+
+def open_app_picker(parent: tk.Toplevel, on_pick: Callable[[str], None]) -> None:
+    """
+    English: Searchable application picker backed by the background index (falls back to a file dialog)
+    中文: 可搜索的程序选择窗口：先显示已缓存的索引，后台增量扫描完成后自动刷新列表
+    """
+    index = _app_index()
 
-    def save_theme():
-        theme["type"] = theme_type_key_var.get()
-        theme["checked"] = theme_checked_var.get()
-        theme["nickname"] = theme_nickname_entry.get()
-        theme["name"] = theme_name_entry.get()
-        # 保存拆分字段
-        theme["on_value"] = on_value_text.get("1.0", "end-1c").strip()
-        # 根据预设决定是否保存 off_value
-        off_preset_code = off_preset_key_var_mod.get() or "none"
-        if off_preset_code == "custom":
-            theme["off_value"] = off_value_text.get("1.0", "end-1c").strip()
-        else:
-            theme["off_value"] = ""
-        theme["off_preset"] = off_preset_code
-        if theme["type"] == "服务(需管理员权限)":
-            theme["value"] = theme["on_value"]
-        if theme["type"] == "命令":
-            theme["window"] = "show" if cmd_window_var.get() else "hide"
-            lo, hi = _get_cmd_value_range_mod()
-            theme["value_min"] = lo
-            theme["value_max"] = hi
-        else:
-            theme.pop("value_min", None)
-            theme.pop("value_max", None)
-        if theme["type"] == "按键(Hotkey)":
-            # 读取临时值以便在保存前校验
-            _on_type = hk_on_type_key_var_mod.get() or "keyboard"
-            _on_value = hk_on_val_var_mod.get().strip()
-            _off_type = hk_off_type_key_var_mod.get() or "none"
-            _off_value = hk_off_val_var_mod.get().strip()
-            try:
-                _char_delay_ms = int(hk_char_delay_var_mod.get() or 0)
-                if _char_delay_ms < 0:
-                    _char_delay_ms = 0
-            except Exception:
-                _char_delay_ms = 0
+    def _search(query: str) -> list[tuple[tuple, str]]:
+        return [((e.name, e.target or e.path), e.path) for e in index.search(query)]
 
-            def _has_non_ascii(s: str) -> bool:
-                try:
-                    return any(ord(ch) > 127 for ch in s)
-                except Exception:
-                    return False
+    def _status() -> str:
+        if _APP_INDEX_STATE["refreshing"]:
+            return t("正在更新索引...")
+        return t("共 {n} 项").format(n=len(index.entries()))
 
-            warn_fields = []
-            if _on_type == "keyboard" and _on_value and _has_non_ascii(_on_value):
-                warn_fields.append("- 打开(on)")
-            if _off_type == "keyboard" and _off_value and _has_non_ascii(_off_value):
-                warn_fields.append("- 关闭(off)")
-            if warn_fields:
-                msg = (
-                    t("检测到以下热键包含中文或全角字符：\n") + "\n".join(warn_fields) +
-                    t("\n\n这些字符可能无法被正确解析，导致按键不生效或行为异常。\n是否仍然要保存？")
-                )
-                if not messagebox.askyesno(t("确认包含中文字符"), msg, parent=theme_window):
-                    theme_window.lift()
-                    return
+    def _browse(picker: dict) -> None:
+        path = filedialog.askopenfilename(parent=picker["window"])
+        if path:
+            picker["pick"](path)
+
+    def _add_root(picker: dict) -> None:
+        folder = filedialog.askdirectory(parent=picker["window"])
+        if not folder:
+            return
+        folder = os.path.normpath(folder)
+        roots = _app_index_user_roots()
+        if folder not in roots and folder not in index.roots:
+            roots.append(folder)
+            _update_gui_cache("app_index_roots", roots)
+            index.roots = index.roots + [folder]
+        _refresh_app_index(picker["refill"])
+        picker["refill"]()
+
+    def _rebuild(picker: dict) -> None:
+        _refresh_app_index(picker["refill"], full=True)
+        picker["refill"]()
+
+    picker = _open_search_picker(
+        parent, "选择程序", [("name", "名称", 180), ("path", "路径", 460)], _search, _status, on_pick,
+        [("浏览文件...", _browse), ("添加文件夹...", _add_root), ("重建索引", _rebuild)],
+    )
+    _refresh_app_index(picker["refill"])
+
+
+# 服务目录：枚举结果保存在 RC-GUI.cache.json 的 "services" 分区，过期（TTL）后在后台刷新
+_SERVICE_CATALOG: rc_services.ServiceCatalog | None = None
+_SERVICE_CATALOG_STATE: dict[str, Any] = {"refreshing": False, "waiters": [], "error": ""}
+
+
+def _service_catalog() -> rc_services.ServiceCatalog:
+    global _SERVICE_CATALOG
+    if _SERVICE_CATALOG is None:
+        _SERVICE_CATALOG = rc_services.ServiceCatalog()
+        cached = _load_gui_cache().get("services")
+        if isinstance(cached, dict):
+            _SERVICE_CATALOG.from_dict(cached)
+    return _SERVICE_CATALOG
+
+
+def _refresh_service_catalog(on_done: Callable[[], None] | None = None, force: bool = False) -> None:
+    """目录过期（或 force）时在后台重新枚举；已在刷新时只登记回调。"""
+    catalog = _service_catalog()
+    if on_done is not None:
+        _SERVICE_CATALOG_STATE["waiters"].append(on_done)
+    if _SERVICE_CATALOG_STATE["refreshing"]:
+        return
+    if not force and not catalog.is_stale():
+        waiters, _SERVICE_CATALOG_STATE["waiters"] = _SERVICE_CATALOG_STATE["waiters"], []
+        for cb in waiters:
+            cb()
+        return
+    _SERVICE_CATALOG_STATE["refreshing"] = True
+
+    def _done(_changed, err) -> None:
+        _SERVICE_CATALOG_STATE["refreshing"] = False
+        _SERVICE_CATALOG_STATE["error"] = str(err) if err is not None else ""
+        if err is None:
+            # 时间戳每次都会更新，无论目录是否变化都写回
+            _update_gui_cache("services", catalog.to_dict())
+        waiters, _SERVICE_CATALOG_STATE["waiters"] = _SERVICE_CATALOG_STATE["waiters"], []
+        for cb in waiters:
+            try:
+                cb()
+            except Exception:
+                pass
 
-            theme["on_type"] = _on_type
-            theme["on_value"] = _on_value
-            theme["off_type"] = _off_type
-            theme["off_value"] = _off_value
-            theme["char_delay_ms"] = _char_delay_ms
-            theme["value"] = ""
-        # 重新构建整个树视图以确保索引正确
-        rebuild_custom_theme_tree()
-        theme_window.destroy()
+    _run_in_background(root, catalog.refresh, _done)
 
-    def delete_theme():
-        if messagebox.askyesno(
-            t("确认删除"), t("确定要删除这个自定义主题吗？"), parent=theme_window
-        ):
-            custom_themes.pop(index)
-            # 重新构建整个树视图
-            rebuild_custom_theme_tree()
-            theme_window.destroy()
-        else:
-            theme_window.lift()
 
-    ttk.Button(theme_window, text=t("保存"), command=save_theme).grid(
-        row=8, column=0, pady=_PADY + 6, padx=_PADX
+def _open_services_msc() -> None:
+    try:
+        os.startfile("services.msc")
+    except Exception:
+        try:
+            subprocess.Popen(["services.msc"])  # 备用方式
+        except Exception as e:
+            messagebox.showerror(t("错误"), t("无法打开服务管理器: {err}").format(err=e))
+
+
+def open_service_picker(parent: tk.Toplevel, on_pick: Callable[[str], None]) -> None:
+    """
+    English: Type-ahead service picker fed by the cached service catalog
+    中文: 服务选择窗口：输入即筛选服务名/显示名，目录过期时在后台刷新
+    """
+    catalog = _service_catalog()
+
+    def _search(query: str) -> list[tuple[tuple, str]]:
+        return [((s.name, s.display_name), s.name) for s in catalog.search(query)]
+
+    def _status() -> str:
+        if _SERVICE_CATALOG_STATE["refreshing"]:
+            return t("正在读取服务列表...")
+        if _SERVICE_CATALOG_STATE["error"] and not catalog.loaded:
+            return t("无法读取服务列表")
+        added, removed = catalog.last_diff
+        text = t("共 {n} 项").format(n=len(catalog))
+        if added or removed:
+            text += " (+{a} / -{r})".format(a=len(added), r=len(removed))
+        return text
+
+    def _reload(picker: dict) -> None:
+        _refresh_service_catalog(picker["refill"], force=True)
+        picker["refill"]()
+
+    picker = _open_search_picker(
+        parent, "选择服务", [("name", "服务名", 180), ("display", "显示名称", 380)], _search, _status, on_pick,
+        [("刷新", _reload), ("打开服务管理器", lambda _p: _open_services_msc())],
     )
-    ttk.Button(theme_window, text=t("删除"), command=delete_theme).grid(row=8, column=1, pady=_PADY + 6, padx=_PADX)
-    ttk.Button(theme_window, text=t("取消"), command=lambda:theme_window.destroy()).grid(row=8, column=2, pady=_PADY + 6, padx=_PADX)
+    _refresh_service_catalog(picker["refill"])
 
-    center_window(theme_window)
 
-    def _apply_lang_to_modify_theme_win() -> None:
-        if not theme_window.winfo_exists():
-            return
-        try:
-            theme_window.title(t("修改自定义主题"))
-        except Exception:
-            pass
-        _refresh_type_and_preset_i18n_mod()
-        try:
-            apply_language_to_widgets(theme_window)
-        except Exception:
-            pass
+# 自定义主题编辑窗口：全程只构建一次，关闭时 withdraw() 隐藏，打开时重新绑定到目标主题
+_THEME_EDITOR: dict | None = None
 
-    register_lang_observer(_apply_lang_to_modify_theme_win)
-    _apply_lang_to_modify_theme_win()
+_THEME_TYPE_KEYS = ["程序或脚本", "服务(需管理员权限)", "命令", "按键(Hotkey)"]
 
 
-# 添加自定义主题的函数中，也要更新显示
-def add_custom_theme(config: Dict[str, Any]) -> None:
+def _get_theme_editor() -> dict:
     """
-    English: Opens a new window to add a new custom theme and updates display
-    中文: 打开新窗口添加新的自定义主题，并更新显示
+    English: Returns the shared custom theme editor, building it on first use
+    中文: 返回共享的自定义主题编辑窗口（首次调用时构建）
     """
+    global _THEME_EDITOR
+    try:
+        if _THEME_EDITOR is not None and _THEME_EDITOR["window"].winfo_exists():
+            return _THEME_EDITOR
+    except Exception:
+        pass
+
+    # 当前绑定的主题记录：theme 为 None 表示“添加”模式；clean 为绑定时的表单内容，用于判断是否有未保存的修改
+    state: dict[str, Any] = {"theme": None, "clean": None}
+
     theme_window = tk.Toplevel(root)
-    theme_window.title(t("添加自定义主题"))
+    theme_window.withdraw()
+    theme_window.title(t("修改自定义主题"))
+    # 编辑窗口首次构建时在后台增量更新应用索引与（过期的）服务目录，打开选择窗口时通常已是最新
+    _refresh_app_index()
+    _refresh_service_catalog()
     # 设置自适应
     theme_window.geometry("")
     theme_window.resizable(True, True)
-    
+
     # 根据系统缩放计算内边距
-    
-    try:
-    
-        s = float(theme_window.tk.call('tk', 'scaling'))
-    
-        if s <= 0: s = 1.0
-    
-    except Exception: s = 1.0
-    
-    _PADX = max(4, int(10 * s))
-    
-    _PADY = max(3, int(6 * s))
+    _PADX, _PADY = _pad(10, 6, 4, 3)
     # 允许窗口大小调整，并设置网格权重使输入控件随窗口拉伸
-    theme_window.resizable(True, True)
     try:
         theme_window.columnconfigure(0, weight=0)
         theme_window.columnconfigure(1, weight=1)
@@ -2546,19 +2945,19 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
         pass
 
     ttk.Label(theme_window, text=t("类型：")).grid(row=0, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    _type_keys_add = ["程序或脚本", "服务(需管理员权限)", "命令", "按键(Hotkey)"]
-    theme_type_key_var = tk.StringVar(value="程序或脚本")
-    theme_type_var = tk.StringVar(value=t("程序或脚本"))
+    _type_keys = _THEME_TYPE_KEYS
+    theme_type_key_var = tk.StringVar(value="程序或脚本")  # 内部值（保持中文 key）
+    theme_type_var = tk.StringVar(value=t("程序或脚本"))  # 显示值（随语言变化）
 
-    def _type_labels_add() -> list[str]:
-        return [t(k) for k in _type_keys_add]
+    def _type_labels() -> list[str]:
+        return [t(k) for k in _type_keys]
 
-    def _type_key_by_label_add(label: str) -> str:
-        m = {t(k): k for k in _type_keys_add}
+    def _type_key_by_label(label: str) -> str:
+        m = {t(k): k for k in _type_keys}
         return m.get(label, "程序或脚本")
 
-    def _type_label_by_key_add(key: str) -> str:
-        if key not in _type_keys_add:
+    def _type_label_by_key(key: str) -> str:
+        if key not in _type_keys:
             key = "程序或脚本"
             theme_type_key_var.set(key)
         return t(key)
@@ -2566,21 +2965,16 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
     theme_type_combobox = ttk.Combobox(
         theme_window,
         textvariable=theme_type_var,
-        values=_type_labels_add(),
+        values=_type_labels(),
         state="readonly",
     )
     theme_type_combobox.grid(row=0, column=1, sticky="we", padx=(0, _PADX), pady=_PADY)
-    try:
-        theme_type_combobox.current(0)
-    except Exception:
-        pass
-
 
     ttk.Label(theme_window, text=t("服务时主程序")).grid(row=0, column=2, sticky="w", padx=_PADX, pady=_PADY)
     ttk.Label(theme_window, text=t("需管理员权限")).grid(row=1, column=2, sticky="w", padx=_PADX, pady=_PADY)
 
     ttk.Label(theme_window, text=t("状态：")).grid(row=1, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    theme_checked_var = tk.IntVar()
+    theme_checked_var = tk.IntVar(value=0)
     ttk.Checkbutton(theme_window, variable=theme_checked_var).grid(
         row=1, column=1, sticky="w", padx=(0, _PADX), pady=_PADY
     )
@@ -2593,44 +2987,95 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
     theme_name_entry = ttk.Entry(theme_window)
     theme_name_entry.grid(row=3, column=1, sticky="we", padx=(0, _PADX), pady=_PADY)
 
-    # 新：程序/命令类型拆分 ON/OFF 与关闭预设；Hotkey 保持原样
-    on_label_add = ttk.Label(theme_window, text=t("打开(on)："))
-    on_label_add.grid(row=4, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    on_frame_add = ttk.Frame(theme_window)
-    on_frame_add.grid(row=4, column=1, sticky="nsew", padx=(0, _PADX), pady=_PADY)
+    # 程序/命令类型拆分 ON/OFF 与关闭预设；Hotkey 使用独立面板
+    on_label = ttk.Label(theme_window, text=t("打开(on)："))
+    on_label.grid(row=4, column=0, sticky="e", padx=_PADX, pady=_PADY)
+    on_frame = ttk.Frame(theme_window)
+    on_frame.grid(row=4, column=1, sticky="nsew", padx=(0, _PADX), pady=_PADY)
     try:
         theme_window.rowconfigure(4, weight=2)
     except Exception:
         pass
-    on_value_text_add = tk.Text(on_frame_add, height=3, wrap="word")
-    on_value_text_add.grid(row=0, column=0, sticky="nsew")
-    on_scroll_y_add = ttk.Scrollbar(on_frame_add, orient="vertical", command=on_value_text_add.yview)
-    on_scroll_y_add.grid(row=0, column=1, sticky="ns")
-    on_value_text_add.configure(yscrollcommand=on_scroll_y_add.set)
+    on_value_text = tk.Text(on_frame, height=3, wrap="word")
+    on_value_text.grid(row=0, column=0, sticky="nsew")
+    on_scroll_y = ttk.Scrollbar(on_frame, orient="vertical", command=on_value_text.yview)
+    on_scroll_y.grid(row=0, column=1, sticky="ns")
+    on_value_text.configure(yscrollcommand=on_scroll_y.set)
     try:
-        on_frame_add.columnconfigure(0, weight=1)
-        on_frame_add.rowconfigure(0, weight=1)
+        on_frame.columnconfigure(0, weight=1)
+        on_frame.rowconfigure(0, weight=1)
     except Exception:
         pass
 
-    off_label_add = ttk.Label(theme_window, text=t("关闭(off)："))
-    off_label_add.grid(row=5, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    off_frame_add = ttk.Frame(theme_window)
-    off_frame_add.grid(row=5, column=1, sticky="nsew", padx=(0, _PADX), pady=_PADY)
-    off_value_text_add = tk.Text(off_frame_add, height=3, wrap="word")
-    off_value_text_add.grid(row=0, column=0, sticky="nsew")
-    off_scroll_y_add = ttk.Scrollbar(off_frame_add, orient="vertical", command=off_value_text_add.yview)
-    off_scroll_y_add.grid(row=0, column=1, sticky="ns")
-    off_value_text_add.configure(yscrollcommand=off_scroll_y_add.set)
+    off_label = ttk.Label(theme_window, text=t("关闭(off)："))
+    off_label.grid(row=5, column=0, sticky="e", padx=_PADX, pady=_PADY)
+    off_frame = ttk.Frame(theme_window)
+    off_frame.grid(row=5, column=1, sticky="nsew", padx=(0, _PADX), pady=_PADY)
+    off_value_text = tk.Text(off_frame, height=3, wrap="word")
+    off_value_text.grid(row=0, column=0, sticky="nsew")
+    off_scroll_y = ttk.Scrollbar(off_frame, orient="vertical", command=off_value_text.yview)
+    off_scroll_y.grid(row=0, column=1, sticky="ns")
+    off_value_text.configure(yscrollcommand=off_scroll_y.set)
     try:
-        off_frame_add.columnconfigure(0, weight=1)
-        off_frame_add.rowconfigure(0, weight=1)
+        off_frame.columnconfigure(0, weight=1)
+        off_frame.rowconfigure(0, weight=1)
     except Exception:
         pass
 
-    off_preset_label_add = ttk.Label(theme_window, text=t("关闭预设："))
-    off_preset_label_add.grid(row=6, column=0, sticky="e", padx=_PADX, pady=_PADY)
-    _preset_label_zh_by_code_add = {
+    # 命令/路径实时检查：与测试、保存共用 rc_command.prepare_command（结果有缓存），有问题时才显示
+    on_lint_var = tk.StringVar(value="")
+    off_lint_var = tk.StringVar(value="")
+    on_lint_label = ttk.Label(on_frame, textvariable=on_lint_var, foreground="#d35400", justify="left", wraplength=420)
+    off_lint_label = ttk.Label(off_frame, textvariable=off_lint_var, foreground="#d35400", justify="left", wraplength=420)
+    lint_state: dict[str, Any] = {"after": None}
+
+    def _lint_kind() -> str | None:
+        type_key = theme_type_key_var.get()
+        if type_key == "命令":
+            return "command"
+        if type_key == "程序或脚本":
+            return "program"
+        return None
+
+    def _lint_field(text: str) -> tuple:
+        kind = _lint_kind()
+        if not kind or not text:
+            return ()
+        try:
+            return rc_command.prepare_command(text, None, kind).issues
+        except Exception:
+            return ()
+
+    def _refresh_lint() -> None:
+        lint_state["after"] = None
+        off_custom = (off_preset_key_var.get() or "none") == "custom"
+        for text_widget, var, label, active in (
+            (on_value_text, on_lint_var, on_lint_label, True),
+            (off_value_text, off_lint_var, off_lint_label, off_custom),
+        ):
+            issues = _lint_field(text_widget.get("1.0", "end-1c").strip()) if active else ()
+            var.set("\n".join(_command_issue_text(i) for i in issues))
+            if issues:
+                label.grid(row=1, column=0, columnspan=2, sticky="w")
+            else:
+                label.grid_remove()
+
+    def _schedule_lint(*_) -> None:
+        # 输入停顿后再检查，连续键入时只执行一次
+        if lint_state["after"] is not None:
+            try:
+                theme_window.after_cancel(lint_state["after"])
+            except Exception:
+                pass
+        lint_state["after"] = theme_window.after(300, _refresh_lint)
+
+    on_value_text.bind("<KeyRelease>", _schedule_lint, add="+")
+    off_value_text.bind("<KeyRelease>", _schedule_lint, add="+")
+
+    off_preset_label = ttk.Label(theme_window, text=t("关闭预设："))
+    off_preset_label.grid(row=6, column=0, sticky="e", padx=_PADX, pady=_PADY)
+    # 关闭预设：内部 code + 显示 label 分离
+    _preset_label_zh_by_code = {
         "none": "忽略",
         "kill": "强制结束",
         "interrupt": "中断",
@@ -2638,7 +3083,7 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
         "custom": "自定义",
     }
 
-    def _default_preset_code_for_type_add(t_type: str) -> str:
+    def _default_preset_code_for_type(t_type: str) -> str:
         if t_type == "命令":
             return "interrupt"
         if t_type == "程序或脚本":
@@ -2647,7 +3092,7 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
             return "stop"
         return "none"
 
-    def _preset_codes_for_type_add(t_type: str) -> tuple[str, ...]:
+    def _preset_codes_for_type(t_type: str) -> tuple[str, ...]:
         if t_type == "命令":
             return ("none", "interrupt", "kill", "custom")
         if t_type == "程序或脚本":
@@ -2656,28 +3101,31 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
             return ("none", "stop", "custom")
         return ("none",)
 
-    def _preset_labels_for_type_add(t_type: str) -> list[str]:
-        return [t(_preset_label_zh_by_code_add[c]) for c in _preset_codes_for_type_add(t_type)]
+    def _preset_labels_for_type(t_type: str) -> list[str]:
+        return [t(_preset_label_zh_by_code[c]) for c in _preset_codes_for_type(t_type)]
 
-    def _preset_code_by_label_add(label: str) -> str:
-        m = {t(v): k for k, v in _preset_label_zh_by_code_add.items()}
+    def _preset_code_by_label(label: str) -> str:
+        m = {t(v): k for k, v in _preset_label_zh_by_code.items()}
         return m.get(label, "none")
 
-    def _preset_label_by_code_add(code: str) -> str:
-        return t(_preset_label_zh_by_code_add.get(code, "忽略"))
+    def _preset_label_by_code(code: str) -> str:
+        return t(_preset_label_zh_by_code.get(code, "忽略"))
+
+    off_preset_key_var = tk.StringVar(value=_default_preset_code_for_type("程序或脚本"))
+    off_preset_var = tk.StringVar(value=_preset_label_by_code(off_preset_key_var.get()))
 
-    off_preset_key_var_add = tk.StringVar(value=_default_preset_code_for_type_add("程序或脚本"))
-    off_preset_var_add = tk.StringVar(value=_preset_label_by_code_add(off_preset_key_var_add.get()))
-    off_preset_combo_add = ttk.Combobox(
+    off_preset_combo = ttk.Combobox(
         theme_window,
-        textvariable=off_preset_var_add,
+        textvariable=off_preset_var,
         state="readonly",
-        values=_preset_labels_for_type_add("程序或脚本"),
+        values=_preset_labels_for_type("程序或脚本"),
     )
-    off_preset_combo_add.grid(row=6, column=1, sticky="w", padx=(0, _PADX), pady=_PADY)
+    off_preset_combo.grid(row=6, column=1, sticky="w", padx=(0, _PADX), pady=_PADY)
+
+    # 记录自定义内容以便在预设与自定义切换时还原
+    previous_custom_off_value = ""
 
-    previous_custom_off_value_add = ""
-    def _preview_text_for_add(code: str, t_type: str, service_name: str = "") -> str:
+    def _preview_text(code: str, t_type: str, service_name: str = "") -> str:
         if LANG != "zh-CN":
             if t_type == "命令":
                 if code == "interrupt":
@@ -2714,80 +3162,77 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
             return t("预设：忽略 — 不执行任何关闭动作。")
         return t("预设：忽略 — 不执行任何关闭动作。")
 
-    def _update_off_editability_add(*_):
-        nonlocal previous_custom_off_value_add
-        code = off_preset_key_var_add.get() or "none"
+    def _update_off_editability(*_):
+        nonlocal previous_custom_off_value
+        code = off_preset_key_var.get() or "none"
         t_type = theme_type_key_var.get()
         try:
             if code == "custom":
-                off_value_text_add.configure(state=tk.NORMAL)
+                # 从预览切回自定义，恢复用户之前的输入
+                off_value_text.configure(state=tk.NORMAL)
                 try:
-                    off_value_text_add.delete("1.0", tk.END)
-                    off_value_text_add.insert("1.0", previous_custom_off_value_add)
+                    off_value_text.delete("1.0", tk.END)
+                    off_value_text.insert("1.0", previous_custom_off_value)
                 except Exception:
                     pass
             else:
-                # 保存自定义缓存
+                # 切换到预设，先缓存自定义内容
                 try:
-                    if str(off_value_text_add.cget("state")) == str(tk.NORMAL):
-                        _cur = off_value_text_add.get("1.0", "end-1c")
+                    if str(off_value_text.cget("state")) == str(tk.NORMAL):
+                        _cur = off_value_text.get("1.0", "end-1c")
                         if _cur.strip():
-                            previous_custom_off_value_add = _cur
+                            previous_custom_off_value = _cur
                 except Exception:
                     pass
-                # 写入预览并禁用
+                # 写入预览说明并禁用
                 try:
-                    off_value_text_add.configure(state=tk.NORMAL)
-                    off_value_text_add.delete("1.0", tk.END)
-                    service_name = on_value_text_add.get("1.0", "end-1c").strip()
-                    off_value_text_add.insert("1.0", _preview_text_for_add(code, t_type, service_name))
+                    off_value_text.configure(state=tk.NORMAL)
+                    off_value_text.delete("1.0", tk.END)
+                    service_name = on_value_text.get("1.0", "end-1c").strip()
+                    off_value_text.insert("1.0", _preview_text(code, t_type, service_name))
                 except Exception:
                     pass
-                off_value_text_add.configure(state=tk.DISABLED)
+                off_value_text.configure(state=tk.DISABLED)
         except Exception:
             pass
         try:
-            if t_type == "程序或脚本" and code == "custom":
-                off_action_btn_add.state(["!disabled"])
-            elif t_type == "命令" and code == "custom":
-                off_action_btn_add.state(["!disabled"])
+            if t_type in ("程序或脚本", "命令") and code == "custom":
+                off_action_btn.state(["!disabled"])
             else:
-                off_action_btn_add.state(["disabled"])
+                off_action_btn.state(["disabled"])
         except Exception:
             pass
+        _schedule_lint()
 
-    def _on_off_preset_selected_add(_event=None):
-        off_preset_key_var_add.set(_preset_code_by_label_add(off_preset_var_add.get()))
-        _update_off_editability_add()
+    def _on_off_preset_selected(_event=None):
+        off_preset_key_var.set(_preset_code_by_label(off_preset_var.get()))
+        _update_off_editability()
 
-    off_preset_combo_add.bind("<<ComboboxSelected>>", _on_off_preset_selected_add)
+    off_preset_combo.bind("<<ComboboxSelected>>", _on_off_preset_selected)
+
+    def _set_on_path(file_path: str) -> None:
+        # 根据类型写入到 on_value 文本框
+        try:
+            on_value_text.delete("1.0", tk.END)
+            on_value_text.insert("1.0", file_path)
+        except Exception:
+            pass
+        _schedule_lint()
 
     def select_file():
-        file_path = filedialog.askopenfilename()
-        if file_path:
-            try:
-                on_value_text_add.delete("1.0", tk.END)
-                on_value_text_add.insert("1.0", file_path)
-            except Exception:
-                pass
+        open_app_picker(theme_window, _set_on_path)
 
     def open_services():
-        try:
-            os.startfile("services.msc")
-        except Exception:
-            try:
-                subprocess.Popen(["services.msc"])  # 备用方式
-            except Exception as e:
-                messagebox.showerror(t("错误"), t("无法打开服务管理器: {err}").format(err=e))
+        open_service_picker(theme_window, _set_on_path)
 
     # 命令类型：{value} 参数范围（默认 0-100，可配置）
-    cmd_value_min_var_add = tk.StringVar(value="0")
-    cmd_value_max_var_add = tk.StringVar(value="100")
+    cmd_value_min_var = tk.StringVar(value="0")
+    cmd_value_max_var = tk.StringVar(value="100")
 
-    def _get_cmd_value_range_add() -> tuple[int, int]:
+    def _get_cmd_value_range() -> tuple[int, int]:
         try:
-            lo = int((cmd_value_min_var_add.get() or "0").strip())
-            hi = int((cmd_value_max_var_add.get() or "100").strip())
+            lo = int((cmd_value_min_var.get() or "0").strip())
+            hi = int((cmd_value_max_var.get() or "100").strip())
         except Exception:
             messagebox.showwarning(t("提示"), t("请输入整数"))
             return 0, 100
@@ -2795,8 +3240,8 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
             lo, hi = hi, lo
         return lo, hi
 
-    def _ask_value_for_placeholder_add(parent_win: tk.Misc) -> str | None:
-        lo, hi = _get_cmd_value_range_add()
+    def _ask_value_for_placeholder(parent_win: tk.Misc) -> str | None:
+        lo, hi = _get_cmd_value_range()
         ex = 50
         if ex < lo or ex > hi:
             ex = lo
@@ -2819,322 +3264,464 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
             return None
         return str(v)
 
-    def test_command_in_powershell():
-        cmd = on_value_text_add.get("1.0", "end-1c").strip()
-        if not cmd:
-            messagebox.showwarning(t("提示"), t("请先在“值”中输入要测试的命令"))
-            return
+    def _run_test_command(cmd: str) -> None:
         if "{value}" in cmd:
-            val = _ask_value_for_placeholder_add(theme_window)
+            val = _ask_value_for_placeholder(theme_window)
             if val is None:
                 return
-            cmd = cmd.replace("{value}", val)
-        cmd = _normalize_command_for_powershell(cmd)
-        if LANG != "zh-CN":
-            ps_script = (
-                "Write-Host 'Ready to test command:' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host 'Press Enter to run';"
-                "\nWrite-Host 'Running...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('Error: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
+            prep = rc_command.prepare_command(cmd, int(val))
         else:
-            ps_script = (
-                "Write-Host '已准备好要测试的命令：' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host '按回车后执行';"
-                "\nWrite-Host '正在执行...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('发生错误: ' + $_.Exception.Message) -ForegroundColor Red }"
+            prep = rc_command.prepare_command(cmd)
+        if prep.errors:
+            messagebox.showwarning(
+                t("提示"), "\n".join(_command_issue_text(i) for i in prep.errors), parent=theme_window
             )
+            return
+        # 在编辑窗口内嵌的测试面板中运行，实时显示输出、耗时、退出码与峰值内存
+        runner["frame"].grid(row=7, column=0, columnspan=4, sticky="nsew", padx=_PADX, pady=_PADY)
+        runner["run"](prep.normalized, [_command_issue_text(i) for i in prep.issues])
+
+    def test_command_in_powershell():
+        cmd = on_value_text.get("1.0", "end-1c").strip()
+        if not cmd:
+            messagebox.showwarning(t("提示"), t("请先在“值”中输入要测试的命令"))
+            return
+        _run_test_command(cmd)
+
+    select_file_btn = ttk.Button(theme_window, text=t("选择文件"), command=select_file)
+    select_file_btn.grid(row=4, column=2, sticky="w", padx=_PADX, pady=_PADY)
+
+    def _set_off_path(file_path: str) -> None:
+        nonlocal previous_custom_off_value
         try:
-            subprocess.Popen(
-                ["powershell.exe", "-NoExit", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script],
-                creationflags=subprocess.CREATE_NEW_CONSOLE,
-            )
-        except Exception as e:
-            messagebox.showerror(t("错误"), t("无法启动 PowerShell: {err}").format(err=e))
-
-    select_file_btn_add = ttk.Button(theme_window, text=t("选择文件"), command=select_file)
-    select_file_btn_add.grid(row=4, column=2, sticky="w", padx=_PADX, pady=_PADY)
-    def select_off_file_add():
-        nonlocal previous_custom_off_value_add
-        file_path = filedialog.askopenfilename()
-        if file_path:
-            try:
-                if (off_preset_key_var_add.get() or "none") != "custom":
-                    off_preset_key_var_add.set("custom")
-                    off_preset_var_add.set(_preset_label_by_code_add("custom"))
-                previous_custom_off_value_add = file_path
-                off_value_text_add.configure(state=tk.NORMAL)
-                off_value_text_add.delete("1.0", tk.END)
-                off_value_text_add.insert("1.0", file_path)
-            except Exception:
-                pass
-            _update_off_editability_add()
+            if (off_preset_key_var.get() or "none") != "custom":
+                off_preset_key_var.set("custom")
+                off_preset_var.set(_preset_label_by_code("custom"))
+            previous_custom_off_value = file_path
+            off_value_text.configure(state=tk.NORMAL)
+            off_value_text.delete("1.0", tk.END)
+            off_value_text.insert("1.0", file_path)
+        except Exception:
+            pass
+        _update_off_editability()
+
+    def select_off_file():
+        open_app_picker(theme_window, _set_off_path)
 
-    def test_off_command_in_powershell_add():
-        if (off_preset_key_var_add.get() or "none") != "custom":
+    def test_off_command_in_powershell():
+        if (off_preset_key_var.get() or "none") != "custom":
             messagebox.showwarning(t("提示"), t("请先将关闭预设切换为“自定义”并填写命令"))
             return
         try:
-            off_value_text_add.configure(state=tk.NORMAL)
+            off_value_text.configure(state=tk.NORMAL)
         except Exception:
             pass
-        cmd = off_value_text_add.get("1.0", "end-1c").strip()
+        cmd = off_value_text.get("1.0", "end-1c").strip()
         if not cmd:
             messagebox.showwarning(t("提示"), t("请先在“关闭(off)”中输入要测试的命令"))
             return
-        if "{value}" in cmd:
-            val = _ask_value_for_placeholder_add(theme_window)
-            if val is None:
-                return
-            cmd = cmd.replace("{value}", val)
-        cmd = _normalize_command_for_powershell(cmd)
-        if LANG != "zh-CN":
-            ps_script = (
-                "Write-Host 'Ready to test command:' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host 'Press Enter to run';"
-                "\nWrite-Host 'Running...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('Error: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
-        else:
-            ps_script = (
-                "Write-Host '已准备好要测试的命令：' -ForegroundColor Cyan;"
-                "\n$cmd = @'\n" + cmd.replace("'@", "'@@") + "\n'@;"
-                "\nWrite-Host $cmd -ForegroundColor Yellow;"
-                "\nRead-Host '按回车后执行';"
-                "\nWrite-Host '正在执行...' -ForegroundColor Green;"
-                "\ntry { iex $cmd } catch { Write-Host ('发生错误: ' + $_.Exception.Message) -ForegroundColor Red }"
-            )
+        _run_test_command(cmd)
+
+    off_action_btn = ttk.Button(theme_window, text=t("选择文件"), command=select_off_file)
+    off_action_btn.grid(row=5, column=2, sticky="w", padx=_PADX, pady=_PADY)
+
+    # 垂直方向自适应：占位扩展区，推开底部按钮
+    try:
+        theme_window.rowconfigure(7, weight=1)
+        _spacer = ttk.Frame(theme_window)
+        _spacer.grid(row=7, column=0, columnspan=4, sticky="nsew")
+    except Exception:
+        pass
+
+    # 命令测试面板：与占位区共用第 7 行，首次测试时显示
+    runner = _make_command_runner(theme_window)
+
+    bench_state: dict[str, Any] = {"running": False}
+
+    def _bench_snapshot() -> Dict[str, Any]:
+        """按保存时的规则取当前表单内容（不修改主题本身）。"""
+        snap: Dict[str, Any] = {
+            "type": theme_type_key_var.get(),
+            "name": theme_name_entry.get(),
+            "on_value": on_value_text.get("1.0", "end-1c").strip(),
+            "off_value": "",
+        }
+        if (off_preset_key_var.get() or "none") == "custom":
+            snap["off_value"] = off_value_text.get("1.0", "end-1c").strip()
+        if snap["type"] == "命令":
+            snap["window"] = "show" if cmd_window_var.get() else "hide"
+            snap["value_min"], snap["value_max"] = _get_cmd_value_range()
+        return snap
+
+    def _start_benchmark(snap: Dict[str, Any], action: str, iterations: int, sweep: bool) -> None:
         try:
-            subprocess.Popen(
-                ["powershell.exe", "-NoExit", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script],
-                creationflags=subprocess.CREATE_NEW_CONSOLE,
+            rc_bench.build_plan(snap, action)
+        except rc_bench.BenchmarkError as e:
+            messagebox.showwarning(t("提示"), t(str(e)), parent=theme_window)
+            return
+        runner["frame"].grid(row=7, column=0, columnspan=4, sticky="nsew", padx=_PADX, pady=_PADY)
+        runner["report"]([], t("基准测试") + "...")
+        bench_state["running"] = True
+        bench_btn.state(["disabled"])
+        progress = {"done": 0, "total": 0}
+
+        def _progress(done: int, total: int) -> None:
+            # 后台线程只写字典，界面由 _tick 在主线程刷新
+            progress["done"], progress["total"] = done, total
+
+        def _tick() -> None:
+            if not bench_state["running"]:
+                return
+            if progress["total"]:
+                runner["status"](f"{t('基准测试')}... {progress['done']}/{progress['total']}")
+            theme_window.after(100, _tick)
+
+        def _work():
+            result = rc_bench.run_benchmark(snap, action, iterations, sweep, progress=_progress)
+            path = os.path.join(appdata_dir, rc_bench.BENCH_FILE_NAME)
+            previous = None
+            try:
+                previous = rc_bench.save_result(path, rc_bench.bench_key(snap, action), result)
+            except Exception:
+                pass
+            return result, previous
+
+        def _on_done(res, err) -> None:
+            bench_state["running"] = False
+            try:
+                bench_btn.state(["!disabled"])
+            except Exception:
+                pass
+            if err is not None:
+                runner["report"]([str(err)], t("基准测试失败"))
+                return
+            result, previous = res
+            runner["report"](rc_bench.format_report(result, previous, t), t("结果已保存到 {path}").format(path=rc_bench.BENCH_FILE_NAME))
+
+        _tick()
+        _run_in_background(theme_window, _work, _on_done)
+
+    def open_benchmark_dialog() -> None:
+        if bench_state["running"]:
+            return
+        snap = _bench_snapshot()
+        dlg = tk.Toplevel(theme_window)
+        dlg.title(t("基准测试"))
+        dlg.transient(theme_window)
+        dlg.resizable(False, False)
+        action_var = tk.StringVar(value="on")
+        iter_var = tk.StringVar(value="10")
+        sweep_var = tk.IntVar(value=1)
+        ttk.Label(dlg, text=t("动作：")).grid(row=0, column=0, sticky="e", padx=_PADX, pady=_PADY)
+        ttk.Radiobutton(dlg, text=t("打开(on)："), value="on", variable=action_var).grid(row=0, column=1, sticky="w")
+        ttk.Radiobutton(dlg, text=t("关闭(off)："), value="off", variable=action_var).grid(row=0, column=2, sticky="w", padx=(0, _PADX))
+        ttk.Label(dlg, text=t("执行次数：")).grid(row=1, column=0, sticky="e", padx=_PADX, pady=_PADY)
+        ttk.Spinbox(dlg, from_=1, to=200, textvariable=iter_var, width=6).grid(row=1, column=1, sticky="w")
+        if snap["type"] == "命令" and "{value}" in (snap["on_value"] + snap["off_value"]):
+            ttk.Checkbutton(dlg, text=t("在 value 参数范围内取值"), variable=sweep_var).grid(
+                row=2, column=0, columnspan=3, sticky="w", padx=_PADX, pady=_PADY
             )
-        except Exception as e:
-            messagebox.showerror(t("错误"), t("无法启动 PowerShell: {err}").format(err=e))
 
-    off_action_btn_add = ttk.Button(theme_window, text=t("选择文件"), command=select_off_file_add)
-    off_action_btn_add.grid(row=5, column=2, sticky="w", padx=_PADX, pady=_PADY)
-    _update_off_editability_add()
+        def _ok() -> None:
+            try:
+                n = max(1, min(200, int(iter_var.get().strip())))
+            except Exception:
+                messagebox.showwarning(t("提示"), t("请输入整数"), parent=dlg)
+                return
+            action = action_var.get()
+            try:
+                shell_open = rc_bench.build_plan(snap, action)["shell_open"]
+            except rc_bench.BenchmarkError:
+                shell_open = False  # 由 _start_benchmark 提示原因
+            # ShellExecute 目标（文档、exe 等）每次都会真正打开程序且不会自动关闭，先确认
+            if shell_open and not messagebox.askyesno(
+                t("提示"),
+                t("该路径将按主程序的方式通过 ShellExecute 打开，每次执行都会真正启动对应程序，且测试结束后不会自动关闭。\n确定要执行 {n} 次吗？").format(n=n),
+                icon="warning",
+                parent=dlg,
+            ):
+                return
+            dlg.destroy()
+            _start_benchmark(snap, action, n, bool(sweep_var.get()))
+
+        btns = ttk.Frame(dlg)
+        btns.grid(row=3, column=0, columnspan=3, pady=_PADY + 4)
+        ttk.Button(btns, text=t("开始"), command=_ok).pack(side="left", padx=_PADX)
+        ttk.Button(btns, text=t("取消"), command=dlg.destroy).pack(side="left", padx=_PADX)
+        center_window(dlg, theme_window)
+        dlg.grab_set()
 
-    # Hotkey 专用设置区（默认隐藏，选中“按键(Hotkey)”时显示）
-    hotkey_frame_add = ttk.Labelframe(theme_window, text=t("按键(Hotkey) 设置"))
+    bench_btn = ttk.Button(theme_window, text=t("基准测试"), command=open_benchmark_dialog)
+
+    # 命令类型：命令窗口显示/隐藏 -> 复选框，放在“状态”后面
+    cmd_window_var = tk.IntVar(value=1)
+    cmd_window_check = ttk.Checkbutton(theme_window, text=t("显示窗口"), variable=cmd_window_var)
+
+    cmd_range_frame = ttk.Frame(theme_window)
+    ttk.Label(cmd_range_frame, text=t("value 参数范围：")).grid(row=0, column=0, sticky="w")
+    ttk.Label(cmd_range_frame, text=t("最小：")).grid(row=0, column=1, sticky="e", padx=(8, 2))
+    cmd_min_entry = ttk.Entry(cmd_range_frame, textvariable=cmd_value_min_var, width=8)
+    cmd_min_entry.grid(row=0, column=2, sticky="w")
+    ttk.Label(cmd_range_frame, text=t("最大：")).grid(row=0, column=3, sticky="e", padx=(10, 2))
+    cmd_max_entry = ttk.Entry(cmd_range_frame, textvariable=cmd_value_max_var, width=8)
+    cmd_max_entry.grid(row=0, column=4, sticky="w")
+
+    # Hotkey 专用设置区（选中“按键(Hotkey)”时显示）
+    hotkey_frame = ttk.Labelframe(theme_window, text=t("按键(Hotkey) 设置"))
     hk_type_items = [
         ("none", "不执行"),
         ("keyboard", "键盘组合"),
     ]
 
-    def _hk_type_labels_add() -> list[str]:
+    def _hk_type_labels() -> list[str]:
         return [t(zh) for _, zh in hk_type_items]
 
-    def _hk_type_key_by_label_add(label: str) -> str:
+    def _hk_type_key_by_label(label: str) -> str:
         m = {t(zh): k for k, zh in hk_type_items}
         return m.get(label, "none")
 
-    def _hk_type_label_by_key_add(key: str) -> str:
+    def _hk_type_label_by_key(key: str) -> str:
         zh = next((zh for k, zh in hk_type_items if k == key), "不执行")
         return t(zh)
 
-    # 变量
-    hk_on_type_key_var_add = tk.StringVar(value="keyboard")
-    hk_on_type_var_add = tk.StringVar(value=_hk_type_label_by_key_add("keyboard"))
-    hk_on_val_var_add = tk.StringVar(value="")
-    hk_off_type_key_var_add = tk.StringVar(value="none")
-    hk_off_type_var_add = tk.StringVar(value=_hk_type_label_by_key_add("none"))
-    hk_off_val_var_add = tk.StringVar(value="")
-    hk_char_delay_var_add = tk.StringVar(value="0")
-
-    ttk.Label(hotkey_frame_add, text=t("打开(on)：")).grid(row=0, column=0, sticky="e", padx=8, pady=4)
-    hk_on_type_combo_add = ttk.Combobox(hotkey_frame_add, values=_hk_type_labels_add(), textvariable=hk_on_type_var_add, state="readonly", width=12)
-    hk_on_type_combo_add.grid(row=0, column=1, sticky="w")
-    hk_on_entry_add = ttk.Entry(hotkey_frame_add, textvariable=hk_on_val_var_add, width=24)
-    hk_on_entry_add.grid(row=0, column=2, sticky="w")
-    ttk.Button(hotkey_frame_add, text=t("录制"), command=lambda: open_keyboard_recorder(theme_window, hk_on_val_var_add)).grid(row=0, column=3, sticky="w")
-
-    ttk.Label(hotkey_frame_add, text=t("关闭(off)：")).grid(row=1, column=0, sticky="e", padx=8, pady=4)
-    hk_off_type_combo_add = ttk.Combobox(hotkey_frame_add, values=_hk_type_labels_add(), textvariable=hk_off_type_var_add, state="readonly", width=12)
-    hk_off_type_combo_add.grid(row=1, column=1, sticky="w")
-    hk_off_entry_add = ttk.Entry(hotkey_frame_add, textvariable=hk_off_val_var_add, width=24)
-    hk_off_entry_add.grid(row=1, column=2, sticky="w")
-    ttk.Button(hotkey_frame_add, text=t("录制"), command=lambda: open_keyboard_recorder(theme_window, hk_off_val_var_add)).grid(row=1, column=3, sticky="w")
-
-    ttk.Label(hotkey_frame_add, text=t("字母段间隔(ms)：")).grid(row=2, column=0, sticky="e", padx=8, pady=4)
-    hk_char_delay_entry_add = ttk.Entry(hotkey_frame_add, textvariable=hk_char_delay_var_add, width=12)
-    hk_char_delay_entry_add.grid(row=2, column=1, sticky="w")
-    ttk.Label(hotkey_frame_add, text=t("(未测试，不保证生效)")).grid(row=2, column=2, columnspan=2, sticky="w")
-
-    def _on_hk_on_type_selected_add(_event=None):
-        hk_on_type_key_var_add.set(_hk_type_key_by_label_add(hk_on_type_var_add.get()))
-        hk_on_type_var_add.set(_hk_type_label_by_key_add(hk_on_type_key_var_add.get()))
-
-    def _on_hk_off_type_selected_add(_event=None):
-        hk_off_type_key_var_add.set(_hk_type_key_by_label_add(hk_off_type_var_add.get()))
-        hk_off_type_var_add.set(_hk_type_label_by_key_add(hk_off_type_key_var_add.get()))
-
-    hk_on_type_combo_add.bind("<<ComboboxSelected>>", _on_hk_on_type_selected_add)
-    hk_off_type_combo_add.bind("<<ComboboxSelected>>", _on_hk_off_type_selected_add)
-
-    # 垂直方向自适应：占位扩展区，推开底部按钮
-    try:
-        theme_window.rowconfigure(7, weight=1)
-        _spacer_add = ttk.Frame(theme_window)
-        _spacer_add.grid(row=7, column=0, columnspan=4, sticky="nsew")
-    except Exception:
-        pass
-
-    # 命令类型：命令窗口显示/隐藏 -> 改为复选框，放在“状态”后面
-    cmd_window_var = tk.IntVar(value=1)
-    cmd_window_check = ttk.Checkbutton(theme_window, text=t("显示窗口"), variable=cmd_window_var)
-
-    cmd_range_frame_add = ttk.Frame(theme_window)
-    ttk.Label(cmd_range_frame_add, text=t("value 参数范围：")).grid(row=0, column=0, sticky="w")
-    ttk.Label(cmd_range_frame_add, text=t("最小：")).grid(row=0, column=1, sticky="e", padx=(8, 2))
-    cmd_min_entry_add = ttk.Entry(cmd_range_frame_add, textvariable=cmd_value_min_var_add, width=8)
-    cmd_min_entry_add.grid(row=0, column=2, sticky="w")
-    ttk.Label(cmd_range_frame_add, text=t("最大：")).grid(row=0, column=3, sticky="e", padx=(10, 2))
-    cmd_max_entry_add = ttk.Entry(cmd_range_frame_add, textvariable=cmd_value_max_var_add, width=8)
-    cmd_max_entry_add.grid(row=0, column=4, sticky="w")
-
-    def _update_type_specific_add(*_):
+    hk_on_type_key_var = tk.StringVar(value="keyboard")
+    hk_on_type_var = tk.StringVar(value=_hk_type_label_by_key("keyboard"))
+    hk_on_val_var = tk.StringVar(value="")
+    hk_off_type_key_var = tk.StringVar(value="none")
+    hk_off_type_var = tk.StringVar(value=_hk_type_label_by_key("none"))
+    hk_off_val_var = tk.StringVar(value="")
+    hk_char_delay_var = tk.StringVar(value="0")
+
+    ttk.Label(hotkey_frame, text=t("打开(on)：")).grid(row=0, column=0, sticky="e", padx=8, pady=4)
+    hk_on_type_combo = ttk.Combobox(hotkey_frame, values=_hk_type_labels(), textvariable=hk_on_type_var, state="readonly", width=12)
+    hk_on_type_combo.grid(row=0, column=1, sticky="w")
+    hk_on_entry = ttk.Entry(hotkey_frame, textvariable=hk_on_val_var, width=24)
+    hk_on_entry.grid(row=0, column=2, sticky="w")
+    ttk.Button(hotkey_frame, text=t("录制"), command=lambda: open_keyboard_recorder(theme_window, hk_on_val_var)).grid(row=0, column=3, sticky="w")
+
+    ttk.Label(hotkey_frame, text=t("关闭(off)：")).grid(row=1, column=0, sticky="e", padx=8, pady=4)
+    hk_off_type_combo = ttk.Combobox(hotkey_frame, values=_hk_type_labels(), textvariable=hk_off_type_var, state="readonly", width=12)
+    hk_off_type_combo.grid(row=1, column=1, sticky="w")
+    hk_off_entry = ttk.Entry(hotkey_frame, textvariable=hk_off_val_var, width=24)
+    hk_off_entry.grid(row=1, column=2, sticky="w")
+    ttk.Button(hotkey_frame, text=t("录制"), command=lambda: open_keyboard_recorder(theme_window, hk_off_val_var)).grid(row=1, column=3, sticky="w")
+
+    ttk.Label(hotkey_frame, text=t("字母段间隔(ms)：")).grid(row=2, column=0, sticky="e", padx=8, pady=4)
+    hk_char_delay_entry = ttk.Entry(hotkey_frame, textvariable=hk_char_delay_var, width=12)
+    hk_char_delay_entry.grid(row=2, column=1, sticky="w")
+    ttk.Label(hotkey_frame, text=t("(未测试，不保证生效)")).grid(row=2, column=2, columnspan=2, sticky="w")
+
+    def _on_hk_on_type_selected(_event=None):
+        hk_on_type_key_var.set(_hk_type_key_by_label(hk_on_type_var.get()))
+        hk_on_type_var.set(_hk_type_label_by_key(hk_on_type_key_var.get()))
+
+    def _on_hk_off_type_selected(_event=None):
+        hk_off_type_key_var.set(_hk_type_key_by_label(hk_off_type_var.get()))
+        hk_off_type_var.set(_hk_type_label_by_key(hk_off_type_key_var.get()))
+
+    hk_on_type_combo.bind("<<ComboboxSelected>>", _on_hk_on_type_selected)
+    hk_off_type_combo.bind("<<ComboboxSelected>>", _on_hk_off_type_selected)
+
+    def _update_type_specific(*_):
         type_key = theme_type_key_var.get()
+        if type_key in ("命令", "程序或脚本"):
+            bench_btn.grid(row=8, column=3, pady=_PADY + 6, padx=_PADX)
+        else:
+            bench_btn.grid_remove()
         if type_key == "命令":
             cmd_window_check.grid(row=1, column=1, sticky="n")
             # 放到“关闭预设”同一行右侧
-            cmd_range_frame_add.grid(row=6, column=1, columnspan=2, sticky="n", padx=(0, _PADX), pady=_PADY)
+            cmd_range_frame.grid(row=6, column=1, columnspan=2, sticky="n", padx=(0, _PADX), pady=_PADY)
         else:
             cmd_window_check.grid_remove()
-            cmd_range_frame_add.grid_remove()
+            cmd_range_frame.grid_remove()
         # Hotkey 面板显示控制；同时隐藏/显示 值 文本和选择按钮
         if type_key == "按键(Hotkey)":
-            on_label_add.grid_remove()
-            on_frame_add.grid_remove()
-            off_label_add.grid_remove()
-            off_frame_add.grid_remove()
-            off_preset_combo_add.grid_remove()
-            off_preset_label_add.grid_remove()
-            select_file_btn_add.grid_remove()
-            off_action_btn_add.state(["disabled"])
-            off_action_btn_add.grid_remove()
-            hotkey_frame_add.grid(row=4, column=1, columnspan=2, sticky="we")
+            on_label.grid_remove()
+            off_label.grid_remove()
+            on_frame.grid_remove()
+            off_frame.grid_remove()
+            off_preset_combo.grid_remove()
+            off_preset_label.grid_remove()
+            hotkey_frame.grid(row=4, column=1, columnspan=2, sticky="we")
+            select_file_btn.grid_remove()
+            off_action_btn.state(["disabled"])
+            off_action_btn.grid_remove()
         else:
-            hotkey_frame_add.grid_remove()
-            on_label_add.grid(row=4, column=0, sticky="e")
-            on_frame_add.grid(row=4, column=1, sticky="nsew")
-            off_label_add.grid(row=5, column=0, sticky="e")
-            off_frame_add.grid(row=5, column=1, sticky="nsew")
-            off_preset_label_add.grid(row=6, column=0, sticky="e")
-            values_now = _preset_labels_for_type_add(type_key)
-            off_preset_combo_add.configure(values=values_now)
-            allowed_codes = _preset_codes_for_type_add(type_key)
-            cur_code = off_preset_key_var_add.get() or "none"
+            hotkey_frame.grid_remove()
+            on_label.grid(row=4, column=0, sticky="e")
+            on_frame.grid(row=4, column=1, sticky="nsew")
+            off_label.grid(row=5, column=0, sticky="e")
+            off_frame.grid(row=5, column=1, sticky="nsew")
+            off_preset_label.grid(row=6, column=0, sticky="e")
+            # 根据类型刷新可选值（保持内部 code 不变）
+            off_preset_combo.configure(values=_preset_labels_for_type(type_key))
+            allowed_codes = _preset_codes_for_type(type_key)
+            cur_code = off_preset_key_var.get() or "none"
             if cur_code not in allowed_codes:
-                cur_code = _default_preset_code_for_type_add(type_key)
+                cur_code = _default_preset_code_for_type(type_key)
                 if cur_code not in allowed_codes:
                     cur_code = allowed_codes[0]
-                off_preset_key_var_add.set(cur_code)
-            off_preset_var_add.set(_preset_label_by_code_add(off_preset_key_var_add.get() or "none"))
-            off_preset_combo_add.grid(row=6, column=1, sticky="w")
+                off_preset_key_var.set(cur_code)
+            off_preset_var.set(_preset_label_by_code(off_preset_key_var.get() or "none"))
+            off_preset_combo.grid(row=6, column=1, sticky="w")
+            # 根据类型设置按钮文本与功能
             if type_key == "程序或脚本":
-                select_file_btn_add.configure(text=t("选择文件"), command=select_file)
-                select_file_btn_add.grid(row=4, column=2, sticky="w", padx=15)
-                off_action_btn_add.configure(text=t("选择文件"), command=select_off_file_add)
-                off_action_btn_add.grid(row=5, column=2, sticky="w", padx=15)
+                select_file_btn.configure(text=t("选择文件"), command=select_file)
+                select_file_btn.grid(row=4, column=2, sticky="w", padx=15)
+                off_action_btn.configure(text=t("选择文件"), command=select_off_file)
+                off_action_btn.grid(row=5, column=2, sticky="w", padx=15)
             elif type_key == "服务(需管理员权限)":
-                select_file_btn_add.grid_remove()
-                off_action_btn_add.state(["disabled"])
-                off_action_btn_add.grid_remove()
+                select_file_btn.configure(text=t("选择服务"), command=open_services)
+                select_file_btn.grid(row=4, column=2, sticky="w", padx=15)
+                off_action_btn.state(["disabled"])
+                off_action_btn.grid_remove()
             elif type_key == "命令":
-                select_file_btn_add.configure(text=t("PowerShell测试"), command=test_command_in_powershell)
-                select_file_btn_add.grid(row=4, column=2, sticky="w", padx=15)
-                off_action_btn_add.configure(text=t("PowerShell测试(关闭)"), command=test_off_command_in_powershell_add)
-                off_action_btn_add.grid(row=5, column=2, sticky="w", padx=15)
+                select_file_btn.configure(text=t("PowerShell测试"), command=test_command_in_powershell)
+                select_file_btn.grid(row=4, column=2, sticky="w", padx=15)
+                off_action_btn.configure(text=t("PowerShell测试(关闭)"), command=test_off_command_in_powershell)
+                off_action_btn.grid(row=5, column=2, sticky="w", padx=15)
             else:
-                select_file_btn_add.grid_remove()
-                off_action_btn_add.state(["disabled"])
-                off_action_btn_add.grid_remove()
-            _update_off_editability_add()
+                select_file_btn.grid_remove()
+                off_action_btn.state(["disabled"])
+                off_action_btn.grid_remove()
+            _update_off_editability()
 
-    def _on_theme_type_selected_add(_event=None):
-        theme_type_key_var.set(_type_key_by_label_add(theme_type_var.get()))
-        theme_type_var.set(_type_label_by_key_add(theme_type_key_var.get()))
-        _update_type_specific_add()
+    def _on_theme_type_selected(_event=None):
+        theme_type_key_var.set(_type_key_by_label(theme_type_var.get()))
+        theme_type_var.set(_type_label_by_key(theme_type_key_var.get()))
+        _update_type_specific()
 
-    theme_type_combobox.bind("<<ComboboxSelected>>", _on_theme_type_selected_add)
-    _update_type_specific_add()
+    theme_type_combobox.bind("<<ComboboxSelected>>", _on_theme_type_selected)
 
-    def _refresh_type_and_preset_i18n_add() -> None:
+    def _refresh_type_and_preset_i18n() -> None:
         try:
-            theme_type_combobox.configure(values=_type_labels_add())
+            theme_type_combobox.configure(values=_type_labels())
+            # 维持当前选择
             cur_type_key = theme_type_key_var.get() or "程序或脚本"
-            theme_type_var.set(_type_label_by_key_add(cur_type_key))
+            if cur_type_key not in _type_keys:
+                cur_type_key = "程序或脚本"
+                theme_type_key_var.set(cur_type_key)
+            theme_type_var.set(_type_label_by_key(cur_type_key))
             try:
-                theme_type_combobox.current(_type_keys_add.index(cur_type_key))
+                theme_type_combobox.current(_type_keys.index(cur_type_key))
             except Exception:
                 pass
         except Exception:
             pass
         try:
             t_key = theme_type_key_var.get() or "程序或脚本"
-            off_preset_combo_add.configure(values=_preset_labels_for_type_add(t_key))
-            off_preset_var_add.set(_preset_label_by_code_add(off_preset_key_var_add.get() or "none"))
+            off_preset_combo.configure(values=_preset_labels_for_type(t_key))
+            off_preset_var.set(_preset_label_by_code(off_preset_key_var.get() or "none"))
         except Exception:
             pass
 
         # Hotkey 下拉选项刷新
         try:
-            hk_on_type_combo_add.configure(values=_hk_type_labels_add())
-            hk_off_type_combo_add.configure(values=_hk_type_labels_add())
-            hk_on_type_var_add.set(_hk_type_label_by_key_add(hk_on_type_key_var_add.get()))
-            hk_off_type_var_add.set(_hk_type_label_by_key_add(hk_off_type_key_var_add.get()))
+            hk_on_type_combo.configure(values=_hk_type_labels())
+            hk_off_type_combo.configure(values=_hk_type_labels())
+            hk_on_type_var.set(_hk_type_label_by_key(hk_on_type_key_var.get()))
+            hk_off_type_var.set(_hk_type_label_by_key(hk_off_type_key_var.get()))
         except Exception:
             pass
 
         # 如果当前是预设（非 custom），则更新预设说明文本语言
         try:
             t_type = theme_type_key_var.get()
-            code = off_preset_key_var_add.get() or "none"
+            code = off_preset_key_var.get() or "none"
             if code != "custom":
-                service_name = on_value_text_add.get("1.0", "end-1c").strip()
-                off_value_text_add.configure(state=tk.NORMAL)
-                off_value_text_add.delete("1.0", tk.END)
-                off_value_text_add.insert("1.0", _preview_text_for_add(code, t_type, service_name))
-                off_value_text_add.configure(state=tk.DISABLED)
+                service_name = on_value_text.get("1.0", "end-1c").strip()
+                off_value_text.configure(state=tk.NORMAL)
+                off_value_text.delete("1.0", tk.END)
+                off_value_text.insert("1.0", _preview_text(code, t_type, service_name))
+                off_value_text.configure(state=tk.DISABLED)
+        except Exception:
+            pass
+
+    def _window_title() -> str:
+        return t("添加自定义主题") if state["theme"] is None else t("修改自定义主题")
+
+    def _hide_runner() -> None:
+        runner["stop"]()
+        runner["frame"].grid_remove()
+
+    def close_editor():
+        # 不销毁，只隐藏；下次打开时重新绑定
+        state["theme"] = None
+        _hide_runner()
+        try:
+            theme_window.withdraw()
         except Exception:
             pass
 
+    def _confirm_lint_errors() -> bool:
+        """保存前检查命令/路径；存在主程序无法正确执行的问题时请用户确认。"""
+        fields = [(t("打开(on)："), on_value_text.get("1.0", "end-1c").strip())]
+        if (off_preset_key_var.get() or "none") == "custom":
+            fields.append((t("关闭(off)："), off_value_text.get("1.0", "end-1c").strip()))
+        lines = []
+        for label, text in fields:
+            for issue in _lint_field(text):
+                if issue.level == "error":
+                    lines.append(f"- {label} {_command_issue_text(issue)}")
+        if not lines:
+            return True
+        msg = "\n".join(lines) + t("\n\n主程序可能无法按预期执行。是否仍然要保存？")
+        ok = messagebox.askyesno(t("确认保存"), msg, parent=theme_window)
+        if not ok:
+            theme_window.lift()
+        return ok
+
+    def _confirm_service_name() -> bool:
+        """服务类型：服务名不在服务目录中时请用户确认（目录尚未读取时不拦截）。"""
+        if theme_type_key_var.get() != "服务(需管理员权限)":
+            return True
+        name = on_value_text.get("1.0", "end-1c").strip()
+        if not name or _service_catalog().lookup(name) is not False:
+            return True
+        ok = messagebox.askyesno(
+            t("确认保存"), t("本机找不到服务“{name}”。是否仍然要保存？").format(name=name), parent=theme_window
+        )
+        if not ok:
+            theme_window.lift()
+        return ok
+
     def save_theme():
-        theme = {
-            "type": theme_type_key_var.get(),
-            "checked": theme_checked_var.get(),
-            "nickname": theme_nickname_entry.get(),
-            "name": theme_name_entry.get(),
-        }
-        if theme["type"] in ("程序或脚本", "命令", "服务(需管理员权限)"):
-            theme["on_value"] = on_value_text_add.get("1.0","end-1c").strip()
-            theme["off_preset"] = off_preset_key_var_add.get() or "none"
-            if theme["off_preset"] == "custom":
-                theme["off_value"] = off_value_text_add.get("1.0","end-1c").strip()
-            else:
-                theme["off_value"] = ""
+        if not _confirm_lint_errors() or not _confirm_service_name():
+            return
+        is_new = state["theme"] is None
+        theme = {} if is_new else state["theme"]
+        theme["type"] = theme_type_key_var.get()
+        theme["checked"] = theme_checked_var.get()
+        theme["nickname"] = theme_nickname_entry.get()
+        theme["name"] = theme_name_entry.get()
+        # 保存拆分字段
+        theme["on_value"] = on_value_text.get("1.0", "end-1c").strip()
+        # 根据预设决定是否保存 off_value
+        off_preset_code = off_preset_key_var.get() or "none"
+        if off_preset_code == "custom":
+            theme["off_value"] = off_value_text.get("1.0", "end-1c").strip()
+        else:
+            theme["off_value"] = ""
+        theme["off_preset"] = off_preset_code
         if theme["type"] == "服务(需管理员权限)":
             theme["value"] = theme["on_value"]
         if theme["type"] == "命令":
             theme["window"] = "show" if cmd_window_var.get() else "hide"
-            lo, hi = _get_cmd_value_range_add()
+            lo, hi = _get_cmd_value_range()
             theme["value_min"] = lo
             theme["value_max"] = hi
+        else:
+            theme.pop("value_min", None)
+            theme.pop("value_max", None)
         if theme["type"] == "按键(Hotkey)":
-            _on_type = hk_on_type_key_var_add.get() or "keyboard"
-            _on_value = hk_on_val_var_add.get().strip()
-            _off_type = hk_off_type_key_var_add.get() or "none"
-            _off_value = hk_off_val_var_add.get().strip()
+            # 读取临时值以便在保存前校验
+            _on_type = hk_on_type_key_var.get() or "keyboard"
+            _on_value = hk_on_val_var.get().strip()
+            _off_type = hk_off_type_key_var.get() or "none"
+            _off_value = hk_off_val_var.get().strip()
             try:
-                _char_delay_ms = int(hk_char_delay_var_add.get() or 0)
+                _char_delay_ms = int(hk_char_delay_var.get() or 0)
                 if _char_delay_ms < 0:
                     _char_delay_ms = 0
             except Exception:
@@ -3166,33 +3753,182 @@ def add_custom_theme(config: Dict[str, Any]) -> None:
             theme["off_value"] = _off_value
             theme["char_delay_ms"] = _char_delay_ms
             theme["value"] = ""  # 兼容旧结构
-        custom_themes.append(theme)
-        # 重新构建整个树视图以确保索引正确
+        if is_new:
+            custom_themes.append(theme)
         rebuild_custom_theme_tree()
-        theme_window.destroy()
+        close_editor()
+
+    def delete_theme():
+        theme = state["theme"]
+        if theme is None:
+            return
+        if messagebox.askyesno(
+            t("确认删除"), t("确定要删除这个自定义主题吗？"), parent=theme_window
+        ):
+            # 按对象身份删除，避免列表在编辑期间被刷新后误删
+            for i, th in enumerate(custom_themes):
+                if th is theme:
+                    custom_themes.pop(i)
+                    break
+            rebuild_custom_theme_tree()
+            close_editor()
+        else:
+            theme_window.lift()
 
     ttk.Button(theme_window, text=t("保存"), command=save_theme).grid(
         row=8, column=0, pady=_PADY + 6, padx=_PADX
     )
-    ttk.Button(theme_window, text=t("取消"), command=theme_window.destroy).grid(row=8, column=2, pady=_PADY + 6, padx=_PADX)
+    delete_btn = ttk.Button(theme_window, text=t("删除"), command=delete_theme)
+    delete_btn.grid(row=8, column=1, pady=_PADY + 6, padx=_PADX)
+    ttk.Button(theme_window, text=t("取消"), command=close_editor).grid(row=8, column=2, pady=_PADY + 6, padx=_PADX)
 
-    center_window(theme_window)
+    theme_window.protocol("WM_DELETE_WINDOW", close_editor)
 
-    def _apply_lang_to_add_theme_win() -> None:
+    def _apply_lang_to_theme_editor() -> None:
         if not theme_window.winfo_exists():
             return
         try:
-            theme_window.title(t("添加自定义主题"))
+            theme_window.title(_window_title())
         except Exception:
             pass
-        _refresh_type_and_preset_i18n_add()
+        _refresh_type_and_preset_i18n()
         try:
             apply_language_to_widgets(theme_window)
         except Exception:
             pass
 
-    register_lang_observer(_apply_lang_to_add_theme_win)
-    _apply_lang_to_add_theme_win()
+    def _form_state() -> tuple:
+        """表单当前内容（预设说明文字随语言变化，只在自定义关闭动作时计入）。"""
+        off_code = off_preset_key_var.get() or "none"
+        return (
+            theme_type_key_var.get(),
+            theme_checked_var.get(),
+            theme_nickname_entry.get(),
+            theme_name_entry.get(),
+            on_value_text.get("1.0", "end-1c"),
+            off_code,
+            off_value_text.get("1.0", "end-1c") if off_code == "custom" else "",
+            cmd_window_var.get(),
+            cmd_value_min_var.get(),
+            cmd_value_max_var.get(),
+            hk_on_type_key_var.get(),
+            hk_on_val_var.get(),
+            hk_off_type_key_var.get(),
+            hk_off_val_var.get(),
+            hk_char_delay_var.get(),
+        )
+
+    def _is_dirty() -> bool:
+        try:
+            return theme_window.state() != "withdrawn" and _form_state() != state["clean"]
+        except Exception:
+            return False
+
+    def _bind(theme: Dict[str, Any] | None) -> None:
+        """把表单重新绑定到 theme（None 表示添加新主题）。"""
+        nonlocal previous_custom_off_value
+        state["theme"] = theme
+        _hide_runner()
+        src = theme or {}
+        type_key = src.get("type") or "程序或脚本"
+        if type_key not in _type_keys:
+            type_key = "程序或脚本"
+        theme_type_key_var.set(type_key)
+        theme_type_var.set(t(type_key))
+        try:
+            theme_type_combobox.current(_type_keys.index(type_key))
+        except Exception:
+            pass
+        theme_checked_var.set(src.get("checked", 0))
+        theme_nickname_entry.delete(0, tk.END)
+        theme_nickname_entry.insert(0, src.get("nickname", ""))
+        theme_name_entry.delete(0, tk.END)
+        theme_name_entry.insert(0, src.get("name", ""))
+
+        on_value_text.delete("1.0", tk.END)
+        if type_key != "按键(Hotkey)":
+            on_value_text.insert("1.0", src.get("on_value", src.get("value", "")))
+        # 清空关闭文本后再切换预设，避免把上一个主题的内容缓存为“自定义”
+        previous_custom_off_value = src.get("off_value", "") if type_key != "按键(Hotkey)" else ""
+        off_value_text.configure(state=tk.NORMAL)
+        off_value_text.delete("1.0", tk.END)
+        preset = src.get("off_preset", _default_preset_code_for_type(type_key))
+        if preset not in _preset_label_zh_by_code:
+            preset = _default_preset_code_for_type(type_key)
+        off_preset_key_var.set(preset)
+        off_preset_var.set(_preset_label_by_code(preset))
+
+        cmd_window_var.set(0 if src.get("window", "show") == "hide" else 1)
+        cmd_value_min_var.set(str(int(src.get("value_min", 0) or 0)))
+        cmd_value_max_var.set(str(int(src.get("value_max", 100) or 100)))
+
+        is_hotkey = type_key == "按键(Hotkey)"
+        hk_on_type_key_var.set((src.get("on_type", "keyboard") or "keyboard") if is_hotkey else "keyboard")
+        hk_on_type_var.set(_hk_type_label_by_key(hk_on_type_key_var.get()))
+        hk_on_val_var.set(src.get("on_value", "") if is_hotkey else "")
+        hk_off_type_key_var.set((src.get("off_type", "none") or "none") if is_hotkey else "none")
+        hk_off_type_var.set(_hk_type_label_by_key(hk_off_type_key_var.get()))
+        hk_off_val_var.set(src.get("off_value", "") if is_hotkey else "")
+        hk_char_delay_var.set(str(src.get("char_delay_ms", 0) or 0))
+
+        if theme is None:
+            delete_btn.grid_remove()
+        else:
+            delete_btn.grid()
+        _update_type_specific()
+        _apply_lang_to_theme_editor()
+        state["clean"] = _form_state()
+
+    def _open(theme: Dict[str, Any] | None) -> None:
+        # 编辑窗口是非模态且共用的：正在编辑的主题有未保存的修改时，先确认再重新绑定
+        if theme is not state["theme"] and _is_dirty():
+            if not messagebox.askyesno(
+                t("未保存的修改"),
+                t("当前编辑的主题有未保存的修改。是否放弃这些修改并打开所选主题？"),
+                icon="warning",
+                parent=theme_window,
+            ):
+                theme_window.lift()
+                theme_window.focus_force()
+                return
+        if theme is not state["theme"] or theme_window.state() == "withdrawn":
+            _bind(theme)
+        try:
+            theme_window.geometry("")
+            theme_window.deiconify()
+            center_window(theme_window)
+            theme_window.lift()
+            theme_window.focus_force()
+        except Exception:
+            pass
+
+    register_lang_observer(_apply_lang_to_theme_editor, owner=theme_window)
+
+    _THEME_EDITOR = {"window": theme_window, "open": _open}
+    return _THEME_EDITOR
+
+
+# 修改自定义主题的函数
+def modify_custom_theme() -> None:
+    """
+    English: Opens the theme editor bound to the selected custom theme
+    中文: 打开主题编辑窗口并绑定到已选定的自定义主题
+    """
+    theme = custom_theme_view["selected_theme"]()
+    if theme is None:
+        messagebox.showwarning(t("警告"), t("请先选择一个自定义主题"))
+        return
+
+    _get_theme_editor()["open"](theme)
+
+
+# 添加自定义主题的函数中，也要更新显示
+def add_custom_theme(config: Dict[str, Any]) -> None:
+    """
+    English: Opens the theme editor in "add" mode and updates display on save
+    中文: 以“添加”模式打开主题编辑窗口，保存后更新显示
+    """
+    _get_theme_editor()["open"](None)
 
 
 # ---------------------------------------------------------
@@ -3631,8 +4367,6 @@ def generate_config() -> None:
 
     # 刷新自定义主题
     custom_themes.clear()
-    for item in custom_theme_tree.get_children():
-        custom_theme_tree.delete(item)
     load_custom_themes()
     
 # 添加一个刷新自定义主题的函数
@@ -3661,10 +4395,6 @@ def refresh_custom_themes() -> None:
             # 清空自定义主题列表
             custom_themes.clear()
             
-            # 清空树视图中的所有项目
-            for item in custom_theme_tree.get_children():
-                custom_theme_tree.delete(item)
-            
             # 重新加载自定义主题
             load_custom_themes()
             
@@ -3675,30 +4405,9 @@ def refresh_custom_themes() -> None:
         messagebox.showwarning(t("警告"), t("配置文件不存在，无法刷新"))
 
 
-def _decode_bytes_best_effort(data: bytes) -> str:
-    if not data:
-        return ""
-    encs: list[str] = []
-    try:
-        encs.append(locale.getpreferredencoding(False))
-    except Exception:
-        pass
-    encs.extend(["utf-8", "gbk", "mbcs"])
-    seen: set[str] = set()
-    candidates: list[tuple[int, str]] = []
-    for enc in encs:
-        if not enc or enc in seen:
-            continue
-        seen.add(enc)
-        try:
-            s = data.decode(enc, errors="replace")
-        except Exception:
-            continue
-        candidates.append((s.count("\ufffd"), s))
-    if not candidates:
-        return data.decode(errors="replace")
-    candidates.sort(key=lambda x: x[0])
-    return candidates[0][1]
+def _decode_bytes_best_effort(data: bytes, source: str | None = None) -> str:
+    """解码命令输出（严格 UTF-8 → 按来源缓存的编码 → 采样检测），见 rc_decode。"""
+    return rc_decode.decode_bytes(data, source)
 
 
 def _run_capture_text(args: list[str]) -> tuple[int, str, str]:
@@ -3706,8 +4415,10 @@ def _run_capture_text(args: list[str]) -> tuple[int, str, str]:
         cp = subprocess.run(args, capture_output=True, text=False, shell=False)
     except FileNotFoundError as e:
         return 1, "", str(e)
-    stdout = _decode_bytes_best_effort(cp.stdout or b"")
-    stderr = _decode_bytes_best_effort(cp.stderr or b"")
+    # 以命令名作为编码提示的来源：同一工具再次调用时跳过编码检测
+    source = os.path.splitext(os.path.basename(args[0]))[0].lower() if args else None
+    stdout = _decode_bytes_best_effort(cp.stdout or b"", source)
+    stderr = _decode_bytes_best_effort(cp.stderr or b"", source)
     return int(getattr(cp, "returncode", 1) or 0), stdout, stderr
 
 
@@ -3737,54 +4448,225 @@ def _is_hibernate_enabled_from_powercfg_output(output: str) -> bool:
         return False
     return True
 
-def sleep():
-    # 检查系统休眠/睡眠支持（test模式开启时跳过检测）
-    global sleep_disabled, sleep_status_message
-    if not ("config" in globals() and config.get("test", 0) == 1):
-        try:
-            rc, out, err = _run_capture_text(["powercfg", "-a"])
-            output = (out or "") + (err or "")
-            if rc != 0:
-                sleep_disabled = True
-            else:
-                sleep_disabled = not _is_hibernate_enabled_from_powercfg_output(output)
-            sleep_status_message = output.strip() or "(no output)"
-        except Exception as e:
-            sleep_disabled = True
-            sleep_status_message = f"检测失败: {e}"
-    else:
-        sleep_status_message = "test模式已开启，未检测系统休眠/睡眠支持。"
+# 能力探测缓存：睡眠/休眠可用性、Twinkle Tray 路径、亮度接口，保存在 RC-GUI.cache.json 的 "capabilities" 分区
+CAPABILITY_TTL_SLEEP = 24 * 3600
+CAPABILITY_TTL_TWINKLE_TRAY = 24 * 3600
+CAPABILITY_TTL_BRIGHTNESS = 7 * 24 * 3600
+_CAPABILITIES: rc_capabilities.CapabilityCache | None = None
+# refreshing：后台探测进行中；pending：探测期间又收到的刷新请求（其回调），本轮结束后再探测一次
+_CAPABILITIES_STATE: dict[str, Any] = {"refreshing": False, "pending": None}
 
-def _resolve_twinkle_tray_path_for_gui() -> str | None:
-    candidates: list[str] = []
+
+def _probe_sleep_support() -> dict:
+    """执行 powercfg -a，返回 {"disabled", "message"}；命令无法执行时抛出异常（不写入缓存）。"""
+    rc, out, err = _run_capture_text(["powercfg", "-a"])
+    output = (out or "") + (err or "")
+    if rc != 0 and not output.strip():
+        raise RuntimeError(f"powercfg exit code {rc}")
+    disabled = rc != 0 or not _is_hibernate_enabled_from_powercfg_output(output)
+    return {"disabled": disabled, "message": output.strip() or "(no output)"}
+
+
+def _twinkle_tray_config_path() -> str:
     try:
-        custom = (config.get("twinkle_tray_path", "") or "").strip()
-        if custom:
-            candidates.append(os.path.expandvars(os.path.expanduser(custom)))
+        return (config.get("twinkle_tray_path", "") or "").strip()
     except Exception:
-        pass
+        return ""
+
+
+def _probe_twinkle_tray_path() -> str | None:
+    candidates: list[str] = []
+    custom = _twinkle_tray_config_path()
+    if custom:
+        candidates.append(os.path.expandvars(os.path.expanduser(custom)))
     candidates.extend(
         [
             os.path.expandvars(r"%LocalAppData%\Programs\twinkle-tray\Twinkle Tray.exe"),
             os.path.expandvars(r"%LocalAppData%\Microsoft\WindowsApps\Twinkle-Tray.exe"),
         ]
     )
-    for alias in ("Twinkle-Tray.exe", "Twinkle Tray.exe", "twinkle-tray.exe"):
-        p = shutil.which(alias)
-        if p:
-            candidates.append(p)
     seen: set[str] = set()
     for p in candidates:
-        if not p:
-            continue
         norm = os.path.normpath(p)
         if norm in seen:
             continue
         seen.add(norm)
         if os.path.isfile(norm):
             return norm
+    # 固定位置都没有时才查 PATH
+    for alias in ("Twinkle-Tray.exe", "Twinkle Tray.exe", "twinkle-tray.exe"):
+        p = shutil.which(alias)
+        if p and os.path.isfile(p):
+            return os.path.normpath(p)
     return None
 
+
+def _probe_wmi_brightness() -> bool:
+    # 一次性进程即可，不为启动探测唤起常驻 PowerShell 池
+    cp = subprocess.run(
+        [
+            "powershell.exe", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command",
+            "@(Get-CimInstance -Namespace root/WMI -ClassName WmiMonitorBrightness -ErrorAction Stop).Count",
+        ],
+        capture_output=True,
+        timeout=20,
+        creationflags=subprocess.CREATE_NO_WINDOW,
+    )
+    try:
+        return cp.returncode == 0 and int(_decode_bytes_best_effort(cp.stdout or b"", "powershell").strip().splitlines()[-1]) > 0
+    except Exception:
+        return False
+
+
+def _probe_dxva2_brightness() -> bool:
+    """枚举显示器，只要有一台物理显示器能读取 DDC/CI 亮度即认为 Dxva2 可用。"""
+    from ctypes import wintypes
+
+    class _PhysicalMonitor(ctypes.Structure):
+        _fields_ = [("hPhysicalMonitor", wintypes.HANDLE), ("szPhysicalMonitorDescription", wintypes.WCHAR * 128)]
+
+    user32 = ctypes.windll.user32
+    dxva2 = ctypes.windll.dxva2
+    monitors: list[Any] = []
+    enum_proc = ctypes.WINFUNCTYPE(
+        wintypes.BOOL, wintypes.HMONITOR, wintypes.HDC, ctypes.POINTER(wintypes.RECT), wintypes.LPARAM
+    )(lambda hmon, _hdc, _rect, _data: monitors.append(hmon) or True)
+    user32.EnumDisplayMonitors(None, None, enum_proc, 0)
+    for hmon in monitors:
+        count = wintypes.DWORD()
+        if not dxva2.GetNumberOfPhysicalMonitorsFromHMONITOR(hmon, ctypes.byref(count)) or not count.value:
+            continue
+        physical = (_PhysicalMonitor * count.value)()
+        if not dxva2.GetPhysicalMonitorsFromHMONITOR(hmon, count.value, physical):
+            continue
+        try:
+            for pm in physical:
+                lo, cur, hi = wintypes.DWORD(), wintypes.DWORD(), wintypes.DWORD()
+                if dxva2.GetMonitorBrightness(pm.hPhysicalMonitor, ctypes.byref(lo), ctypes.byref(cur), ctypes.byref(hi)):
+                    return True
+        finally:
+            dxva2.DestroyPhysicalMonitors(count.value, physical)
+    return False
+
+
+def _probe_brightness_backends() -> dict:
+    """逐个尝试亮度接口，返回 {"wmi", "dxva2", "twinkle_tray"} -> 是否响应。"""
+    result = {}
+    for name, func in (
+        ("wmi", _probe_wmi_brightness),
+        ("dxva2", _probe_dxva2_brightness),
+        ("twinkle_tray", lambda: _capabilities().fetch("twinkle_tray") is not None),
+    ):
+        try:
+            result[name] = bool(func())
+        except Exception:
+            result[name] = False
+    return result
+
+
+def _capabilities() -> rc_capabilities.CapabilityCache:
+    global _CAPABILITIES
+    if _CAPABILITIES is None:
+        _CAPABILITIES = rc_capabilities.CapabilityCache({
+            "sleep": rc_capabilities.Probe(_probe_sleep_support, CAPABILITY_TTL_SLEEP),
+            "twinkle_tray": rc_capabilities.Probe(
+                _probe_twinkle_tray_path,
+                CAPABILITY_TTL_TWINKLE_TRAY,
+                key=_twinkle_tray_config_path,
+                validate=lambda p: p is None or os.path.isfile(p),
+            ),
+            # 亮度接口的结果依赖 Twinkle Tray 路径，路径配置变化时一并重新探测
+            "brightness": rc_capabilities.Probe(
+                _probe_brightness_backends, CAPABILITY_TTL_BRIGHTNESS, key=_twinkle_tray_config_path
+            ),
+        })
+        cached = _load_gui_cache().get("capabilities")
+        if isinstance(cached, dict):
+            _CAPABILITIES.from_dict(cached)
+    return _CAPABILITIES
+
+
+def _save_capabilities() -> None:
+    _update_gui_cache("capabilities", _capabilities().to_dict())
+
+
+def _apply_brightness_capability() -> None:
+    """所有亮度接口都未响应时标记“屏幕亮度”不可用（尚未探测过时不做判断）。"""
+    global brightness_disabled, brightness_status_message
+    backends = _capabilities().get("brightness")
+    if isinstance(backends, dict) and backends and not any(backends.values()):
+        brightness_disabled = True
+        brightness_status_message = "未检测到可用的亮度接口（WMI / Dxva2 / Twinkle Tray）"
+    else:
+        brightness_disabled = False
+        brightness_status_message = ""
+
+
+def _brightness_backend_hint(name: str) -> str:
+    """高级亮度设置中显示的探测结果（尚未探测过时为空）。"""
+    backends = _capabilities().get("brightness")
+    if not isinstance(backends, dict) or name not in backends:
+        return ""
+    return t("已响应") if backends[name] else t("未响应")
+
+
+def _refresh_capabilities(on_changed: Callable[[dict], None] | None = None) -> None:
+    """在后台重新探测过期的能力项并写回缓存；有变化时在主线程回调 on_changed({名称: 新值})。"""
+    cache = _capabilities()
+    if _CAPABILITIES_STATE["refreshing"]:
+        # 本轮可能已探测过刚被 invalidate 的项（如启动时的睡眠检测），结束后再刷新一次
+        _CAPABILITIES_STATE["pending"] = on_changed or _CAPABILITIES_STATE["pending"] or (lambda _changed: None)
+        return
+    if not cache.stale_names():
+        return
+    _CAPABILITIES_STATE["refreshing"] = True
+
+    def _done(changed, err) -> None:
+        _CAPABILITIES_STATE["refreshing"] = False
+        pending, _CAPABILITIES_STATE["pending"] = _CAPABILITIES_STATE["pending"], None
+        if err is None:
+            _save_capabilities()
+            if changed and on_changed is not None:
+                try:
+                    on_changed(changed)
+                except Exception:
+                    pass
+        if pending is not None and cache.stale_names():
+            _refresh_capabilities(pending)
+
+    _run_in_background(root, cache.refresh_stale, _done)
+
+
+def sleep():
+    # 检查系统休眠/睡眠支持（test模式开启时跳过检测）
+    # 有缓存时直接使用（即使已过期，启动后由 _refresh_capabilities 在后台更新），只有首次运行才同步执行 powercfg
+    global sleep_disabled, sleep_status_message
+    if not ("config" in globals() and config.get("test", 0) == 1):
+        cache = _capabilities()
+        try:
+            if not cache.has("sleep"):
+                cache.probe("sleep")
+                _save_capabilities()
+            status = cache.get("sleep")
+            sleep_disabled = bool(status["disabled"])
+            sleep_status_message = str(status["message"])
+        except Exception as e:
+            sleep_disabled = True
+            sleep_status_message = f"检测失败: {e}"
+    else:
+        sleep_status_message = "test模式已开启，未检测系统休眠/睡眠支持。"
+
+def _resolve_twinkle_tray_path_for_gui() -> str | None:
+    """Twinkle Tray 路径（缓存未过期且文件仍存在时不再查找）。"""
+    cache = _capabilities()
+    try:
+        if cache.is_stale("twinkle_tray"):
+            cache.probe("twinkle_tray")
+            _save_capabilities()
+        return cache.get("twinkle_tray")
+    except Exception:
+        return None
+
 def enable_sleep_window() -> None:
     """
     
@@ -3804,6 +4686,9 @@ def enable_sleep_window() -> None:
     try:
         rc, out, err = _run_capture_text(["powercfg", "/hibernate", "on"])
         if rc == 0:
+            # 电源配置已改变：缓存的睡眠可用性作废并在后台重新探测
+            _capabilities().invalidate("sleep")
+            _refresh_capabilities(_on_capabilities_changed)
             messagebox.showinfo(t("提示"), t("休眠/睡眠功能已启用"))
         else:
             detail = (err or out).strip()
@@ -3829,6 +4714,9 @@ def disable_sleep_window() -> None:
     try:
         rc, out, err = _run_capture_text(["powercfg", "/hibernate", "off"])
         if rc == 0:
+            # 电源配置已改变：缓存的睡眠可用性作废并在后台重新探测
+            _capabilities().invalidate("sleep")
+            _refresh_capabilities(_on_capabilities_changed)
             messagebox.showinfo(t("提示"), t("休眠/睡眠功能已关闭"))
         else:
             detail = (err or out).strip()
@@ -3848,6 +4736,9 @@ def check_sleep_status_window() -> None:
             return
 
         enabled = _is_hibernate_enabled_from_powercfg_output(output)
+        # 顺便更新能力缓存，避免下次启动再执行一次 powercfg -a
+        _capabilities().put("sleep", {"disabled": not enabled, "message": output.strip() or "(no output)"})
+        _save_capabilities()
 
         status_text = "已启用（可用）" if enabled else "未启用或不可用"
         if LANG != "zh-CN":
@@ -3872,6 +4763,424 @@ appdata_dir: str = os.path.abspath(os.path.dirname(sys.argv[0]))
 config_toml_path: str = os.path.join(appdata_dir, "config.toml")
 config_file_path: str = config_toml_path
 
+# GUI 日志：与 main.log / tray.log 同目录、同格式，同样在写入前做 200KB 上限检查
+GUI_LOG_MAX_BYTES = 200 * 1024
+_GUI_LOG_LOCK = threading.Lock()
+
+
+def gui_log_path() -> str:
+    return os.path.join(appdata_dir, "logs", "gui.log")
+
+
+def gui_log(level: str, msg: str) -> None:
+    """写一条 GUI 日志（可在任意线程调用，失败时静默忽略）。"""
+    now = time.time()
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    line = f"{stamp}.{int((now % 1) * 1000):03d} [{level}] {msg}\n"
+    path = gui_log_path()
+    with _GUI_LOG_LOCK:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            mode = "a"
+            try:
+                if os.path.getsize(path) >= GUI_LOG_MAX_BYTES:
+                    mode = "w"  # 超过上限先清空再写
+            except OSError:
+                pass
+            with open(path, mode, encoding="utf-8") as f:
+                f.write(line)
+        except Exception:
+            pass
+
+
+# ----------------------------
+# 事件循环卡顿看门狗（默认关闭）
+# RC_GUI_WATCHDOG=1 启用；RC_GUI_WATCHDOG_SECONDS 设置判定阈值（默认 2 秒）
+# ----------------------------
+
+# 单次卡顿最多记录的堆栈采样数，避免长时间卡死时日志被刷满
+_WATCHDOG_MAX_SAMPLES = 10
+
+
+def _start_stall_watchdog(tk_root: tk.Misc) -> None:
+    """
+    主线程通过 after() 周期性刷新心跳；后台线程发现心跳超过阈值未更新时，
+    用 sys._current_frames() 抓取主线程堆栈写入 logs/gui.log，定位阻塞调用。
+    """
+    if os.environ.get("RC_GUI_WATCHDOG", "").strip() not in ("1", "true", "on", "yes"):
+        return
+    try:
+        threshold = float(os.environ.get("RC_GUI_WATCHDOG_SECONDS", "") or 2.0)
+    except ValueError:
+        threshold = 2.0
+    threshold = max(0.2, threshold)
+    interval = min(0.25, threshold / 4)
+    interval_ms = max(10, int(interval * 1000))
+    main_ident = threading.main_thread().ident
+    beat = {"last": time.monotonic()}
+
+    def _heartbeat() -> None:
+        beat["last"] = time.monotonic()
+        try:
+            tk_root.after(interval_ms, _heartbeat)
+        except Exception:
+            pass
+
+    def _main_stack() -> str:
+        frame = sys._current_frames().get(main_ident)
+        if frame is None:
+            return "  <main thread not found>"
+        return "".join(traceback.format_stack(frame)).rstrip()
+
+    def _watch() -> None:
+        stalled_since = None
+        samples = 0
+        next_sample = 0.0
+        prev_tick = time.monotonic()
+        while True:
+            time.sleep(interval)
+            now = time.monotonic()
+            # 看门狗线程自身也睡过头（系统睡眠/休眠恢复）时不算卡顿
+            if now - prev_tick > interval + threshold:
+                beat["last"] = now
+            prev_tick = now
+            lag = now - beat["last"]
+            if lag < threshold:
+                if stalled_since is not None:
+                    gui_log("WARN", f"GUI event loop recovered after {now - stalled_since:.2f}s stall")
+                    stalled_since = None
+                continue
+            if stalled_since is None:
+                stalled_since = beat["last"]
+                samples = 0
+                next_sample = now
+            if samples < _WATCHDOG_MAX_SAMPLES and now >= next_sample:
+                samples += 1
+                next_sample = now + threshold
+                gui_log(
+                    "WARN",
+                    f"GUI event loop stalled for {lag:.2f}s (sample {samples}), main thread stack:\n{_main_stack()}",
+                )
+
+    tk_root.after(interval_ms, _heartbeat)
+    threading.Thread(target=_watch, name="rc-gui-watchdog", daemon=True).start()
+    gui_log("INFO", f"GUI stall watchdog enabled (threshold {threshold:.2f}s)")
+
+# ----------------------------
+# 日志查看器：增量跟踪 main.log / tray.log
+# ----------------------------
+
+# 保留的最近日志条数（环形缓冲与文本框行数的上限）
+LOG_VIEW_CAPACITY = 5000
+# 每个日志文件单次最多读取的字节数，避免一次读取占用事件循环过久
+LOG_VIEW_READ_BYTES = 256 * 1024
+LOG_VIEW_POLL_MS = 500
+
+_LOG_VIEW: dict | None = None
+
+
+def _log_view_paths() -> dict:
+    """来源名 -> 日志路径；托盘无权写安装目录时改写 %LOCALAPPDATA%\\Remote-Controls\\logs\\tray.log。"""
+    logs_dir = os.path.join(appdata_dir, "logs")
+    tray = os.path.join(logs_dir, "tray.log")
+    local = os.environ.get("LOCALAPPDATA", "")
+    fallback = os.path.join(local, "Remote-Controls", "logs", "tray.log") if local else ""
+    try:
+        if fallback and os.path.exists(fallback):
+            if not os.path.exists(tray) or os.path.getmtime(fallback) > os.path.getmtime(tray):
+                tray = fallback
+    except OSError:
+        pass
+    return {"main": os.path.join(logs_dir, "main.log"), "tray": tray}
+
+
+def _log_view_topics() -> list:
+    try:
+        return rc_router.Router(config).topics
+    except Exception:
+        return []
+
+
+def open_log_viewer() -> None:
+    """
+    English: Live log panel that tails RC-main/RC-tray logs incrementally with level and topic filters
+    中文: 日志查看器：after() 定时从上次的偏移增量读取，最近记录存入环形缓冲；切换筛选走索引，新记录只追加到末尾
+    """
+    global _LOG_VIEW
+    lv = _LOG_VIEW
+    try:
+        if lv is not None and lv["window"].winfo_exists():
+            lv["buffer"].set_topics(_log_view_topics())
+            lv["window"].deiconify()
+            lv["window"].lift()
+            lv["schedule"](0)
+            return
+    except Exception:
+        pass
+
+    win = tk.Toplevel(root)
+    win.title(t("日志"))
+    w, h = _scaled_size(win, 900, 560)
+    win.geometry(f"{w}x{h}")
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(1, weight=1)
+
+    buffer = rc_log.LogBuffer(LOG_VIEW_CAPACITY, _log_view_topics())
+    readers = {name: rc_log.LogReader(path) for name, path in _log_view_paths().items()}
+    # shown：文本框中每一行对应的记录序号（提示行使用它前一条记录的序号，随之一起淘汰）
+    state: dict = {"after": None, "shown": deque(), "truncations": {name: 0 for name in readers}}
+
+    bar = ttk.Frame(win)
+    bar.grid(row=0, column=0, columnspan=2, sticky="ew", padx=_PADX, pady=_PADY)
+    level_vars = {level: tk.IntVar(value=1) for level in ("INFO", "WARN", "ERROR")}
+    for level, var in level_vars.items():
+        ttk.Checkbutton(bar, text=level, variable=var, command=lambda: _render_all()).pack(side="left", padx=(0, 6))
+    ttk.Label(bar, text=t("主题：")).pack(side="left", padx=(12, 0))
+    topic_var = tk.StringVar()
+
+    def _topic_values() -> None:
+        counts = buffer.topic_counts()
+        topic_box["values"] = [""] + sorted(counts, key=lambda k: (-counts[k], k))
+
+    topic_box = ttk.Combobox(bar, textvariable=topic_var, width=_scaled_width(32), postcommand=_topic_values)
+    topic_box.pack(side="left")
+    topic_box.bind("<<ComboboxSelected>>", lambda _e: _render_all())
+    topic_box.bind("<Return>", lambda _e: _render_all())
+    topic_box.bind("<Escape>", lambda _e: (topic_var.set(""), _render_all()))
+    ttk.Button(bar, text=t("清空"), command=lambda: (buffer.clear(), _render_all())).pack(side="right")
+    ttk.Button(bar, text=t("统计"), command=lambda: open_log_analytics(win)).pack(side="right", padx=(0, 6))
+    ttk.Button(
+        bar, text=t("打开日志文件夹"), command=lambda: os.startfile(os.path.dirname(readers["main"].path))
+    ).pack(side="right", padx=(0, 6))
+
+    txt = tk.Text(win, wrap="word", undo=False, relief="flat", padx=6, pady=4, state=tk.DISABLED)
+    vsb = ttk.Scrollbar(win, orient="vertical", command=txt.yview)
+    txt.configure(yscrollcommand=vsb.set)
+    txt.grid(row=1, column=0, sticky="nsew", padx=(_PADX, 0))
+    vsb.grid(row=1, column=1, sticky="ns", padx=(0, _PADX))
+    txt.tag_configure("WARN", foreground="#d35400")
+    txt.tag_configure("ERROR", foreground="#c0392b")
+    txt.tag_configure("note", foreground="#808080")
+    status_var = tk.StringVar(value="")
+    ttk.Label(win, textvariable=status_var).grid(row=2, column=0, columnspan=2, sticky="w", padx=_PADX, pady=_PADY)
+
+    def _filters() -> tuple:
+        levels = {level for level, var in level_vars.items() if var.get()}
+        return (None if len(levels) == len(level_vars) else levels), (topic_var.get().strip() or None)
+
+    def _format(entry: rc_log.LogEntry) -> str:
+        rec = entry.record
+        if rec.continued:
+            return f"    {rec.message}\n"
+        ms = int(round((rec.time or 0.0) * 1000))
+        stamp = time.strftime("%m-%d %H:%M:%S", time.localtime(ms // 1000)) + f".{ms % 1000:03d}"
+        return f"{stamp} {entry.source:<4} {rec.level:<5} {rec.message}\n"
+
+    def _insert(items: list) -> None:
+        """items: [(序号, 文本, 样式)]；一次 insert 追加，超出容量时只删除顶部的旧行。"""
+        if not items:
+            return
+        at_bottom = txt.yview()[1] >= 0.999
+        shown: deque = state["shown"]
+        args: list = []
+        for seq, text, tag in items:
+            args.extend((text, (tag,)))
+            shown.append(seq)
+        drop = 0
+        while drop < len(shown) and (len(shown) - drop > LOG_VIEW_CAPACITY or shown[drop] < buffer.first):
+            drop += 1
+        txt.configure(state=tk.NORMAL)
+        txt.insert("end", *args)
+        if drop:
+            for _ in range(drop):
+                shown.popleft()
+            txt.delete("1.0", f"{drop + 1}.0")
+        txt.configure(state=tk.DISABLED)
+        # 只有视图原本停在底部时才跟随滚动，向上翻看时不打扰
+        if at_bottom:
+            txt.see("end")
+
+    def _update_status() -> None:
+        parts = [
+            f"{os.path.basename(r.path)}: {t('未找到')}" for r in readers.values() if not os.path.exists(r.path)
+        ]
+        parts.append(t("显示 {shown} 条 / 共 {total} 条").format(shown=len(state["shown"]), total=len(buffer)))
+        status_var.set("    ".join(parts))
+
+    def _render_all() -> None:
+        levels, topic = _filters()
+        txt.configure(state=tk.NORMAL)
+        txt.delete("1.0", "end")
+        txt.configure(state=tk.DISABLED)
+        state["shown"].clear()
+        _insert([(e.seq, _format(e), e.record.level) for e in buffer.select(levels, topic)])
+        txt.see("end")
+        _update_status()
+
+    def _poll() -> None:
+        state["after"] = None
+        try:
+            if not win.winfo_exists() or win.state() == "withdrawn":
+                return
+        except Exception:
+            return
+        levels, topic = _filters()
+        items: list = []
+        fresh: list = []
+        for name, reader in readers.items():
+            try:
+                records = reader.poll(LOG_VIEW_READ_BYTES)
+            except Exception:
+                records = []
+            if reader.truncations != state["truncations"][name]:
+                state["truncations"][name] = reader.truncations
+                note = t("{name} 已清空（超过 200KB），从头继续读取").format(name=os.path.basename(reader.path))
+                items.append((max(buffer.first, buffer.next - 1), f"—— {note} ——\n", "note"))
+            fresh.extend((name, rec) for rec in records)
+        # 两个文件的新记录按时间合并（稳定排序，同一文件内顺序不变）
+        fresh.sort(key=lambda pair: pair[1].time or 0.0)
+        for name, rec in fresh:
+            entry = buffer.append(name, rec)
+            if buffer.matches(entry, levels, topic):
+                items.append((entry.seq, _format(entry), rec.level))
+        _insert(items)
+        _update_status()
+        _schedule(LOG_VIEW_POLL_MS)
+
+    def _schedule(delay_ms: int) -> None:
+        if state["after"] is not None:
+            try:
+                win.after_cancel(state["after"])
+            except Exception:
+                pass
+        state["after"] = win.after(delay_ms, _poll)
+
+    def _on_close() -> None:
+        # 隐藏而不销毁：读取偏移与缓冲保留，再次打开只读取新增内容
+        if state["after"] is not None:
+            try:
+                win.after_cancel(state["after"])
+            except Exception:
+                pass
+            state["after"] = None
+        win.withdraw()
+
+    win.protocol("WM_DELETE_WINDOW", _on_close)
+    register_lang_observer(lambda: apply_language_to_widgets(win), owner=win)
+    _LOG_VIEW = {"window": win, "buffer": buffer, "schedule": _schedule}
+    _schedule(0)
+
+
+def open_log_analytics(parent: tk.Misc | None = None) -> None:
+    """
+    English: Per-topic analytics over RC-main logs (message counts, payload mix, failures, action latency)
+    中文: 按主题统计日志：在后台线程解析，结果显示在表格中，可导出 CSV / JSON
+    """
+    win = tk.Toplevel(parent or root)
+    win.title(t("日志统计"))
+    w, h = _scaled_size(win, 980, 460)
+    win.geometry(f"{w}x{h}")
+    win.columnconfigure(0, weight=1)
+    win.rowconfigure(1, weight=1)
+    state: dict = {"analyzer": None}
+
+    # (列, 标题, 宽度)；on/off/on#N/off#N 为 payload 原文，不翻译
+    columns = (
+        ("topic", "主题", 220), ("messages", "消息数", 70),
+        *((kind, "", 60 if "#" in kind else 50) for kind in rc_analytics.PAYLOAD_KINDS),
+        ("other", "其它", 50), ("failures", "失败", 50), ("failure_rate", "失败率", 70),
+        ("action_p50_ms", "首条动作 p50 (ms)", 120), ("action_p90_ms", "首条动作 p90 (ms)", 120),
+        ("done_p90_ms", "处理完成 p90 (ms)", 120), ("done_max_ms", "处理完成最大 (ms)", 120),
+    )
+    tree = ttk.Treeview(win, columns=[c[0] for c in columns], show="headings", height=16)
+    for col, title, width in columns:
+        tree.heading(col, text=t(title) if title else col)
+        tree.column(col, width=_scaled_width(width), stretch=(col == "topic"), anchor="w" if col == "topic" else "e")
+    tree.tag_configure("error", foreground="#c0392b")
+    vsb = ttk.Scrollbar(win, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=vsb.set)
+    tree.grid(row=1, column=0, sticky="nsew", padx=(_PADX, 0))
+    vsb.grid(row=1, column=1, sticky="ns", padx=(0, _PADX))
+    status_var = tk.StringVar(value="")
+    ttk.Label(win, textvariable=status_var).grid(row=2, column=0, columnspan=2, sticky="w", padx=_PADX, pady=_PADY)
+
+    bar = ttk.Frame(win)
+    bar.grid(row=0, column=0, columnspan=2, sticky="ew", padx=_PADX, pady=_PADY)
+    buttons = [
+        ttk.Button(bar, text=t("分析当前日志"), command=lambda: _run([_log_view_paths()["main"]])),
+        ttk.Button(bar, text=t("选择日志文件…"), command=lambda: _choose()),
+        ttk.Button(bar, text=t("导出 CSV"), command=lambda: _export("csv")),
+        ttk.Button(bar, text=t("导出 JSON"), command=lambda: _export("json")),
+    ]
+    for i, btn in enumerate(buttons):
+        btn.pack(side="left", padx=(0 if i == 0 else 6, 0))
+
+    def _show(analyzer: rc_analytics.Analyzer, paths: list, elapsed: float) -> None:
+        tree.delete(*tree.get_children())
+        for row in analyzer.rows():
+            values = [f"{row[col] * 100:.1f}%" if col == "failure_rate" else row[col] for col, _title, _width in columns]
+            tree.insert("", "end", values=values, tags=("error",) if row["failures"] else ())
+        status_var.set(
+            t("{files} 个文件，{lines} 行，{topics} 个主题，用时 {sec:.1f} 秒").format(
+                files=len(paths), lines=analyzer.lines, topics=len(analyzer.topics), sec=elapsed
+            )
+        )
+
+    def _run(paths: list) -> None:
+        for btn in buttons:
+            btn.state(["disabled"])
+        status_var.set(t("正在分析…"))
+        started = time.perf_counter()
+
+        def _done(result: Any, err: BaseException | None) -> None:
+            try:
+                if not win.winfo_exists():
+                    return
+            except Exception:
+                return
+            for btn in buttons:
+                btn.state(["!disabled"])
+            if err is not None:
+                status_var.set(f"{t('分析失败')}: {err}")
+                return
+            state["analyzer"] = result
+            _show(result, paths, time.perf_counter() - started)
+
+        _run_in_background(win, lambda: rc_analytics.analyze_files(paths), _done)
+
+    def _choose() -> None:
+        paths = filedialog.askopenfilenames(
+            parent=win,
+            initialdir=os.path.dirname(_log_view_paths()["main"]),
+            filetypes=[(t("日志文件"), "*.log *.txt"), (t("所有文件"), "*.*")],
+        )
+        if paths:
+            _run(list(paths))
+
+    def _export(kind: str) -> None:
+        analyzer = state["analyzer"]
+        if analyzer is None:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=win, defaultextension=f".{kind}", initialfile=f"rc-log-stats.{kind}",
+            filetypes=[(kind.upper(), f"*.{kind}")],
+        )
+        if not path:
+            return
+        try:
+            if kind == "csv":
+                analyzer.write_csv(path)
+            else:
+                analyzer.write_json(path)
+        except Exception as e:
+            messagebox.showerror(t("错误"), str(e), parent=win)
+            return
+        status_var.set(f"{t('已导出：')}{path}")
+
+    register_lang_observer(lambda: apply_language_to_widgets(win), owner=win)
+    _run([_log_view_paths()["main"]])
+
+
 # 尝试读取配置文件
 config: Dict[str, Any] = {}
 
@@ -3946,13 +5255,7 @@ root.columnconfigure(0, weight=1)
 
 # 主界面统一内边距（根据系统缩放自动调整）
 def _base_pad() -> tuple[int, int]:
-    try:
-        scale = float(root.tk.call("tk", "scaling"))
-        if scale <= 0:
-            scale = 1.0
-    except Exception:
-        scale = 1.0
-    return max(4, int(10 * scale)), max(3, int(6 * scale))
+    return _pad(10, 6, 4, 3)
 
 _PADX, _PADY = _base_pad()
 
@@ -4386,6 +5689,8 @@ def open_builtin_settings():
         adv_win.resizable(True, True)
         adv_win.transient(win)
         adv_win.grab_set()
+        # 预先启动一个 PowerShell 工作进程，测试按钮无需等待进程启动
+        _ps_pool().warm()
         
         # 设置自适应框架
         adv_win.columnconfigure(0, weight=1)
@@ -4430,6 +5735,17 @@ def open_builtin_settings():
         else:
             wmi_var.set(1)
 
+        def _run_brightness_ps_test(ps_cmd: str, success_msg: str) -> None:
+            def _on_done(res, err) -> None:
+                if err is not None:
+                    messagebox.showerror(t("测试失败"), f"执行测试时出错:\n{err}", parent=adv_win)
+                elif not res.ok:
+                    messagebox.showerror(t("测试失败"), f"执行测试时出错:\n{_format_ps_result(res)}", parent=adv_win)
+                else:
+                    messagebox.showinfo(t("测试成功"), success_msg, parent=adv_win)
+
+            _run_in_background(adv_win, lambda: _ps_pool().run(ps_cmd, timeout=60.0), _on_done)
+
         def test_brightness_method(method):
             val = simpledialog.askinteger(t("测试亮度"), t("请输入亮度值 (0-100):"), 
                                          parent=adv_win, minvalue=0, maxvalue=100)
@@ -4460,12 +5776,10 @@ def open_builtin_settings():
                         }}
                         Write-Host 'Success'
                     }} catch {{
-                        [Console]::Error.WriteLine("WMI Failed: $($_.Exception.Message)");
-                        exit 1;
+                        throw "WMI Failed: $($_.Exception.Message)"
                     }}
                     """
-                    subprocess.run(["powershell", "-Command", ps_cmd], capture_output=True, check=True)
-                    messagebox.showinfo(t("测试成功"), f"WMI 亮度已设置为 {val}%")
+                    _run_brightness_ps_test(ps_cmd, f"WMI 亮度已设置为 {val}%")
 
                 elif method == "dxva2":
                     target_str = dxva2_target.get().strip()
@@ -4523,8 +5837,8 @@ def open_builtin_settings():
                     }}
                     [MonitorControl]::SetBrightness({val}, {target_idx})
                     """
-                    subprocess.run(["powershell", "-Command", ps_cmd], capture_output=True, check=True)
-                    messagebox.showinfo(t("测试成功"), f"Dxva2 亮度已设置为 {val}%")
+                    # 常驻进程中 MonitorControl 只编译一次，之后的测试直接复用
+                    _run_brightness_ps_test(ps_cmd, f"Dxva2 亮度已设置为 {val}%")
 
                 elif method == "twinkle_tray":
                     if not messagebox.askokcancel(t("确认测试"), t("请先确保 Twinkle Tray 正在运行后再测试，否则将未响应，可退出Twinkle Tray解决")):
@@ -4564,12 +5878,14 @@ def open_builtin_settings():
         wmi_row.pack(fill="x", pady=2)
         ttk.Checkbutton(wmi_row, text=t("WMI (系统 WMI 接口)"), variable=wmi_var).pack(side="left")
         ttk.Button(wmi_row, text=t("测试"), width=5, command=lambda: test_brightness_method("wmi")).pack(side="left", padx=10)
+        ttk.Label(wmi_row, text=_brightness_backend_hint("wmi"), foreground="gray").pack(side="left")
 
         # Dxva2 row
         dxva2_row = ttk.Frame(cb_frame)
         dxva2_row.pack(fill="x", pady=2)
         ttk.Checkbutton(dxva2_row, text=t("Dxva2 (物理显示器 DDC/CI)"), variable=dxva2_var).pack(side="left")
         ttk.Button(dxva2_row, text=t("测试"), width=5, command=lambda: test_brightness_method("dxva2")).pack(side="left", padx=10)
+        ttk.Label(dxva2_row, text=_brightness_backend_hint("dxva2"), foreground="gray").pack(side="left")
 
         # Twinkle Tray row
         tt_row = ttk.Frame(cb_frame)
@@ -4577,6 +5893,7 @@ def open_builtin_settings():
         tt_cb = ttk.Checkbutton(tt_row, text=t("Twinkle Tray (第三方接口)"), variable=tt_var)
         tt_cb.pack(side="left")
         ttk.Button(tt_row, text=t("测试"), width=5, command=lambda: test_brightness_method("twinkle_tray")).pack(side="left", padx=10)
+        ttk.Label(tt_row, text=_brightness_backend_hint("twinkle_tray"), foreground="gray").pack(side="left")
         
         adv_row += 1
 
@@ -4966,7 +6283,7 @@ def open_builtin_settings():
             except Exception:
                 pass
 
-        register_lang_observer(lambda: (_apply_lang_to_adv_win(), apply_language_to_widgets(adv_win)))
+        register_lang_observer(lambda: (_apply_lang_to_adv_win(), apply_language_to_widgets(adv_win)), owner=adv_win)
         _apply_lang_to_adv_win()
         apply_language_to_widgets(adv_win)
 
@@ -5171,7 +6488,7 @@ def open_builtin_settings():
         except Exception:
             pass
 
-    register_lang_observer(lambda: (_apply_lang_to_builtin_win(), apply_language_to_widgets(win)))
+    register_lang_observer(lambda: (_apply_lang_to_builtin_win(), apply_language_to_widgets(win)), owner=win)
     _apply_lang_to_builtin_win()
     apply_language_to_widgets(win)
 
@@ -5193,11 +6510,15 @@ sleep_status_message = ""
 brightness_disabled = False
 brightness_status_message = ""
 sleep()
+_apply_brightness_capability()
 
-for idx, theme in enumerate(builtin_themes):
+
+def _build_builtin_theme_row(idx: int, theme: dict) -> None:
+    """生成内置主题的一行（勾选框 + 名称输入框）；先移除该行已有的控件，便于能力状态变化后重建。"""
     theme_key = theme["key"]
-    theme["name_var"].set(config.get(theme_key, ""))
-    theme["checked"].set(config.get(f"{theme_key}_checked", 0))
+    for column in (0, 1, 2):
+        for w in theme_frame.grid_slaves(row=idx + 1, column=column):
+            w.destroy()
     if theme_key == "sleep" and sleep_disabled:
         theme["checked"].set(0)
         theme["name_var"].set("")
@@ -5225,13 +6546,60 @@ for idx, theme in enumerate(builtin_themes):
             row=idx + 1, column=2, sticky="ew", padx=_PADX, pady=_PADY
         )
 
+
+for idx, theme in enumerate(builtin_themes):
+    theme_key = theme["key"]
+    theme["name_var"].set(config.get(theme_key, ""))
+    theme["checked"].set(config.get(f"{theme_key}_checked", 0))
+    _build_builtin_theme_row(idx, theme)
+
+
+def _on_capabilities_changed(changed: dict) -> None:
+    """后台探测结果与缓存不同时更新全局状态，睡眠可用性变化则重建该行。"""
+    global sleep_disabled, sleep_status_message
+    if "brightness" in changed:
+        _apply_brightness_capability()
+    if "sleep" in changed and config.get("test", 0) != 1:
+        was_disabled = sleep_disabled
+        sleep_disabled = bool(changed["sleep"]["disabled"])
+        sleep_status_message = str(changed["sleep"]["message"])
+        if sleep_disabled != was_disabled:
+            for idx, theme in enumerate(builtin_themes):
+                if theme["key"] == "sleep":
+                    if not sleep_disabled:
+                        theme["name_var"].set(config.get("sleep", ""))
+                        theme["checked"].set(config.get("sleep_checked", 0))
+                    _build_builtin_theme_row(idx, theme)
+
+
+# 界面显示后再在后台刷新过期的能力探测（首次运行时包括亮度接口）
+root.after(1500, lambda: _refresh_capabilities(_on_capabilities_changed))
+
 # 自定义主题列表
 custom_themes: List[Dict[str, Any]] = []
 
-# 自定义主题列表组件
-custom_theme_tree = ttk.Treeview(theme_frame, columns=("theme",), show="headings")
+# 自定义主题列表组件（虚拟列表：只生成可见行，滚动条由模型驱动）
+custom_theme_box = ttk.Frame(theme_frame)
+custom_theme_box.grid(row=1, column=3, rowspan=5, pady=_PADY, padx=_PADX, sticky="nsew")
+custom_theme_search_row = ttk.Frame(custom_theme_box)
+custom_theme_search_row.pack(side="top", fill="x", pady=(0, 4))
+ttk.Label(custom_theme_search_row, text=t("搜索：")).pack(side="left")
+custom_theme_search_var = tk.StringVar()
+custom_theme_search_entry = ttk.Entry(custom_theme_search_row, textvariable=custom_theme_search_var)
+custom_theme_search_entry.pack(side="left", fill="x", expand=True)
+custom_theme_tree = ttk.Treeview(custom_theme_box, columns=("theme",), show="headings", selectmode="browse")
 custom_theme_tree.heading("theme", text=t("双击即可修改"))
-custom_theme_tree.grid(row=1, column=3, rowspan=5, pady=_PADY, padx=_PADX, sticky="nsew")
+custom_theme_vsb = ttk.Scrollbar(custom_theme_box, orient="vertical")
+custom_theme_vsb.pack(side="right", fill="y")
+custom_theme_tree.pack(side="left", fill="both", expand=True)
+custom_theme_view = _make_virtual_theme_list(custom_theme_tree, custom_theme_vsb)
+# 行文本含“开/关”、检索文本含类型译名，切换语言时重新索引并生成可见行
+register_lang_observer(lambda: custom_theme_view["set_rows"](custom_themes))
+
+custom_theme_search_var.trace_add(
+    "write", lambda *_: custom_theme_view["set_filter"](custom_theme_search_var.get())
+)
+custom_theme_search_entry.bind("<Escape>", lambda _e: custom_theme_search_var.set(""))
 
 # 刷新主题配置按钮
 ttk.Button(theme_frame, text=t("刷新"), command=refresh_custom_themes).grid(
@@ -5243,7 +6611,8 @@ ttk.Button(theme_frame, text=t("更多"), command=open_builtin_settings).grid(ro
 custom_btn_frame = ttk.Frame(theme_frame)
 custom_btn_frame.grid(row=6, column=3, sticky="ew")
 ttk.Button(custom_btn_frame, text=t("添加"), command=lambda: add_custom_theme(config)).pack(side="left", expand=True, fill="x", padx=(_PADX, 4), pady=_PADY)
-ttk.Button(custom_btn_frame, text=t("修改"), command=lambda: modify_custom_theme()).pack(side="left", expand=True, fill="x", padx=(4, _PADX), pady=_PADY)
+ttk.Button(custom_btn_frame, text=t("修改"), command=lambda: modify_custom_theme()).pack(side="left", expand=True, fill="x", padx=4, pady=_PADY)
+ttk.Button(custom_btn_frame, text=t("全部检查"), command=check_all_themes).pack(side="left", expand=True, fill="x", padx=(4, _PADX), pady=_PADY)
 
 # 绑定鼠标双击事件到自定义主题列表
 custom_theme_tree.bind("<Double-Button-1>", on_double_click)
@@ -5255,15 +6624,19 @@ button_frame.grid_rowconfigure(0, weight=1)
 button_frame.grid_columnconfigure(0, weight=1)
 button_frame.grid_columnconfigure(1, weight=1)
 button_frame.grid_columnconfigure(2, weight=1)
+button_frame.grid_columnconfigure(3, weight=1)
 
 ttk.Button(button_frame, text=t("打开配置文件夹"), command=lambda:os.startfile(appdata_dir)).grid(
     row=0, column=0, padx=_PADX, pady=_PADY, sticky="e"
 )
+ttk.Button(button_frame, text=t("查看日志"), command=open_log_viewer).grid(
+    row=0, column=1, padx=_PADX, pady=_PADY
+)
 ttk.Button(button_frame, text=t("保存配置文件"), command=generate_config).grid(
-    row=0, column=1, padx=_PADX, pady=_PADY, sticky="w"
+    row=0, column=2, padx=_PADX, pady=_PADY, sticky="w"
 )
 ttk.Button(button_frame, text=t("取消"), command=lambda:root.destroy()).grid(
-    row=0, column=2, padx=_PADX, pady=_PADY, sticky="w"
+    row=0, column=3, padx=_PADX, pady=_PADY, sticky="w"
 )
 
 # 设置窗口在窗口大小变化时，框架自动扩展
@@ -5284,5 +6657,11 @@ startup_admin_check()
 # 初始应用一次语言（确保 LabelFrame/heading/按钮在英文模式下生效）
 _apply_language_everywhere()
 
+# 可选：事件循环卡顿看门狗
+_start_stall_watchdog(root)
+
+# 由提权重启拉起时，进入事件循环后通知旧实例退出
+root.after_idle(signal_restart_ready)
+
 root.mainloop()
 
@@ -0,0 +1,345 @@
+"""按 topic 统计 RC-main 日志：消息数、payload 分布、失败次数、收到 → 动作日志的耗时
+
+主程序收到消息时先记一行“收到 MQTT 消息 topic='…' payload='…'”，随后在处理过程中记录动作日志
+（“命令开启：…”“PowerShell 执行出错 …”等，多数不含 topic）。这里把一条“收到”之后、下一条“收到”之前
+（且不超过 SESSION_SECONDS，也没有遇到 MQTT 连接、配置重载等分发之外的日志）的日志都归入该消息：
+- 第一条动作日志的时间 → “首条动作”耗时；最后一条 → “处理完成”耗时（例如 PowerShell 出错的回报）；
+- 其中出现 WARN / ERROR 即记为一次失败。
+耗时用固定分桶的直方图累计，每个 topic 只占常数内存；日志由 rc_log.LogReader 流式读取。
+
+    python rc_analytics.py logs/main.log [更多日志...] [--csv out.csv] [--json out.json]
+    python rc_analytics.py --self-check
+"""
+import csv
+import json
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import rc_log
+
+# 直方图分桶上界（毫秒），最后一个桶为“大于最大上界”
+HIST_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+_BUCKET_LABELS = [f"<={b}" for b in HIST_BOUNDS_MS] + [f">{HIST_BOUNDS_MS[-1]}"]
+# 一条消息的日志最多归并的时长（秒）；超过后的日志不再计入该消息。
+# 动作日志通常在几百毫秒内写出（PowerShell 出错的回报要等进程退出），窗口过长会把空闲时的无关警告算成失败
+SESSION_SECONDS = 10.0
+# 主程序在消息分发之外写的日志（见 rc_mqtt.c / main.c / rc_config_watcher.c）：遇到即结束当前消息
+_OUTSIDE_DISPATCH_PREFIXES = (
+    "MQTT(Paho)",
+    "MQTT starting",
+    "MQTT 启动",
+    "RC-main 启动",
+    "Router ready",
+    "路由已就绪",
+    "检测到配置文件变化",
+    "配置文件",
+    "检测到 config.toml",
+)
+
+_VALUE_PAYLOAD_RE = re.compile(r"^(\w+)#-?\d+$")
+
+# payload_kind 的取值（other 除外）；CSV / JSON / 界面表格按同一组列统计
+PAYLOAD_KINDS = ("on", "off", "on#N", "off#N")
+
+CSV_FIELDS = (
+    "topic", "messages", "on", "off", "on#N", "off#N", "other", "failures", "failure_rate",
+    "action_p50_ms", "action_p90_ms", "action_max_ms", "done_p50_ms", "done_p90_ms", "done_max_ms",
+)
+
+
+def payload_kind(payload: str) -> str:
+    """on / off 原样，on#50 / off#20 这类归为 on#N / off#N，其它为 other。"""
+    p = payload.strip().lower()
+    if p in ("on", "off"):
+        return p
+    m = _VALUE_PAYLOAD_RE.match(p)
+    if m and m.group(1) in ("on", "off"):
+        return m.group(1) + "#N"
+    return "other"
+
+
+class Histogram:
+    """固定分桶的耗时直方图（毫秒）；百分位取所在桶的上界（溢出桶取最大值）。"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(HIST_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        ms = max(0.0, ms)
+        for i, bound in enumerate(HIST_BOUNDS_MS):
+            if ms <= bound:
+                break
+        else:
+            i = len(HIST_BOUNDS_MS)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(self.count * pct / 100.0)))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(float(HIST_BOUNDS_MS[i]), self.max) if i < len(HIST_BOUNDS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "max_ms": round(self.max, 1),
+            "buckets": {label: n for label, n in zip(_BUCKET_LABELS, self.counts) if n},
+        }
+
+
+class TopicStats:
+    __slots__ = ("topic", "messages", "payloads", "failures", "action", "done")
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.messages = 0
+        self.payloads: Dict[str, int] = {}
+        self.failures = 0
+        self.action = Histogram()  # 收到 → 第一条动作日志
+        self.done = Histogram()  # 收到 → 最后一条归入该消息的日志
+
+    def row(self) -> dict:
+        return {
+            "topic": self.topic,
+            "messages": self.messages,
+            **{k: self.payloads.get(k, 0) for k in PAYLOAD_KINDS},
+            "other": self.messages - sum(self.payloads.get(k, 0) for k in PAYLOAD_KINDS),
+            "failures": self.failures,
+            "failure_rate": round(self.failures / self.messages, 4) if self.messages else 0.0,
+            "action_p50_ms": self.action.percentile(50),
+            "action_p90_ms": self.action.percentile(90),
+            "action_max_ms": round(self.action.max, 1),
+            "done_p50_ms": self.done.percentile(50),
+            "done_p90_ms": self.done.percentile(90),
+            "done_max_ms": round(self.done.max, 1),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "messages": self.messages,
+            "payloads": dict(self.payloads),
+            "failures": self.failures,
+            "action": self.action.to_dict(),
+            "done": self.done.to_dict(),
+        }
+
+
+class Analyzer:
+    """
+    English: Single-pass per-topic aggregation over a parsed RC-main log stream
+    中文: 单遍扫描日志记录，按 topic 累计统计；可多次 feed 不同文件，最后调用 finish()
+    """
+
+    def __init__(self, session_seconds: float = SESSION_SECONDS):
+        self.session_seconds = session_seconds
+        self.topics: Dict[str, TopicStats] = {}
+        self.lines = 0
+        self.unattributed: Dict[str, int] = {}  # 不属于任何消息的日志，按级别计数
+        self.truncations = 0
+        self._open: Optional[list] = None  # [统计, 收到时间, 第一条动作时间, 最后时间, 是否失败]
+
+    def _close(self) -> None:
+        cur = self._open
+        self._open = None
+        if cur is None:
+            return
+        stats, t0, first, last, failed = cur
+        if first is not None:
+            stats.action.add((first - t0) * 1000.0)
+            stats.done.add((last - t0) * 1000.0)
+        if failed:
+            stats.failures += 1
+
+    def feed(self, rec: rc_log.Record) -> None:
+        self.lines += 1
+        received = None if rec.continued else rc_log.parse_receive(rec.message)
+        if received is not None:
+            self._close()
+            topic, payload = received
+            stats = self.topics.get(topic)
+            if stats is None:
+                stats = self.topics[topic] = TopicStats(topic)
+            stats.messages += 1
+            kind = payload_kind(payload)
+            stats.payloads[kind] = stats.payloads.get(kind, 0) + 1
+            self._open = [stats, rec.time or 0.0, None, None, False]
+            return
+        if not rec.continued and rec.message.startswith(_OUTSIDE_DISPATCH_PREFIXES):
+            self._close()
+        cur = self._open
+        if cur is not None and rec.time is not None and rec.time - cur[1] > self.session_seconds:
+            self._close()
+            cur = None
+        if cur is None:
+            self.unattributed[rec.level] = self.unattributed.get(rec.level, 0) + 1
+            return
+        if rec.time is not None:
+            if cur[2] is None:
+                cur[2] = rec.time
+            cur[3] = rec.time
+        if rec.level in ("WARN", "ERROR"):
+            cur[4] = True
+
+    def feed_file(self, path: str) -> None:
+        """流式读取整个文件；不同文件之间不跨文件归并。"""
+        reader = rc_log.LogReader(path)
+        feed = self.feed
+        for rec in reader.records():
+            feed(rec)
+        self.truncations += reader.truncations
+        self._close()
+
+    def finish(self) -> "Analyzer":
+        self._close()
+        return self
+
+    def rows(self) -> List[dict]:
+        """按消息数从多到少。"""
+        stats = sorted(self.topics.values(), key=lambda s: (-s.messages, s.topic))
+        return [s.row() for s in stats]
+
+    def to_dict(self) -> dict:
+        return {
+            "lines": self.lines,
+            "unattributed": dict(self.unattributed),
+            "hist_bounds_ms": list(HIST_BOUNDS_MS),
+            "topics": {s.topic: s.to_dict() for s in sorted(self.topics.values(), key=lambda s: -s.messages)},
+        }
+
+    def write_csv(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def analyze_files(paths: Iterable[str]) -> Analyzer:
+    analyzer = Analyzer()
+    for path in paths:
+        analyzer.feed_file(path)
+    return analyzer.finish()
+
+
+def _self_check() -> None:
+    import os
+    import tempfile
+
+    base = time.mktime((2025, 1, 2, 3, 4, 5, 0, 0, -1))
+
+    def _line(t: float, level: str, msg: str) -> str:
+        ms = int(round(t * 1000))
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ms // 1000)) + f".{ms % 1000:03d} [{level}] {msg}\n"
+
+    lines = [
+        _line(base, "INFO", "MQTT 连接成功"),
+        _line(base + 1.000, "INFO", "收到 MQTT 消息 topic='pc/cmd' payload='on' (len=2)"),
+        _line(base + 1.004, "INFO", "命令开启：pc/cmd (window=show)"),
+        _line(base + 1.500, "ERROR", "PowerShell 执行出错 (exit=1): boom"),
+        _line(base + 2.000, "INFO", "收到 MQTT 消息 topic='pc/cmd' payload='on#30' (len=5)"),
+        _line(base + 2.010, "INFO", "命令开启：pc/cmd (window=show)"),
+        _line(base + 3.000, "INFO", "MQTT message topic='pc/vol' payload='off' (len=3)"),
+        _line(base + 3.001, "INFO", "音量：静音"),
+        _line(base + 4.000, "INFO", "收到 MQTT 消息 topic='pc/vol' payload='pause' (len=5)"),
+        _line(base + 4.001, "WARN", "已忽略 payload：pause (topic=pc/vol)"),
+        _line(base + 5.000, "INFO", "收到 MQTT 消息 topic='pc/bri' payload='off#20' (len=6)"),
+        _line(base + 5.500, "WARN", "MQTT(Paho) 已断开连接"),  # 连接层日志：结束上一条消息，不算失败
+        _line(base + 6.000, "INFO", "收到 MQTT 消息 topic='pc/bri' payload='on' (len=2)"),
+        _line(base + 6.001, "INFO", "亮度：on"),
+        _line(base + 30.00, "WARN", "亮度平滑：接口未响应"),  # 超过 SESSION_SECONDS 的无关警告
+        _line(base + 100.0, "INFO", "配置已重新加载"),  # 超过 SESSION_SECONDS，不归入上一条消息
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "main.log")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        a = analyze_files([path])
+        rows = {r["topic"]: r for r in a.rows()}
+        cmd, vol = rows["pc/cmd"], rows["pc/vol"]
+        assert [r["topic"] for r in a.rows()] == ["pc/bri", "pc/cmd", "pc/vol"]  # 消息数相同时按 topic 排序
+        bri = rows["pc/bri"]
+        assert (bri["off#N"], bri["on"], bri["other"], bri["failures"]) == (1, 1, 0, 0), bri
+        assert bri["done_max_ms"] == 1.0, bri  # 30 秒后的警告不计入“处理完成”耗时
+        assert (cmd["messages"], cmd["on"], cmd["on#N"], cmd["failures"]) == (2, 1, 1, 1), cmd
+        assert cmd["action_p50_ms"] == 5 and cmd["action_max_ms"] == 10.0 and cmd["done_max_ms"] == 500.0, cmd
+        assert (vol["off"], vol["other"], vol["failures"], vol["failure_rate"]) == (1, 1, 1, 0.5), vol
+        assert a.unattributed == {"INFO": 2, "WARN": 2} and a.lines == len(lines), a.unattributed
+        a.write_csv(os.path.join(tmp, "out.csv"))
+        a.write_json(os.path.join(tmp, "out.json"))
+        with open(os.path.join(tmp, "out.csv"), encoding="utf-8-sig") as f:
+            csv_rows = {r["topic"]: r for r in csv.DictReader(f)}
+        assert csv_rows["pc/bri"]["off#N"] == "1" and csv_rows["pc/cmd"]["on#N"] == "1", csv_rows
+        with open(os.path.join(tmp, "out.json"), encoding="utf-8") as f:
+            topics = json.load(f)["topics"]
+        assert topics["pc/cmd"]["action"]["buckets"] == {"<=5": 1, "<=10": 1}
+        assert topics["pc/bri"]["payloads"] == {"off#N": 1, "on": 1}, topics["pc/bri"]
+
+        # 吞吐：约 30MB 日志
+        big = os.path.join(tmp, "big.log")
+        block = "".join(
+            _line(base + i * 0.01, "INFO", f"收到 MQTT 消息 topic='bench/t{i % 20}' payload='on#{i % 100}' (len=5)")
+            + _line(base + i * 0.01 + 0.002, "INFO", f"命令开启：bench/t{i % 20} (window=show)")
+            for i in range(10000)
+        ).encode("utf-8")
+        with open(big, "wb") as f:
+            for _ in range(20):
+                f.write(block)
+        t0 = time.perf_counter()
+        a = analyze_files([big])
+        dt = time.perf_counter() - t0
+        print(f"{a.lines} lines, {os.path.getsize(big) / 1e6:.1f} MB in {dt:.2f}s")
+        assert sum(r["messages"] for r in a.rows()) == 200000
+    print("rc_analytics self-check OK")
+
+
+def main(argv: List[str]) -> int:
+    if "--self-check" in argv:
+        _self_check()
+        return 0
+    paths: List[str] = []
+    out = {"--csv": None, "--json": None}
+    it = iter(argv)
+    for arg in it:
+        if arg in out:
+            out[arg] = next(it, None)
+        else:
+            paths.append(arg)
+    if not paths:
+        print(__doc__)
+        return 2
+    a = analyze_files(paths)
+    if out["--csv"]:
+        a.write_csv(out["--csv"])
+    if out["--json"]:
+        a.write_json(out["--json"])
+    print(f"{'topic':<32} {'msgs':>6} {'fail':>5} {'act p50':>8} {'act p90':>8} {'done p90':>9}")
+    for r in a.rows():
+        print(
+            f"{r['topic']:<32} {r['messages']:>6} {r['failures']:>5} {r['action_p50_ms']:>8.0f}"
+            f" {r['action_p90_ms']:>8.0f} {r['done_p90_ms']:>9.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,310 @@
+"""应用程序索引（主题编辑窗口“选择程序”用）
+
+后台遍历配置的根目录（开始菜单、Program Files、用户添加的文件夹），收集可执行文件与快捷方式，
+.lnk 的目标通过可替换的 resolver 解析。索引连同每个目录的 mtime 一起保存到 JSON：
+再次扫描时目录 mtime 未变则直接复用上次的文件列表（不再 listdir、不再解析快捷方式），
+只重新读取发生变化的目录。
+
+说明：目录 mtime 只在其直接子项增删/改名时变化，所以仍需逐级 stat 子目录，但 stat 远比
+listdir + 解析 .lnk 便宜。原地修改快捷方式的目标不会被发现，可在界面中“重建索引”。
+
+不依赖 Windows，可在任意平台对构造的目录树自测：
+    python rc_appindex.py
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+INDEX_VERSION = 1
+# 收录的文件类型（小写）
+APP_EXTENSIONS = (".exe", ".lnk", ".bat", ".cmd", ".ps1")
+# 不收录的文件名前缀（卸载程序等）
+SKIP_NAME_PREFIXES = ("unins", "uninstall", "setup", "install", "update")
+# 跳过的目录名（小写）：体积大且几乎没有用户会选的程序
+SKIP_DIR_NAMES = {"windowsapps", "common files", "windows defender", "windows nt", "__pycache__", "node_modules", "$recycle.bin"}
+# 每个根目录向下遍历的最大层数（开始菜单很浅，Program Files 下的深层多为运行库）
+DEFAULT_MAX_DEPTH = 4
+
+# resolver(.lnk 路径) -> 目标路径；无法解析时返回 None
+LinkResolver = Callable[[str], Optional[str]]
+
+
+class AppEntry(NamedTuple):
+    name: str  # 显示名（去掉扩展名）
+    path: str  # 文件路径（快捷方式为 .lnk 本身）
+    target: str  # 快捷方式的目标，其它文件与 path 相同
+
+
+def default_roots() -> List[str]:
+    """Windows 上的默认根目录（开始菜单优先）；不存在的目录会在扫描时跳过。"""
+    env = os.environ.get
+    roots = [
+        os.path.join(env("APPDATA", ""), "Microsoft", "Windows", "Start Menu", "Programs"),
+        os.path.join(env("ProgramData", ""), "Microsoft", "Windows", "Start Menu", "Programs"),
+        os.path.join(env("LOCALAPPDATA", ""), "Programs"),
+        env("ProgramFiles", ""),
+        env("ProgramFiles(x86)", ""),
+    ]
+    out: List[str] = []
+    for r in roots:
+        if r and os.path.isabs(r) and r not in out:
+            out.append(r)
+    return out
+
+
+def shell_link_resolver() -> LinkResolver:
+    """使用 WScript.Shell 解析 .lnk（每个线程需要自己初始化 COM）。非 Windows 返回总是 None 的解析器。"""
+    try:
+        import pythoncom
+        import win32com.client
+    except Exception:
+        return lambda _path: None
+    local = threading.local()
+
+    def _resolve(path: str) -> Optional[str]:
+        shell = getattr(local, "shell", None)
+        if shell is None:
+            pythoncom.CoInitialize()
+            shell = local.shell = win32com.client.Dispatch("WScript.Shell")
+        try:
+            target = shell.CreateShortcut(path).TargetPath
+        except Exception:
+            return None
+        return target or None
+
+    return _resolve
+
+
+def _wanted_file(name: str) -> bool:
+    low = name.lower()
+    if not low.endswith(APP_EXTENSIONS):
+        return False
+    return not low.startswith(SKIP_NAME_PREFIXES)
+
+
+class AppIndex:
+    """
+    English: Incremental, persisted index of launchable files under a set of roots (thread-safe reads)
+    中文: 按目录 mtime 增量更新并持久化的应用索引；refresh 在后台线程调用，entries/search 可随时读取
+    """
+
+    def __init__(
+        self,
+        roots: List[str],
+        cache_path: Optional[str] = None,
+        resolver: Optional[LinkResolver] = None,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+    ):
+        self.roots = list(roots)
+        self.cache_path = cache_path
+        self._resolver = resolver or (lambda _path: None)
+        self._max_depth = max_depth
+        self._lock = threading.Lock()
+        # 目录 -> {"mtime", "files": [[name, path, target]], "dirs": [子目录]}
+        self._dirs: Dict[str, dict] = {}
+        self._entries: List[AppEntry] = []
+        self.stats = {"dirs": 0, "rescanned": 0, "resolved": 0, "seconds": 0.0}
+        self.load()
+
+    # ---- 持久化 ----
+
+    def load(self) -> bool:
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION or not isinstance(data.get("dirs"), dict):
+                return False
+        except Exception:
+            return False
+        with self._lock:
+            self._dirs = data["dirs"]
+            self._entries = self._collect(self._dirs)
+        return True
+
+    def save(self, roots: Optional[List[str]] = None) -> None:
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = {"version": INDEX_VERSION, "roots": list(roots or self.roots), "dirs": self._dirs}
+        tmp = self.cache_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_path)
+        except Exception:
+            pass
+
+    # ---- 扫描 ----
+
+    def _scan_dir(self, path: str, mtime: float) -> dict:
+        files = []
+        dirs = []
+        try:
+            with os.scandir(path) as it:
+                for de in it:
+                    try:
+                        if de.is_dir(follow_symlinks=False):
+                            if de.name.lower() not in SKIP_DIR_NAMES:
+                                dirs.append(de.path)
+                        elif de.is_file() and _wanted_file(de.name):
+                            target = de.path
+                            if de.name.lower().endswith(".lnk"):
+                                target = self._resolver(de.path) or ""
+                                self.stats["resolved"] += 1
+                            files.append([os.path.splitext(de.name)[0], de.path, target])
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return {"mtime": mtime, "files": files, "dirs": sorted(dirs)}
+
+    def refresh(self, full: bool = False, roots: Optional[List[str]] = None) -> bool:
+        """
+        扫描所有根目录；只重新读取 mtime 变化的目录。返回索引内容是否有变化。
+        roots 为本轮扫描的根目录副本（由调用线程传入，扫描期间 self.roots 被替换也不受影响）。
+        """
+        roots = list(self.roots if roots is None else roots)
+        start = time.perf_counter()
+        self.stats["resolved"] = 0
+        with self._lock:
+            old = {} if full else dict(self._dirs)
+        new: Dict[str, dict] = {}
+        changed = False
+        rescanned = 0
+        stack = [(root, 0) for root in reversed(roots)]
+        while stack:
+            path, depth = stack.pop()
+            if path in new:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                changed = changed or path in old
+                continue
+            entry = old.get(path)
+            if entry is None or entry.get("mtime") != mtime:
+                entry = self._scan_dir(path, mtime)
+                rescanned += 1
+                changed = True
+            new[path] = entry
+            if depth < self._max_depth:
+                for sub in reversed(entry["dirs"]):
+                    stack.append((sub, depth + 1))
+        if set(old) - set(new):
+            changed = True
+        entries = self._collect(new, roots)
+        with self._lock:
+            self._dirs = new
+            self._entries = entries
+        self.stats.update(dirs=len(new), rescanned=rescanned, seconds=round(time.perf_counter() - start, 3))
+        if changed:
+            self.save(roots)
+        return changed
+
+    def _collect(self, dirs: Dict[str, dict], roots: Optional[List[str]] = None) -> List[AppEntry]:
+        # 同一目标只保留一项，开始菜单（根目录靠前）的快捷方式优先
+        order = {r: i for i, r in enumerate(roots or self.roots)}
+
+        def _root_rank(path: str) -> int:
+            for r, i in order.items():
+                if path == r or path.startswith(r.rstrip("\\/") + os.sep):
+                    return i
+            return len(order)
+
+        seen = set()
+        out: List[AppEntry] = []
+        for d in sorted(dirs, key=lambda p: (_root_rank(p), p)):
+            for name, path, target in dirs[d].get("files", []):
+                key = (target or path).lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                out.append(AppEntry(name, path, target))
+        return out
+
+    # ---- 查询 ----
+
+    def entries(self) -> List[AppEntry]:
+        with self._lock:
+            return list(self._entries)
+
+    def search(self, query: str, limit: int = 200) -> List[AppEntry]:
+        """空格分隔的多个词需同时命中名称或路径；名称以查询开头的排在前面。"""
+        terms = query.lower().split()
+        entries = self.entries()
+        if not terms:
+            return entries[:limit]
+        scored = []
+        for i, e in enumerate(entries):
+            name = e.name.lower()
+            hay = name + "\n" + e.path.lower() + "\n" + e.target.lower()
+            if not all(term in hay for term in terms):
+                continue
+            if name.startswith(terms[0]):
+                rank = 0
+            elif all(term in name for term in terms):
+                rank = 1
+            else:
+                rank = 2
+            scored.append((rank, i, e))
+        scored.sort(key=lambda x: (x[0], x[1]))
+        return [e for _, _, e in scored[:limit]]
+
+
+if __name__ == "__main__":
+    # 自检：构造目录树，验证首次扫描、增量扫描（只重扫变化的目录）、快捷方式解析与持久化
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        menu = os.path.join(tmp, "Start Menu")
+        pf = os.path.join(tmp, "Program Files")
+        for d in (os.path.join(menu, "Tools"), os.path.join(pf, "App", "bin"), os.path.join(pf, "Common Files")):
+            os.makedirs(d)
+        for f in (
+            os.path.join(menu, "Tools", "Editor.lnk"),
+            os.path.join(pf, "App", "bin", "editor.exe"),
+            os.path.join(pf, "App", "unins000.exe"),
+            os.path.join(pf, "App", "readme.txt"),
+            os.path.join(pf, "Common Files", "x.exe"),
+        ):
+            open(f, "w").close()
+        editor_exe = os.path.join(pf, "App", "bin", "editor.exe")
+        calls: List[str] = []
+
+        def _resolver(path: str) -> Optional[str]:
+            calls.append(path)
+            return editor_exe
+
+        cache = os.path.join(tmp, "index.json")
+        idx = AppIndex([menu, pf], cache, _resolver)
+        assert idx.refresh()
+        names = [e.name for e in idx.entries()]
+        assert names == ["Editor"], names  # editor.exe 与快捷方式目标相同，只保留开始菜单中的那项
+        assert len(calls) == 1
+
+        idx2 = AppIndex([menu, pf], cache, _resolver)
+        assert [e.name for e in idx2.entries()] == ["Editor"]  # 从缓存加载
+        assert not idx2.refresh() and idx2.stats["rescanned"] == 0 and len(calls) == 1
+
+        time.sleep(0.01)
+        new_dir = os.path.join(pf, "Other")
+        os.makedirs(new_dir)
+        open(os.path.join(new_dir, "other.exe"), "w").close()
+        assert idx2.refresh()
+        assert idx2.stats["rescanned"] == 2, idx2.stats  # Program Files 与新目录
+        assert [e.name for e in idx2.search("oth")] == ["other"]
+        assert [e.name for e in idx2.search("app editor")] == ["Editor"]  # 命中目标路径
+
+        # 扫描使用调用时传入的根目录副本；之后新增的根目录由下一轮扫描收录
+        extra = os.path.join(tmp, "Extra")
+        os.makedirs(extra)
+        open(os.path.join(extra, "zeta.exe"), "w").close()
+        snapshot = list(idx2.roots)
+        idx2.roots = idx2.roots + [extra]
+        assert not idx2.refresh(roots=snapshot) and not idx2.search("zeta")
+        assert idx2.refresh() and [e.name for e in idx2.search("zeta")] == ["zeta"]
+        print(f"rc_appindex self-check OK ({idx2.stats})")
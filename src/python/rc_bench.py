@@ -0,0 +1,293 @@
+"""自定义主题的命令延迟基准测试
+
+按 RC-main 的方式（见 rc_command）重复执行“命令”或“程序或脚本”主题的 on/off 动作，统计：
+- cold：本轮第一次执行（磁盘/模块缓存尚未预热）；
+- warm：其余各次的 p50 / p95 / max；
+- spawn：以相同参数启动空命令的耗时，即进程启动开销；net = warm p50 - spawn p50。
+
+结果按主题追加保存到配置目录下的 RC-bench.json，便于修改命令前后对比。
+spawn 函数可替换（例如在没有 PowerShell 的环境中自测）。
+"""
+import hashlib
+import json
+import os
+import subprocess
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import rc_command
+
+BENCH_FILE_NAME = "RC-bench.json"
+# 每个主题/动作最多保留的历史记录条数
+BENCH_HISTORY_LIMIT = 20
+# 测量进程启动开销时最多执行的空命令次数
+BASELINE_MAX_RUNS = 5
+
+# 结果中的说明文字（保存为中文原文，显示时由界面翻译）
+NOTE_NO_EXIT = "显示窗口模式：测试时未加 -NoExit"
+NOTE_SHELL_OPEN = "ShellExecute：只统计到启动调用返回"
+
+# spawn(命令行或路径, 创建标志, 超时秒数, 是否 ShellExecute) -> 耗时毫秒；超时抛 subprocess.TimeoutExpired
+SpawnFunc = Callable[[str, int, float, bool], float]
+
+
+class BenchmarkError(Exception):
+    """主题无法按主程序方式执行（类型不支持、动作为空或路径不安全）。"""
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """线性插值百分位；空列表返回 0。"""
+    if not samples:
+        return 0.0
+    data = sorted(samples)
+    if len(data) == 1:
+        return data[0]
+    k = (len(data) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(samples),
+        "p50": round(percentile(samples, 50), 1),
+        "p95": round(percentile(samples, 95), 1),
+        "max": round(max(samples), 1) if samples else 0.0,
+    }
+
+
+def default_spawn(cmdline: str, flags: int, timeout: float, shell_open: bool) -> float:
+    """启动进程并等待其退出（ShellExecute 方式只计到调用返回），返回耗时毫秒。"""
+    start = time.perf_counter()
+    if shell_open:
+        os.startfile(cmdline)  # type: ignore[attr-defined]
+        return (time.perf_counter() - start) * 1000.0
+    proc = subprocess.Popen(cmdline, creationflags=flags)
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        raise
+    return (time.perf_counter() - start) * 1000.0
+
+
+def build_plan(theme: Dict[str, Any], action: str = "on") -> Dict[str, Any]:
+    """
+    按主程序规则把主题的 on/off 动作展开为启动计划：
+    {"cmdline", "flags", "shell_open", "template", "baseline", "value_range", "note"}
+    """
+    ttype = theme.get("type", "")
+    if action == "off":
+        raw = str(theme.get("off_value", "") or "")
+    else:
+        raw = str(theme.get("on_value", "") or theme.get("value", "") or "")
+    if not raw.strip():
+        raise BenchmarkError("动作为空：只有自定义命令/路径可以测试")
+
+    if ttype == "命令":
+        hide, _keep = rc_command.command_window_mode(theme.get("window", "show"))
+        flags = rc_command.powershell_creationflags(hide)
+        # 显示窗口模式下主程序会加 -NoExit 保留窗口，进程不会退出；测试时不保留窗口以便计时
+        return {
+            "template": raw,
+            "flags": flags,
+            "shell_open": False,
+            "hide": hide,
+            "baseline": "powershell.exe " + rc_command.powershell_args("", hide, False),
+            "value_range": (int(theme.get("value_min", 0) or 0), int(theme.get("value_max", 100) or 100))
+            if "{value}" in raw
+            else None,
+            "note": "" if hide else NOTE_NO_EXIT,
+        }
+    if ttype == "程序或脚本":
+        launch = rc_command.program_launch(raw)
+        if launch is None:
+            raise BenchmarkError("路径为空或包含引号/控制字符，主程序会拒绝执行")
+        exe, args = launch
+        if exe is None:
+            return {
+                "template": raw,
+                "cmdline": args,
+                "flags": 0,
+                "shell_open": True,
+                "baseline": None,
+                "value_range": None,
+                "note": NOTE_SHELL_OPEN,
+            }
+        baseline = "powershell.exe " + rc_command.powershell_args("", True, False) if exe == "powershell.exe" else "cmd.exe /c rem"
+        return {
+            "template": raw,
+            "cmdline": f"{exe} {args}",
+            "flags": rc_command.CREATE_NO_WINDOW,
+            "shell_open": False,
+            "baseline": baseline,
+            "value_range": None,
+            "note": "",
+        }
+    raise BenchmarkError("只支持“命令”和“程序或脚本”类型")
+
+
+def _cmdline_for(plan: Dict[str, Any], value: Optional[int]) -> str:
+    if "cmdline" in plan:
+        return plan["cmdline"]
+    norm = rc_command.prepare_command(plan["template"], value).normalized
+    return "powershell.exe " + rc_command.powershell_args(norm, plan["hide"], False)
+
+
+def sweep_values(value_range: Optional[tuple], iterations: int) -> List[Optional[int]]:
+    """把 value_min..value_max 均匀分布到各次执行；没有 {value} 时全部为 None。"""
+    if not value_range:
+        return [None] * iterations
+    lo, hi = value_range
+    if lo > hi:
+        lo, hi = hi, lo
+    if iterations == 1:
+        return [lo]
+    return [round(lo + (hi - lo) * i / (iterations - 1)) for i in range(iterations)]
+
+
+def run_benchmark(
+    theme: Dict[str, Any],
+    action: str = "on",
+    iterations: int = 10,
+    sweep: bool = True,
+    timeout: float = 30.0,
+    spawn: Optional[SpawnFunc] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """执行基准测试并返回可直接保存的结果字典。"""
+    spawn = spawn or default_spawn
+    iterations = max(1, int(iterations))
+    plan = build_plan(theme, action)
+    values = sweep_values(plan["value_range"] if sweep else None, iterations)
+    if not sweep and plan["value_range"]:
+        values = [plan["value_range"][0]] * iterations
+
+    baseline_runs = min(BASELINE_MAX_RUNS, iterations) if plan["baseline"] else 0
+    total = iterations + baseline_runs
+    samples: List[float] = []
+    failures = 0
+    for i, value in enumerate(values):
+        try:
+            samples.append(spawn(_cmdline_for(plan, value), plan["flags"], timeout, plan["shell_open"]))
+        except Exception:
+            failures += 1
+        if progress:
+            progress(i + 1, total)
+
+    # 空命令放在最后执行，避免提前预热影响 cold 数据
+    baseline: List[float] = []
+    for i in range(baseline_runs):
+        try:
+            baseline.append(spawn(plan["baseline"], plan["flags"], timeout, False))
+        except Exception:
+            pass
+        if progress:
+            progress(iterations + i + 1, total)
+
+    cold = samples[:1]
+    warm = samples[1:]
+    spawn_stats = summarize(baseline) if baseline else None
+    warm_stats = summarize(warm)
+    net = None
+    if spawn_stats and warm:
+        net = round(max(0.0, warm_stats["p50"] - spawn_stats["p50"]), 1)
+    sample_cmd = _cmdline_for(plan, values[0])
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "action": action,
+        "iterations": iterations,
+        "failures": failures,
+        "cold_ms": round(cold[0], 1) if cold else None,
+        "warm": warm_stats,
+        "spawn": spawn_stats,
+        "net_p50_ms": net,
+        "values": [values[0], values[-1]] if plan["value_range"] else None,
+        "command": sample_cmd,
+        "command_sha1": hashlib.sha1(plan["template"].encode("utf-8")).hexdigest()[:12],
+        "note": plan["note"],
+    }
+
+
+def bench_key(theme: Dict[str, Any], action: str) -> str:
+    return f"{theme.get('type', '')}|{theme.get('name', '')}|{action}"
+
+
+def load_history(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_result(path: str, key: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """追加保存结果（原子写入），返回该主题上一次的结果用于对比。"""
+    data = load_history(path)
+    history = data.get(key) if isinstance(data.get(key), list) else []
+    previous = history[-1] if history else None
+    history.append(result)
+    data[key] = history[-BENCH_HISTORY_LIMIT:]
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return previous
+
+
+def format_report(
+    result: Dict[str, Any],
+    previous: Optional[Dict[str, Any]] = None,
+    translate: Callable[[str], str] = lambda s: s,
+) -> List[str]:
+    """把结果整理为多行文本（界面显示用）；translate 用于翻译说明文字（界面传入 t）。"""
+    lines = [f"> {result['command']}"]
+    if result.get("values"):
+        lines.append(f"{{value}}: {result['values'][0]} .. {result['values'][1]}")
+    lines.append(f"iterations: {result['iterations']}  failures: {result['failures']}")
+    if result.get("cold_ms") is not None:
+        lines.append(f"cold: {result['cold_ms']:.1f} ms")
+    w = result["warm"]
+    if w["n"]:
+        lines.append(f"warm: p50 {w['p50']:.1f} ms  p95 {w['p95']:.1f} ms  max {w['max']:.1f} ms  (n={w['n']})")
+    s = result.get("spawn")
+    if s:
+        lines.append(f"spawn: p50 {s['p50']:.1f} ms  p95 {s['p95']:.1f} ms  (n={s['n']})")
+    if result.get("net_p50_ms") is not None:
+        lines.append(f"net (warm p50 - spawn p50): {result['net_p50_ms']:.1f} ms")
+    if result.get("note"):
+        lines.append(translate(result["note"]))
+    if previous and previous.get("warm", {}).get("n") and w["n"]:
+        delta = w["p50"] - previous["warm"]["p50"]
+        changed = "" if previous.get("command_sha1") == result.get("command_sha1") else " (command changed)"
+        lines.append(f"vs {previous.get('time', '?')}: warm p50 {delta:+.1f} ms{changed}")
+    return lines
+
+
+if __name__ == "__main__":
+    # 自检：用假的 spawn 验证计划展开、{value} 扫描、统计与保存
+    import tempfile
+
+    seen: List[str] = []
+
+    def _fake_spawn(cmdline: str, flags: int, timeout: float, shell_open: bool) -> float:
+        seen.append(cmdline)
+        return 50.0 if "& {  }" in cmdline else 120.0 + len(seen)
+
+    theme = {"type": "命令", "name": "t", "on_value": 'curl "x?v={value}"', "window": "hide", "value_min": 10, "value_max": 20}
+    res = run_benchmark(theme, iterations=3, spawn=_fake_spawn)
+    assert seen[0] == 'powershell.exe -NoProfile -ExecutionPolicy Bypass -WindowStyle Hidden -NonInteractive -Command "& { curl.exe \\"x?v=10\\" }"', seen[0]
+    assert seen[2].endswith('v=20\\" }"'), seen[2]
+    assert res["cold_ms"] == 121.0 and res["warm"]["n"] == 2 and res["spawn"]["p50"] == 50.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, BENCH_FILE_NAME)
+        assert save_result(path, bench_key(theme, "on"), res) is None
+        assert save_result(path, bench_key(theme, "on"), res)["cold_ms"] == 121.0
+    assert build_plan({"type": "命令", "on_value": "x", "window": "show"})["note"] == NOTE_NO_EXIT
+    report = format_report(dict(res, note=NOTE_NO_EXIT), translate={NOTE_NO_EXIT: "window=show"}.get)
+    assert report[-1] == "window=show", report
+    print("\n".join(format_report(res, res)))
+    print("rc_bench self-check OK")
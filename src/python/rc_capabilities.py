@@ -0,0 +1,211 @@
+"""系统能力探测缓存（睡眠/休眠可用性、Twinkle Tray 路径、亮度接口）
+
+探测本身（powercfg -a、逐个路径查找 Twinkle Tray、调用亮度接口）都比较慢，而结果很少变化。
+这里按名称登记探测函数，每项带独立的 TTL，结果可序列化为字典由调用方保存
+（GUI 存在 RC-GUI.cache.json 的 "capabilities" 分区）。
+
+每项缓存在以下情况视为过期：
+- 超过 TTL（或系统时间回拨）；
+- 登记了 key 函数且其返回值与探测时不同（例如配置中的 Twinkle Tray 路径被修改）；
+- 登记了 validate 函数且缓存值已不再有效（例如缓存的 exe 已被删除）；
+- 调用了 invalidate()（例如刚执行过 powercfg /hibernate on）。
+
+过期的值仍可通过 get() 读取（启动时先用旧值，再由 refresh_stale() 在后台更新）。
+    python rc_capabilities.py
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class Probe(NamedTuple):
+    func: Callable[[], Any]  # 执行探测，返回可 JSON 序列化的值；失败时抛出异常（不写入缓存）
+    ttl: float  # 秒
+    key: Optional[Callable[[], str]] = None  # 影响探测结果的输入（如配置项），变化即过期
+    validate: Optional[Callable[[Any], bool]] = None  # 廉价的有效性检查，返回 False 即过期
+
+
+class CapabilityCache:
+    """
+    English: Persisted, per-entry TTL cache of slow system capability probes
+    中文: 按项设置 TTL 的能力探测缓存；probe/refresh_stale 可在后台线程调用，get 可随时读取
+    """
+
+    def __init__(self, probes: Dict[str, Probe]):
+        self._probes = dict(probes)
+        self._lock = threading.Lock()
+        # 名称 -> {"value", "time", "key"}
+        self._entries: Dict[str, dict] = {}
+        # 名称 -> invalidate 次数；探测期间被 invalidate 的结果照常写入，但仍视为过期
+        self._generations: Dict[str, int] = {}
+
+    # ---- 持久化 ----
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._entries.items()}
+
+    def from_dict(self, data: dict) -> None:
+        entries = {}
+        for name, entry in (data or {}).items():
+            # 只接受仍在登记中的项，结构不对的直接丢弃
+            if name in self._probes and isinstance(entry, dict) and "value" in entry:
+                try:
+                    entries[name] = {"value": entry["value"], "time": float(entry["time"]), "key": str(entry.get("key", ""))}
+                except Exception:
+                    continue
+        with self._lock:
+            self._entries = entries
+
+    # ---- 读取 ----
+
+    def has(self, name: str) -> bool:
+        with self._lock:
+            return name in self._entries
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """返回缓存值（可能已过期）；从未探测过时返回 default。"""
+        with self._lock:
+            entry = self._entries.get(name)
+        return default if entry is None else entry["value"]
+
+    def age(self, name: str) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(name)
+        return None if entry is None else max(0.0, time.time() - entry["time"])
+
+    def _key(self, probe: Probe) -> str:
+        if probe.key is None:
+            return ""
+        try:
+            return str(probe.key())
+        except Exception:
+            return ""
+
+    def is_stale(self, name: str, now: Optional[float] = None) -> bool:
+        probe = self._probes[name]
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            return True
+        now = time.time() if now is None else now
+        if now - entry["time"] >= probe.ttl or now < entry["time"]:
+            return True
+        if entry["key"] != self._key(probe):
+            return True
+        if probe.validate is not None:
+            try:
+                return not probe.validate(entry["value"])
+            except Exception:
+                return True
+        return False
+
+    def stale_names(self, now: Optional[float] = None) -> List[str]:
+        return [name for name in self._probes if self.is_stale(name, now)]
+
+    # ---- 更新 ----
+
+    def put(self, name: str, value: Any) -> None:
+        """写入在别处已得到的结果（例如“检查状态”按钮刚执行过 powercfg -a）。"""
+        probe = self._probes[name]
+        entry = {"value": value, "time": time.time(), "key": self._key(probe)}
+        with self._lock:
+            self._entries[name] = entry
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """标记一项（或全部）过期；旧值保留，下次 get() 仍可读取。"""
+        with self._lock:
+            for n in [name] if name is not None else list(self._probes):
+                self._generations[n] = self._generations.get(n, 0) + 1
+                if n in self._entries:
+                    self._entries[n]["time"] = 0.0
+
+    def probe(self, name: str) -> Any:
+        """立即执行探测并写入缓存；探测失败时保留旧值并抛出异常。"""
+        with self._lock:
+            generation = self._generations.get(name, 0)
+        value = self._probes[name].func()
+        self.put(name, value)
+        with self._lock:
+            # 探测开始后又被 invalidate（例如刚修改了系统设置）：结果可能已过时，保持过期以便再次探测
+            if self._generations.get(name, 0) != generation:
+                self._entries[name]["time"] = 0.0
+        return value
+
+    def fetch(self, name: str) -> Any:
+        """未过期时返回缓存值，否则同步探测。"""
+        if not self.is_stale(name):
+            return self.get(name)
+        return self.probe(name)
+
+    def refresh_stale(self, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """重新探测过期的项；返回值发生变化的 {名称: 新值}。单项失败不影响其它项。"""
+        changed: Dict[str, Any] = {}
+        for name in names if names is not None else list(self._probes):
+            if not self.is_stale(name):
+                continue
+            had = self.has(name)
+            old = self.get(name)
+            try:
+                value = self.probe(name)
+            except Exception:
+                continue
+            if not had or value != old:
+                changed[name] = value
+        return changed
+
+
+if __name__ == "__main__":
+    # 自检：用计数的假探测验证 TTL、key/validate 失效、invalidate、失败保留旧值与序列化
+    calls = {"a": 0, "b": 0}
+    cfg = {"path": "x"}
+    state = {"fail": False, "valid": True}
+
+    def _probe_a():
+        calls["a"] += 1
+        if state["fail"]:
+            raise RuntimeError("boom")
+        return {"n": calls["a"]}
+
+    def _probe_b():
+        calls["b"] += 1
+        return cfg["path"].upper()
+
+    cache = CapabilityCache({
+        "a": Probe(_probe_a, ttl=60),
+        "b": Probe(_probe_b, ttl=60, key=lambda: cfg["path"], validate=lambda _v: state["valid"]),
+    })
+    assert cache.get("a") is None and cache.stale_names() == ["a", "b"]
+    assert cache.refresh_stale() == {"a": {"n": 1}, "b": "X"}
+    assert cache.stale_names() == [] and cache.fetch("a") == {"n": 1} and calls["a"] == 1
+    assert cache.is_stale("a", time.time() + 61)
+
+    cfg["path"] = "y"  # key 变化
+    assert cache.stale_names() == ["b"] and cache.get("b") == "X"
+    assert cache.refresh_stale() == {"b": "Y"} and calls["b"] == 2
+    state["valid"] = False  # validate 失败
+    assert cache.is_stale("b")
+    state["valid"] = True
+    assert cache.refresh_stale() == {} and calls["b"] == 2
+
+    cache.invalidate("a")
+    state["fail"] = True
+    assert cache.refresh_stale() == {} and cache.get("a") == {"n": 1}  # 失败时保留旧值
+    state["fail"] = False
+    assert cache.refresh_stale() == {"a": {"n": 3}}
+
+    # 探测进行中被 invalidate：结果写入但仍为过期，下一轮会重新探测
+    def _probe_racing():
+        cache.invalidate("a")
+        return {"n": -1}
+
+    cache._probes["a"] = Probe(_probe_racing, ttl=60)
+    cache.invalidate("a")
+    assert cache.refresh_stale() == {"a": {"n": -1}} and cache.stale_names() == ["a"]
+    cache._probes["a"] = Probe(_probe_a, ttl=60)
+    assert cache.refresh_stale() == {"a": {"n": 4}} and cache.stale_names() == []
+
+    copy = CapabilityCache({"a": Probe(_probe_a, ttl=60), "b": Probe(_probe_b, ttl=60, key=lambda: cfg["path"])})
+    copy.from_dict(dict(cache.to_dict(), gone={"value": 1, "time": 0}))
+    assert copy.stale_names() == [] and copy.get("b") == "Y" and not copy.has("gone")
+    print("rc_capabilities self-check OK")
@@ -0,0 +1,343 @@
+"""主题配置的离线检查（“全部检查”）
+
+在不执行任何动作的前提下，找出 RC-main 收到消息时才会暴露的问题：
+- 程序或脚本：路径不存在、含引号/控制字符（主程序拒绝执行）；
+- 服务：服务名查不到（通过可替换的 service_lookup 查询）；
+- 命令：rc_command.prepare_command 的检查结果；
+- 按键(Hotkey)：map_key_token 不认识的按键名；
+- 所有主题：主题名为空、与其它已启用主题重名（主程序只会触发先匹配到的那个）。
+
+check_all 在线程池中并发检查，每完成一个主题就回调一次（回调在工作线程中执行）。
+文件存在性、服务查询与 PATH 查找均可替换，便于在非 Windows 环境下自测：
+    python rc_check.py
+"""
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import rc_command
+import rc_router
+
+STATUS_OK = "ok"
+STATUS_WARNING = "warning"
+STATUS_ERROR = "error"
+
+# service_lookup(服务名) -> True 存在 / False 不存在 / None 无法判断
+ServiceLookup = Callable[[str], Optional[bool]]
+
+
+class CheckIssue(NamedTuple):
+    level: str  # "error" / "warning"
+    message: str  # 中文说明（界面显示前经 t() 翻译）
+    detail: str = ""  # 不翻译的附加信息（路径、按键名等）
+
+
+class CheckResult(NamedTuple):
+    key: str
+    status: str
+    issues: Tuple[CheckIssue, ...]
+
+
+class CheckItem(NamedTuple):
+    key: str  # 调用方用于定位结果的标识（如行 ID）
+    kind: str  # "custom" / "builtin"
+    theme: Dict[str, Any]
+
+
+def status_of(issues: Iterable[CheckIssue]) -> str:
+    levels = {i.level for i in issues}
+    if "error" in levels:
+        return STATUS_ERROR
+    if "warning" in levels:
+        return STATUS_WARNING
+    return STATUS_OK
+
+
+# ---- 按键：与 rc_actions.c map_key_token / RC_ActionHotkey 对应 ----
+
+HOTKEY_MODIFIERS = {"ctrl", "control", "alt", "shift", "win", "meta", "super"}
+HOTKEY_NAMED_KEYS = {
+    "enter", "return", "esc", "escape", "tab", "space", "backspace", "delete", "insert",
+    "home", "end", "up", "down", "left", "right", "pageup", "pgup", "pagedown", "pgdn",
+}
+_HOTKEY_FN_RE = re.compile(r"[fF](\d+)")
+_HOTKEY_SPACE = " \t\r\n"
+
+
+def map_key_token(tok: str) -> bool:
+    """按键名能否映射为虚拟键码（单字符按 VkKeyScanA 的常见结果：可打印 ASCII）。"""
+    low = tok.lower()
+    if low in HOTKEY_MODIFIERS or low in HOTKEY_NAMED_KEYS:
+        return True
+    m = _HOTKEY_FN_RE.match(tok)
+    if m and tok[1:]:
+        # C 侧用 atoi 解析，"f5x" 也会被当作 F5
+        if 1 <= int(m.group(1)) <= 24:
+            return True
+    return len(tok) == 1 and 0x20 < ord(tok) < 0x7F
+
+
+def check_hotkey(value: str) -> List[CheckIssue]:
+    """按主程序的解析方式检查热键串。"""
+    value = value or ""
+    if not value.strip():
+        return [CheckIssue("error", "按键为空")]
+    if "+" not in value:
+        # 逐字符输入：无法映射的字符会被静默跳过
+        bad = sorted({ch for ch in value if ch not in _HOTKEY_SPACE and not map_key_token(ch)})
+        if bad:
+            return [CheckIssue("warning", "以下字符无法输入，会被跳过", " ".join(bad))]
+        return []
+    compact = "".join(ch for ch in value if ch not in _HOTKEY_SPACE)
+    tokens = [tok for tok in compact.split("+") if tok]
+    issues: List[CheckIssue] = []
+    if len(tokens) > 32:
+        issues.append(CheckIssue("warning", "组合键超过 32 个，多出的部分会被忽略"))
+        tokens = tokens[:32]
+    unknown = [tok for tok in tokens if not map_key_token(tok)]
+    typed = [tok for tok in unknown if tok.isascii() and tok.isalpha()]
+    dropped = [tok for tok in unknown if tok not in typed]
+    if typed:
+        issues.append(CheckIssue("warning", "未知按键名会被逐个字母输入", " ".join(typed)))
+    if dropped:
+        issues.append(CheckIssue("error", "未知按键名，主程序会忽略", " ".join(dropped)))
+    if tokens and all(tok.lower() in HOTKEY_MODIFIERS for tok in tokens):
+        issues.append(CheckIssue("warning", "只有修饰键，没有实际按下的键"))
+    return issues
+
+
+# ---- 路径 ----
+
+_URI_RE = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]+:")
+_DRIVE_RE = re.compile(r"^[A-Za-z]:")
+
+
+def check_program_path(
+    path: str,
+    exists: Callable[[str], bool] = os.path.exists,
+    which: Callable[[str], Optional[str]] = shutil.which,
+) -> List[CheckIssue]:
+    """按 rc_command.program_launch 的规则展开路径后检查是否存在。"""
+    launch = rc_command.program_launch(path)
+    if launch is None:
+        if not rc_command.strip_wrapping_quotes(path):
+            return [CheckIssue("error", "路径为空")]
+        return [CheckIssue("error", "路径包含引号或控制字符，主程序会拒绝执行")]
+    exe, target = launch
+    if exe is not None:
+        # .ps1/.bat/.cmd：从参数串中取回已展开的路径
+        target = target[target.index('"') + 1:-1]
+    elif _URI_RE.match(target) and not _DRIVE_RE.match(target):
+        # URL / 协议（http:、ms-settings: 等）交给 ShellExecute，不检查
+        return []
+    if "%" in target:
+        return [CheckIssue("warning", "路径中的环境变量未能展开", target)]
+    if exists(target):
+        return []
+    if not os.path.isabs(target) and not _DRIVE_RE.match(target):
+        # 相对名称：ShellExecute 还会查找 App Paths，这里只查 PATH
+        if which(target):
+            return []
+        return [CheckIssue("warning", "在 PATH 中找不到该程序", target)]
+    return [CheckIssue("error", "文件不存在", target)]
+
+
+def psutil_service_lookup(name: str) -> Optional[bool]:
+    """Windows 下通过 psutil 查询服务是否存在；其它平台返回 None。"""
+    try:
+        import psutil
+    except Exception:
+        return None
+    getter = getattr(psutil, "win_service_get", None)
+    if getter is None:
+        return None
+    try:
+        getter(name)
+        return True
+    except psutil.NoSuchProcess:
+        return False
+    except Exception:
+        return None
+
+
+class ThemeChecker:
+    """
+    English: Dry-run validator for custom and built-in themes (never executes anything)
+    中文: 主题检查器：只读取文件系统/服务列表，不执行任何动作；各查询函数均可替换
+    """
+
+    def __init__(
+        self,
+        service_lookup: Optional[ServiceLookup] = None,
+        exists: Callable[[str], bool] = os.path.exists,
+        which: Callable[[str], Optional[str]] = shutil.which,
+    ):
+        self._service_lookup = service_lookup or psutil_service_lookup
+        self._exists = exists
+        self._which = which
+
+    def _command_issues(self, cmd: str, label: str) -> List[CheckIssue]:
+        return [
+            CheckIssue(i.level, i.message, label)
+            for i in rc_command.prepare_command(cmd).issues
+        ]
+
+    def check_custom(self, theme: Dict[str, Any]) -> List[CheckIssue]:
+        ttype = theme.get("type", "")
+        on_value = str(theme.get("on_value", "") or theme.get("value", "") or "").strip()
+        off_value = str(theme.get("off_value", "") or "").strip()
+        issues: List[CheckIssue] = []
+        if ttype == "程序或脚本":
+            issues += check_program_path(on_value, self._exists, self._which)
+            if off_value:
+                issues += [i._replace(detail=f"off: {i.detail}".rstrip(": ")) for i in check_program_path(off_value, self._exists, self._which)]
+        elif ttype == "服务(需管理员权限)":
+            if not on_value:
+                issues.append(CheckIssue("error", "服务名为空"))
+            else:
+                found = self._service_lookup(on_value)
+                if found is False:
+                    issues.append(CheckIssue("error", "找不到该服务", on_value))
+                elif found is None:
+                    issues.append(CheckIssue("warning", "无法查询服务列表", on_value))
+            if off_value:
+                issues += self._command_issues(off_value, "off")
+        elif ttype == "命令":
+            if not on_value:
+                issues.append(CheckIssue("error", "命令为空"))
+            else:
+                issues += self._command_issues(on_value, "on")
+            if off_value:
+                issues += self._command_issues(off_value, "off")
+        elif ttype == "按键(Hotkey)":
+            if (theme.get("on_type") or "keyboard") == "keyboard":
+                issues += [i._replace(detail=f"on: {i.detail}".rstrip(": ")) for i in check_hotkey(str(theme.get("on_value", "")))]
+            if (theme.get("off_type") or "none") == "keyboard":
+                issues += [i._replace(detail=f"off: {i.detail}".rstrip(": ")) for i in check_hotkey(str(theme.get("off_value", "")))]
+        else:
+            issues.append(CheckIssue("error", "未知的主题类型", str(ttype)))
+        return issues
+
+    def check_builtin(self, theme: Dict[str, Any]) -> List[CheckIssue]:
+        """theme: {"name", "checked", "available"(可选), "reason"(可选)}"""
+        issues: List[CheckIssue] = []
+        if theme.get("available") is False:
+            issues.append(CheckIssue("warning" if not theme.get("checked") else "error", "该功能在本机不可用", str(theme.get("reason") or "")))
+        return issues
+
+    def check(self, item: CheckItem) -> CheckResult:
+        try:
+            if item.kind == "builtin":
+                issues = self.check_builtin(item.theme)
+            else:
+                issues = self.check_custom(item.theme)
+        except Exception as e:
+            issues = [CheckIssue("error", "检查失败", str(e))]
+        if item.theme.get("checked") and not str(item.theme.get("name", "") or "").strip():
+            issues.insert(0, CheckIssue("error", "已启用但主题名为空"))
+        return CheckResult(item.key, status_of(issues), tuple(issues))
+
+
+# 自定义主题类型 -> rc_router.DISPATCH_ORDER 中的类别
+_DISPATCH_KIND = {
+    "程序或脚本": "application",
+    "命令": "command",
+    "服务(需管理员权限)": "serve",
+    "按键(Hotkey)": "hotkey",
+}
+
+
+def _dispatch_rank(item: CheckItem) -> int:
+    kind = "builtin" if item.kind == "builtin" else _DISPATCH_KIND.get(str(item.theme.get("type", "")), "")
+    try:
+        return rc_router.DISPATCH_ORDER.index(kind)
+    except ValueError:
+        return len(rc_router.DISPATCH_ORDER)
+
+
+def duplicate_topics(items: Iterable[CheckItem]) -> Dict[str, List[CheckIssue]]:
+    """
+    已启用主题中重名的项：主程序按 应用→命令→服务→内置→热键（同类按序号）的顺序只触发先匹配到的一个。
+    会触发的那一项标为警告，其余（永远不会触发）标为错误。
+    """
+    groups: Dict[str, List[Tuple[int, int, CheckItem]]] = {}
+    for pos, item in enumerate(items):
+        name = str(item.theme.get("name", "") or "").strip()
+        if name and item.theme.get("checked"):
+            # 同一类别内 items 的顺序即配置中的序号顺序
+            groups.setdefault(name, []).append((_dispatch_rank(item), pos, item))
+    extra: Dict[str, List[CheckIssue]] = {}
+    for name, group in groups.items():
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda g: g[:2])
+        first = group[0][2]
+        other = first.theme.get("nickname") or first.theme.get("name") or first.key
+        for _rank, _pos, item in group[1:]:
+            extra.setdefault(item.key, []).append(CheckIssue("error", "主题名与其它已启用主题重复", str(other)))
+            mine = item.theme.get("nickname") or name
+            extra.setdefault(first.key, []).append(CheckIssue("warning", "主题名与其它已启用主题重复", str(mine)))
+    return extra
+
+
+def check_all(
+    items: List[CheckItem],
+    checker: Optional[ThemeChecker] = None,
+    on_result: Optional[Callable[[CheckResult], None]] = None,
+    max_workers: int = 8,
+) -> List[CheckResult]:
+    """并发检查全部主题；每个主题完成时调用 on_result（工作线程中），返回按完成顺序排列的结果。"""
+    checker = checker or ThemeChecker()
+    dups = duplicate_topics(items)
+    results: List[CheckResult] = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="rc-check") as pool:
+        futures = [pool.submit(checker.check, item) for item in items]
+        for fut in as_completed(futures):
+            res = fut.result()
+            if res.key in dups:
+                issues = res.issues + tuple(dups[res.key])
+                res = CheckResult(res.key, status_of(issues), issues)
+            results.append(res)
+            if on_result:
+                on_result(res)
+    return results
+
+
+if __name__ == "__main__":
+    # 自检：用假的文件系统与服务列表验证各类检查
+    files = {"C:\\Tools\\run.bat", "C:\\Apps\\a.exe"}
+    checker = ThemeChecker(
+        service_lookup=lambda name: {"Spooler": True}.get(name, False),
+        exists=lambda p: p in files,
+        which=lambda p: "C:\\Windows\\notepad.exe" if p.lower() == "notepad.exe" else None,
+    )
+    items = [
+        CheckItem("1", "custom", {"type": "程序或脚本", "name": "a", "checked": 1, "on_value": '"C:/Apps/a.exe"'}),
+        CheckItem("2", "custom", {"type": "程序或脚本", "name": "b", "checked": 1, "on_value": "C:\\Gone\\x.exe"}),
+        CheckItem("3", "custom", {"type": "程序或脚本", "name": "c", "checked": 1, "on_value": "notepad.exe", "off_value": "C:\\Tools\\run.bat"}),
+        CheckItem("4", "custom", {"type": "服务(需管理员权限)", "name": "d", "checked": 1, "on_value": "Spooler"}),
+        CheckItem("5", "custom", {"type": "服务(需管理员权限)", "name": "e", "checked": 1, "on_value": "Removed"}),
+        CheckItem("6", "custom", {"type": "命令", "name": "f", "checked": 1, "on_value": 'echo "x'}),
+        CheckItem("7", "custom", {"type": "按键(Hotkey)", "name": "g", "checked": 1, "on_type": "keyboard", "on_value": "ctrl+shift+f13"}),
+        CheckItem("8", "custom", {"type": "按键(Hotkey)", "name": "h", "checked": 1, "on_type": "keyboard", "on_value": "ctrl+f25"}),
+        CheckItem("9", "custom", {"type": "按键(Hotkey)", "name": "a", "checked": 1, "on_type": "keyboard", "on_value": "win+d"}),
+        CheckItem("10", "custom", {"type": "程序或脚本", "name": "", "checked": 1, "on_value": "https://example.com"}),
+        CheckItem("sleep", "builtin", {"name": "sleep", "checked": 1, "available": False, "reason": "hibernate off"}),
+    ]
+    got = {r.key: r for r in check_all(items, checker, max_workers=4)}
+    expect = {"1": "warning", "2": "error", "3": "ok", "4": "ok", "5": "error", "6": "error", "7": "ok", "8": "error", "9": "error", "10": "error", "sleep": "error"}
+    for key, status in expect.items():
+        assert got[key].status == status, (key, got[key])
+    # 重名：按主程序的匹配顺序判断谁会触发（应用先于内置，内置先于热键），与列表顺序无关
+    dups = duplicate_topics([
+        CheckItem("builtin:computer", "builtin", {"name": "pc", "checked": 1}),
+        CheckItem("hk", "custom", {"type": "按键(Hotkey)", "name": "pc", "checked": 1}),
+        CheckItem("app", "custom", {"type": "程序或脚本", "name": "pc", "checked": 1}),
+    ])
+    assert [i.level for i in dups["app"]] == ["warning", "warning"], dups
+    assert [i.level for i in dups["builtin:computer"]] == ["error"] and [i.level for i in dups["hk"]] == ["error"]
+    assert [i.message for i in check_hotkey("abc中")] == ["以下字符无法输入，会被跳过"]
+    assert [i.level for i in check_hotkey("ctrl+hello")] == ["warning"]
+    print("rc_check self-check OK")
@@ -0,0 +1,306 @@
+"""RC-main 命令执行方式的 Python 对照实现
+
+与 src/main 中的 C 实现逐条对应，供 GUI 的基准测试等功能按“主程序的方式”启动命令：
+- apply_value_placeholder      <-> rc_router.c apply_value_placeholder
+- normalize_powershell_command <-> rc_router.c normalize_powershell_command
+- powershell_args              <-> rc_actions.c RC_ActionRunPowershellCommandUtf8Ex
+- program_launch               <-> rc_actions.c RC_ActionRunProgramUtf8
+
+prepare_command 把“替换 {value} -> 规范化 -> 检查”合成一条带缓存的流水线，GUI 的预览、测试与保存共用。
+与 C 实现的一致性由 rc_command_golden.json 固定（scripts/gen_command_golden.py 编译 C 源码生成），
+修改 C 侧行为时请同步这里并重新生成语料：
+    python rc_command.py
+"""
+import functools
+import json
+import os
+import re
+from typing import NamedTuple, Optional, Tuple
+
+# Windows 进程创建标志（非 Windows 平台上 subprocess 没有这些常量）
+CREATE_NEW_CONSOLE = 0x00000010
+CREATE_NEW_PROCESS_GROUP = 0x00000200
+CREATE_NO_WINDOW = 0x08000000
+
+# 主程序拼接 PowerShell 参数的缓冲区长度（wchar_t，含结尾 NUL）；超出时命令不会被执行
+POWERSHELL_ARGS_CAP = 8192
+
+GOLDEN_FILE_NAME = "rc_command_golden.json"
+
+
+def apply_value_placeholder(cmd: str, value: Optional[int]) -> str:
+    """把 {value} 替换为整数值；value 为 None（payload 不带 #数值）时原样返回。"""
+    cmd = cmd or ""
+    if value is None:
+        return cmd
+    return cmd.replace("{value}", "%d" % int(value))
+
+
+def clamp_value(value: int, lo: int, hi: int) -> int:
+    """与主程序一致：min/max 写反时先交换，越界时钳制到范围内。"""
+    if lo > hi:
+        lo, hi = hi, lo
+    return max(lo, min(hi, int(value)))
+
+
+def normalize_powershell_command(cmd: str) -> str:
+    """只把开头的 "curl " / "curl\\t"（不区分大小写）换成 curl.exe，避免命中 Invoke-WebRequest 别名。"""
+    cmd = cmd or ""
+    if cmd[:5].lower() in ("curl ", "curl\t"):
+        return "curl.exe" + cmd[4:]
+    return cmd
+
+
+def escape_quotes_for_cmdline(s: str) -> str:
+    """把 '"' 转义为 '\\"'，与 dup_and_escape_quotes_for_cmdline 相同。"""
+    return (s or "").replace('"', '\\"')
+
+
+def powershell_args(cmd: str, hide: bool, keep: bool) -> str:
+    """返回主程序传给 powershell.exe 的参数串（不含可执行文件名）。"""
+    escaped = escape_quotes_for_cmdline(cmd)
+    if keep:
+        return f'-NoProfile -ExecutionPolicy Bypass -NoExit -Command "& {{ {escaped} }}"'
+    if hide:
+        return f'-NoProfile -ExecutionPolicy Bypass -WindowStyle Hidden -NonInteractive -Command "& {{ {escaped} }}"'
+    return f'-NoProfile -ExecutionPolicy Bypass -Command "& {{ {escaped} }}"'
+
+
+def powershell_args_fit(args: str) -> bool:
+    """参数串能否放入主程序的缓冲区（按 UTF-16 码元计数）。"""
+    return len(args.encode("utf-16-le")) // 2 < POWERSHELL_ARGS_CAP
+
+
+def powershell_creationflags(hide: bool) -> int:
+    """create_process_ex(hideWindow, newConsole=!hide, newProcessGroup=true) 对应的标志。"""
+    flags = CREATE_NEW_PROCESS_GROUP
+    flags |= CREATE_NO_WINDOW if hide else CREATE_NEW_CONSOLE
+    return flags
+
+
+def command_window_mode(window: str) -> Tuple[bool, bool]:
+    """commandN_window -> (hide, keep)：hide 时隐藏且不保留窗口，其它值按 show 处理。"""
+    hide = (window or "show").lower() == "hide"
+    return hide, not hide
+
+
+def strip_wrapping_quotes(s: str) -> str:
+    """去掉两端空白及一层包裹的 "..." 或 '...'。"""
+    p = (s or "").lstrip(" \t\r\n").rstrip(" \t\r\n")
+    if len(p) >= 2 and ((p[0] == '"' and p[-1] == '"') or (p[0] == "'" and p[-1] == "'")):
+        p = p[1:-1]
+    return p
+
+
+def contains_cmdline_unsafe_chars(s: str) -> bool:
+    return any(ch == '"' or ord(ch) < 0x20 for ch in s)
+
+
+def program_launch(path: str) -> Optional[Tuple[Optional[str], str]]:
+    """
+    主程序启动程序/脚本的方式：
+    - .ps1      -> ("powershell.exe", '-NoProfile -ExecutionPolicy Bypass -File "<path>"')，隐藏窗口
+    - .bat/.cmd -> ("cmd.exe", '/c "<path>"')，隐藏窗口
+    - 其它      -> (None, <path>)，表示 ShellExecute("open")
+    路径为空或含引号/控制字符时返回 None（主程序同样拒绝执行）。
+    """
+    p = strip_wrapping_quotes(path)
+    if not p:
+        return None
+    p = p.replace("/", "\\")
+    # 与 file_ext_lower(tmp) 一致：在展开环境变量之前取最后一个 '.' 起的子串（不区分目录部分），
+    # 因此 %X% 即使指向 .ps1，主程序也按 ShellExecute 打开
+    dot = p.rfind(".")
+    ext = p[dot:].lower() if dot >= 0 else ""
+    p = os.path.expandvars(p)
+    if contains_cmdline_unsafe_chars(p):
+        return None
+    if ext == ".ps1":
+        return "powershell.exe", f'-NoProfile -ExecutionPolicy Bypass -File "{p}"'
+    if ext in (".bat", ".cmd"):
+        return "cmd.exe", f'/c "{p}"'
+    return None, p
+
+
+class LintIssue(NamedTuple):
+    code: str  # 规则编号，如 "curl-alias"
+    level: str  # "error"：主程序不会按预期执行；"warning"：可能有问题
+    message: str  # 中文说明（界面显示前经 t() 翻译）
+
+
+class PreparedCommand(NamedTuple):
+    source: str
+    value: Optional[int]
+    applied: str  # 替换 {value} 后
+    normalized: str  # 规范化后，即主程序交给 PowerShell 的命令
+    issues: Tuple[LintIssue, ...]
+
+    @property
+    def errors(self) -> Tuple[LintIssue, ...]:
+        return tuple(i for i in self.issues if i.level == "error")
+
+
+# 规范化后仍以裸 curl 调用的位置（会命中 Invoke-WebRequest 别名）
+_CURL_ALIAS_RE = re.compile(r"(?<![\w.$-])curl(?![\w.-])", re.IGNORECASE)
+# 写法接近但不会被替换的占位符，如 {Value}、{ value }
+_PLACEHOLDER_LIKE_RE = re.compile(r"\{\s*value\s*\}", re.IGNORECASE)
+_HERE_STRING_TAIL_RE = re.compile(r"[ \t]*\r?\n")
+
+
+def _scan_quotes(cmd: str) -> list:
+    """
+    粗略模拟 PowerShell 的引号规则，返回发现的问题：
+    - "..." 内反引号转义下一个字符，'...' 内 '' 表示单引号；
+    - here-string 的 @" / @' 后必须直接换行，结束标记 "@ / '@ 必须位于行首；
+    - 字符串外的 # 开始行注释，<# ... #> 为块注释。
+    """
+    issues = []
+    i, n = 0, len(cmd)
+    while i < n:
+        ch = cmd[i]
+        if ch == "`":
+            i += 2
+            continue
+        if ch == "<" and cmd.startswith("<#", i):
+            end = cmd.find("#>", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if ch == "#" and (i == 0 or cmd[i - 1] in " \t\r\n;"):
+            end = cmd.find("\n", i)
+            i = n if end < 0 else end + 1
+            continue
+        if ch == "@" and i + 1 < n and cmd[i + 1] in "\"'":
+            q = cmd[i + 1]
+            tail = _HERE_STRING_TAIL_RE.match(cmd, i + 2)
+            if not tail:
+                issues.append(LintIssue("here-string", "error", "here-string 的 @" + q + " 后必须直接换行"))
+                return issues
+            close = re.compile(r"^" + re.escape(q) + "@", re.MULTILINE).search(cmd, tail.end())
+            if not close:
+                issues.append(LintIssue("here-string", "error", "here-string 缺少位于行首的结束标记 " + q + "@"))
+                return issues
+            i = close.end()
+            continue
+        if ch in "\"'":
+            j = i + 1
+            while j < n:
+                c = cmd[j]
+                if ch == '"' and c == "`":
+                    j += 2
+                    continue
+                if c == ch:
+                    if j + 1 < n and cmd[j + 1] == ch:  # "" 或 '' 转义
+                        j += 2
+                        continue
+                    break
+                j += 1
+            if j >= n:
+                issues.append(LintIssue("unbalanced-quote", "error", "引号未闭合：" + ch))
+                return issues
+            i = j + 1
+            continue
+        i += 1
+    return issues
+
+
+def _lint_command(source: str, normalized: str) -> list:
+    issues = []
+    if _CURL_ALIAS_RE.search(normalized):
+        issues.append(
+            LintIssue("curl-alias", "warning", "curl 只有位于命令开头时才会被改写为 curl.exe，其它位置会调用 Invoke-WebRequest，请写成 curl.exe")
+        )
+    for m in _PLACEHOLDER_LIKE_RE.finditer(source):
+        if m.group(0) != "{value}":
+            issues.append(LintIssue("placeholder", "warning", "占位符必须写成 {value}（区分大小写，不能有空格）"))
+            break
+    issues.extend(_scan_quotes(normalized))
+    if any(ord(ch) < 0x20 and ch not in "\t\r\n" for ch in normalized):
+        issues.append(LintIssue("unsafe-chars", "warning", "命令包含不可见的控制字符"))
+    if not powershell_args_fit(powershell_args(normalized, True, False)):  # 隐藏模式的参数前缀最长
+        issues.append(LintIssue("too-long", "error", "命令过长，主程序无法拼接 PowerShell 参数"))
+    return issues
+
+
+def _lint_program(path: str) -> list:
+    p = strip_wrapping_quotes(path)
+    if p and contains_cmdline_unsafe_chars(os.path.expandvars(p.replace("/", "\\"))):
+        return [LintIssue("unsafe-chars", "error", "路径包含引号或控制字符，主程序会拒绝执行")]
+    return []
+
+
+@functools.lru_cache(maxsize=512)
+def prepare_command(cmd: str, value: Optional[int] = None, kind: str = "command") -> PreparedCommand:
+    """
+    English: Memoized pipeline shared by preview/test/save: expand {value}, normalize like RC-main, lint
+    中文: 与主程序相同地替换 {value} 并规范化，同时给出检查结果；kind 为 "command" 或 "program"
+    """
+    cmd = cmd or ""
+    if kind == "program":
+        return PreparedCommand(cmd, value, cmd, cmd, tuple(_lint_program(cmd)))
+    applied = apply_value_placeholder(cmd, value)
+    normalized = normalize_powershell_command(applied)
+    issues = _lint_command(cmd, normalized) if cmd.strip() else []
+    return PreparedCommand(cmd, value, applied, normalized, tuple(issues))
+
+
+def check_golden(path: Optional[str] = None) -> int:
+    """按 golden 语料核对与 C 实现的一致性，返回用例数；不一致时抛 AssertionError。"""
+    path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), GOLDEN_FILE_NAME)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    cases = data["cases"]
+    for case in cases:
+        prep = prepare_command(case["cmd"], case["value"])
+        assert prep.applied == case["applied"], (case["name"], prep.applied)
+        assert prep.normalized == case["normalized"], (case["name"], prep.normalized)
+        for mode, (hide, keep) in (("hide", (True, False)), ("show", (False, False)), ("keep", (False, True))):
+            args = powershell_args(prep.normalized, hide, keep)
+            expected = case["args"][mode]
+            if expected is None:
+                assert not powershell_args_fit(args), (case["name"], mode)
+            else:
+                assert powershell_args_fit(args) and args == expected, (case["name"], mode, args)
+    for case in data.get("programs", []):
+        saved = {k: os.environ.get(k) for k in case["env"]}
+        os.environ.update(case["env"])
+        try:
+            launch = program_launch(case["path"])
+            expanded = os.path.expandvars(case["normalized"]) if case["normalized"] is not None else None
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        if case["normalized"] is None:
+            assert launch is None, (case["name"], launch)
+            continue
+        ext = case["ext"].lower()
+        if ext == ".ps1":
+            expected = ("powershell.exe", f'-NoProfile -ExecutionPolicy Bypass -File "{expanded}"')
+        elif ext in (".bat", ".cmd"):
+            expected = ("cmd.exe", f'/c "{expanded}"')
+        else:
+            expected = (None, expanded)
+        assert launch == expected, (case["name"], launch)
+    return len(cases) + len(data.get("programs", []))
+
+
+if __name__ == "__main__":
+    # 自检：与 C 实现的 golden 语料逐条比对，再验证检查规则
+    print(f"golden: {check_golden()} cases OK")
+    codes = lambda c: [i.code for i in prepare_command(c).issues]  # noqa: E731
+    assert codes('curl "http://x/?a=1"') == []
+    assert codes("Get-Date; curl http://x") == ["curl-alias"]
+    assert codes("echo {Value}") == ["placeholder"]
+    assert codes('echo "abc') == ["unbalanced-quote"]
+    assert codes("echo 'it''s' \"a`\"b\"") == []
+    assert codes('$s = @"x\n"@') == ["here-string"]
+    assert codes('$s = @"\nline\n  "@') == ["here-string"]
+    assert codes('$s = @"\nline "quoted"\n"@; $s') == []
+    assert codes("echo hi # it's a comment") == []
+    assert codes("x" * 9000) == ["too-long"]
+    assert [i.code for i in prepare_command('C:\\a"b.exe', kind="program").issues] == ["unsafe-chars"]
+    assert prepare_command("set {value}", 5).normalized == "set 5"
+    assert prepare_command("set {value}", 5) is prepare_command("set {value}", 5)
+    print("rc_command self-check OK")
@@ -0,0 +1,206 @@
+"""子进程输出解码（powercfg、PowerShell 等命令的输出编码不固定：UTF-8、GBK 或系统 ANSI 代码页）
+
+做法：
+1. 纯 ASCII 或严格 UTF-8 能解码时直接返回（最常见，且只需一次 C 层解码）；
+2. 否则只取前 SAMPLE_BYTES 字节，用各候选编码试解码并比较替换字符数，选出编码后只完整解码一次；
+3. 按来源（命令名）缓存选中的编码：同一来源再次解码时先用该编码严格解码，成功即跳过检测；
+4. 流式输出用 StreamDecoder 增量解码，多字节字符跨块也不会被截断。
+    python rc_decode.py
+"""
+import codecs
+import locale
+import threading
+from typing import Dict, List, Optional
+
+# 检测编码时采样的字节数
+SAMPLE_BYTES = 64 * 1024
+# 候选编码（系统首选编码排在最前；当前平台不支持的会被跳过）
+FALLBACK_ENCODINGS = ("utf-8", "gbk", "mbcs")
+
+
+def _codec_name(enc: str) -> Optional[str]:
+    try:
+        return codecs.lookup(enc).name
+    except Exception:
+        return None
+
+
+def candidate_encodings() -> List[str]:
+    encs: List[str] = []
+    try:
+        encs.append(locale.getpreferredencoding(False))
+    except Exception:
+        pass
+    encs.extend(FALLBACK_ENCODINGS)
+    out: List[str] = []
+    for enc in encs:
+        name = _codec_name(enc) if enc else None
+        if name and name not in out:
+            out.append(name)
+    return out
+
+
+class EncodingHints:
+    """来源 -> 上次成功使用的编码（线程安全）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hints: Dict[str, str] = {}
+
+    def get(self, source: Optional[str]) -> Optional[str]:
+        if not source:
+            return None
+        with self._lock:
+            return self._hints.get(source)
+
+    def set(self, source: Optional[str], enc: str) -> None:
+        if source:
+            with self._lock:
+                self._hints[source] = enc
+
+    def forget(self, source: str) -> None:
+        with self._lock:
+            self._hints.pop(source, None)
+
+
+# 进程内共享的编码提示
+HINTS = EncodingHints()
+
+
+def _replacements(sample: bytes, enc: str) -> Optional[int]:
+    try:
+        # 增量解码且 final=False：采样截断处的半个多字节字符不计入
+        text = codecs.getincrementaldecoder(enc)(errors="replace").decode(sample, final=False)
+    except Exception:
+        return None
+    return text.count("\ufffd")
+
+
+def detect_encoding(data: bytes, candidates: Optional[List[str]] = None, sample_bytes: int = SAMPLE_BYTES) -> str:
+    """只看前 sample_bytes 字节，返回替换字符最少的候选编码（并列时取靠前的）。"""
+    candidates = candidates or candidate_encodings()
+    if data.isascii():
+        return "utf-8"
+    sample = data[:sample_bytes]
+    if len(data) <= sample_bytes:
+        try:
+            sample.decode("utf-8")
+            return "utf-8"
+        except UnicodeDecodeError:
+            pass
+    elif _replacements(sample, "utf-8") == 0:
+        return "utf-8"
+    best: Optional[tuple] = None
+    for i, enc in enumerate(candidates):
+        n = _replacements(sample, enc)
+        if n is not None and (best is None or (n, i) < best[:2]):
+            best = (n, i, enc)
+    return best[2] if best else "utf-8"
+
+
+def decode_bytes(data: bytes, source: Optional[str] = None, hints: Optional[EncodingHints] = HINTS) -> str:
+    """解码整段输出；source 为来源名（如 "powercfg"），用于读写编码提示。"""
+    if not data:
+        return ""
+    if data.isascii():
+        return data.decode("ascii")
+    hinted = hints.get(source) if hints is not None else None
+    # 严格 UTF-8 在先：GBK 等双字节编码常能“成功”解码 UTF-8 字节（得到乱码），反之则几乎不会
+    for enc in ("utf-8", hinted):
+        if not enc:
+            continue
+        try:
+            text = data.decode(enc)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        if hints is not None:
+            hints.set(source, enc)
+        return text
+    enc = detect_encoding(data)
+    if hints is not None:
+        hints.set(source, enc)
+    return data.decode(enc, errors="replace")
+
+
+class StreamDecoder:
+    """
+    English: Incremental decoder for streamed process output that picks the codec once
+    中文: 流式输出的增量解码：在出现第一段非 ASCII 字节时选定编码，之后逐块增量解码
+    """
+
+    def __init__(self, source: Optional[str] = None, hints: Optional[EncodingHints] = HINTS):
+        self.source = source
+        self._hints = hints
+        self.encoding: Optional[str] = hints.get(source) if hints is not None else None
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace") if self.encoding else None
+        self._replaced = 0
+        self._checked = False
+
+    def _choose(self, data: bytes) -> None:
+        enc = detect_encoding(data)
+        self.encoding = enc
+        self._decoder = codecs.getincrementaldecoder(enc)(errors="replace")
+
+    def feed(self, data: bytes) -> str:
+        if self._decoder is None or not self._checked:
+            if data.isascii():
+                return data.decode("ascii") if self._decoder is None else self._decode(data)
+            # 第一段非 ASCII 输出：依次用 UTF-8、提示编码严格试解码，都不匹配时采样检测
+            self._checked = True
+            for enc in ("utf-8", self.encoding):
+                if not enc:
+                    continue
+                try:
+                    codecs.getincrementaldecoder(enc)().decode(data, final=False)
+                except UnicodeDecodeError:
+                    continue
+                if enc != self.encoding or self._decoder is None:
+                    self.encoding = enc
+                    self._decoder = codecs.getincrementaldecoder(enc)(errors="replace")
+                break
+            else:
+                self._choose(data)
+        return self._decode(data)
+
+    def _decode(self, data: bytes) -> str:
+        text = self._decoder.decode(data, final=False)
+        self._replaced += text.count("\ufffd")
+        return text
+
+    def flush(self) -> str:
+        """流结束：输出残留字节；整段都没有替换字符时记住所选编码。"""
+        if self._decoder is None:
+            return ""
+        text = self._decoder.decode(b"", final=True)
+        self._replaced += text.count("\ufffd")
+        if self._hints is not None and self._replaced == 0:
+            self._hints.set(self.source, self.encoding)
+        return text
+
+
+if __name__ == "__main__":
+    # 自检：严格 UTF-8 快速路径、GBK 检测、来源提示、截断采样与增量解码
+    zh = "休眠不可用。系统固件不支持休眠。\n"
+    assert decode_bytes(b"plain ascii", "x") == "plain ascii"
+    hints = EncodingHints()
+    assert decode_bytes(zh.encode("utf-8"), "ps", hints) == zh and hints.get("ps") == "utf-8"
+    gbk = (zh * 3).encode("gbk")
+    assert detect_encoding(gbk, ["utf-8", "gbk"]) == "gbk"
+    hints.set("powercfg", "gbk")
+    assert decode_bytes(gbk, "powercfg", hints) == zh * 3
+    # 提示失效（输出改为 UTF-8）时重新检测并更新提示
+    assert decode_bytes(zh.encode("utf-8"), "powercfg", hints) == zh and hints.get("powercfg") == "utf-8"
+    # 采样在多字节字符中间截断时仍判定为 UTF-8
+    big = ("a" * 9 + "测") * 5000
+    assert detect_encoding(big.encode("utf-8"), ["gbk", "utf-8"], sample_bytes=1001) == "utf-8"
+    # 增量解码：UTF-8 字符跨块
+    raw = ("line 1\n" + zh).encode("utf-8")
+    dec = StreamDecoder("stream", hints)
+    out = "".join(dec.feed(raw[i:i + 5]) for i in range(0, len(raw), 5)) + dec.flush()
+    assert out == "line 1\n" + zh and dec.encoding == "utf-8" and hints.get("stream") == "utf-8"
+    hints.set("stream-gbk", "ascii")  # 提示已过时（严格解码失败），输出实际是 GBK
+    dec = StreamDecoder("stream-gbk", hints)
+    graw = zh.encode("gbk") * 2
+    out = dec.feed(graw[:len(graw) // 2]) + dec.feed(graw[len(graw) // 2:]) + dec.flush()
+    assert out == zh * 2 and dec.encoding == "gbk" and hints.get("stream-gbk") == "gbk", (dec.encoding, out)
+    print("rc_decode self-check OK")
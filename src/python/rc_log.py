@@ -0,0 +1,386 @@
+"""RC-main / RC-tray 日志的流式解析与增量跟踪
+
+日志格式（rc_log.c / tray.c）：
+    2025-01-02 03:04:05.678 [INFO] 消息           （main.log，毫秒精度）
+    2025-01-02 03:04:05 [WARN] tray.c:291 - 消息   （tray.log，秒精度，带 文件:行号 前缀）
+两者都在写入前检查大小，达到 200KB 时把文件截断为 0 再继续写。
+
+LogReader 从保存的字节偏移开始按块读取，只消费到最后一个完整行为止（未写完的行下次再读），
+逐条产出 Record，内存占用与文件大小无关：
+- 文件变小 → 视为被截断，从 0 重新开始；
+- 文件在两次读取之间被截断并重新写到超过原偏移 → 通过比对文件开头的字节识别；
+- 没有时间戳的行（多行消息的后续行）继承上一条的时间与级别，continued=True；
+- 时间戳每秒只换算一次（同一秒内的行复用结果）。
+
+LogBuffer 保存最近 N 条记录（环形缓冲），并维护按级别、按 topic 的序号索引，
+查看器切换筛选条件时只遍历命中的记录。
+    python rc_log.py
+"""
+import os
+import re
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# 与 rc_log.c RC_LOG_MAX_BYTES / tray.c TRAY_LOG_MAX_BYTES 一致
+LOG_MAX_BYTES = 200 * 1024
+# 每次 read() 的块大小
+CHUNK_BYTES = 256 * 1024
+# 单行最大字节数（rc_log.c 的行缓冲为 4600 字节）；超过时强制切分，避免缓冲区无限增长
+MAX_LINE_BYTES = 64 * 1024
+# 用于识别“截断后又写回原长度”的文件开头字节数
+HEAD_BYTES = 64
+
+_HEADER_RE = re.compile(r"(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)(?:\.(\d{3}))? \[([A-Za-z]+)\] ?")
+_TRAY_SOURCE_RE = re.compile(r"([^\s:]+:\d+) - ")
+_RECEIVE_RE = re.compile(r"(?:收到 MQTT 消息|MQTT message) topic='(.*)' payload='(.*)' \(len=(\d+)\)$")
+
+
+class Record(NamedTuple):
+    offset: int  # 该行在文件中的起始字节偏移
+    time: Optional[float]  # 本地时间换算的时间戳（秒）
+    level: str  # INFO / WARN / ERROR（原样）
+    message: str
+    source: str = ""  # tray.log 的 文件:行号
+    continued: bool = False  # 无时间戳的后续行
+
+
+def parse_receive(message: str) -> Optional[Tuple[str, str]]:
+    """“收到 MQTT 消息”行 -> (topic, payload 预览)；payload 预览已被主程序清理并截断到 127 字节。"""
+    m = _RECEIVE_RE.match(message)
+    return (m.group(1), m.group(2)) if m else None
+
+
+class LogReader:
+    """
+    English: Incremental, constant-memory reader of RC log files resuming from a byte offset
+    中文: 从字节偏移开始增量读取日志；offset 始终指向下一条未读完整行的开头，可保存后恢复
+    """
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = max(0, int(offset))
+        self.truncations = 0
+        self._head: bytes = b""  # 最近一次看到的文件开头
+        self._stamp = ""  # 上一次换算的“年月日时分秒”
+        self._stamp_time = 0.0
+        self._last: Optional[Record] = None
+
+    @classmethod
+    def at_end(cls, path: str) -> "LogReader":
+        """从文件末尾开始（只看之后新写入的行）。"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        reader = cls(path, size)
+        reader._head = reader._read_head()
+        return reader
+
+    def _read_head(self) -> bytes:
+        try:
+            with open(self.path, "rb") as f:
+                return f.read(HEAD_BYTES)
+        except OSError:
+            return b""
+
+    def _check_truncation(self, size: int) -> None:
+        if size < self.offset:
+            truncated = True
+        elif self.offset and self._head:
+            # 大小没有回退，但开头已不同：截断后又写到了原偏移之后
+            head = self._read_head()
+            truncated = head[: len(self._head)] != self._head[: len(head)]
+        else:
+            truncated = False
+        if truncated:
+            self.truncations += 1
+            self.offset = 0
+            self._head = b""
+            self._last = None
+
+    def _epoch(self, m) -> float:
+        stamp = m.group(0)[:19]
+        if stamp != self._stamp:
+            y, mo, d, h, mi, s = (int(m.group(i)) for i in range(1, 7))
+            self._stamp_time = time.mktime((y, mo, d, h, mi, s, 0, 0, -1))
+            self._stamp = stamp
+        ms = m.group(7)
+        return self._stamp_time + (int(ms) / 1000.0 if ms else 0.0)
+
+    def parse(self, line: bytes, offset: int) -> Record:
+        text = line.decode("utf-8", "replace").rstrip("\r")
+        m = _HEADER_RE.match(text)
+        if m is None:
+            last = self._last
+            return Record(offset, last.time if last else None, last.level if last else "", text, "", True)
+        message = text[m.end():]
+        source = ""
+        sm = _TRAY_SOURCE_RE.match(message)
+        if sm is not None:
+            source, message = sm.group(1), message[sm.end():]
+        rec = Record(offset, self._epoch(m), m.group(8).upper(), message, source)
+        self._last = rec
+        return rec
+
+    def records(self, max_bytes: Optional[int] = None) -> Iterator[Record]:
+        """
+        从当前偏移读到文件末尾（或消费满 max_bytes 后停止），逐条产出完整行。
+        迭代中途停止也安全：offset 只越过已产出的行。
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        self._check_truncation(size)
+        if size <= self.offset:
+            return
+        limit = size - self.offset
+        budget = limit if max_bytes is None else min(max_bytes, limit)
+        with open(self.path, "rb") as f:
+            if self.offset < HEAD_BYTES or not self._head:
+                f.seek(0)
+                self._head = f.read(HEAD_BYTES)
+            f.seek(self.offset)
+            buf = b""
+            read = 0
+            progressed = False
+            while True:
+                if read < budget:
+                    want = min(CHUNK_BYTES, budget - read)
+                elif not progressed and buf and read < limit:
+                    # 预算已用完但一行都还没产出：继续读到行尾（最多 MAX_LINE_BYTES），保证每次都有进展
+                    want = min(CHUNK_BYTES, limit - read)
+                else:
+                    break
+                chunk = f.read(want)
+                if not chunk:
+                    break
+                read += len(chunk)
+                buf += chunk
+                end = buf.rfind(b"\n")
+                if end >= 0:
+                    block, buf = buf[: end + 1], buf[end + 1:]
+                    for line in block.split(b"\n")[:-1]:
+                        rec = self.parse(line, self.offset)
+                        self.offset += len(line) + 1
+                        progressed = True
+                        yield rec
+                # 超长行：按 MAX_LINE_BYTES 切成多条（不拆开 UTF-8 字符），后续片段作为 continued 记录
+                while len(buf) >= MAX_LINE_BYTES:
+                    cut = MAX_LINE_BYTES
+                    while cut > 1 and (buf[cut] & 0xC0) == 0x80:
+                        cut -= 1
+                    piece, buf = buf[:cut], buf[cut:]
+                    rec = self.parse(piece, self.offset)
+                    self.offset += cut
+                    progressed = True
+                    yield rec
+
+    def poll(self, max_bytes: Optional[int] = None) -> List[Record]:
+        return list(self.records(max_bytes))
+
+
+class LogEntry(NamedTuple):
+    seq: int  # 追加顺序号（单调递增）
+    source: str  # 日志来源名（如 "main" / "tray"）
+    record: Record
+    topic: str  # 关联的 topic（无关联时为空）
+
+
+class LogBuffer:
+    """
+    English: Bounded ring buffer of recent log records with per-level and per-topic sequence indices
+    中文: 最近 capacity 条日志的环形缓冲；索引为按序号递增的 deque，淘汰最旧记录时各索引从左端弹出
+    """
+
+    def __init__(self, capacity: int = 5000, topics: Iterable[str] = ()):
+        self.capacity = max(1, int(capacity))
+        self._ring: List[Optional[LogEntry]] = [None] * self.capacity
+        self.first = 0  # 仍在缓冲中的最小序号
+        self.next = 0  # 下一条的序号
+        self._by_level: Dict[str, deque] = {}
+        self._by_topic: Dict[str, deque] = {}
+        self._topics: List[str] = []
+        self._last: Dict[str, LogEntry] = {}  # 来源 -> 最后一条
+        self.set_topics(topics)
+
+    def __len__(self) -> int:
+        return self.next - self.first
+
+    def set_topics(self, topics: Iterable[str]) -> None:
+        """配置中的 topic；动作日志（如“命令开启：xxx”）按其中出现的 topic 归类，长的优先。"""
+        self._topics = sorted({t for t in topics if t}, key=len, reverse=True)
+
+    def topic_of(self, source: str, record: Record) -> str:
+        last = self._last.get(source)
+        if record.continued:
+            return last.topic if last else ""
+        received = parse_receive(record.message)
+        if received:
+            return received[0]
+        # 主程序在同一线程中先记“收到”再记动作，最近的 topic 最可能命中
+        if last and last.topic and last.topic in record.message:
+            return last.topic
+        for topic in self._topics:
+            if topic in record.message:
+                return topic
+        return ""
+
+    def append(self, source: str, record: Record) -> LogEntry:
+        if self.next - self.first >= self.capacity:
+            self._evict()
+        entry = LogEntry(self.next, source, record, self.topic_of(source, record))
+        self._ring[entry.seq % self.capacity] = entry
+        self.next += 1
+        self._by_level.setdefault(record.level, deque()).append(entry.seq)
+        if entry.topic:
+            self._by_topic.setdefault(entry.topic, deque()).append(entry.seq)
+        self._last[source] = entry
+        return entry
+
+    def _evict(self) -> None:
+        slot = self.first % self.capacity
+        old = self._ring[slot]
+        self._ring[slot] = None
+        self.first += 1
+        if old is None:
+            return
+        for index, key in ((self._by_level, old.record.level), (self._by_topic, old.topic)):
+            q = index.get(key)
+            if q and q[0] == old.seq:
+                q.popleft()
+                if not q:
+                    del index[key]
+
+    def clear(self) -> None:
+        while self.first < self.next:
+            self._evict()
+        self._last.clear()
+
+    def get(self, seq: int) -> Optional[LogEntry]:
+        if self.first <= seq < self.next:
+            return self._ring[seq % self.capacity]
+        return None
+
+    def level_counts(self) -> Dict[str, int]:
+        return {level: len(q) for level, q in self._by_level.items()}
+
+    def topic_counts(self) -> Dict[str, int]:
+        return {topic: len(q) for topic, q in self._by_topic.items()}
+
+    @staticmethod
+    def matches(entry: LogEntry, levels: Optional[Set[str]] = None, topic: Optional[str] = None) -> bool:
+        return (levels is None or entry.record.level in levels) and (not topic or entry.topic == topic)
+
+    def select(self, levels: Optional[Set[str]] = None, topic: Optional[str] = None, limit: Optional[int] = None) -> List[LogEntry]:
+        """按条件筛选（按序号升序）；limit 只取最后 limit 条。"""
+        if topic:
+            seqs: Iterable[int] = self._by_topic.get(topic, ())
+        elif levels is not None:
+            merged: List[int] = []
+            for level in levels:
+                merged.extend(self._by_level.get(level, ()))
+            seqs = sorted(merged)
+        else:
+            seqs = range(self.first, self.next)
+        out: List[LogEntry] = []
+        for seq in reversed(seqs):
+            entry = self._ring[seq % self.capacity]
+            if entry is not None and self.matches(entry, levels, topic):
+                out.append(entry)
+                if limit is not None and len(out) >= limit:
+                    break
+        out.reverse()
+        return out
+
+
+if __name__ == "__main__":
+    # 自检：两种格式、后续行、未写完的行、截断（变小 / 截断后重新写长）、分批读取与吞吐
+    import tempfile
+
+    def _line(i: int, level: str = "INFO", ms: bool = True) -> bytes:
+        stamp = f"2025-01-02 03:04:{i % 60:02d}" + (f".{i % 1000:03d}" if ms else "")
+        return f"{stamp} [{level}] 收到 MQTT 消息 topic='t{i}' payload='on#{i}' (len=5)\n".encode("utf-8")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "main.log")
+        with open(path, "wb") as f:
+            f.write(_line(1) + _line(2, "WARN") + b"  continued\r\n")
+            f.write(b"2025-01-02 03:04:05 [ERROR] tray.c:291 - boom\n2025-01-02 03:04:06.0")
+        reader = LogReader(path)
+        recs = reader.poll()
+        assert [r.level for r in recs] == ["INFO", "WARN", "WARN", "ERROR"], recs
+        assert parse_receive(recs[1].message) == ("t2", "on#2") and recs[2].continued and recs[2].message == "  continued"
+        assert recs[3].source == "tray.c:291" and recs[3].message == "boom"
+        assert abs(recs[1].time - recs[0].time - 1.001) < 1e-6 and recs[2].time == recs[1].time
+        partial_at = reader.offset
+        with open(path, "ab") as f:
+            f.write(b"07 [INFO] done\n")
+        recs = reader.poll()
+        assert len(recs) == 1 and recs[0].offset == partial_at and recs[0].message == "done"
+
+        # 截断：文件变小
+        with open(path, "wb") as f:
+            f.write(_line(3))
+        assert [r.message for r in reader.poll()] == ["收到 MQTT 消息 topic='t3' payload='on#3' (len=5)"]
+        assert reader.truncations == 1
+        # 截断后又写到了原偏移之后：大小没有回退，靠文件开头识别
+        with open(path, "wb") as f:
+            f.write(b"".join(_line(i) for i in range(100, 110)))
+        assert len(reader.poll()) == 10 and reader.truncations == 2
+
+        # 分批读取与从保存的偏移恢复
+        with open(path, "wb") as f:
+            f.write(b"".join(_line(i) for i in range(200)))
+        reader = LogReader(path)
+        first = reader.poll(max_bytes=1000)
+        resumed = LogReader(path, reader.offset).poll()
+        assert len(first) + len(resumed) == 200 and resumed[0].offset == reader.offset
+        assert LogReader.at_end(path).poll() == []
+
+        # 超长行：切成 MAX_LINE_BYTES 的片段，偏移与字节数严格对应；小预算下每次轮询也都有进展
+        long_line = b"2025-01-02 03:04:05.000 [INFO] " + "长".encode("utf-8") * 100000 + b"\n"
+        with open(path, "wb") as f:
+            f.write(long_line + b"2025-01-02 03:04:06.000 [INFO] next\n")
+        recs = LogReader(path).poll()
+        assert recs[-1].message == "next" and recs[-1].offset == len(long_line), recs[-1]
+        assert all(r.continued for r in recs[1:-1]) and not recs[0].continued
+        assert "".join(r.message for r in recs[1:-1]).endswith("长") and "\ufffd" not in "".join(r.message for r in recs)
+        reader, got = LogReader(path), []
+        for _ in range(20):
+            got += reader.poll(max_bytes=70000)
+        assert [r.offset for r in got] == [r.offset for r in recs] and reader.offset == os.path.getsize(path)
+        with open(path, "wb") as f:
+            f.write(b"2025-01-02 03:04:05.000 [INFO] " + b"x" * 5000 + b"\nnext\n")
+        reader = LogReader(path)
+        got = reader.poll(max_bytes=100)
+        got += reader.poll(max_bytes=100)
+        assert [r.message for r in got][1:] == ["next"] and reader.offset == os.path.getsize(path)
+
+        # 吞吐：约 LOG_MAX_BYTES * 50 的日志
+        with open(path, "wb") as f:
+            for _ in range(50):
+                f.write(b"".join(_line(i) for i in range(2000)))
+        t0 = time.perf_counter()
+        n = sum(1 for _ in LogReader(path).records())
+        dt = time.perf_counter() - t0
+        print(f"{n} lines, {os.path.getsize(path) / dt / 1e6:.1f} MB/s")
+        assert n == 100000
+
+    # 环形缓冲与索引：淘汰最旧记录后索引同步，动作日志与后续行按 topic 归类
+    buf = LogBuffer(capacity=4, topics=["pc/cmd", "pc"])
+    mk = lambda msg, level="INFO", cont=False: Record(0, 0.0, level, msg, "", cont)  # noqa: E731
+    buf.append("main", mk("收到 MQTT 消息 topic='pc/cmd' payload='on' (len=2)"))
+    buf.append("main", mk("命令开启：pc/cmd (window=show)"))
+    buf.append("tray", mk("started"))
+    buf.append("main", mk("命令执行失败：pc/cmd", "ERROR"))
+    buf.append("main", mk("  detail", "ERROR", True))
+    assert len(buf) == 4 and buf.first == 1 and buf.get(0) is None
+    assert [e.seq for e in buf.select(topic="pc/cmd")] == [1, 3, 4]
+    assert [e.seq for e in buf.select(levels={"ERROR"})] == [3, 4] and buf.topic_counts() == {"pc/cmd": 3}
+    assert [e.seq for e in buf.select(levels={"INFO", "ERROR"}, limit=2)] == [3, 4]
+    assert buf.level_counts() == {"INFO": 2, "ERROR": 2}
+    buf.clear()
+    assert len(buf) == 0 and buf.level_counts() == {} and buf.select() == []
+    print("rc_log self-check OK")
@@ -0,0 +1,184 @@
+"""按窗口生命周期自动注销的回调登记表（GUI 语言切换观察者）
+
+GUI 在切换语言时需要刷新各窗口里的动态文案（combobox 选项、窗口标题等），
+各窗口把刷新闭包登记到这里。闭包会引用整棵控件树，窗口关闭后若不注销，
+反复打开/关闭编辑器会让登记表与内存一起无限增长。register 传入 owner 时，
+owner 销毁（<Destroy>）即自动注销。
+
+自检（创建/销毁 1000 个 Toplevel，断言登记表与 tracemalloc 统计保持平稳；无显示环境时改用模拟控件）：
+    python rc_observers.py --self-check
+"""
+import sys
+from typing import Any, Callable, List, Optional
+
+
+class ObserverRegistry:
+    """English: Callback registry whose entries can be scoped to a Tk widget's lifetime.
+    中文: 回调登记表；登记时可绑定 owner 控件，owner 销毁即自动注销。
+    """
+
+    def __init__(self) -> None:
+        # GUI 直接复用这个列表对象，只做原地修改（[:] 赋值），不要重新绑定
+        self.callbacks: List[Callable[[], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.callbacks)
+
+    def register(self, cb: Callable[[], Any], owner: Optional[Any] = None) -> None:
+        """English: Add cb; when owner is given, remove it again once owner is destroyed.
+        中文: 登记回调；传入 owner 时，owner 销毁即自动注销。
+        """
+        self.callbacks.append(cb)
+        if owner is None:
+            return
+        owner_name = str(owner)
+
+        def _on_owner_destroy(event, _cb=cb) -> None:
+            # Toplevel 的 <Destroy> 也会收到子控件的销毁事件，只在 owner 自身销毁时注销
+            try:
+                if str(event.widget) != owner_name:
+                    return
+            except Exception:
+                return
+            self.unregister(_cb)
+
+        try:
+            owner.bind("<Destroy>", _on_owner_destroy, add="+")
+        except Exception:
+            pass
+
+    def unregister(self, cb: Callable[[], Any]) -> None:
+        """English: Remove cb (no-op if absent).
+        中文: 注销回调（不存在时忽略）。
+        """
+        self.callbacks[:] = [x for x in self.callbacks if x is not cb]
+
+    def notify(self) -> None:
+        """English: Call every callback; drop the ones that raise (their window is gone).
+        中文: 依次调用全部回调；抛异常的（多为窗口已销毁）顺带移除。
+        """
+        alive: List[Callable[[], Any]] = []
+        for cb in list(self.callbacks):
+            try:
+                cb()
+                alive.append(cb)
+            except Exception:
+                pass
+        self.callbacks[:] = alive
+
+
+class _FakeWidget:
+    """English: Minimal stand-in for a Tk widget (bind/destroy) used when no display is available.
+    中文: 无显示环境时代替 Tk 控件的最小实现，只模拟 bind 与 destroy 的 <Destroy> 传播。
+    """
+
+    _seq = 0
+
+    def __init__(self, parent: Optional["_FakeWidget"] = None) -> None:
+        _FakeWidget._seq += 1
+        self._name = f"{parent._name if parent else ''}.w{_FakeWidget._seq}"
+        self._parent = parent
+        self._handlers: List[Callable[[Any], Any]] = []
+        self.payload = bytearray(256)
+
+    def __str__(self) -> str:
+        return self._name
+
+    def bind(self, sequence: str, func: Callable[[Any], Any], add: str = "") -> None:
+        self._handlers.append(func)
+
+    def destroy(self) -> None:
+        # 与 Tk 一致：Toplevel 的绑定也会收到子控件的 <Destroy>
+        event = type("Event", (), {"widget": self})()
+        targets = self._handlers + (self._parent._handlers if self._parent else [])
+        for func in list(targets):
+            func(event)
+        self._handlers = []
+
+
+def _self_check(rounds: int = 1000) -> int:
+    import gc
+    import tracemalloc
+
+    try:
+        import tkinter as tk
+
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"note: 无法创建 Tk 窗口（{e}），改用模拟控件")
+        root = None
+
+    def _make_window() -> Any:
+        if root is None:
+            win = _FakeWidget()
+            return win, (lambda: win.payload.hex()), (lambda: len(win.payload)), _FakeWidget(win)
+        win = tk.Toplevel(root)
+        var = tk.StringVar(win, value="x")
+        tk.Label(win, textvariable=var).pack()
+        entry = tk.Entry(win)
+        entry.pack()
+        return win, (lambda: var.set(var.get())), (lambda: entry.configure(width=10)), tk.Frame(win)
+
+    def _update() -> None:
+        if root is not None:
+            root.update()
+
+    registry = ObserverRegistry()
+    permanent = lambda: None
+    registry.register(permanent)
+
+    def _open_and_close() -> None:
+        win, refresh_title, refresh_width, child = _make_window()
+        # 与编辑器一致：闭包引用窗口内的控件
+        registry.register(refresh_title, owner=win)
+        registry.register(refresh_width, owner=win)
+        # 子控件销毁不应注销 owner 的回调
+        child.destroy()
+        assert len(registry) == 3, len(registry)
+        win.destroy()
+
+    try:
+        # 预热：让 Tcl/Tk 与 Python 的内部缓存先稳定下来
+        for _ in range(50):
+            _open_and_close()
+        _update()
+        assert len(registry) == 1, len(registry)
+
+        gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        for i in range(rounds):
+            _open_and_close()
+            if i % 100 == 0:
+                _update()
+                registry.notify()
+        _update()
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert len(registry) == 1 and registry.callbacks[0] is permanent, len(registry)
+        growth = after - before
+        # 泄漏时每轮至少留下两个闭包及其控件对象（数百字节），1000 轮远超此上限
+        assert growth < 64 * 1024, f"memory grew by {growth} bytes over {rounds} rounds"
+
+        # 对照：不传 owner 时登记表随窗口数线性增长（证明上面的断言确实能发现泄漏）
+        leaky = ObserverRegistry()
+        for _ in range(100):
+            win, refresh_title, _w, _c = _make_window()
+            leaky.register(refresh_title)
+            win.destroy()
+        assert len(leaky) == 100, len(leaky)
+    finally:
+        if root is not None:
+            root.destroy()
+
+    print(f"self-check ok ({rounds} windows, python heap growth {growth} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    if "--self-check" in sys.argv[1:]:
+        sys.exit(_self_check())
+    print(__doc__)
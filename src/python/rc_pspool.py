@@ -0,0 +1,341 @@
+"""常驻 PowerShell 工作进程池（供 RC-GUI 的各类“测试”按钮使用）
+
+每次测试都启动新的 powershell.exe 需要数百毫秒到数秒；DXVA2 测试还要每次重新
+Add-Type 编译 C# 类型。这里维护少量长期存活的 powershell.exe，按行收发请求：
+
+- 请求：一行，内容为脚本 UTF-8 字节的 base64；
+- 响应：一行，RESPONSE_PREFIX + base64(UTF-8 JSON {"ok","out","err"})；
+- 脚本自身直接写到 stdout 的其它行原样收集到 output 中。
+
+工作进程按需启动（第一次 run 时），已编译的类型在进程内保留，后续请求只需几十毫秒。
+脚本中的 exit 会结束工作进程：本次请求返回失败，下次请求自动补充新进程。
+
+worker_factory / worker_argv 可替换，Linux 下可用 fake_worker_argv() 走同一协议自测：
+    python rc_pspool.py
+"""
+import base64
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+RESPONSE_PREFIX = "@@RC-PS@@"
+READY_LINE = RESPONSE_PREFIX + "READY"
+
+# 工作进程主循环：读一行 -> 执行 -> 回一行。变量名带 __rc 前缀，避免与测试脚本冲突
+_BOOTSTRAP = r"""
+$ProgressPreference = 'SilentlyContinue'
+$__rcUtf8 = New-Object System.Text.UTF8Encoding $false
+try { [Console]::OutputEncoding = $__rcUtf8 } catch { }
+$__rcIn = [Console]::In
+$__rcOut = [Console]::Out
+$__rcOut.WriteLine('@@RC-PS@@READY')
+$__rcOut.Flush()
+while ($true) {
+    $__rcLine = $__rcIn.ReadLine()
+    if ($null -eq $__rcLine) { break }
+    if ($__rcLine.Length -eq 0) { continue }
+    $__rcOk = $true
+    $__rcErr = ''
+    $__rcText = ''
+    try {
+        $__rcScript = $__rcUtf8.GetString([Convert]::FromBase64String($__rcLine))
+        $__rcText = (& ([ScriptBlock]::Create($__rcScript)) *>&1 | Out-String)
+    } catch {
+        $__rcOk = $false
+        $__rcErr = $_.Exception.Message
+    }
+    $__rcResp = @{ ok = $__rcOk; out = [string]$__rcText; err = [string]$__rcErr } | ConvertTo-Json -Compress
+    $__rcOut.WriteLine('@@RC-PS@@' + [Convert]::ToBase64String($__rcUtf8.GetBytes($__rcResp)))
+    $__rcOut.Flush()
+}
+"""
+
+# 与真实工作进程协议一致的 Python 替身，用于没有 PowerShell 的环境：
+#   "fail <msg>" -> 失败；"sleep <秒>" -> 延时后成功；"exit" -> 进程退出；其它 -> 原样回显
+_FAKE_WORKER_SOURCE = r"""
+import base64, json, sys, time
+out = sys.stdout
+out.write("@@RC-PS@@READY\n"); out.flush()
+for line in sys.stdin:
+    line = line.strip()
+    if not line:
+        continue
+    script = base64.b64decode(line).decode("utf-8")
+    resp = {"ok": True, "out": script, "err": ""}
+    if script == "exit":
+        sys.exit(1)
+    if script.startswith("fail "):
+        resp = {"ok": False, "out": "", "err": script[5:]}
+    elif script.startswith("sleep "):
+        time.sleep(float(script[6:]))
+        resp["out"] = ""
+    elif script.startswith("print "):
+        out.write(script[6:] + "\n")
+        resp["out"] = ""
+    elif script.startswith("garble "):
+        sys.stderr.write(script[7:] + "\n"); sys.stderr.flush()
+        out.write("@@RC-PS@@!not-base64!\n"); out.flush()
+        continue
+    data = base64.b64encode(json.dumps(resp).encode("utf-8")).decode("ascii")
+    out.write("@@RC-PS@@" + data + "\n"); out.flush()
+"""
+
+
+class PowerShellPoolError(Exception):
+    """工作进程无法启动、池已关闭或等待空闲进程超时。"""
+
+
+class PSResult(NamedTuple):
+    ok: bool
+    output: str
+    error: str
+    elapsed_ms: float
+
+
+def default_worker_argv() -> List[str]:
+    encoded = base64.b64encode(_BOOTSTRAP.encode("utf-16-le")).decode("ascii")
+    return [
+        "powershell.exe", "-NoLogo", "-NoProfile", "-NonInteractive",
+        "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded,
+    ]
+
+
+def fake_worker_argv() -> List[str]:
+    return [sys.executable, "-c", _FAKE_WORKER_SOURCE]
+
+
+class PowerShellWorker:
+    """单个常驻工作进程；同一时刻只处理一个请求（由进程池保证）。"""
+
+    def __init__(self, argv: Optional[List[str]] = None, startup_timeout: float = 20.0):
+        self._argv = list(argv) if argv else default_worker_argv()
+        self._startup_timeout = startup_timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._stderr: List[str] = []
+        self._stderr_lock = threading.Lock()
+
+    def start(self) -> None:
+        try:
+            self._proc = subprocess.Popen(
+                self._argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+        except Exception as e:
+            raise PowerShellPoolError(f"无法启动 PowerShell 工作进程: {e}") from e
+        threading.Thread(target=self._pump_stdout, daemon=True).start()
+        threading.Thread(target=self._pump_stderr, daemon=True).start()
+
+        deadline = time.monotonic() + self._startup_timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                line = None
+            if line is None:
+                self.close()
+                raise PowerShellPoolError("PowerShell 工作进程启动超时或已退出")
+            if line == READY_LINE:
+                return
+
+    def _pump_stdout(self) -> None:
+        proc = self._proc
+        try:
+            for raw in iter(proc.stdout.readline, b""):
+                self._lines.put(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        except Exception:
+            pass
+        self._lines.put(None)
+
+    def _pump_stderr(self) -> None:
+        proc = self._proc
+        try:
+            for raw in iter(proc.stderr.readline, b""):
+                with self._stderr_lock:
+                    self._stderr.append(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        except Exception:
+            pass
+
+    def _take_stderr(self) -> str:
+        with self._stderr_lock:
+            text = "\n".join(self._stderr)
+            self._stderr.clear()
+        return text
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def request(self, script: str, timeout: float) -> PSResult:
+        start = time.perf_counter()
+
+        def _result(ok: bool, output: str, error: str) -> PSResult:
+            return PSResult(ok, output, error, (time.perf_counter() - start) * 1000.0)
+
+        if not self.alive():
+            return _result(False, "", "PowerShell 工作进程已退出")
+        payload = base64.b64encode(script.encode("utf-8")) + b"\n"
+        try:
+            self._proc.stdin.write(payload)
+            self._proc.stdin.flush()
+        except Exception as e:
+            self.close()
+            return _result(False, "", f"写入请求失败: {e}")
+
+        extra: List[str] = []
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                # 无法中断正在执行的脚本：结束该进程，由池补充新进程
+                self.close()
+                return _result(False, "\n".join(extra), f"执行超时（{timeout:g} 秒）")
+            if line is None:
+                err = self._take_stderr() or "PowerShell 工作进程意外退出"
+                self.close()
+                return _result(False, "\n".join(extra), err)
+            if not line.startswith(RESPONSE_PREFIX):
+                extra.append(line)
+                continue
+            try:
+                resp = json.loads(base64.b64decode(line[len(RESPONSE_PREFIX):]).decode("utf-8"))
+            except Exception as e:
+                # 协议已错位，未读完的 stderr 也无法归属：结束该进程，由池补充新进程
+                err = f"无法解析响应: {e}"
+                stderr_text = self._take_stderr()
+                if stderr_text:
+                    err = f"{err}\n{stderr_text}"
+                self.close()
+                return _result(False, "\n".join(extra), err)
+            output = "\n".join(extra + [str(resp.get("out") or "").rstrip()]).strip()
+            error = str(resp.get("err") or "")
+            stderr_text = self._take_stderr()
+            if stderr_text:
+                error = f"{error}\n{stderr_text}".strip()
+            return _result(bool(resp.get("ok")), output, error)
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+class PowerShellPool:
+    """
+    English: Lazily started pool of long-lived PowerShell workers (thread-safe)
+    中文: 按需启动的常驻 PowerShell 进程池；空闲进程后进先出复用，已编译的类型保持热状态
+    """
+
+    def __init__(self, size: int = 2, worker_factory: Optional[Callable[[], PowerShellWorker]] = None):
+        self._size = max(1, int(size))
+        self._factory = worker_factory or PowerShellWorker
+        self._idle: List[PowerShellWorker] = []
+        self._count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _acquire(self, timeout: float) -> PowerShellWorker:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PowerShellPoolError("PowerShell 进程池已关闭")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive():
+                        return worker
+                    self._count -= 1
+                if self._count < self._size:
+                    self._count += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise PowerShellPoolError("没有空闲的 PowerShell 工作进程")
+        try:
+            worker = self._factory()
+            worker.start()
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+        return worker
+
+    def _release(self, worker: PowerShellWorker) -> None:
+        with self._cond:
+            if worker.alive() and not self._closed:
+                self._idle.append(worker)
+            else:
+                self._count -= 1
+                worker.close()
+            self._cond.notify()
+
+    def run(self, script: str, timeout: float = 30.0) -> PSResult:
+        """在空闲工作进程中执行脚本（阻塞，建议在后台线程调用）。"""
+        worker = self._acquire(timeout)
+        try:
+            return worker.request(script, timeout)
+        finally:
+            self._release(worker)
+
+    def warm(self) -> None:
+        """后台预先启动一个工作进程，让第一次测试也能快速响应。"""
+        def _warm() -> None:
+            try:
+                self._release(self._acquire(30.0))
+            except Exception:
+                pass
+
+        threading.Thread(target=_warm, name="rc-pspool-warm", daemon=True).start()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.close()
+
+
+if __name__ == "__main__":
+    # 自检：使用 Python 替身工作进程验证协议、复用、超时与进程退出后的补充
+    pool = PowerShellPool(size=2, worker_factory=lambda: PowerShellWorker(fake_worker_argv()))
+    try:
+        r = pool.run("中文 echo")
+        assert r.ok and r.output == "中文 echo", r
+        r = pool.run("print side channel")
+        assert r.ok and r.output == "side channel", r
+        r = pool.run("fail boom")
+        assert not r.ok and r.error == "boom", r
+        r = pool.run("exit")
+        assert not r.ok, r
+        r = pool.run("garble leftover")
+        assert not r.ok and "无法解析响应" in r.error, r
+        time.sleep(0.2)  # 让残留的 stderr 到达
+        r = pool.run("after garble")
+        assert r.ok and r.output == "after garble" and "leftover" not in r.error, r
+        r = pool.run("sleep 2", timeout=0.3)
+        assert not r.ok and "超时" in r.error, r
+        t0 = time.perf_counter()
+        for _ in range(50):
+            assert pool.run("warm").ok
+        per_call = (time.perf_counter() - t0) * 1000.0 / 50
+        print(f"rc_pspool self-check OK ({per_call:.2f} ms per warm request)")
+    finally:
+        pool.close()
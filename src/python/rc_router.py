@@ -0,0 +1,533 @@
+"""RC-main 消息分发（RC_RouterHandle）的 Python 对照实现，用于离线回放
+
+给定 config.toml 与一批 (topic, payload)，不接触任何硬件地算出主程序会执行的动作，
+便于排查“语音指令触发了错误动作”之类的问题。与 src/main 中的 C 实现逐条对应：
+- load_config                  <-> rc_json.c RC_JsonParseToml（各层表展平为一层，后出现的同名键覆盖）
+- cfg_str / cfg_int / cfg_bool <-> rc_router.c 同名函数
+- is_on_off_payload            <-> rc_router.c is_on_off_payload
+- parse_percent_payload_strict <-> rc_router.c parse_percent_payload_strict
+- Router.handle                <-> rc_router.c RC_RouterHandle（应用 → 命令 → 服务 → 内置 → 热键）
+
+C 侧按顺序逐个比较 topic；这里在加载时按同样的优先级建立 topic 哈希索引（先登记者优先），
+并缓存 (topic, payload) 的结果——回放不执行动作、没有状态，相同消息的结果总是相同的。
+kill/interrupt 依赖运行期记录的 PID，回放只报告会采取的策略。
+
+用法（输入每行 "topic<TAB>payload" 或 {"topic": ..., "payload": ...}）：
+    python rc_router.py config.toml messages.tsv
+    python rc_router.py config.toml - --format jsonl < messages.tsv
+    python rc_router.py --self-check
+"""
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+import rc_command
+
+# 与 C 侧 for (i = 1; i < 50; i++) 一致
+MAX_ITEMS = 49
+# RC_RouterHandle 的匹配顺序（同一 topic 只触发最先匹配的一项）
+DISPATCH_ORDER = ("application", "command", "serve", "builtin", "hotkey")
+_INT_MIN = -(2**31)
+_INT_MAX = 2**31 - 1
+# strtol 接受的形式：前导空白、可选符号、十进制数字（不允许尾随字符）
+_STRTOL_RE = re.compile(r"[ \t\n\v\f\r]*[+-]?[0-9]+\Z")
+# 结果缓存上限（条）；超过后清空重建，避免回放超大日志时无限增长
+_MEMO_LIMIT = 200_000
+
+
+# ---- 配置 ----
+
+
+def flatten_config(table: Dict[str, Any], out: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    按 tomlc99 的键顺序展平：同一层先取标量（字符串/布尔/整数/浮点），再进入子表；
+    数组与日期时间被忽略；同名键后出现的覆盖先出现的。
+    """
+    out = {} if out is None else out
+    for key, value in table.items():
+        if isinstance(value, (str, bool, int, float)):
+            out[key] = value
+    for value in table.values():
+        if isinstance(value, dict):
+            flatten_config(value, out)
+    return out
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return flatten_config(tomllib.load(f))
+
+
+def cfg_str(cfg: Dict[str, Any], key: str) -> Optional[str]:
+    value = cfg.get(key)
+    return value if isinstance(value, str) else None
+
+
+def _llround(v: float) -> int:
+    return int(math.floor(v + 0.5)) if v >= 0 else -int(math.floor(-v + 0.5))
+
+
+def cfg_int(cfg: Dict[str, Any], key: str, default: int) -> int:
+    value = cfg.get(key)
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if isinstance(value, (int, float)):
+        if value < _INT_MIN or value > _INT_MAX or (isinstance(value, float) and math.isnan(value)):
+            return default
+        return _llround(value) if isinstance(value, float) else value
+    return default
+
+
+def cfg_bool(cfg: Dict[str, Any], key: str, default: bool) -> bool:
+    value = cfg.get(key)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    return default
+
+
+# ---- payload ----
+
+
+def is_on_off_payload(payload: str) -> bool:
+    p = payload.lower()
+    return p in ("on", "off", "pause") or p.startswith("on#") or p.startswith("off#")
+
+
+def parse_percent_payload_strict(payload: str) -> Optional[Tuple[str, int, bool]]:
+    """返回 (base, value, has_value)；"on#" / "on#abc" 等非法格式返回 None。"""
+    p = payload.lower()
+    if p in ("on", "off", "pause"):
+        return p, 0, False
+    for base in ("on", "off"):
+        prefix = base + "#"
+        if p.startswith(prefix):
+            digits = payload[len(prefix):]
+            if not _STRTOL_RE.match(digits):
+                return None
+            v = int(digits)
+            if v < _INT_MIN or v > _INT_MAX:
+                return None
+            return base, v, True
+    return payload, 0, False
+
+
+# ---- 分发 ----
+
+
+class Action(NamedTuple):
+    topic: str
+    payload: str
+    kind: str  # app / command / service / computer / screen / volume / sleep / media / hotkey / payload / topic
+    target: str  # 配置中的键，如 "command3"、"screen"；无匹配时为空
+    action: str  # 主程序会执行的操作，如 "run"、"kill"、"set"、"ignore"
+    detail: str  # 路径、规范化后的命令、百分比等
+    level: str  # 主程序记录日志的级别：info / warn
+    message: str  # 主程序日志中对应的消息（与 C 侧格式一致）
+
+    def to_dict(self) -> Dict[str, str]:
+        return self._asdict()
+
+
+class _Item(NamedTuple):
+    kind: str
+    key: str
+    fields: Dict[str, Any]
+
+
+class Router:
+    """
+    English: Pure-Python mirror of RC_RouterHandle backed by a hashed topic index
+    中文: RC_RouterHandle 的对照实现：加载配置后按 topic 哈希查找，结果按 (topic, payload) 缓存
+    """
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.cfg = cfg
+        self.topics: List[str] = []  # 订阅顺序与 RC_RouterGetTopics 相同
+        self._index: Dict[str, _Item] = {}
+        self._memo: Dict[Tuple[str, str], Action] = {}
+        builtins = self._load_builtins()
+        apps = self._load_items("application", self._app_fields)
+        cmds = self._load_items("command", self._command_fields)
+        serves = self._load_items("serve", self._serve_fields)
+        hotkeys = self._load_items("hotkey", self._hotkey_fields)
+        # 按 RC_RouterHandle 的匹配顺序（DISPATCH_ORDER）登记，同一 topic 只保留最先匹配的一项
+        groups = {"application": apps, "command": cmds, "serve": serves, "builtin": builtins, "hotkey": hotkeys}
+        for item in (item for kind in DISPATCH_ORDER for item in groups[kind]):
+            self._index.setdefault(item.fields["topic"], item)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Router":
+        return cls(load_config(path))
+
+    # ---- 加载（对应 load_builtins / load_applications / ...） ----
+
+    def _load_builtins(self) -> List[_Item]:
+        items = []
+        for key in ("Computer", "screen", "volume", "sleep", "media"):
+            topic = cfg_str(self.cfg, key) or ""
+            if cfg_bool(self.cfg, f"{key}_checked", False):
+                if topic:
+                    self.topics.append(topic)
+                items.append(_Item(key.lower(), key, {"topic": topic}))
+        return items
+
+    def _load_items(self, prefix: str, fields) -> List[_Item]:
+        items = []
+        for i in range(1, MAX_ITEMS + 1):
+            key = f"{prefix}{i}"
+            topic = cfg_str(self.cfg, key)
+            if not topic or not cfg_bool(self.cfg, f"{key}_checked", False):
+                continue
+            item = _Item(prefix, key, dict(fields(key, i), topic=topic))
+            items.append(item)
+            self.topics.append(topic)
+        return items
+
+    def _s(self, key: str) -> str:
+        return cfg_str(self.cfg, key) or ""
+
+    def _app_fields(self, key: str, i: int) -> Dict[str, Any]:
+        legacy = cfg_str(self.cfg, f"{key}_directory{i}")
+        return {
+            "on_path": self._s(f"{key}_on_value") or (legacy or ""),
+            "off_path": self._s(f"{key}_off_value"),
+            "off_preset": self._s(f"{key}_off_preset") or "kill",
+        }
+
+    def _command_fields(self, key: str, _i: int) -> Dict[str, Any]:
+        lo = cfg_int(self.cfg, f"{key}_value_min", 0)
+        hi = cfg_int(self.cfg, f"{key}_value_max", 100)
+        if lo > hi:
+            lo, hi = hi, lo
+        return {
+            "value": self._s(f"{key}_value"),
+            "on_value": self._s(f"{key}_on_value"),
+            "off_value": self._s(f"{key}_off_value"),
+            "off_preset": self._s(f"{key}_off_preset") or "kill",
+            "window": self._s(f"{key}_window") or "show",
+            "min": lo,
+            "max": hi,
+        }
+
+    def _serve_fields(self, key: str, _i: int) -> Dict[str, Any]:
+        return {
+            "service": self._s(f"{key}_value"),
+            "off_preset": self._s(f"{key}_off_preset") or "stop",
+            "off_value": self._s(f"{key}_off_value"),
+        }
+
+    def _hotkey_fields(self, key: str, _i: int) -> Dict[str, Any]:
+        return {
+            "on_type": self._s(f"{key}_on_type") or "keyboard",
+            "on_value": self._s(f"{key}_on_value"),
+            "off_type": self._s(f"{key}_off_type") or "none",
+            "off_value": self._s(f"{key}_off_value"),
+        }
+
+    # ---- 分发 ----
+
+    def handle(self, topic: str, payload: str) -> Action:
+        memo_key = (topic, payload)
+        hit = self._memo.get(memo_key)
+        if hit is not None:
+            return hit
+        result = self._handle(topic, payload)
+        if len(self._memo) >= _MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+    def _handle(self, topic: str, payload: str) -> Action:
+        def act(kind, target, action, detail="", level="info", message=""):
+            return Action(topic, payload, kind, target, action, str(detail), level, message)
+
+        if not is_on_off_payload(payload):
+            return act("payload", "", "ignore", level="warn", message=f"已忽略 payload：{payload} (topic={topic})")
+        parsed = parse_percent_payload_strict(payload)
+        if parsed is None:
+            return act("payload", "", "invalid", level="warn", message=f"payload 格式无效：{payload} (topic={topic})")
+        base, value, has_value = parsed
+        item = self._index.get(topic)
+        if item is None:
+            return act("topic", "", "unknown", level="warn", message=f"未知主题：{topic}")
+        f = item.fields
+        kind, key = item.kind, item.key
+
+        if kind == "application":
+            if base == "on":
+                return act("app", key, "run", f["on_path"], message=f"应用开启：{topic} => {f['on_path']}")
+            if base == "off":
+                if f["off_path"]:
+                    return act("app", key, "run", f["off_path"], message=f"应用关闭(自定义)：{topic} => {f['off_path']}")
+                if f["off_preset"].lower() in ("none", "custom"):
+                    return act("app", key, "none", message=f"应用关闭预设=none：{topic}")
+                return act("app", key, "kill", f["on_path"], message=f"应用关闭(kill)：{topic} => {f['on_path']}")
+            return act("app", key, "ignore", message=f"已忽略应用 payload：{payload} (topic={topic})")
+
+        if kind == "command":
+            applied_value, level, message = value, "info", ""
+            if has_value and not f["min"] <= value <= f["max"]:
+                applied_value = rc_command.clamp_value(value, f["min"], f["max"])
+                level = "warn"
+                message = f"命令参数超出范围，将钳制：{value} -> {applied_value} (range={f['min']}-{f['max']}, topic={topic}); "
+            window = f["window"]
+
+            def _ps(raw: str) -> str:
+                applied = rc_command.apply_value_placeholder(raw, applied_value if has_value else None)
+                return rc_command.normalize_powershell_command(applied)
+
+            if base == "on":
+                raw = f["on_value"] or f["value"]
+                return act("command", key, "run", _ps(raw), level, message + f"命令开启：{topic} (window={window})")
+            if base == "off":
+                if f["off_value"]:
+                    return act("command", key, "run", _ps(f["off_value"]), level, message + f"命令关闭(自定义)：{topic} (window={window})")
+                preset = f["off_preset"].lower()
+                if preset == "none":
+                    return act("command", key, "none", "", level, message + f"命令关闭预设=none：{topic}")
+                if preset == "custom":
+                    return act("command", key, "none", "", "warn", message + f"命令关闭预设=custom 但 off_value 为空：{topic}")
+                # interrupt / kill 依赖运行期登记的 PID，回放只能报告策略
+                strategy = "interrupt" if preset == "interrupt" else "kill"
+                return act("command", key, strategy, "recorded pids", level, message + f"命令关闭({strategy})：{topic}")
+            return act("command", key, "ignore", "", level, message + f"已忽略命令 payload：{payload} (topic={topic})")
+
+        if kind == "serve":
+            if base == "on":
+                return act("service", key, "start", f["service"], message=f"服务启动：{topic} => {f['service']}")
+            if base == "off":
+                preset = f["off_preset"].lower()
+                if preset == "none":
+                    return act("service", key, "none", message=f"服务关闭预设=none：{topic}")
+                if preset == "custom":
+                    if f["off_value"]:
+                        applied = rc_command.apply_value_placeholder(f["off_value"], value if has_value else None)
+                        cmd = rc_command.normalize_powershell_command(applied)
+                        return act("service", key, "run", cmd, message=f"服务关闭：执行自定义命令：{topic}")
+                    return act("service", key, "none", level="warn", message=f"服务关闭预设=custom 但命令为空：{topic}")
+                return act("service", key, "stop", f["service"], message=f"服务停止：{topic} => {f['service']}")
+            return act("service", key, "ignore", message=f"已忽略服务 payload：{payload} (topic={topic})")
+
+        if kind == "computer":
+            if base == "on":
+                action = cfg_str(self.cfg, "computer_on_action")
+                delay = cfg_int(self.cfg, "computer_on_delay", 0)
+                return act("computer", key, "lock" if action is None else action, f"delay={delay}")
+            if base == "off":
+                action = cfg_str(self.cfg, "computer_off_action")
+                delay = cfg_int(self.cfg, "computer_off_delay", 60)
+                return act("computer", key, "none" if action is None else action, f"delay={delay}")
+            return act("computer", key, "ignore", level="warn", message=f"未知电脑指令：{payload}")
+
+        if kind == "screen":
+            if base == "off":
+                return act("screen", key, "set", 0)
+            if base == "on":
+                if has_value and not 0 <= value <= 100:
+                    return act("screen", key, "ignore", value, "warn", f"亮度百分比超出范围 0-100：{value} (topic={topic})")
+                return act("screen", key, "set", value if has_value else 100)
+            return act("screen", key, "ignore", level="warn", message=f"未知屏幕指令：{payload}")
+
+        if kind == "volume":
+            lo = max(0, cfg_int(self.cfg, "volume_min", 0))
+            hi = min(100, cfg_int(self.cfg, "volume_max", 100))
+            if lo > hi:
+                lo, hi = hi, lo
+            if base in ("off", "pause"):
+                return act("volume", key, "set", 0)
+            if has_value and not 0 <= value <= 100:
+                return act("volume", key, "ignore", value, "warn", f"音量百分比超出范围 0-100：{value} (topic={topic})")
+            target = value if has_value else 100
+            return act("volume", key, "set", min(max(target, lo), hi))
+
+        if kind == "sleep":
+            if base in ("on", "off"):
+                action = cfg_str(self.cfg, f"sleep_{base}_action")
+                delay = cfg_int(self.cfg, f"sleep_{base}_delay", 0)
+                action = ("sleep" if base == "on" else "none") if action is None else action
+                return act("sleep", key, action, f"delay={delay}" if delay > 0 else "")
+            return act("sleep", key, "ignore", level="warn", message=f"未知睡眠指令：{payload}")
+
+        if kind == "media":
+            return act("media", key, "media", payload)
+
+        # hotkey
+        if base in ("on", "off"):
+            return act("hotkey", key, f[f"{base}_type"], f[f"{base}_value"])
+        return act("hotkey", key, "ignore", message=f"已忽略热键 payload：{payload} (topic={topic})")
+
+
+# ---- 回放 ----
+
+
+def parse_message_line(line: str) -> Optional[Tuple[str, str]]:
+    """解析一行输入：JSON 对象 {"topic", "payload"} 或 "topic<TAB>payload"；空行与 # 注释返回 None。"""
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        try:
+            obj = json.loads(line)
+            return str(obj["topic"]), str(obj["payload"])
+        except Exception:
+            return None
+    topic, sep, payload = line.partition("\t")
+    return (topic, payload) if sep else None
+
+
+def replay(router: Router, lines: Iterable[str]) -> Iterator[Action]:
+    handle = router.handle
+    for line in lines:
+        msg = parse_message_line(line)
+        if msg is not None:
+            yield handle(*msg)
+
+
+def _tsv_field(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def format_action(action: Action, fmt: str = "tsv") -> str:
+    if fmt == "jsonl":
+        return json.dumps(action.to_dict(), ensure_ascii=False)
+    return "\t".join(_tsv_field(x) for x in action[:7])
+
+
+def run_replay(router: Router, src: TextIO, out: TextIO, fmt: str = "tsv", summary: bool = False) -> Dict[str, int]:
+    """回放 src 中的消息并逐条写出结果；返回按 kind/action 统计的条数。"""
+    counts: Dict[str, int] = {}
+    rendered: Dict[Action, str] = {}
+    buf: List[str] = []
+    write = out.write
+    for action in replay(router, src):
+        line = rendered.get(action)
+        if line is None:
+            if len(rendered) >= _MEMO_LIMIT:
+                rendered.clear()
+            line = rendered[action] = format_action(action, fmt) + "\n"
+        if not summary:
+            buf.append(line)
+            if len(buf) >= 4096:
+                write("".join(buf))
+                buf.clear()
+        k = f"{action.kind}.{action.action}"
+        counts[k] = counts.get(k, 0) + 1
+    if buf:
+        write("".join(buf))
+    return counts
+
+
+def _self_check() -> None:
+    import io
+
+    cfg = flatten_config(tomllib.loads("""
+[settings]
+notify = 1
+[built_in_themes]
+Computer = "pc"
+Computer_checked = 1
+computer_off_action = "shutdown"
+screen = "light"
+screen_checked = true
+volume = "vol"
+volume_checked = 1
+volume_min = 10
+volume_max = 80
+sleep = "zz"
+sleep_checked = 0
+[custom]
+application1 = "app"
+application1_checked = 1
+application1_on_value = 'C:\\Tools\\app.exe'
+command1 = "cmd"
+command1_checked = 1
+command1_on_value = 'curl "http://x/?v={value}"'
+command1_value_min = 20
+command1_value_max = 30
+command1_off_preset = "interrupt"
+command2 = "app"
+command2_checked = 1
+command2_value = "shadowed by application1"
+serve1 = "svc"
+serve1_checked = 1
+serve1_value = "Spooler"
+hotkey1 = "hk"
+hotkey1_checked = 1
+hotkey1_on_value = "ctrl+alt+t"
+hotkey2 = "light"
+hotkey2_checked = 1
+"""))
+    r = Router(cfg)
+    assert r.topics == ["pc", "light", "vol", "app", "cmd", "app", "svc", "hk", "light"], r.topics
+    h = r.handle
+    assert parse_percent_payload_strict("ON# 42") == ("on", 42, True)
+    assert parse_percent_payload_strict("on#4x") is None and parse_percent_payload_strict("off#") is None
+    assert parse_percent_payload_strict("on#99999999999") is None
+    assert h("app", "on")[2:6] == ("app", "application1", "run", "C:\\Tools\\app.exe")
+    assert h("app", "off")[4:6] == ("kill", "C:\\Tools\\app.exe")
+    a = h("cmd", "on#5")
+    assert a.action == "run" and a.detail == 'curl.exe "http://x/?v=20"' and a.level == "warn", a
+    assert h("cmd", "off").action == "interrupt"
+    assert h("svc", "off")[4:6] == ("stop", "Spooler")
+    assert h("pc", "on")[4:6] == ("lock", "delay=0") and h("pc", "off")[4:6] == ("shutdown", "delay=60")
+    assert h("light", "on#50")[4:6] == ("set", "50") and h("light", "on#150").action == "ignore"
+    assert h("light", "pause").level == "warn"  # 屏幕优先于同名热键
+    assert h("vol", "on#95")[5] == "80" and h("vol", "pause")[5] == "0"
+    assert h("zz", "on").kind == "topic"  # 未勾选的内置主题不会匹配
+    assert h("hk", "on")[4:6] == ("keyboard", "ctrl+alt+t") and h("hk", "off")[4:6] == ("none", "")
+    assert h("x", "hello").kind == "payload" and h("x", "on#").action == "invalid"
+    assert h("cmd", "on#5") is a  # 结果缓存
+
+    # 吞吐：回放 20 万条（含重复的 topic/payload 组合）
+    payloads = ["on", "off", "pause", "on#10", "on#55", "off#3", "bogus"]
+    topics = ["app", "cmd", "svc", "pc", "light", "vol", "hk", "nope"]
+    lines = [f"{topics[i % 8]}\t{payloads[(i // 8) % 7]}\n" for i in range(200_000)]
+    lines.append('{"topic": "svc", "payload": "on"}\n')
+    out = io.StringIO()
+    start = time.perf_counter()
+    counts = run_replay(Router(cfg), iter(lines), out)
+    elapsed = time.perf_counter() - start
+    assert sum(counts.values()) == 200_001 and out.getvalue().count("\n") == 200_001
+    assert out.getvalue().endswith("svc\ton\tservice\tserve1\tstart\tSpooler\tinfo\n")
+    print(f"rc_router self-check OK ({len(lines) / elapsed:,.0f} msg/s)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="按 config.toml 回放 (topic, payload) 消息，输出 RC-main 会执行的动作")
+    ap.add_argument("config", nargs="?", help="config.toml 路径")
+    ap.add_argument("messages", nargs="?", default="-", help="消息文件（每行 topic<TAB>payload 或 JSON），- 表示标准输入")
+    ap.add_argument("--format", choices=("tsv", "jsonl"), default="tsv")
+    ap.add_argument("--summary", action="store_true", help="只输出按 kind.action 汇总的条数")
+    ap.add_argument("--self-check", action="store_true")
+    args = ap.parse_args(argv)
+    if args.self_check:
+        _self_check()
+        return 0
+    if not args.config:
+        ap.error("缺少 config.toml 路径（自检请使用 --self-check）")
+    router = Router.from_file(args.config)
+    src = sys.stdin if args.messages == "-" else open(args.messages, "r", encoding="utf-8", errors="replace")
+    try:
+        counts = run_replay(router, src, sys.stdout, args.format, args.summary)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+    if args.summary:
+        for k, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+            print(f"{n}\t{k}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
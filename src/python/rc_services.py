@@ -0,0 +1,151 @@
+"""Windows 服务目录（主题编辑窗口“选择服务”与保存时校验用）
+
+服务列表只在后台枚举一次并缓存（带 TTL）；过期后再次枚举时与旧目录比对，只增删变化的项，
+并报告新增/移除的服务名。枚举后端可替换：默认使用 psutil.win_service_iter()（只取名称与
+显示名，不逐个查询状态，一次枚举即可完成），测试时可换成 static_backend。
+
+目录可序列化为字典（to_dict / from_dict），由调用方决定保存位置（GUI 存在 RC-GUI.cache.json）。
+    python rc_services.py
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 目录有效期：服务很少增删，一天刷新一次即可（打开选择窗口时也会在后台刷新过期目录）
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class ServiceInfo(NamedTuple):
+    name: str  # 服务名（sc / net start 使用的名称）
+    display_name: str
+
+
+ServiceBackend = Callable[[], Iterable[ServiceInfo]]
+
+
+def psutil_backend() -> List[ServiceInfo]:
+    """通过 psutil 枚举本机服务（仅 Windows）。"""
+    import psutil
+
+    return [ServiceInfo(s.name(), s.display_name()) for s in psutil.win_service_iter()]
+
+
+def static_backend(services: Iterable[Tuple[str, str]]) -> ServiceBackend:
+    """固定列表后端（测试或非 Windows 环境使用）。"""
+    items = [ServiceInfo(n, d) for n, d in services]
+    return lambda: list(items)
+
+
+class ServiceCatalog:
+    """
+    English: Cached, incrementally refreshed catalog of Windows services with a pluggable backend
+    中文: 带 TTL 的服务目录：refresh 在后台线程调用，search/lookup 可随时在主线程读取
+    """
+
+    def __init__(self, backend: Optional[ServiceBackend] = None, ttl: float = DEFAULT_TTL_SECONDS):
+        self._backend = backend or psutil_backend
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._services: Dict[str, ServiceInfo] = {}  # 小写服务名 -> 服务
+        self._loaded_at = 0.0
+        self.last_diff: Tuple[List[str], List[str]] = ([], [])  # (新增, 移除)
+
+    # ---- 持久化 ----
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "time": self._loaded_at,
+                "services": [[s.name, s.display_name] for s in self._services.values()],
+            }
+
+    def from_dict(self, data: dict) -> bool:
+        try:
+            services = {n.lower(): ServiceInfo(str(n), str(d)) for n, d in data["services"]}
+            loaded_at = float(data["time"])
+        except Exception:
+            return False
+        with self._lock:
+            self._services = services
+            self._loaded_at = loaded_at
+        return True
+
+    # ---- 刷新 ----
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at > 0
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return not self.loaded or now - self._loaded_at >= self._ttl or now < self._loaded_at
+
+    def refresh(self) -> bool:
+        """重新枚举并与当前目录比对；返回是否有增删或显示名变化。后端出错时保留旧目录并抛出异常。"""
+        fresh = {s.name.lower(): s for s in self._backend()}
+        with self._lock:
+            old = self._services
+            added = sorted(fresh[k].name for k in fresh.keys() - old.keys())
+            removed = sorted(old[k].name for k in old.keys() - fresh.keys())
+            renamed = any(old[k] != fresh[k] for k in fresh.keys() & old.keys())
+            if added or removed or renamed:
+                # 只替换变化的项，未变化的 ServiceInfo 对象保持不变
+                merged = {k: old.get(k) if old.get(k) == v else v for k, v in fresh.items()}
+                self._services = merged
+            self._loaded_at = time.time()
+            self.last_diff = (added, removed)
+        return bool(added or removed or renamed)
+
+    # ---- 查询 ----
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    def lookup(self, name: str) -> Optional[bool]:
+        """服务是否存在（不区分大小写）；目录尚未加载时返回 None。可直接用作 rc_check 的 service_lookup。"""
+        if not self.loaded:
+            return None
+        with self._lock:
+            return (name or "").strip().lower() in self._services
+
+    def canonical_name(self, name: str) -> Optional[str]:
+        with self._lock:
+            info = self._services.get((name or "").strip().lower())
+        return info.name if info else None
+
+    def search(self, query: str, limit: int = 300) -> List[ServiceInfo]:
+        """在服务名与显示名中检索（多个词需同时命中）；服务名以查询开头的排在前面。"""
+        terms = (query or "").lower().split()
+        with self._lock:
+            services = sorted(self._services.values(), key=lambda s: s.name.lower())
+        if not terms:
+            return services[:limit]
+        scored = []
+        for s in services:
+            name = s.name.lower()
+            hay = name + "\n" + s.display_name.lower()
+            if not all(term in hay for term in terms):
+                continue
+            rank = 0 if name.startswith(terms[0]) else (1 if s.display_name.lower().startswith(terms[0]) else 2)
+            scored.append((rank, s))
+        scored.sort(key=lambda x: x[0])
+        return [s for _, s in scored[:limit]]
+
+
+if __name__ == "__main__":
+    # 自检：用固定列表后端验证刷新、增量比对、TTL 与序列化
+    current = [("Spooler", "Print Spooler"), ("wuauserv", "Windows Update")]
+    cat = ServiceCatalog(lambda: [ServiceInfo(n, d) for n, d in current], ttl=60)
+    assert cat.lookup("spooler") is None and cat.is_stale()
+    assert cat.refresh() and cat.last_diff == (["Spooler", "wuauserv"], [])
+    assert cat.lookup("SPOOLER") and cat.lookup("Missing") is False
+    assert not cat.is_stale() and cat.is_stale(time.time() + 61)
+    spooler = cat.search("spool")[0]
+    current = [("Spooler", "Print Spooler"), ("BITS", "Background Intelligent Transfer Service")]
+    assert cat.refresh() and cat.last_diff == (["BITS"], ["wuauserv"])
+    assert cat.search("spool")[0] is spooler  # 未变化的项被保留
+    assert [s.name for s in cat.search("background")] == ["BITS"]
+    assert not cat.refresh()
+    copy = ServiceCatalog(static_backend([]))
+    assert copy.from_dict(cat.to_dict()) and copy.canonical_name("bits") == "BITS" and not copy.is_stale()
+    print("rc_services self-check OK")
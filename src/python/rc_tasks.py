@@ -0,0 +1,253 @@
+"""开机自启动计划任务管理
+
+原来的做法每一步都单独启动 schtasks.exe 或重新连接 Schedule.Service：
+创建任务 → 删除两个旧任务名 → 再连接 COM 修改设置并重新注册，托盘任务再来一遍；
+检查任务是否存在时还要枚举根目录下的全部任务。
+
+这里只连接一次任务计划服务并保持会话：
+- 直接构造任务定义（触发器、操作、权限、设置）并一次注册，不再经过 schtasks；
+- 按名称查询任务（GetTask），结果缓存，注册/删除时同步更新缓存；
+- 旧任务名的清理批量进行，缓存中已知不存在的任务不会再发起调用；
+- 连接失效（例如服务重启）时自动重连一次。
+
+后端可替换：ComSchedulerBackend 使用 win32com，FakeSchedulerBackend 只在内存中记录，用于自检。
+    python rc_tasks.py
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+# Task Scheduler 2.0 常量
+TASK_TRIGGER_BOOT = 8
+TASK_TRIGGER_LOGON = 9
+TASK_ACTION_EXEC = 0
+TASK_CREATE_OR_UPDATE = 6
+TASK_LOGON_INTERACTIVE_TOKEN = 3
+TASK_LOGON_GROUP = 4
+TASK_LOGON_SERVICE_ACCOUNT = 5
+TASK_RUNLEVEL_HIGHEST = 1
+# 多实例策略：并行 0 / 排队 1 / 不运行新实例 2 / 停止已运行的实例 3
+TASK_INSTANCES_PARALLEL = 0
+TASK_INSTANCES_STOP_EXISTING = 3
+
+# 旧版本使用过的中文任务名（设置或关闭自启动时一并清理）
+LEGACY_TASK_NAMES = ("A远程控制", "A远程托盘")
+
+
+class TaskSpec(NamedTuple):
+    name: str
+    path: str  # 要运行的程序
+    trigger: str  # "logon"（用户登录时）/ "boot"（系统启动时）
+    account: str  # "group"（Administrators 组）/ "system"（SYSTEM）/ "user"（当前登录用户）
+    multiple_instances: int = TASK_INSTANCES_PARALLEL
+
+
+class ComSchedulerBackend:
+    """通过 Schedule.Service 操作根目录下的任务（仅 Windows）。"""
+
+    def __init__(self):
+        import win32com.client
+
+        self._service = win32com.client.Dispatch("Schedule.Service")
+        self._service.Connect()
+        self._folder = self._service.GetFolder("\\")
+
+    def exists(self, name: str) -> bool:
+        try:
+            self._folder.GetTask(name)
+            return True
+        except Exception as e:
+            # 任务不存在时 GetTask 抛出 ERROR_FILE_NOT_FOUND；其它错误（如连接失效）继续抛出
+            if _is_not_found(e):
+                return False
+            raise
+
+    def register(self, spec: TaskSpec) -> None:
+        td = self._service.NewTask(0)
+        td.Triggers.Create(TASK_TRIGGER_BOOT if spec.trigger == "boot" else TASK_TRIGGER_LOGON)
+        action = td.Actions.Create(TASK_ACTION_EXEC)
+        action.Path = spec.path
+        td.Principal.RunLevel = TASK_RUNLEVEL_HIGHEST
+        settings = td.Settings
+        settings.MultipleInstances = spec.multiple_instances
+        settings.Hidden = False  # 确保不是隐藏运行
+        settings.DisallowStartIfOnBatteries = False  # 电池供电时也允许启动
+        settings.StopIfGoingOnBatteries = False  # 切换到电池供电时不停止
+        settings.ExecutionTimeLimit = "PT0S"  # 无限时间限制
+        if spec.account == "system":
+            user, logon_type = "SYSTEM", TASK_LOGON_SERVICE_ACCOUNT
+        elif spec.account == "group":
+            user, logon_type = "BUILTIN\\Administrators", TASK_LOGON_GROUP
+        else:
+            user, logon_type = "", TASK_LOGON_INTERACTIVE_TOKEN
+        td.Principal.LogonType = logon_type
+        self._folder.RegisterTaskDefinition(spec.name, td, TASK_CREATE_OR_UPDATE, user, "", logon_type)
+
+    def delete(self, name: str) -> bool:
+        try:
+            self._folder.DeleteTask(name, 0)
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+
+def _hresult_in(e: Exception, codes: set) -> bool:
+    # com_error: args[0] 为 HRESULT（有符号），excepinfo[5] 为 scode
+    for arg in getattr(e, "args", ()):
+        if isinstance(arg, int) and (arg in codes or arg - (1 << 32) in codes):
+            return True
+    excepinfo = getattr(e, "excepinfo", None)
+    return bool(excepinfo and len(excepinfo) > 5 and excepinfo[5] in codes)
+
+
+def _is_not_found(e: Exception) -> bool:
+    # HRESULT_FROM_WIN32(ERROR_FILE_NOT_FOUND) / ERROR_PATH_NOT_FOUND
+    return _hresult_in(e, {-2147024894, -2147024893})
+
+
+# 会话失效类错误（可重连重试）：RPC_S_SERVER_UNAVAILABLE、RPC_S_CALL_FAILED、RPC_S_CALL_FAILED_DNE、
+# RPC_E_DISCONNECTED、CO_E_OBJNOTCONNECTED、SCHED_E_SERVICE_NOT_RUNNING
+_DISCONNECTED_HRESULTS = {-2147023174, -2147023170, -2147023169, -2147417848, -2147221507, -2147216619}
+
+
+def _is_disconnected(e: Exception) -> bool:
+    return isinstance(e, ConnectionError) or _hresult_in(e, _DISCONNECTED_HRESULTS)
+
+
+class FakeSchedulerBackend:
+    """内存中的任务计划（测试用），记录每次调用。"""
+
+    def __init__(self, tasks: Iterable[str] = ()):
+        self.tasks: Dict[str, Optional[TaskSpec]] = {name: None for name in tasks}
+        self.calls: List[tuple] = []
+        self.fail_next: Optional[Exception] = None  # 下一次调用抛出的异常（模拟连接失效、拒绝访问等）
+
+    def _call(self, *call) -> None:
+        self.calls.append(call)
+        if self.fail_next is not None:
+            e, self.fail_next = self.fail_next, None
+            raise e
+
+    def exists(self, name: str) -> bool:
+        self._call("exists", name)
+        return name in self.tasks
+
+    def register(self, spec: TaskSpec) -> None:
+        self._call("register", spec.name)
+        self.tasks[spec.name] = spec
+
+    def delete(self, name: str) -> bool:
+        self._call("delete", name)
+        return self.tasks.pop(name, False) is not False
+
+
+class TaskManager:
+    """
+    English: Scheduled-task manager holding one scheduler session with a by-name lookup cache
+    中文: 持有一个任务计划会话的管理器；按名称缓存是否存在，首次使用时才连接
+    """
+
+    def __init__(self, connect: Optional[Callable[[], object]] = None):
+        self._connect = connect or ComSchedulerBackend
+        self._backend = None
+        self._exists: Dict[str, bool] = {}
+        self.connects = 0
+
+    def _call(self, method: str, *args):
+        # 只有连接失效（RPC/服务重启）时才丢弃会话与缓存并重连重试一次；
+        # 拒绝访问、任务定义无效等错误原样抛出，会话与缓存保持
+        for attempt in (0, 1):
+            if self._backend is None:
+                self._backend = self._connect()
+                self.connects += 1
+            try:
+                return getattr(self._backend, method)(*args)
+            except Exception as e:
+                if not _is_disconnected(e):
+                    raise
+                self._backend = None
+                self._exists.clear()
+                if attempt:
+                    raise
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """丢弃缓存（任务可能在程序外被修改时调用）；会话保持。"""
+        if name is None:
+            self._exists.clear()
+        else:
+            self._exists.pop(name, None)
+
+    def exists(self, name: str) -> bool:
+        if name not in self._exists:
+            self._exists[name] = bool(self._call("exists", name))
+        return self._exists[name]
+
+    def register(self, spec: TaskSpec) -> None:
+        self._call("register", spec)
+        self._exists[spec.name] = True
+
+    def delete_many(self, names: Iterable[str]) -> Dict[str, bool]:
+        """批量删除；返回 {任务名: 是否确实删除了}。缓存中已知不存在的任务直接跳过。"""
+        results: Dict[str, bool] = {}
+        for name in names:
+            if self._exists.get(name) is False:
+                results[name] = False
+                continue
+            results[name] = bool(self._call("delete", name))
+            self._exists[name] = False
+        return results
+
+    def install(self, main: TaskSpec, tray: Optional[TaskSpec] = None, legacy: Iterable[str] = LEGACY_TASK_NAMES) -> None:
+        """注册主程序（及托盘）任务，并清理旧任务名。"""
+        self.register(main)
+        if tray is not None:
+            self.register(tray)
+        self.delete_many(legacy)
+
+    def uninstall(self, names: Iterable[str], legacy: Iterable[str] = LEGACY_TASK_NAMES) -> Dict[str, bool]:
+        results = self.delete_many(names)
+        self.delete_many(legacy)
+        return results
+
+
+if __name__ == "__main__":
+    # 自检：一次连接完成安装/检查/删除，缓存命中不再调用后端，连接失效时自动重连
+    backends: List[FakeSchedulerBackend] = []
+    existing = ["A远程控制"]
+
+    def _connect() -> FakeSchedulerBackend:
+        backends.append(FakeSchedulerBackend(existing))
+        return backends[-1]
+
+    mgr = TaskManager(_connect)
+    main = TaskSpec("Main", r"C:\RC\RC-main.exe", "boot", "system", TASK_INSTANCES_STOP_EXISTING)
+    tray = TaskSpec("Tray", r"C:\RC\RC-tray.exe", "logon", "user")
+    assert not mgr.exists("Main")
+    mgr.install(main, tray)
+    fake = backends[0]
+    assert mgr.connects == 1 and set(fake.tasks) == {"Main", "Tray"}
+    assert fake.calls == [
+        ("exists", "Main"), ("register", "Main"), ("register", "Tray"),
+        ("delete", "A远程控制"), ("delete", "A远程托盘"),
+    ], fake.calls
+    n = len(fake.calls)
+    assert mgr.exists("Main") and mgr.exists("Main") and len(fake.calls) == n  # 缓存命中
+    assert mgr.uninstall(["Main", "Tray"]) == {"Main": True, "Tray": True}
+    assert fake.calls[n:] == [("delete", "Main"), ("delete", "Tray")]  # 旧任务名已知不存在，跳过
+    assert not mgr.exists("Tray") and fake.tasks == {}
+
+    # 拒绝访问：原样抛出，不重连、不丢弃缓存
+    denied = OSError(-2147024891, "Access is denied.")
+    fake.fail_next = denied
+    try:
+        mgr.register(main)
+        raise AssertionError("expected access denied")
+    except OSError as e:
+        assert e is denied
+    assert mgr.connects == 1 and not mgr.exists("Tray") and "Main" not in fake.tasks
+
+    fake.fail_next = ConnectionError("RPC server unavailable")
+    mgr.invalidate()
+    existing = ["Main"]
+    assert mgr.exists("Main") and mgr.connects == 2  # 重连并重新查询
+    print("rc_tasks self-check OK")